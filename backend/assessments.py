@@ -0,0 +1,411 @@
+"""
+Online assessments: timed sessions, buffered answer autosave and grading.
+
+A scheduled test's questions are fixed when it is created, so each process
+caches its paper (Paper) and the sessions it has seen (OpenSession). A
+student starts a session once per test; it ends at started_at plus the test's
+duration, or at the test's end if that comes first.
+
+During a drive hundreds of students autosave at once, every few seconds.
+Saves are checked against the cached session and paper and kept in
+AnswerBuffer, which costs no SQL; a save to a question answered earlier in
+the same interval just replaces it. The buffer writes everything pending in
+one multi-row upsert of assessment_answers every
+assessment_autosave_flush_seconds, or sooner once
+assessment_autosave_max_pending answers are waiting. Each row carries its save
+time and the upsert keeps the newest, so it does not matter which worker
+flushes first. Submitting writes the session's pending answers in the submit
+transaction. Another worker that has the session cached only learns of the
+submit when it reloads it, so until the deadline it may still take a save;
+that save counts, as it would have without the submit. Answers still buffered
+when a process dies are lost; at most one flush interval's worth.
+
+A "grade_assessment" task is queued for assessment_grading_delay_seconds after
+the test ends, by which time every worker has flushed. Grading reads the
+test's answers into a sessions x questions matrix and scores them all with a
+few numpy operations, then writes every session's score in one executemany.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal, dialect_insert
+from models import Assessment, AssessmentSession, Question, assessment_answers, assessment_questions
+from task_queue import task_handler, utcnow
+
+FLUSH_CHUNK_ROWS = 1000  # Rows per upsert statement, well inside bind parameter limits
+MAX_CACHED_PAPERS = 1000
+MAX_CACHED_SESSIONS = 100000
+
+
+def _aware(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value  # SQLite returns naive UTC
+
+
+@dataclass
+class Paper:
+    """A scheduled test's fixed question paper"""
+    assessment_id: int
+    starts_at: datetime
+    ends_at: datetime
+    duration: timedelta
+    questions: Dict[int, dict]  # Question id -> SessionQuestion fields, in the scheduled order
+
+
+@dataclass
+class OpenSession:
+    id: int
+    assessment_id: int
+    student_id: int
+    started_at: datetime
+    deadline: datetime
+    submitted_at: Optional[datetime]
+
+
+def question_order(paper: Paper, session_id: int) -> List[int]:
+    """The session's own, stable order of the paper's questions"""
+    order = list(paper.questions)
+    random.Random(session_id).shuffle(order)
+    return order
+
+
+async def load_paper(db: AsyncSession, assessment_id: int) -> Optional[Paper]:
+    assessment = await db.get(Assessment, assessment_id)
+    if assessment is None:
+        return None
+    result = await db.execute(
+        select(Question.id, Question.text, Question.options, Question.marks, Question.negative_marks)
+        .join(assessment_questions, assessment_questions.c.question_id == Question.id)
+        .where(assessment_questions.c.assessment_id == assessment_id)
+        .order_by(assessment_questions.c.position)
+    )
+    return Paper(
+        assessment_id=assessment.id,
+        starts_at=_aware(assessment.starts_at),
+        ends_at=_aware(assessment.ends_at),
+        duration=timedelta(minutes=assessment.duration_minutes),
+        questions={
+            row.id: {
+                "id": row.id, "text": row.text, "options": json.loads(row.options),
+                "marks": row.marks, "negative_marks": row.negative_marks,
+            }
+            for row in result.all()
+        },
+    )
+
+
+def _open_session(row: AssessmentSession) -> OpenSession:
+    return OpenSession(
+        id=row.id,
+        assessment_id=row.assessment_id,
+        student_id=row.student_id,
+        started_at=_aware(row.started_at),
+        deadline=_aware(row.deadline),
+        submitted_at=_aware(row.submitted_at) if row.submitted_at else None,
+    )
+
+
+async def start_session(db: AsyncSession, paper: Paper, student_id: int) -> OpenSession:
+    """The student's session of the test, started now unless it already was; the caller commits"""
+    existing = select(AssessmentSession).where(
+        AssessmentSession.assessment_id == paper.assessment_id, AssessmentSession.student_id == student_id
+    )
+    row = (await db.execute(existing)).scalar_one_or_none()
+    if row is None:
+        now = utcnow()
+        stmt = dialect_insert(db.bind, AssessmentSession).values(
+            assessment_id=paper.assessment_id,
+            student_id=student_id,
+            started_at=now,
+            deadline=min(now + paper.duration, paper.ends_at),
+        )
+        stmt = stmt.on_conflict_do_nothing(index_elements=["assessment_id", "student_id"]).returning(AssessmentSession)
+        row = (await db.execute(stmt)).scalar_one_or_none()
+        if row is None:  # Started at the same moment from another tab
+            row = (await db.execute(existing)).scalar_one()
+    return _open_session(row)
+
+
+async def saved_answers(db: AsyncSession, session_id: int) -> Dict[int, int]:
+    result = await db.execute(
+        select(assessment_answers.c.question_id, assessment_answers.c.selected_option)
+        .where(assessment_answers.c.session_id == session_id)
+    )
+    return dict(result.all())
+
+
+def invalid_answer(paper: Paper, answers: List[Tuple[int, int]]) -> Optional[str]:
+    """Why answers cannot be saved for the paper, if they cannot"""
+    for question_id, option in answers:
+        question = paper.questions.get(question_id)
+        if question is None:
+            return f"Question {question_id} is not part of this test"
+        if option >= len(question["options"]):
+            return f"Question {question_id} has no option {option}"
+    return None
+
+
+class AnswerBuffer:
+    """Autosaved answers waiting to be written, with the papers and sessions that validate them"""
+
+    def __init__(self, flush_interval_seconds: float, max_pending: int, grace_seconds: float):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max_pending
+        self.grace = timedelta(seconds=grace_seconds)
+        self._pending: Dict[int, Dict[int, Tuple[int, datetime]]] = {}  # Session -> question -> (option, saved at)
+        self._pending_count = 0
+        self._papers: Dict[int, Paper] = {}
+        self._sessions: Dict[int, OpenSession] = {}
+        self._wake = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self.saves = 0
+        self.answers_saved = 0
+        self.answers_replaced = 0  # Overwritten before they were flushed
+        self.flushes = 0
+        self.rows_written = 0
+        self.largest_flush = 0
+        self.last_flush_ms = 0.0
+
+    async def paper(self, db: AsyncSession, assessment_id: int) -> Optional[Paper]:
+        paper = self._papers.get(assessment_id)
+        if paper is None:
+            paper = await load_paper(db, assessment_id)
+            if paper is not None:
+                if len(self._papers) >= MAX_CACHED_PAPERS:
+                    self._papers.pop(next(iter(self._papers)))
+                self._papers[assessment_id] = paper
+        return paper
+
+    def remember(self, session: OpenSession):
+        if len(self._sessions) >= MAX_CACHED_SESSIONS:
+            self._sessions.pop(next(iter(self._sessions)))
+        self._sessions[session.id] = session
+
+    async def session(self, db: AsyncSession, session_id: int) -> Optional[OpenSession]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            row = await db.get(AssessmentSession, session_id)
+            if row is None:
+                return None
+            session = _open_session(row)
+            self.remember(session)
+        return session
+
+    def save(self, session: OpenSession, answers: List[Tuple[int, int]]) -> Optional[str]:
+        """Buffer a session's answers (checked with invalid_answer()); returns why they were refused, if they were"""
+        now = utcnow()
+        if session.submitted_at is not None:
+            return "Test already submitted"
+        if now > session.deadline + self.grace:
+            return "Time is up for this test"
+
+        pending = self._pending.setdefault(session.id, {})
+        for question_id, option in answers:
+            if question_id in pending:
+                self.answers_replaced += 1
+            else:
+                self._pending_count += 1
+            pending[question_id] = (option, now)
+        self.saves += 1
+        self.answers_saved += len(answers)
+        if self._pending_count >= self.max_pending:
+            self._wake.set()
+        return None
+
+    def pending_answers(self, session_id: int) -> Dict[int, int]:
+        return {question_id: option for question_id, (option, _) in self._pending.get(session_id, {}).items()}
+
+    async def flush(self, db: Optional[AsyncSession] = None, session_id: Optional[int] = None) -> int:
+        """Write pending answers, all of them or one session's, and return how many.
+
+        With db the rows join the caller's transaction and this commits it,
+        so that a failed commit puts the answers back in the buffer; otherwise
+        they are written on a session of our own.
+        """
+        if session_id is None:
+            taken, self._pending = self._pending, {}
+        else:
+            taken = {session_id: self._pending.pop(session_id)} if session_id in self._pending else {}
+        rows = [
+            {"session_id": sid, "question_id": question_id, "selected_option": option, "saved_at": saved_at}
+            for sid in sorted(taken)  # Key order, so concurrent flushes lock rows alike
+            for question_id, (option, saved_at) in sorted(taken[sid].items())
+        ]
+        self._pending_count -= len(rows)
+        if not rows:
+            if db is not None:
+                await db.commit()
+            return 0
+
+        started = time.perf_counter()
+        try:
+            if db is not None:
+                await self._write(db, rows)
+                await db.commit()
+            else:
+                async with AsyncSessionLocal() as own:
+                    await self._write(own, rows)
+                    await own.commit()
+        except BaseException:
+            self._restore(taken)
+            raise
+        self.flushes += 1
+        self.rows_written += len(rows)
+        self.largest_flush = max(self.largest_flush, len(rows))
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+        return len(rows)
+
+    async def _write(self, db: AsyncSession, rows: List[dict]):
+        for start in range(0, len(rows), FLUSH_CHUNK_ROWS):
+            stmt = dialect_insert(db.bind, assessment_answers).values(rows[start:start + FLUSH_CHUNK_ROWS])
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=["session_id", "question_id"],
+                set_={"selected_option": stmt.excluded.selected_option, "saved_at": stmt.excluded.saved_at},
+                where=assessment_answers.c.saved_at <= stmt.excluded.saved_at,
+            ))
+
+    def _restore(self, taken: Dict[int, Dict[int, Tuple[int, datetime]]]):
+        """Put back answers a failed flush took, unless newer ones arrived meanwhile"""
+        for sid, answers in taken.items():
+            pending = self._pending.setdefault(sid, {})
+            for question_id, answer in answers.items():
+                if question_id not in pending:
+                    pending[question_id] = answer
+                    self._pending_count += 1
+
+    def _forget_finished(self):
+        """Drop cached sessions and papers that can take no more saves"""
+        cutoff = utcnow() - self.grace
+        for sid in [sid for sid, session in self._sessions.items() if session.deadline < cutoff]:
+            if sid not in self._pending:
+                del self._sessions[sid]
+        for assessment_id in [a for a, paper in self._papers.items() if paper.ends_at < cutoff]:
+            del self._papers[assessment_id]
+
+    async def start(self):
+        if self._flusher is None:
+            self._stopping.clear()
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still pending"""
+        if self._flusher is not None:
+            self._stopping.set()
+            self._wake.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+                self._forget_finished()
+            except SQLAlchemyError as e:
+                print(f"Autosave flush failed, will retry: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "pending_answers": self._pending_count,
+            "pending_sessions": len(self._pending),
+            "cached_sessions": len(self._sessions),
+            "cached_papers": len(self._papers),
+            "saves": self.saves,
+            "answers_saved": self.answers_saved,
+            "answers_replaced": self.answers_replaced,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "largest_flush": self.largest_flush,
+            "last_flush_ms": round(self.last_flush_ms, 1),
+        }
+
+
+answer_buffer = AnswerBuffer(
+    flush_interval_seconds=settings.assessment_autosave_flush_seconds,
+    max_pending=settings.assessment_autosave_max_pending,
+    grace_seconds=settings.assessment_autosave_grace_seconds,
+)
+
+
+async def grade_assessment(db: AsyncSession, assessment_id: int) -> dict:
+    """Score every session of a test from its saved answers; the caller commits.
+
+    Safe to run again: scores are recomputed from the answers.
+    """
+    started = time.perf_counter()
+    key = (await db.execute(
+        select(Question.id, Question.correct_option, Question.marks, Question.negative_marks)
+        .join(assessment_questions, assessment_questions.c.question_id == Question.id)
+        .where(assessment_questions.c.assessment_id == assessment_id)
+        .order_by(Question.id)
+    )).all()
+    session_ids = np.fromiter((await db.execute(
+        select(AssessmentSession.id).where(AssessmentSession.assessment_id == assessment_id).order_by(AssessmentSession.id)
+    )).scalars(), dtype=np.int64)
+    answers = (await db.execute(
+        select(assessment_answers.c.session_id, assessment_answers.c.question_id, assessment_answers.c.selected_option)
+        .join(AssessmentSession, AssessmentSession.id == assessment_answers.c.session_id)
+        .where(AssessmentSession.assessment_id == assessment_id)
+    )).all()
+
+    question_ids = np.array([row.id for row in key], dtype=np.int64)
+    correct = np.array([row.correct_option for row in key], dtype=np.int16)
+    marks = np.array([row.marks for row in key], dtype=np.float64)
+    penalties = np.array([row.negative_marks for row in key], dtype=np.float64)
+
+    # chosen[s, q]: the option session s picked for question q, -1 when unanswered
+    chosen = np.full((len(session_ids), len(question_ids)), -1, dtype=np.int16)
+    if answers and len(question_ids):
+        triples = np.array(answers, dtype=np.int64)
+        rows = np.searchsorted(session_ids, triples[:, 0])
+        cols = np.searchsorted(question_ids, triples[:, 1])
+        on_paper = (cols < len(question_ids)) & (question_ids[np.minimum(cols, len(question_ids) - 1)] == triples[:, 1])
+        chosen[rows[on_paper], cols[on_paper]] = triples[on_paper, 2]
+
+    answered = chosen >= 0
+    right = chosen == correct
+    wrong = answered & ~right
+    scores = right @ marks - wrong @ penalties
+    correct_counts = right.sum(axis=1)
+    answered_counts = answered.sum(axis=1)
+
+    if len(session_ids):
+        await db.execute(update(AssessmentSession), [
+            {"id": int(sid), "score": round(float(score), 4), "correct_count": int(hits), "answered_count": int(count)}
+            for sid, score, hits, count in zip(session_ids, scores, correct_counts, answered_counts)
+        ])
+    await db.execute(update(Assessment).where(Assessment.id == assessment_id).values(graded_at=utcnow()))
+    return {
+        "assessment_id": assessment_id,
+        "sessions": int(len(session_ids)),
+        "answers": len(answers),
+        "mean_score": round(float(scores.mean()), 2) if len(session_ids) else None,
+        "max_score": float(marks.sum()),
+        "grading_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+@task_handler("grade_assessment")
+async def grade_closed_assessment(payload: dict):
+    """Grading queued for shortly after a test ends"""
+    await answer_buffer.flush()
+    async with AsyncSessionLocal() as db:
+        await grade_assessment(db, payload["assessment_id"])
+        await db.commit()
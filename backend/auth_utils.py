@@ -1,5 +1,8 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from config import settings
@@ -18,6 +21,55 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+# bcrypt costs a few hundred ms of CPU per call, so request handlers run it on
+# a bounded pool instead of the event loop
+_hash_executor: Optional[Executor] = None
+_hash_pending = 0
+
+def get_hash_executor() -> Executor:
+    """Lazily create the password hashing pool"""
+    global _hash_executor
+    if _hash_executor is None:
+        if settings.password_hash_pool == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+        else:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                thread_name_prefix="password-hash"
+            )
+    return _hash_executor
+
+def shutdown_hash_executor():
+    """Stop the password hashing pool"""
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+async def _run_hash_job(func, *args):
+    """Run a hashing call on the pool, shedding load with a 503 when it is full"""
+    global _hash_pending
+    if _hash_pending >= settings.password_hash_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, please retry shortly",
+            headers={"Retry-After": str(settings.password_hash_retry_after_seconds)},
+        )
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), func, *args)
+    finally:
+        _hash_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash on the hashing pool"""
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool"""
+    return await _run_hash_job(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -30,6 +82,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
+def build_token_claims(user) -> dict:
+    """Claims identifying a user: email subject, id, role and token version"""
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role.value,
+        "ver": user.token_version or 0,
+    }
+
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode JWT token"""
     try:
@@ -37,6 +98,9 @@ def verify_token(token: str) -> Optional[dict]:
         email: str = payload.get("sub")
         if email is None:
             return None
+        # Tokens issued before id/role/version claims existed are no longer accepted
+        if payload.get("uid") is None or payload.get("role") is None or payload.get("ver") is None:
+            return None
         return payload
     except JWTError:
         return None
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Online test load benchmark: N students take the same timed test at once.
+
+Each simulated student starts the test, autosaves a few answers every
+--interval seconds for --rounds rounds, and submits. Reports latency
+percentiles for start, autosave and submit, how the autosave buffer batched
+the writes, and how long grading the whole test took.
+
+    python bench_assessments.py --takers 1000
+    python bench_assessments.py --takers 1000 --rounds 20 --interval 1 --ramp 2 --questions 60
+The app is driven in-process through httpx.ASGITransport against DATABASE_URL,
+or a throwaway SQLite database when that is not set. Client and server share
+one process, so at high request rates the latencies measure that process's
+CPU as much as the server.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='assessments-bench-'), 'bench.db')}"
+
+import httpx
+from sqlalchemy import func, insert, select, update
+
+from auth_utils import create_access_token, build_token_claims
+from config import settings
+from database import engine, Base, async_engine
+from models import User, UserRole, Assessment, assessment_answers
+from assessments import answer_buffer
+from task_queue import utcnow
+
+
+def seed_users(takers: int) -> dict:
+    """Students and a recruiter, written directly: registering would time bcrypt, not tests"""
+    Base.metadata.create_all(bind=engine)
+    suffix = uuid4().hex[:8]
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"name": f"Bench student {i}", "email": f"bench-{suffix}-{i}@example.com", "role": UserRole.STUDENT,
+             "company_name": None}
+            for i in range(takers)
+        ] + [
+            {"name": "Bench recruiter", "email": f"bench-{suffix}-company@example.com", "role": UserRole.COMPANY,
+             "company_name": f"Bench Corp {suffix}"},
+        ])
+        rows = connection.execute(
+            select(User.id, User.email, User.role, User.token_version, User.company_name)
+            .where(User.email.like(f"bench-{suffix}-%"))
+            .order_by(User.id)
+        ).all()
+
+    def headers(row) -> dict:
+        return {"Authorization": f"Bearer {create_access_token(data=build_token_claims(SimpleNamespace(**row._mapping)))}"}
+
+    company = next(row for row in rows if row.role == UserRole.COMPANY)
+    return {
+        "company": headers(company),
+        "company_name": company.company_name,
+        "students": [headers(row) for row in rows if row.role == UserRole.STUDENT],
+    }
+
+
+async def schedule(client: httpx.AsyncClient, seeded: dict, questions: int) -> int:
+    rng = random.Random(1)
+    r = await client.post("/api/tests/banks", headers=seeded["company"], json={
+        "name": "Bench aptitude",
+        "questions": [
+            {"text": f"Question {i}", "options": ["A", "B", "C", "D"], "correct_option": rng.randrange(4),
+             "marks": 1, "negative_marks": 0.25}
+            for i in range(questions)
+        ],
+    })
+    r.raise_for_status()
+    now = utcnow()
+    r = await client.post("/api/tests/", headers=seeded["company"], json={
+        "title": "Bench aptitude round", "company_name": seeded["company_name"], "position": "Engineer",
+        "type": "aptitude", "bank_id": r.json()["id"], "duration_minutes": 60,
+        "starts_at": (now - timedelta(minutes=1)).isoformat(), "ends_at": (now + timedelta(hours=1)).isoformat(),
+    })
+    r.raise_for_status()
+    return r.json()["id"]
+
+
+async def take_test(client, headers, assessment_id: int, args, rng: random.Random, latencies: dict):
+    async def timed(kind: str, request):
+        started = time.perf_counter()
+        r = await request
+        latencies[kind].append((time.perf_counter() - started) * 1000)
+        r.raise_for_status()
+        return r.json()
+
+    await asyncio.sleep(rng.uniform(0, args.ramp))  # Students do not click start in lockstep
+    session = await timed("start", client.post(f"/api/tests/{assessment_id}/start", headers=headers))
+    questions = session["questions"]
+    for _ in range(args.rounds):
+        await asyncio.sleep(args.interval * rng.uniform(0.8, 1.2))
+        answers = [
+            {"question_id": q["id"], "selected_option": rng.randrange(len(q["options"]))}
+            for q in rng.sample(questions, rng.randint(1, 3))
+        ]
+        await timed("autosave", client.put(
+            f"/api/tests/sessions/{session['session_id']}/answers", headers=headers, json={"answers": answers}))
+    await timed("submit", client.post(f"/api/tests/sessions/{session['session_id']}/submit", headers=headers))
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--takers", type=int, default=1000, help="Students taking the test at once")
+    parser.add_argument("--rounds", type=int, default=6, help="Autosaves per student")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between a student's autosaves")
+    parser.add_argument("--ramp", type=float, default=10, help="Seconds over which students start the test")
+    parser.add_argument("--questions", type=int, default=50)
+    args = parser.parse_args()
+
+    seeded = seed_users(args.takers)
+    from main import app
+    await answer_buffer.start()  # ASGITransport does not run startup handlers
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+            assessment_id = await schedule(client, seeded, args.questions)
+
+            latencies = {"start": [], "autosave": [], "submit": []}
+            rng = random.Random(2)
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                take_test(client, headers, assessment_id, args, random.Random(rng.random()), latencies)
+                for headers in seeded["students"]
+            ))
+            elapsed = time.perf_counter() - started
+
+            print(f"{args.takers} students, {args.rounds} autosaves each, in {elapsed:.1f} s "
+                  f"({sum(map(len, latencies.values())) / elapsed:.0f} req/s)\n")
+            print(f"{'request':<10} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+            for kind, values in latencies.items():
+                print(f"{kind:<10} {len(values):>7} {statistics.median(values):>8.1f} {percentile(values, 0.95):>8.1f} "
+                      f"{percentile(values, 0.99):>8.1f} {max(values):>8.1f}")
+
+            stats = answer_buffer.stats()
+            with engine.connect() as connection:
+                stored = connection.execute(select(func.count()).select_from(assessment_answers)).scalar()
+            print(f"\nAutosave buffer: {stats['answers_saved']} answers saved, {stats['answers_replaced']} replaced "
+                  f"before reaching the database; {stats['rows_written']} rows in {stats['flushes']} flushes "
+                  f"(largest {stats['largest_flush']} rows), {stored} answer rows stored")
+
+            with engine.begin() as connection:
+                # Backdated past the window in which late saves may still be flushing
+                settled = settings.assessment_autosave_grace_seconds + settings.assessment_autosave_flush_seconds + 1
+                connection.execute(
+                    update(Assessment).where(Assessment.id == assessment_id).values(ends_at=utcnow() - timedelta(seconds=settled))
+                )
+            r = await client.post(f"/api/tests/{assessment_id}/grade", headers=seeded["company"])
+            r.raise_for_status()
+            graded = r.json()
+            print(f"Grading: {graded['sessions']} sessions, {graded['answers']} answers in {graded['grading_ms']} ms "
+                  f"(mean score {graded['mean_score']} of {graded['max_score']})")
+    finally:
+        await answer_buffer.stop()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Bulk application benchmark: applies one student to N jobs and shortlists the
+applications, first one request per item, then through the bulk endpoints,
+and reports items per second for each path.
+
+    python bench_bulk_applications.py --jobs 200
+    python bench_bulk_applications.py --url http://localhost:8000 --jobs 500 --batch 250
+Without --url the app is driven in-process through httpx.ASGITransport.
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+import httpx
+
+from bench_load import make_client
+
+
+async def register(client: httpx.AsyncClient, suffix: str, role: str, **extra) -> dict:
+    r = await client.post("/api/auth/register", json={
+        "name": f"Bench {role}",
+        "email": f"bench-{role}-{suffix}-{uuid4().hex[:6]}@example.com",
+        "password": "S3cretp@ss!",
+        "role": role,
+        **extra,
+    })
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def seed(client: httpx.AsyncClient, jobs: int) -> dict:
+    """A company posting N jobs, and two students to apply to them"""
+    suffix = uuid4().hex[:8]
+    company_name = f"Bench Corp {suffix}"
+    headers = {
+        "company": await register(client, suffix, "company", company_name=company_name),
+        "one_by_one": await register(client, suffix, "student"),
+        "bulk": await register(client, suffix, "student"),
+    }
+    job_ids = []
+    for i in range(jobs):
+        r = await client.post("/api/jobs/", headers=headers["company"], json={
+            "title": f"Bench role {i}",
+            "company_name": company_name,
+            "category": "tier3",
+            "package_lpa": 4.0 + (i % 4),
+        })
+        r.raise_for_status()
+        job_ids.append(r.json()["id"])
+    return {"headers": headers, "job_ids": job_ids}
+
+
+def batches(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def timed(label: str, items: int, calls):
+    """Run the request coroutines in order; returns the per-item results"""
+    results = []
+    started = time.perf_counter()
+    for call in calls:
+        r = await call()
+        r.raise_for_status()
+        body = r.json()
+        results.extend(body["results"] if "results" in body else [body])
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {items:>6} {len(calls):>9} {elapsed:>9.2f} {items / elapsed:>10.1f}")
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="", help="Base URL of a running server (default: in-process)")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=500, help="Items per bulk request (max 500)")
+    args = parser.parse_args()
+
+    async with make_client(args.url, 1) as client:
+        seeded = await seed(client, args.jobs)
+        headers, job_ids = seeded["headers"], seeded["job_ids"]
+        n = len(job_ids)
+
+        print(f"{'path':<32} {'items':>6} {'requests':>9} {'seconds':>9} {'items/s':>10}")
+        single = await timed("apply, one by one", n, [
+            (lambda job_id=job_id: client.post(
+                "/api/applications/apply", headers=headers["one_by_one"], json={"job_id": job_id}))
+            for job_id in job_ids
+        ])
+        bulk = await timed("apply, bulk", n, [
+            (lambda chunk=chunk: client.post(
+                "/api/applications/apply/bulk", headers=headers["bulk"], json={"job_ids": chunk}))
+            for chunk in batches(job_ids, args.batch)
+        ])
+        assert all(result["ok"] for result in bulk), "bulk apply refused a job"
+
+        single_moves = await timed("shortlist, one per request", n, [
+            (lambda app_id=result["id"]: client.post(
+                "/api/applications/status/bulk", headers=headers["company"],
+                json={"transitions": [{"application_id": app_id, "status": "shortlisted"}]}))
+            for result in single
+        ])
+        app_ids = [result["application"]["id"] for result in bulk]
+        bulk_moves = await timed("shortlist, bulk", n, [
+            (lambda chunk=chunk: client.post(
+                "/api/applications/status/bulk", headers=headers["company"],
+                json={"transitions": [{"application_id": a, "status": "shortlisted"} for a in chunk]}))
+            for chunk in batches(app_ids, args.batch)
+        ])
+        moved = sum(result["ok"] for result in single_moves + bulk_moves)
+        print(f"\n{moved} of {2 * n} applications shortlisted")
+
+    if not args.url:
+        from database import async_engine
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Eligibility benchmark: seeds a synthetic cohort and times the set-based
+"eligible students for a job" and "eligible jobs for a student" queries.
+
+    DATABASE_URL=sqlite:///./bench.db python bench_eligibility.py --students 50000 --jobs 2000
+
+Point DATABASE_URL at a scratch database; the script inserts synthetic rows.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from uuid import uuid4
+
+from sqlalchemy import insert, select, func
+
+from database import engine, Base, AsyncSessionLocal, async_engine
+from models import User, UserRole, StudentProfile, Job, JobCategory, Skill, student_skills, job_skills
+from eligibility import eligible_students_query, eligible_jobs_query
+
+SKILL_VOCABULARY = 300
+BATCH_SIZE = 10000
+
+
+def _batched_insert(connection, target, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(insert(target), rows[start:start + BATCH_SIZE])
+
+
+def seed(students: int, jobs: int, seed_value: int):
+    """Insert a synthetic cohort; returns (profile ids, job ids)"""
+    rng = random.Random(seed_value)
+    Base.metadata.create_all(bind=engine)
+    run = uuid4().hex[:8]  # Keeps repeated runs on one database apart
+
+    with engine.begin() as connection:
+        skill_names = [f"bench-{run}-skill-{i}" for i in range(SKILL_VOCABULARY)]
+        _batched_insert(connection, Skill, [{"name": n} for n in skill_names])
+        skill_ids = [
+            row[0] for row in connection.execute(select(Skill.id).where(Skill.name.in_(skill_names)))
+        ]
+
+        _batched_insert(connection, User, [
+            {"name": f"Student {i}", "email": f"bench-{run}-{i}@example.com", "role": UserRole.STUDENT}
+            for i in range(students)
+        ])
+        user_ids = [
+            row[0] for row in connection.execute(
+                select(User.id).where(User.email.like(f"bench-{run}-%")).order_by(User.id)
+            )
+        ]
+
+        _batched_insert(connection, StudentProfile, [
+            {
+                "user_id": user_id,
+                "cgpa": round(rng.uniform(5.0, 10.0), 2),
+                "backlogs": rng.choice([0, 0, 0, 1, 2, 3]),
+                "placed_final": rng.random() < 0.05,
+                "highest_accepted_package_lpa": rng.choice([None, None, None, 4.0, 9.0, 16.0]),
+                "upgrades_used": 0,
+            }
+            for user_id in user_ids
+        ])
+        profile_ids = [
+            row[0] for row in connection.execute(
+                select(StudentProfile.id)
+                .join(User, User.id == StudentProfile.user_id)
+                .where(User.email.like(f"bench-{run}-%"))
+                .order_by(StudentProfile.id)
+            )
+        ]
+        _batched_insert(connection, student_skills, [
+            {"student_profile_id": profile_id, "skill_id": skill_id}
+            for profile_id in profile_ids
+            for skill_id in rng.sample(skill_ids, rng.randint(5, 25))
+        ])
+
+        job_rows = []
+        for i in range(jobs):
+            category = rng.choice(list(JobCategory))
+            package = {
+                JobCategory.TIER1: rng.uniform(15, 40),
+                JobCategory.TIER2: rng.uniform(8, 15),
+                JobCategory.TIER3: rng.uniform(3, 8),
+                JobCategory.INTERNSHIP: None,
+            }[category]
+            job_rows.append({
+                "title": f"Bench {run} job {i}",
+                "company_name": f"Bench Corp {i % 100}",
+                "package_lpa": package,
+                "category": category,
+                "min_cgpa": rng.choice([0.0, 6.0, 7.0, 7.5, 8.0]),
+                "max_backlogs": rng.choice([0, 1, 999]),
+                "is_active": rng.random() < 0.9,
+            })
+        _batched_insert(connection, Job, job_rows)
+        job_ids = [
+            row[0] for row in connection.execute(
+                select(Job.id).where(Job.title.like(f"Bench {run} job %")).order_by(Job.id)
+            )
+        ]
+        _batched_insert(connection, job_skills, [
+            {"job_id": job_id, "skill_id": skill_id}
+            for job_id in job_ids
+            for skill_id in rng.sample(skill_ids, rng.randint(0, 3))
+        ])
+
+    return profile_ids, job_ids
+
+
+async def time_queries(profile_ids, job_ids, samples: int, seed_value: int):
+    rng = random.Random(seed_value)
+    per_job, per_student = [], []
+    matched_students, matched_jobs = 0, 0
+
+    async with AsyncSessionLocal() as db:
+        for job_id in rng.sample(job_ids, min(samples, len(job_ids))):
+            start = time.perf_counter()
+            count = await db.scalar(select(func.count()).select_from(eligible_students_query(job_id).subquery()))
+            per_job.append(time.perf_counter() - start)
+            matched_students += count
+
+        for profile_id in rng.sample(profile_ids, min(samples, len(profile_ids))):
+            start = time.perf_counter()
+            count = await db.scalar(select(func.count()).select_from(eligible_jobs_query(profile_id).subquery()))
+            per_student.append(time.perf_counter() - start)
+            matched_jobs += count
+
+    def report(label, timings, matched):
+        timings.sort()
+        print(
+            f"{label:<28} n={len(timings):<4} avg matches={matched / len(timings):>9.1f} "
+            f"p50={statistics.median(timings) * 1000:>8.1f} ms  p95={timings[int(len(timings) * 0.95) - 1] * 1000:>8.1f} ms"
+        )
+
+    report("eligible students per job", per_job, matched_students)
+    report("eligible jobs per student", per_student, matched_jobs)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--samples", type=int, default=20, help="Jobs and students to time")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    profile_ids, job_ids = seed(args.students, args.jobs, args.seed)
+    print(f"Seeded {len(profile_ids)} students x {len(job_ids)} jobs in {time.perf_counter() - start:.1f}s")
+
+    await time_queries(profile_ids, job_ids, args.samples, args.seed)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the Placement Tracker API
+Reports requests-per-second and latency percentiles per concurrency level.
+
+Run it once on the old tree and once on the new one to compare:
+    python bench_load.py --concurrency 50 200
+    python bench_load.py --url http://localhost:8000 --concurrency 50 200
+    python bench_load.py --scenario login --concurrency 1 4 16 64 128
+Without --url the app is driven in-process through httpx.ASGITransport.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+
+import httpx
+
+
+async def seed(client: httpx.AsyncClient) -> dict:
+    """Register a TPO and a student and post a few jobs to read back"""
+    suffix = uuid4().hex[:8]
+    password = "S3cretp@ss!"
+
+    tpo = await client.post("/api/auth/register", json={
+        "name": "Bench TPO",
+        "email": f"bench-tpo-{suffix}@example.com",
+        "password": password,
+        "role": "tpo",
+    })
+    tpo.raise_for_status()
+    tpo_headers = {"Authorization": f"Bearer {tpo.json()['access_token']}"}
+
+    student = await client.post("/api/auth/register", json={
+        "name": "Bench Student",
+        "email": f"bench-student-{suffix}@example.com",
+        "password": password,
+        "role": "student",
+    })
+    student.raise_for_status()
+    student_headers = {"Authorization": f"Bearer {student.json()['access_token']}"}
+
+    for i in range(20):
+        r = await client.post("/api/jobs/", headers=tpo_headers, json={
+            "title": f"Bench Engineer {i}",
+            "company_name": f"Bench Corp {i % 5}",
+            "package_lpa": 4.0 + i,
+            "category": "tier3" if 4.0 + i < 8 else ("tier2" if 4.0 + i < 15 else "tier1"),
+            "required_skills": ["python"],
+        })
+        r.raise_for_status()
+
+    return {
+        "tpo": tpo_headers,
+        "student": student_headers,
+        "student_login": {
+            "email": f"bench-student-{suffix}@example.com",
+            "password": password,
+            "role": "student",
+        },
+    }
+
+
+def read_mix(headers: dict):
+    """Authenticated read traffic that mirrors a dashboard load"""
+    return [
+        ("GET", "/api/jobs/", headers["student"], None),
+        ("GET", "/api/auth/me", headers["student"], None),
+        ("GET", "/api/applications/my", headers["student"], None),
+        ("GET", "/api/users/dashboard/stats", headers["tpo"], None),
+    ]
+
+
+def login_mix(headers: dict):
+    """Password logins, which are dominated by bcrypt verification"""
+    return [("POST", "/api/auth/login", None, headers["student_login"])]
+
+
+SCENARIOS = {"read": read_mix, "login": login_mix}
+
+
+async def run_level(client: httpx.AsyncClient, mix: list, concurrency: int, total: int) -> dict:
+    latencies = []
+    errors = 0
+    shed = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors, shed
+        for i in counter:
+            method, path, headers, body = mix[i % len(mix)]
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, path, headers=headers, json=body)
+                if r.status_code == 503:
+                    shed += 1
+                elif r.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "shed": shed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def make_client(url: str, concurrency: int) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if url:
+        return httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0)
+
+    from init_db import create_tables
+    create_tables()
+    from main import app
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=60.0)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="", help="Base URL of a running server (default: in-process)")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="read")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per concurrency level")
+    args = parser.parse_args()
+
+    async with make_client(args.url, max(args.concurrency)) as client:
+        headers = await seed(client)
+        mix = SCENARIOS[args.scenario](headers)
+
+        print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'503s':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+        for level in args.concurrency:
+            res = await run_level(client, mix, level, args.requests)
+            print(
+                f"{res['concurrency']:>8} {res['requests']:>9} {res['errors']:>7} {res['shed']:>6} "
+                f"{res['rps']:>9.1f} {res['p50_ms']:>9.1f} {res['p95_ms']:>9.1f}"
+            )
+
+    if not args.url:
+        from database import async_engine
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
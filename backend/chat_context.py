@@ -0,0 +1,137 @@
+"""
+Conversation history for the chatbot's prompt.
+
+Only the newest chat_context_max_messages messages are read, newest first off
+ix_chat_messages_conversation_created, so loading context costs the same at
+turn 10 and at turn 10,000. Of those, fit_history() keeps the newest messages
+whose estimated tokens fit the prompt budget.
+
+Long conversations also keep a rolling summary. Once the messages after
+chat_conversations.summary_through_message_id go over
+chat_summary_trigger_tokens, refresh_summary() runs as a background task and
+folds all but the newest chat_summary_keep_messages of them into the summary.
+The prompt is then the system prompt, the summary and the recent turns.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from llm_client import LLMError, get_llm_client
+from models import ChatConversation, ChatMessage, MessageStatus
+
+# Roughly what the chat completions format adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """You keep a running summary of a placement and career guidance chat between a student and an assistant. Merge the new messages into the current summary. Keep the student's goals, background, constraints and questions, and the advice already given; drop greetings and small talk. Reply with the updated summary only, in under 200 words."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count: about four characters per token for English"""
+    return (len(text) + 3) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def summary_message(summary: str) -> Dict[str, str]:
+    return {"role": "system", "content": f"Summary of the conversation so far:\n{summary}"}
+
+
+async def load_recent_history(
+    db: AsyncSession,
+    conversation_id: int,
+    limit: int,
+    after_message_id: Optional[int] = None,
+    before_message_id: Optional[int] = None,
+) -> List[ChatMessage]:
+    """The conversation's newest `limit` complete messages between the given ids, oldest first"""
+    query = select(ChatMessage).where(
+        ChatMessage.conversation_id == conversation_id,
+        ChatMessage.status == MessageStatus.COMPLETE  # Not replies still being generated, or failed ones
+    )
+    if after_message_id is not None:
+        query = query.where(ChatMessage.id > after_message_id)
+    if before_message_id is not None:
+        query = query.where(ChatMessage.id < before_message_id)
+    result = await db.execute(
+        query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit)
+    )
+    history = list(result.scalars().all())
+    history.reverse()
+    return history
+
+
+def fit_history(history: Sequence[ChatMessage], token_budget: int) -> List[ChatMessage]:
+    """The newest messages of history whose estimated tokens fit token_budget, oldest first"""
+    kept = []
+    for message in reversed(history):
+        token_budget -= estimate_tokens(message.content)
+        if token_budget < 0:
+            break
+        kept.append(message)
+    kept.reverse()
+    return kept
+
+
+def summary_due(unsummarized_tokens: int) -> bool:
+    """Whether this many tokens of unsummarized history call for a summary refresh"""
+    return 0 < settings.chat_summary_trigger_tokens < unsummarized_tokens
+
+
+# Conversations with a refresh running in this process
+_refreshing = set()
+
+
+async def refresh_summary(conversation_id: int):
+    """Fold the unsummarized messages, except the newest few, into the conversation's summary.
+
+    Runs after the response on its own session. Messages older than the
+    history window, or beyond chat_summary_input_tokens, are left out.
+    """
+    if conversation_id in _refreshing:
+        return
+    _refreshing.add(conversation_id)
+    try:
+        async with AsyncSessionLocal() as db:
+            conversation = await db.get(ChatConversation, conversation_id)
+            if conversation is None:
+                return
+            through_id = conversation.summary_through_message_id
+            history = await load_recent_history(
+                db, conversation_id, settings.chat_context_max_messages, after_message_id=through_id
+            )
+            keep = settings.chat_summary_keep_messages
+            to_fold = fit_history(history[:-keep] if keep else history, settings.chat_summary_input_tokens)
+            if not to_fold:
+                return
+
+            transcript = "\n\n".join(f"{message.role.value}: {message.content}" for message in to_fold)
+            prompt = [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Current summary:\n{conversation.summary or '(none yet)'}\n\nNew messages:\n{transcript}"},
+            ]
+            try:
+                summary = await get_llm_client().complete(
+                    prompt, max_tokens=settings.chat_summary_max_tokens, temperature=0.2
+                )
+            except LLMError as e:
+                print(f"Chat summary error for conversation {conversation_id}: {e}")
+                return
+
+            # Another worker may have moved the summary on meanwhile; keep theirs
+            await db.execute(
+                update(ChatConversation)
+                .where(
+                    ChatConversation.id == conversation_id,
+                    ChatConversation.summary_through_message_id.is_not_distinct_from(through_id),
+                )
+                .values(summary=summary.strip(), summary_through_message_id=to_fold[-1].id)
+            )
+            await db.commit()
+    finally:
+        _refreshing.discard(conversation_id)
@@ -9,7 +9,74 @@ class Settings(BaseSettings):
     secret_key: str = "your-super-secret-jwt-key-here-change-this-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+
+    # Password hashing pool ("thread" or "process")
+    password_hash_pool: str = "thread"
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64  # Hash jobs queued or running before we shed load
+    password_hash_retry_after_seconds: int = 2
+
+    # Authenticated principal cache. Each worker has its own: a revocation,
+    # role change or deactivation committed through another worker is seen
+    # here only once the cached entry expires, so tokens can outlive them by
+    # up to principal_cache_ttl_seconds. principal_cache_max_entries = 0
+    # turns the cache off and checks every request against the database.
+    principal_cache_ttl_seconds: int = 60
+    principal_cache_max_entries: int = 10000
+
+    # Student placement state snapshots used by apply (see placement_state.py)
+    placement_state_cache_ttl_seconds: int = 300
+    placement_state_cache_max_entries: int = 10000
+
+    # TPO dashboard statistics cache
+    dashboard_stats_ttl_seconds: int = 15
+
+    # Idempotency-Key replay window for retried writes
+    idempotency_key_ttl_hours: int = 24
     
+    # OpenAI-compatible chat completions API used by the chatbot (see llm_client.py)
+    openai_api_key: Optional[str] = None
+    openai_base_url: str = "https://api.openai.com/v1"
+    openai_model: str = "gpt-3.5-turbo"
+    llm_max_concurrency: int = 16  # Completions in flight per worker, and pooled connections
+    llm_queue_timeout_seconds: float = 10  # Wait for a free slot before giving up
+    llm_timeout_seconds: float = 30  # Per attempt
+    llm_max_retries: int = 2
+    llm_retry_backoff_seconds: float = 0.5
+    llm_retry_backoff_max_seconds: float = 8
+
+    # Chat prompt context (see chat_context.py)
+    chat_context_max_messages: int = 50  # Newest messages read per turn
+    chat_context_token_budget: int = 3000  # Prompt tokens for system prompt, summary, history and the new message
+    chat_summary_trigger_tokens: int = 1500  # Unsummarized history that starts a summary refresh; 0 disables summaries
+    chat_summary_keep_messages: int = 6  # Newest messages left out of the summary and sent verbatim
+    chat_summary_input_tokens: int = 3000  # Most message tokens folded in per refresh
+    chat_summary_max_tokens: int = 300
+
+    # Cached answers to the first message of a conversation (see response_cache.py)
+    chat_response_cache_ttl_seconds: int = 86400
+    chat_response_cache_max_entries: int = 5000
+    chat_response_cache_max_question_chars: int = 200  # Longer messages bypass the cache
+    chat_response_cache_min_similarity: float = 0.0  # > 0 also serves near-duplicate questions, e.g. 0.85
+
+    # Background task queue and its worker pool (see task_queue.py)
+    task_workers: int = 4  # Tasks run at once per API process; 0 runs none (another process works the queue)
+    task_poll_interval_seconds: float = 1.0  # Idle workers look for tasks enqueued by other processes
+    task_lease_seconds: int = 300  # A running task not finished by then is handed to another worker
+    task_max_attempts: int = 3
+    task_retry_backoff_seconds: float = 2  # Doubles after each failed attempt
+    task_retention_hours: int = 24  # Finished tasks are deleted after this
+
+    # Pushed events over Server-Sent Events (see realtime.py)
+    realtime_queue_size: int = 100  # Undelivered events per stream before it is closed
+    realtime_keepalive_seconds: float = 15  # Comment sent on idle streams so proxies keep them open
+
+    # Online assessments (see assessments.py)
+    assessment_autosave_flush_seconds: float = 1.0  # Buffered answers are written at least this often
+    assessment_autosave_max_pending: int = 5000  # Buffered answers that start a flush early
+    assessment_autosave_grace_seconds: float = 5  # Saves this late after a session's deadline still count
+    assessment_grading_delay_seconds: float = 30  # After a test ends, so every worker has flushed its saves
+
     # Google OAuth
     google_client_id: Optional[str] = None
     google_client_secret: Optional[str] = None
@@ -0,0 +1,116 @@
+"""
+TPO dashboard statistics: one aggregate statement behind a short-TTL cache.
+
+Handlers that change the numbers (register, create_job, apply_to_job,
+accept_offer, schedule_test) call dashboard_stats_cache.invalidate() after they commit, so
+pollers see fresh figures on the next request rather than after the TTL. They
+also call publish_dashboard_delta() before committing, which pushes the change
+to open TPO dashboards as a `dashboard` event (see realtime.py).
+"""
+
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+import asyncio
+import time
+
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import User, UserRole, StudentProfile, Job, Application, Assessment
+from realtime import publish_after_commit
+
+
+async def compute_dashboard_stats(db: AsyncSession) -> dict:
+    """All dashboard counts in a single SELECT over one-row aggregates"""
+    user_counts = (
+        select(
+            func.count().filter(User.role == UserRole.STUDENT).label("total_students"),
+            func.count().filter(and_(User.role == UserRole.COMPANY, User.is_active == True)).label("active_companies"),
+        )
+        .select_from(User)
+        .subquery()
+    )
+    placed = (
+        select(func.count().label("placed_students"))
+        .select_from(User)
+        .join(StudentProfile, StudentProfile.user_id == User.id)
+        .where(User.role == UserRole.STUDENT, StudentProfile.placed_final == True)
+        .subquery()
+    )
+    active_jobs = (
+        select(func.count().label("active_jobs"))
+        .select_from(Job)
+        .where(Job.is_active == True)
+        .subquery()
+    )
+    applications = (
+        select(func.count().label("total_applications"))
+        .select_from(Application)
+        .subquery()
+    )
+
+    upcoming_tests = (
+        select(func.count().label("upcoming_tests"))
+        .select_from(Assessment)
+        .where(Assessment.ends_at > datetime.now(timezone.utc))
+        .subquery()
+    )
+
+    row = (await db.execute(select(user_counts, placed, active_jobs, applications, upcoming_tests))).one()
+
+    return {
+        "totalStudents": row.total_students,
+        "placedStudents": row.placed_students,
+        "activeCompanies": row.active_companies,
+        "activeJobs": row.active_jobs,
+        "totalApplications": row.total_applications,
+        "upcomingTests": row.upcoming_tests,  # Scheduled or running
+        "computedAt": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def publish_dashboard_delta(db: AsyncSession, **delta: int):
+    """Push changed counts (keys of compute_dashboard_stats) to TPO dashboards once db commits"""
+    publish_after_commit(db, "dashboard", {"delta": delta}, roles=[UserRole.TPO.value])
+
+
+class DashboardStatsCache:
+    """Single-entry TTL cache; concurrent misses share one computation"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._value: Optional[dict] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> Optional[dict]:
+        if self._value is not None and self._expires_at > time.monotonic():
+            return self._value
+        return None
+
+    async def get_or_compute(self, compute: Callable[[], Awaitable[dict]]) -> dict:
+        value = self._fresh()
+        if value is not None:
+            return value
+
+        async with self._lock:
+            value = self._fresh()
+            if value is not None:
+                return value
+
+            generation = self._generation
+            value = await compute()
+            # Don't cache a result that an invalidation overtook mid-query
+            if generation == self._generation:
+                self._value = value
+                self._expires_at = time.monotonic() + self.ttl_seconds
+            return value
+
+    def invalidate(self):
+        self._generation += 1
+        self._value = None
+
+
+dashboard_stats_cache = DashboardStatsCache(ttl_seconds=settings.dashboard_stats_ttl_seconds)
@@ -1,9 +1,21 @@
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
 
-# Create engine
+
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (asyncpg / aiosqlite)"""
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+# Create engine (used by scripts such as init_db.py and view_database_data.py)
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
@@ -13,13 +25,35 @@ engine = create_engine(
 # Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API request handlers
+async_engine = create_async_engine(
+    async_database_url(settings.database_url),
+    pool_pre_ping=True,
+    pool_recycle=300
+)
+
+# Objects stay usable after commit; handlers serialize them after db.commit()
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+def dialect_insert(bind, table):
+    """INSERT construct for the bind's dialect, exposing on_conflict_do_nothing/do_update"""
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Unsupported database dialect: {bind.dialect.name}")
+    return insert(table)
+
 # Create base class for models
 Base = declarative_base()
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
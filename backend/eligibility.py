@@ -0,0 +1,100 @@
+"""
+Placement eligibility rules.
+
+The same rules exist in two forms that must stay in step:
+- ineligibility_reason(): one student's placement snapshot against one job,
+  with the message the apply endpoints return;
+- eligible_pair_clause(): a SQL condition over StudentProfile x Job, used to
+  evaluate one job against every student, or one student against every job,
+  in a single set-based query.
+"""
+
+from typing import Optional
+
+from sqlalchemy import and_, or_, exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import StudentProfile, Job, JobCategory, student_skills, job_skills
+from placement_state import PlacementState, mask_skill_ids
+from skills import skill_names
+
+
+async def ineligibility_reason(
+    db: AsyncSession, state: PlacementState, job: Job, required_skills: int
+) -> Optional[str]:
+    """Why the student may not apply to the job, or None when eligible.
+
+    Works from the student's placement snapshot and the job's required skill
+    bitset; the database is only read to name missing skills in the message.
+    """
+    if state.placed_final:
+        return "You are already placed (Tier-1 final)"
+
+    if job.category != JobCategory.INTERNSHIP:
+        if state.cgpa is not None and job.min_cgpa is not None and state.cgpa < job.min_cgpa:
+            return "CGPA below required minimum"
+        if state.backlogs is not None and job.max_backlogs is not None and state.backlogs > job.max_backlogs:
+            return "Backlogs exceed allowed maximum"
+        missing = required_skills & ~state.skills
+        if missing:
+            names = await skill_names(db, mask_skill_ids(missing))
+            return f"Missing required skills: {', '.join(names)}"
+
+    # Once accepted somewhere, no applying to lower package jobs
+    if state.highest_accepted_package_lpa is not None and job.category != JobCategory.INTERNSHIP and job.package_lpa is not None:
+        if job.package_lpa < state.highest_accepted_package_lpa:
+            return "Cannot apply to a job offering a lower package than your accepted offer"
+
+    return None
+
+
+def eligible_pair_clause():
+    """SQL condition true when StudentProfile may apply to Job (both in the FROM list)"""
+    is_internship = Job.category == JobCategory.INTERNSHIP
+
+    # Correlate explicitly: implicit correlation does not reach into a JOIN ... ON
+    holds_skill = exists().where(
+        student_skills.c.student_profile_id == StudentProfile.id,
+        student_skills.c.skill_id == job_skills.c.skill_id,
+    ).correlate_except(student_skills)
+    has_all_skills = ~exists().where(
+        job_skills.c.job_id == Job.id,
+        ~holds_skill,
+    ).correlate_except(job_skills)
+
+    return and_(
+        Job.is_active == True,
+        func.coalesce(StudentProfile.placed_final, False) == False,
+        or_(
+            is_internship,
+            and_(
+                or_(StudentProfile.cgpa.is_(None), Job.min_cgpa.is_(None), StudentProfile.cgpa >= Job.min_cgpa),
+                or_(StudentProfile.backlogs.is_(None), Job.max_backlogs.is_(None), StudentProfile.backlogs <= Job.max_backlogs),
+                has_all_skills,
+            ),
+        ),
+        or_(
+            StudentProfile.highest_accepted_package_lpa.is_(None),
+            is_internship,
+            Job.package_lpa.is_(None),
+            Job.package_lpa >= StudentProfile.highest_accepted_package_lpa,
+        ),
+    )
+
+
+def eligible_students_query(job_id: int):
+    """SELECT of StudentProfile rows eligible for one job"""
+    return (
+        select(StudentProfile)
+        .join(Job, Job.id == job_id)
+        .where(eligible_pair_clause())
+    )
+
+
+def eligible_jobs_query(student_profile_id: int):
+    """SELECT of Job rows one student may apply to"""
+    return (
+        select(Job)
+        .join(StudentProfile, StudentProfile.id == student_profile_id)
+        .where(eligible_pair_clause())
+    )
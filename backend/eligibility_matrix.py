@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Vectorized students x jobs eligibility matrix for overnight drive planning.
+
+Loads StudentProfile and Job into columnar NumPy arrays (skills as packed
+uint64 bitsets over the skill vocabulary) and evaluates every pair with the
+rules from eligibility.ineligibility_reason using array comparisons and
+bitwise AND. Results can be materialized into the eligibility_matrix table.
+
+    python eligibility_matrix.py              # compute and report
+    python eligibility_matrix.py --materialize
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import select, delete, insert, func
+
+from database import engine, Base
+from models import StudentProfile, Job, JobCategory, Skill, student_skills, job_skills, eligibility_matrix
+
+STUDENT_CHUNK = 1024
+INSERT_BATCH = 20000
+
+
+@dataclass
+class StudentColumns:
+    profile_ids: np.ndarray
+    cgpa: np.ndarray          # float64, NaN when unknown
+    backlogs: np.ndarray      # float64, NaN when unknown
+    package_floor: np.ndarray  # float64, NaN when nothing accepted yet
+    placed_final: np.ndarray  # bool
+    skills: np.ndarray        # uint64 [students, words]
+
+
+@dataclass
+class JobColumns:
+    job_ids: np.ndarray
+    is_active: np.ndarray     # bool
+    internship: np.ndarray    # bool
+    min_cgpa: np.ndarray      # float64, NaN when unset
+    max_backlogs: np.ndarray  # float64, NaN when unset
+    package: np.ndarray       # float64, NaN when unset
+    skills: np.ndarray        # uint64 [jobs, words]
+
+
+def _float_column(values) -> np.ndarray:
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _pack_skills(owner_ids: np.ndarray, pairs, skill_index: dict, words: int) -> np.ndarray:
+    """Pack (owner_id, skill_id) pairs into one uint64 bitset row per owner"""
+    bits = np.zeros((len(owner_ids), words * 64), dtype=bool)
+    if len(owner_ids):
+        row_of = {owner_id: row for row, owner_id in enumerate(owner_ids.tolist())}
+        rows, cols = [], []
+        for owner_id, skill_id in pairs:
+            row = row_of.get(owner_id)
+            if row is not None:
+                rows.append(row)
+                cols.append(skill_index[skill_id])
+        bits[rows, cols] = True
+    # packbits is big-endian per byte; any fixed layout works as long as
+    # students and jobs share it
+    return np.packbits(bits, axis=1).view(np.uint64).reshape(len(owner_ids), words)
+
+
+def load_columns(connection):
+    """Read profiles, jobs and skill links into columnar arrays"""
+    skill_ids = [row[0] for row in connection.execute(select(Skill.id).order_by(Skill.id))]
+    skill_index = {skill_id: i for i, skill_id in enumerate(skill_ids)}
+    words = max(1, (len(skill_ids) + 63) // 64)
+
+    profiles = connection.execute(
+        select(
+            StudentProfile.id,
+            StudentProfile.cgpa,
+            StudentProfile.backlogs,
+            StudentProfile.highest_accepted_package_lpa,
+            StudentProfile.placed_final,
+        ).order_by(StudentProfile.id)
+    ).all()
+    profile_ids = np.array([p[0] for p in profiles], dtype=np.int64)
+    students = StudentColumns(
+        profile_ids=profile_ids,
+        cgpa=_float_column(p[1] for p in profiles),
+        backlogs=_float_column(p[2] for p in profiles),
+        package_floor=_float_column(p[3] for p in profiles),
+        placed_final=np.array([bool(p[4]) for p in profiles], dtype=bool),
+        skills=_pack_skills(
+            profile_ids,
+            connection.execute(select(student_skills.c.student_profile_id, student_skills.c.skill_id)),
+            skill_index,
+            words,
+        ),
+    )
+
+    job_rows = connection.execute(
+        select(Job.id, Job.is_active, Job.category, Job.min_cgpa, Job.max_backlogs, Job.package_lpa).order_by(Job.id)
+    ).all()
+    job_ids = np.array([j[0] for j in job_rows], dtype=np.int64)
+    jobs = JobColumns(
+        job_ids=job_ids,
+        is_active=np.array([bool(j[1]) for j in job_rows], dtype=bool),
+        internship=np.array([j[2] == JobCategory.INTERNSHIP for j in job_rows], dtype=bool),
+        min_cgpa=_float_column(j[3] for j in job_rows),
+        max_backlogs=_float_column(j[4] for j in job_rows),
+        package=_float_column(j[5] for j in job_rows),
+        skills=_pack_skills(
+            job_ids,
+            connection.execute(select(job_skills.c.job_id, job_skills.c.skill_id)),
+            skill_index,
+            words,
+        ),
+    )
+    return students, jobs
+
+
+def compute_matrix(students: StudentColumns, jobs: JobColumns, chunk: int = STUDENT_CHUNK) -> np.ndarray:
+    """Boolean [students, jobs] matrix; True where the student may apply.
+
+    Comparisons are written as the negation of the per-request rejection test
+    (e.g. not cgpa < min_cgpa) so NaN, standing in for NULL, never rejects.
+    """
+    n_students, n_jobs = len(students.profile_ids), len(jobs.job_ids)
+    out = np.zeros((n_students, n_jobs), dtype=bool)
+    if n_students == 0 or n_jobs == 0:
+        return out
+
+    # Only bitset words where some job requires a skill can reject anyone
+    live_words = np.flatnonzero(jobs.skills.any(axis=0))
+
+    with np.errstate(invalid="ignore"):
+        for start in range(0, n_students, chunk):
+            stop = min(start + chunk, n_students)
+
+            cgpa = students.cgpa[start:stop, None]
+            backlogs = students.backlogs[start:stop, None]
+            floor = students.package_floor[start:stop, None]
+
+            requirements_ok = ~(cgpa < jobs.min_cgpa[None, :]) & ~(backlogs > jobs.max_backlogs[None, :])
+            for w in live_words:
+                missing = jobs.skills[None, :, w] & ~students.skills[start:stop, w, None]
+                requirements_ok &= missing == 0
+
+            floor_ok = jobs.internship[None, :] | ~(jobs.package[None, :] < floor)
+
+            out[start:stop] = (
+                jobs.is_active[None, :]
+                & ~students.placed_final[start:stop, None]
+                & (jobs.internship[None, :] | requirements_ok)
+                & floor_ok
+            )
+    return out
+
+
+def materialize(connection, students: StudentColumns, jobs: JobColumns, matrix: np.ndarray) -> int:
+    """Replace the eligibility_matrix table with the eligible pairs"""
+    Base.metadata.create_all(bind=connection, tables=[eligibility_matrix])
+    connection.execute(delete(eligibility_matrix))
+
+    rows, cols = np.nonzero(matrix)
+    profile_ids = students.profile_ids[rows]
+    job_ids = jobs.job_ids[cols]
+    for start in range(0, len(rows), INSERT_BATCH):
+        connection.execute(insert(eligibility_matrix), [
+            {"student_profile_id": int(p), "job_id": int(j)}
+            for p, j in zip(profile_ids[start:start + INSERT_BATCH], job_ids[start:start + INSERT_BATCH])
+        ])
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--materialize", action="store_true", help="Write eligible pairs to eligibility_matrix")
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        started = time.perf_counter()
+        students, jobs = load_columns(connection)
+        loaded = time.perf_counter()
+        matrix = compute_matrix(students, jobs)
+        computed = time.perf_counter()
+
+        print(f"Loaded {len(students.profile_ids)} students x {len(jobs.job_ids)} jobs in {loaded - started:.2f}s")
+        print(f"Computed {int(matrix.sum())} eligible pairs in {computed - loaded:.2f}s")
+
+        if args.materialize:
+            written = materialize(connection, students, jobs, matrix)
+            print(f"Materialized {written} pairs in {time.perf_counter() - computed:.2f}s")
+            total = connection.execute(select(func.count()).select_from(eligibility_matrix)).scalar()
+            print(f"eligibility_matrix now holds {total} rows")
+
+
+if __name__ == "__main__":
+    main()
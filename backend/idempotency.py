@@ -0,0 +1,86 @@
+"""
+Idempotency-Key support for retried writes.
+
+A handler looks the key up once it holds the lock that serializes the write
+(so a concurrent retry waits and then sees the stored row), replays the stored
+response if there is one, and otherwise stores its response in the same
+transaction as the write. Only successful responses are stored: a retry of a
+refused request is evaluated afresh.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import hashlib
+import json
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import dialect_insert
+from models import IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(body: BaseModel) -> str:
+    """Stable hash of a request body, to catch a key reused for a different request"""
+    return hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+
+
+def _expired(created_at: Optional[datetime]) -> bool:
+    if created_at is None:
+        return False
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)  # SQLite returns naive UTC
+    return datetime.now(timezone.utc) - created_at > timedelta(hours=settings.idempotency_key_ttl_hours)
+
+
+async def find_response(
+    db: AsyncSession, user_id: int, endpoint: str, key: str, fingerprint: str
+) -> Optional[dict]:
+    """Stored response for the key, or None when the request has not completed before"""
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters",
+        )
+
+    result = await db.execute(
+        select(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.endpoint == endpoint,
+            IdempotencyKey.key == key,
+        )
+    )
+    stored = result.scalars().first()
+    if stored is None or _expired(stored.created_at):
+        return None
+    if stored.request_fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request",
+        )
+    return json.loads(stored.response_json)
+
+
+async def store_response(
+    db: AsyncSession, user_id: int, endpoint: str, key: str, fingerprint: str, response: dict
+):
+    """Record the response in the caller's transaction (replacing an expired entry)"""
+    values = {
+        "user_id": user_id,
+        "endpoint": endpoint,
+        "key": key,
+        "request_fingerprint": fingerprint,
+        "response_json": json.dumps(response),
+        "created_at": datetime.now(timezone.utc),
+    }
+    stmt = dialect_insert(db.bind, IdempotencyKey.__table__).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "endpoint", "key"],
+        set_={column: stmt.excluded[column] for column in ("request_fingerprint", "response_json", "created_at")},
+    )
+    await db.execute(stmt)
@@ -1,11 +1,33 @@
-from database import engine, Base
-# Import models module to ensure all models are registered with Base
-from models import User, StudentProfile, Job, Application
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+from database import engine
+
+ALEMBIC_INI = Path(__file__).with_name("alembic.ini")
+
+
+def alembic_config() -> Config:
+    """alembic.ini, usable from any working directory"""
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.with_name("migrations")))
+    return config
+
+
+def upgrade_database():
+    """Bring the schema up to the latest migration (alembic upgrade head).
+    Databases created by the old create_all are adopted in place."""
+    config = alembic_config()
+    config.attributes["configure_logger"] = False  # Leave the caller's logging alone
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
 
 
 def create_tables():
     """Create all database tables"""
-    Base.metadata.create_all(bind=engine)
+    upgrade_database()
     print("Database tables created successfully!")
 
 if __name__ == "__main__":
@@ -0,0 +1,230 @@
+"""
+Async client for the chat completions API behind the chatbot.
+
+Completions never block the event loop: an LLMBackend does the I/O and
+LLMClient wraps it with a per-worker concurrency limit, a per-attempt timeout
+and retries with jittered exponential backoff. OpenAIBackend talks to any
+OpenAI-compatible API at settings.openai_base_url over one pooled
+httpx.AsyncClient; point the base URL at stub_llm_server.py to run without an
+API key, or install another backend with set_llm_backend().
+"""
+
+import asyncio
+import json
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from config import settings
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """The completion failed, after any retries, or could not be started"""
+
+
+class LLMBackend:
+    """Source of completions for LLMClient"""
+
+    async def complete(self, payload: dict, timeout: float) -> str:
+        """The whole completion's content"""
+        raise NotImplementedError
+
+    def stream(self, payload: dict, timeout: float) -> AsyncIterator[str]:
+        """The completion's content deltas as they are generated"""
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI-compatible /chat/completions over a shared connection pool"""
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, max_connections: int = 16):
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def complete(self, payload: dict, timeout: float) -> str:
+        response = await self.http.post("/chat/completions", json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def stream(self, payload: dict, timeout: float) -> AsyncIterator[str]:
+        payload = {**payload, "stream": True}
+        async with self.http.stream("POST", "/chat/completions", json=payload, timeout=timeout) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue  # Blank separators and SSE comments
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    yield delta
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def _retry_after(exc: Exception) -> float:
+    if isinstance(exc, httpx.HTTPStatusError):
+        try:
+            return float(exc.response.headers.get("Retry-After", 0))
+        except ValueError:
+            pass  # An HTTP date; fall back to our own backoff
+    return 0.0
+
+
+class LLMClient:
+    """Concurrency-limited, retrying completions from an LLMBackend"""
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        model: str,
+        max_concurrency: int = 16,
+        queue_timeout_seconds: float = 10,
+        timeout_seconds: float = 30,
+        max_retries: int = 2,
+        backoff_seconds: float = 0.5,
+        backoff_max_seconds: float = 8,
+    ):
+        self.backend = backend
+        self.model = model
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.retries = 0
+
+    def _payload(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> dict:
+        return {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        """Full jitter, so clients that failed together do not retry together"""
+        delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_seconds * 2 ** attempt))
+        return min(self.backoff_max_seconds, max(delay, _retry_after(exc)))
+
+    @asynccontextmanager
+    async def _slot(self):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            raise LLMError("Too many completions in flight") from None
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """The completion's content; timeout bounds each attempt"""
+        payload = self._payload(messages, max_tokens, temperature)
+        timeout = timeout or self.timeout_seconds
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._slot():
+                    return await asyncio.wait_for(self.backend.complete(payload, timeout), timeout)
+            except (httpx.HTTPError, asyncio.TimeoutError, ValueError, LookupError) as exc:
+                if attempt == self.max_retries or not _is_retryable(exc):
+                    raise LLMError(f"Completion failed: {exc!r}") from exc
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, exc))
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """The completion's content deltas; timeout bounds the wait for each chunk.
+
+        Attempts are retried only until the first delta has been yielded.
+        """
+        payload = self._payload(messages, max_tokens, temperature)
+        timeout = timeout or self.timeout_seconds
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                async with self._slot():
+                    async for delta in self.backend.stream(payload, timeout):
+                        started = True
+                        yield delta
+                return
+            except (httpx.HTTPError, asyncio.TimeoutError, ValueError, LookupError) as exc:
+                if started or attempt == self.max_retries or not _is_retryable(exc):
+                    raise LLMError(f"Completion stream failed: {exc!r}") from exc
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, exc))
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+
+_llm_client: Optional[LLMClient] = None
+
+
+def _build_client(backend: LLMBackend) -> LLMClient:
+    return LLMClient(
+        backend,
+        model=settings.openai_model,
+        max_concurrency=settings.llm_max_concurrency,
+        queue_timeout_seconds=settings.llm_queue_timeout_seconds,
+        timeout_seconds=settings.llm_timeout_seconds,
+        max_retries=settings.llm_max_retries,
+        backoff_seconds=settings.llm_retry_backoff_seconds,
+        backoff_max_seconds=settings.llm_retry_backoff_max_seconds,
+    )
+
+
+def get_llm_client() -> LLMClient:
+    """The worker's shared client, created on first use"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = _build_client(OpenAIBackend(
+            settings.openai_base_url,
+            api_key=settings.openai_api_key,
+            max_connections=settings.llm_max_concurrency,
+        ))
+    return _llm_client
+
+
+def set_llm_backend(backend: LLMBackend) -> LLMClient:
+    """Serve completions from backend from now on (the previous one is not closed)"""
+    global _llm_client
+    _llm_client = _build_client(backend)
+    return _llm_client
+
+
+async def close_llm_client():
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
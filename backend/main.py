@@ -3,8 +3,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 
+from database import async_engine
+from auth_utils import shutdown_hash_executor
+from llm_client import close_llm_client
+from task_queue import task_pool
+from realtime import event_hub
+from assessments import answer_buffer
+from notifications import announce_job  # noqa: F401  Registers the notify_new_job task handler for task_pool
 # Import routers
-from routers import auth, users, applications, tests, notifications, jobs
+from routers import auth, users, applications, tests, notifications, jobs, eligibility, reports, chat, tasks, events
 
 app = FastAPI(
     title="Placement Tracker API",
@@ -26,8 +33,37 @@ app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
 app.include_router(applications.router, prefix="/api/applications", tags=["Applications"])
 app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(eligibility.router, prefix="/api/eligibility", tags=["Eligibility"])
+app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
 app.include_router(tests.router, prefix="/api/tests", tags=["Tests"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["Notifications"])
+app.include_router(chat.router, prefix="/api", tags=["Chat"])  # Router carries its /chat prefix
+app.include_router(tasks.router, prefix="/api/tasks", tags=["Tasks"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
+
+@app.on_event("startup")
+async def start_background_services():
+    # Run queued background tasks, including any left over from the last run (see task_queue.py)
+    await task_pool.start()
+    # Deliver committed changes to open event streams (see realtime.py)
+    await event_hub.start()
+    # Write autosaved test answers in batches (see assessments.py)
+    await answer_buffer.start()
+
+@app.on_event("shutdown")
+async def release_resources():
+    # End open event streams
+    await event_hub.stop()
+    # Write test answers still buffered
+    await answer_buffer.stop()
+    # Let running background tasks finish before their connections go
+    await task_pool.stop()
+    # Close pooled async connections so aiosqlite/asyncpg workers exit cleanly
+    await async_engine.dispose()
+    # Stop the password hashing pool
+    shutdown_hash_executor()
+    # Close the pooled LLM API connections
+    await close_llm_client()
 
 @app.get("/")
 async def root():
@@ -38,4 +74,5 @@ async def health_check():
     return {"status": "healthy", "service": "placement-tracker-api"}
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # Open event streams would otherwise hold up shutdown until their clients leave
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, timeout_graceful_shutdown=5)
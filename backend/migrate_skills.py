@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Backfill the skills / student_skills / job_skills tables from the legacy
+StudentProfile.skills_json and Job.required_skills_json columns.
+
+Migration 0002 already does this when it adds the tables (alembic upgrade
+head, init_db.py); run this only to copy JSON written after that again.
+Safe to re-run: skills and associations are inserted with ON CONFLICT DO NOTHING.
+"""
+
+from database import engine
+from skills import backfill_skill_tables
+
+
+def backfill_skills():
+    with engine.begin() as connection:
+        counts = backfill_skill_tables(connection)
+    print(f"Backfilled {counts['skills']} skills, {counts['student_links']} student links, "
+          f"{counts['job_links']} job links")
+
+
+if __name__ == "__main__":
+    backfill_skills()
@@ -0,0 +1,66 @@
+"""
+Helpers for migrations that also have to adopt databases created before
+migrations existed, when init_db.py ran Base.metadata.create_all. Such a
+database may already hold any subset of the objects a migration creates, so
+these helpers skip whatever is already there. Offline (--sql) runs cannot
+inspect anything and emit the full DDL.
+"""
+
+import sqlalchemy as sa
+from alembic import context, op
+from sqlalchemy.dialects import postgresql
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def table_exists(table: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    return _inspector().has_table(table)
+
+
+def column_exists(table: str, column: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    return any(c["name"] == column for c in _inspector().get_columns(table))
+
+
+def index_exists(table: str, index: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    return any(ix["name"] == index for ix in _inspector().get_indexes(table))
+
+
+def enum_type(*values: str, name: str):
+    """Enum column type. On PostgreSQL the named type is created once by
+    create_enum_types(), since several tables share it."""
+    return sa.Enum(*values, name=name).with_variant(
+        postgresql.ENUM(*values, name=name, create_type=False), "postgresql"
+    )
+
+
+def create_enum_types(**types):
+    """create_enum_types(userrole=("STUDENT", ...), ...) on PostgreSQL, if missing"""
+    if op.get_context().dialect.name != "postgresql":
+        return
+    for name, values in types.items():
+        postgresql.ENUM(*values, name=name).create(op.get_bind(), checkfirst=not context.is_offline_mode())
+
+
+def create_table_if_missing(table: str, *columns, **kw) -> bool:
+    if table_exists(table):
+        return False
+    op.create_table(table, *columns, **kw)
+    return True
+
+
+def create_index_if_missing(index: str, table: str, columns, **kw):
+    if not index_exists(table, index):
+        op.create_index(index, table, columns, **kw)
+
+
+def drop_index_if_exists(index: str, table: str):
+    if context.is_offline_mode() or index_exists(table, index):
+        op.drop_index(index, table_name=table)
@@ -0,0 +1,143 @@
+"""Initial schema: users, profiles, jobs, applications and chat
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+The schema as first shipped with init_db.py. Tables that already exist are
+left alone, so a database built by the old create_all is adopted in place.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.schema_helpers import create_enum_types, create_index_if_missing, create_table_if_missing, enum_type
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+USER_ROLES = ("STUDENT", "TPO", "COMPANY")
+JOB_CATEGORIES = ("TIER1", "TIER2", "TIER3", "INTERNSHIP")
+APPLICATION_STATUSES = ("APPLIED", "SHORTLISTED", "OFFERED", "ACCEPTED", "REJECTED", "WITHDRAWN")
+MESSAGE_ROLES = ("USER", "ASSISTANT", "SYSTEM")
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    create_enum_types(
+        userrole=USER_ROLES,
+        jobcategory=JOB_CATEGORIES,
+        applicationstatus=APPLICATION_STATUSES,
+        messagerole=MESSAGE_ROLES,
+    )
+
+    create_table_if_missing(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("password_hash", sa.String(length=255), nullable=True),
+        sa.Column("role", enum_type(*USER_ROLES, name="userrole"), nullable=False),
+        sa.Column("avatar_url", sa.String(length=500), nullable=True),
+        sa.Column("provider", sa.String(length=20), nullable=True),
+        sa.Column("google_id", sa.String(length=100), nullable=True),
+        sa.Column("company_name", sa.String(length=200), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("google_id"),
+    )
+    create_index_if_missing("ix_users_email", "users", ["email"], unique=True)
+    create_index_if_missing("ix_users_id", "users", ["id"])
+
+    create_table_if_missing(
+        "student_profiles",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("cgpa", sa.Float(), nullable=True),
+        sa.Column("skills_json", sa.Text(), nullable=True),
+        sa.Column("backlogs", sa.Integer(), nullable=True),
+        sa.Column("upgrades_used", sa.Integer(), nullable=True),
+        sa.Column("highest_accepted_tier", enum_type(*JOB_CATEGORIES, name="jobcategory"), nullable=True),
+        sa.Column("highest_accepted_package_lpa", sa.Float(), nullable=True),
+        sa.Column("placed_final", sa.Boolean(), nullable=True),
+        *_timestamps(),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id"),
+    )
+    create_index_if_missing("ix_student_profiles_id", "student_profiles", ["id"])
+
+    create_table_if_missing(
+        "jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(length=200), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("company_name", sa.String(length=200), nullable=False),
+        sa.Column("package_lpa", sa.Float(), nullable=True),
+        sa.Column("category", enum_type(*JOB_CATEGORIES, name="jobcategory"), nullable=False),
+        sa.Column("min_cgpa", sa.Float(), nullable=True),
+        sa.Column("required_skills_json", sa.Text(), nullable=True),
+        sa.Column("max_backlogs", sa.Integer(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing("ix_jobs_id", "jobs", ["id"])
+
+    create_table_if_missing(
+        "applications",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("status", enum_type(*APPLICATION_STATUSES, name="applicationstatus"), nullable=False),
+        sa.Column("is_final_acceptance", sa.Boolean(), nullable=True),
+        sa.Column("offered_package_lpa", sa.Float(), nullable=True),
+        *_timestamps(),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"]),
+        sa.ForeignKeyConstraint(["student_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing("ix_applications_id", "applications", ["id"])
+
+    create_table_if_missing(
+        "chat_conversations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(length=200), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        *_timestamps(),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing("ix_chat_conversations_id", "chat_conversations", ["id"])
+
+    create_table_if_missing(
+        "chat_messages",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("conversation_id", sa.Integer(), nullable=False),
+        sa.Column("role", enum_type(*MESSAGE_ROLES, name="messagerole"), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["conversation_id"], ["chat_conversations.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing("ix_chat_messages_id", "chat_messages", ["id"])
+
+
+def downgrade() -> None:
+    for table in ("chat_messages", "chat_conversations", "applications", "jobs", "student_profiles", "users"):
+        op.drop_table(table)
+    if op.get_bind().dialect.name == "postgresql":
+        for name in ("messagerole", "applicationstatus", "jobcategory", "userrole"):
+            op.execute(f"DROP TYPE IF EXISTS {name}")
@@ -0,0 +1,165 @@
+"""Token versions, skills, eligibility matrix, idempotency keys and rollups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+Everything added to models.py before migrations existed. Like 0001 it skips
+objects a create_all database already has. It copies the legacy JSON skill
+lists into the new skill tables (skills.backfill_skill_tables) and counts the
+existing applications and placements into the new rollup tables
+(placement_rollups.rebuild_rollup_tables), so an adopted database needs no
+manual backfill.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from migrations.schema_helpers import (
+    column_exists, create_index_if_missing, create_table_if_missing, enum_type,
+)
+from placement_rollups import rebuild_rollup_tables
+from skills import backfill_skill_tables
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JOB_CATEGORIES = ("TIER1", "TIER2", "TIER3", "INTERNSHIP")
+APPLICATION_STATUSES = ("APPLIED", "SHORTLISTED", "OFFERED", "ACCEPTED", "REJECTED", "WITHDRAWN")
+ACTIVE_APPLICATION_PREDICATE = "status IN ('APPLIED', 'SHORTLISTED', 'OFFERED')"
+
+
+def upgrade() -> None:
+    if not column_exists("users", "token_version"):
+        with op.batch_alter_table("users") as batch:
+            batch.add_column(sa.Column("token_version", sa.Integer(), server_default="0", nullable=False))
+
+    create_table_if_missing(
+        "skills",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing("ix_skills_id", "skills", ["id"])
+    create_index_if_missing("ix_skills_name", "skills", ["name"], unique=True)
+
+    create_table_if_missing(
+        "student_skills",
+        sa.Column("student_profile_id", sa.Integer(), nullable=False),
+        sa.Column("skill_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["skill_id"], ["skills.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["student_profile_id"], ["student_profiles.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("student_profile_id", "skill_id"),
+    )
+    create_index_if_missing("ix_student_skills_skill_student", "student_skills", ["skill_id", "student_profile_id"])
+
+    create_table_if_missing(
+        "job_skills",
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("skill_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["skill_id"], ["skills.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("job_id", "skill_id"),
+    )
+    create_index_if_missing("ix_job_skills_skill_job", "job_skills", ["skill_id", "job_id"])
+
+    # Without this an adopted database's jobs would lose their skill
+    # requirements; offline (--sql) runs have no rows to read
+    if not context.is_offline_mode():
+        backfill_skill_tables(op.get_bind())
+
+    create_index_if_missing("ix_jobs_active_created_id", "jobs", ["is_active", "created_at", "id"])
+    create_index_if_missing("ix_jobs_active_category_created_id", "jobs", ["is_active", "category", "created_at", "id"])
+    create_index_if_missing("ix_jobs_active_company_created_id", "jobs", ["is_active", "company_name", "created_at", "id"])
+
+    create_table_if_missing(
+        "eligibility_matrix",
+        sa.Column("student_profile_id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["student_profile_id"], ["student_profiles.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("student_profile_id", "job_id"),
+    )
+    create_index_if_missing("ix_eligibility_matrix_job_student", "eligibility_matrix", ["job_id", "student_profile_id"])
+
+    # Before the unique index can exist, older duplicate active applications
+    # (possible before it did) keep only the earliest one per student and job
+    op.execute(
+        f"""
+        UPDATE applications SET status = 'WITHDRAWN'
+        WHERE {ACTIVE_APPLICATION_PREDICATE}
+          AND EXISTS (
+            SELECT 1 FROM applications AS earlier
+            WHERE earlier.student_id = applications.student_id
+              AND earlier.job_id = applications.job_id
+              AND earlier.id < applications.id
+              AND earlier.{ACTIVE_APPLICATION_PREDICATE}
+          )
+        """
+    )
+    create_index_if_missing(
+        "uq_applications_active_student_job",
+        "applications",
+        ["student_id", "job_id"],
+        unique=True,
+        postgresql_where=sa.text(ACTIVE_APPLICATION_PREDICATE),
+        sqlite_where=sa.text(ACTIVE_APPLICATION_PREDICATE),
+    )
+
+    create_table_if_missing(
+        "idempotency_keys",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("endpoint", sa.String(length=100), nullable=False),
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("request_fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("response_json", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "endpoint", "key"),
+    )
+
+    create_table_if_missing(
+        "application_rollups",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("company_name", sa.String(length=200), nullable=False),
+        sa.Column("category", enum_type(*JOB_CATEGORIES, name="jobcategory"), nullable=False),
+        sa.Column("status", enum_type(*APPLICATION_STATUSES, name="applicationstatus"), nullable=False),
+        sa.Column("applications", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "company_name", "category", "status"),
+    )
+    create_table_if_missing(
+        "package_rollups",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("company_name", sa.String(length=200), nullable=False),
+        sa.Column("category", enum_type(*JOB_CATEGORIES, name="jobcategory"), nullable=False),
+        sa.Column("package_lpa", sa.Float(), nullable=False),
+        sa.Column("offers", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "company_name", "category", "package_lpa"),
+    )
+    create_table_if_missing(
+        "placement_tier_rollups",
+        sa.Column("tier", sa.String(length=20), nullable=False),
+        sa.Column("students", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("tier"),
+    )
+    # Reports read only the rollups, so an adopted database's history must
+    # be counted into them now; offline (--sql) runs have no rows to count
+    if not context.is_offline_mode():
+        rebuild_rollup_tables(op.get_bind())
+
+
+def downgrade() -> None:
+    for table in (
+        "placement_tier_rollups", "package_rollups", "application_rollups", "idempotency_keys",
+        "eligibility_matrix", "job_skills", "student_skills", "skills",
+    ):
+        op.drop_table(table)
+    op.drop_index("uq_applications_active_student_job", table_name="applications")
+    for index in ("ix_jobs_active_company_created_id", "ix_jobs_active_category_created_id", "ix_jobs_active_created_id"):
+        op.drop_index(index, table_name="jobs")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("token_version")
@@ -0,0 +1,38 @@
+"""Indexes for the foreign keys and filters on hot query paths
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+jobs.is_active/created_at is already covered by the keyset indexes of 0002.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from migrations.schema_helpers import create_index_if_missing
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_users_role_id", "users", ["role", "id"]),
+    ("ix_applications_student_created", "applications", ["student_id", "created_at"]),
+    ("ix_applications_job_status", "applications", ["job_id", "status"]),
+    ("ix_applications_status", "applications", ["status"]),
+    ("ix_chat_conversations_user_active_updated", "chat_conversations", ["user_id", "is_active", "updated_at"]),
+    ("ix_chat_messages_conversation_created", "chat_messages", ["conversation_id", "created_at"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        create_index_if_missing(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,56 @@
+"""Placement version on student profiles; every student gets a profile
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+Profiles are now created with the student's account instead of lazily on the
+first apply, so students registered before that get theirs here, and the
+unplaced rollup counter is recounted to include them.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.schema_helpers import column_exists
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not column_exists("student_profiles", "placement_version"):
+        with op.batch_alter_table("student_profiles") as batch:
+            batch.add_column(sa.Column("placement_version", sa.Integer(), server_default="0", nullable=False))
+
+    op.execute(
+        """
+        INSERT INTO student_profiles (user_id, cgpa, backlogs, upgrades_used, placed_final, placement_version)
+        SELECT id, 0.0, 0, 0, FALSE, 0 FROM users
+        WHERE role = 'STUDENT'
+          AND NOT EXISTS (SELECT 1 FROM student_profiles WHERE student_profiles.user_id = users.id)
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO placement_tier_rollups (tier, students)
+        SELECT 'unplaced', 0
+        WHERE NOT EXISTS (SELECT 1 FROM placement_tier_rollups WHERE tier = 'unplaced')
+        """
+    )
+    op.execute(
+        """
+        UPDATE placement_tier_rollups
+        SET students = (SELECT COUNT(*) FROM student_profiles WHERE highest_accepted_tier IS NULL)
+        WHERE tier = 'unplaced'
+        """
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("student_profiles") as batch:
+        batch.drop_column("placement_version")
@@ -0,0 +1,37 @@
+"""Rolling chat summaries and prompt token counts
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.schema_helpers import column_exists
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("chat_conversations") as batch:
+        if not column_exists("chat_conversations", "summary"):
+            batch.add_column(sa.Column("summary", sa.Text(), nullable=True))
+        if not column_exists("chat_conversations", "summary_through_message_id"):
+            batch.add_column(sa.Column("summary_through_message_id", sa.Integer(), nullable=True))
+    if not column_exists("chat_messages", "prompt_tokens"):
+        with op.batch_alter_table("chat_messages") as batch:
+            batch.add_column(sa.Column("prompt_tokens", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("chat_messages") as batch:
+        batch.drop_column("prompt_tokens")
+    with op.batch_alter_table("chat_conversations") as batch:
+        batch.drop_column("summary_through_message_id")
+        batch.drop_column("summary")
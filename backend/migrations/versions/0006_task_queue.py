@@ -0,0 +1,62 @@
+"""Background task queue and pending chat replies
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.schema_helpers import (
+    column_exists, create_enum_types, create_index_if_missing, create_table_if_missing, enum_type
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MESSAGE_STATUSES = ("PENDING", "COMPLETE", "FAILED")
+TASK_STATUSES = ("QUEUED", "RUNNING", "DONE", "FAILED")
+
+
+def upgrade() -> None:
+    create_enum_types(messagestatus=MESSAGE_STATUSES, taskstatus=TASK_STATUSES)
+
+    if not column_exists("chat_messages", "status"):
+        with op.batch_alter_table("chat_messages") as batch:
+            batch.add_column(sa.Column(
+                "status", enum_type(*MESSAGE_STATUSES, name="messagestatus"),
+                server_default="COMPLETE", nullable=False,
+            ))
+
+    create_table_if_missing(
+        "task_queue",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=50), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", enum_type(*TASK_STATUSES, name="taskstatus"), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing("ix_task_queue_status_id", "task_queue", ["status", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_queue_status_id", table_name="task_queue")
+    op.drop_table("task_queue")
+    with op.batch_alter_table("chat_messages") as batch:
+        batch.drop_column("status")
+    if op.get_bind().dialect.name == "postgresql":
+        for name in ("taskstatus", "messagestatus"):
+            op.execute(f"DROP TYPE IF EXISTS {name}")
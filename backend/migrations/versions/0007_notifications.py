@@ -0,0 +1,63 @@
+"""Notifications and unread counters
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.schema_helpers import create_enum_types, create_index_if_missing, create_table_if_missing, enum_type
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NOTIFICATION_TYPES = ("JOB", "INTERVIEW", "APPLICATION", "SYSTEM", "REMINDER")
+NOTIFICATION_PRIORITIES = ("LOW", "MEDIUM", "HIGH")
+
+
+def upgrade() -> None:
+    create_enum_types(notificationtype=NOTIFICATION_TYPES, notificationpriority=NOTIFICATION_PRIORITIES)
+
+    create_table_if_missing(
+        "notifications",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("type", enum_type(*NOTIFICATION_TYPES, name="notificationtype"), nullable=False),
+        sa.Column("priority", enum_type(*NOTIFICATION_PRIORITIES, name="notificationpriority"), nullable=False),
+        sa.Column("title", sa.String(length=200), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=True),
+        sa.Column("application_id", sa.Integer(), nullable=True),
+        sa.Column("is_read", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["application_id"], ["applications.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing("ix_notifications_user_id_id", "notifications", ["user_id", "id"])
+    create_index_if_missing("ix_notifications_job_id", "notifications", ["job_id"])
+
+    create_table_if_missing(
+        "notification_counters",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("unread", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("notification_counters")
+    op.drop_index("ix_notifications_job_id", table_name="notifications")
+    op.drop_index("ix_notifications_user_id_id", table_name="notifications")
+    op.drop_table("notifications")
+    if op.get_bind().dialect.name == "postgresql":
+        for name in ("notificationpriority", "notificationtype"):
+            op.execute(f"DROP TYPE IF EXISTS {name}")
@@ -0,0 +1,128 @@
+"""Online assessments: question banks, scheduled tests, sessions and answers
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.schema_helpers import create_enum_types, create_index_if_missing, create_table_if_missing, enum_type
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ASSESSMENT_TYPES = ("APTITUDE", "TECHNICAL", "CODING", "INTERVIEW", "GROUP_DISCUSSION")
+
+
+def upgrade() -> None:
+    create_enum_types(assessmenttype=ASSESSMENT_TYPES)
+
+    create_table_if_missing(
+        "question_banks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("company_name", sa.String(length=200), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing("ix_question_banks_owner_id", "question_banks", ["owner_id"])
+
+    create_table_if_missing(
+        "questions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bank_id", sa.Integer(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("options", sa.Text(), nullable=False),
+        sa.Column("correct_option", sa.Integer(), nullable=False),
+        sa.Column("marks", sa.Float(), nullable=False),
+        sa.Column("negative_marks", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["bank_id"], ["question_banks.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing("ix_questions_bank_id_id", "questions", ["bank_id", "id"])
+
+    create_table_if_missing(
+        "assessments",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(length=200), nullable=False),
+        sa.Column("company_name", sa.String(length=200), nullable=False),
+        sa.Column("position", sa.String(length=200), nullable=False),
+        sa.Column("type", enum_type(*ASSESSMENT_TYPES, name="assessmenttype"), nullable=False),
+        sa.Column("bank_id", sa.Integer(), nullable=False),
+        sa.Column("question_count", sa.Integer(), nullable=False),
+        sa.Column("starts_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("ends_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("duration_minutes", sa.Integer(), nullable=False),
+        sa.Column("location", sa.String(length=200), nullable=True),
+        sa.Column("instructions", sa.Text(), nullable=True),
+        sa.Column("created_by", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("graded_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["bank_id"], ["question_banks.id"]),
+        sa.ForeignKeyConstraint(["created_by"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing("ix_assessments_ends_at", "assessments", ["ends_at"])
+
+    create_table_if_missing(
+        "assessment_questions",
+        sa.Column("assessment_id", sa.Integer(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("question_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["assessment_id"], ["assessments.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["question_id"], ["questions.id"]),
+        sa.PrimaryKeyConstraint("assessment_id", "position"),
+    )
+
+    create_table_if_missing(
+        "assessment_sessions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("assessment_id", sa.Integer(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("deadline", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("submitted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("score", sa.Float(), nullable=True),
+        sa.Column("correct_count", sa.Integer(), nullable=True),
+        sa.Column("answered_count", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["assessment_id"], ["assessments.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["student_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    create_index_if_missing(
+        "uq_assessment_sessions_assessment_student", "assessment_sessions", ["assessment_id", "student_id"], unique=True
+    )
+
+    create_table_if_missing(
+        "assessment_answers",
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("question_id", sa.Integer(), nullable=False),
+        sa.Column("selected_option", sa.Integer(), nullable=False),
+        sa.Column("saved_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["session_id"], ["assessment_sessions.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["question_id"], ["questions.id"]),
+        sa.PrimaryKeyConstraint("session_id", "question_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("assessment_answers")
+    op.drop_index("uq_assessment_sessions_assessment_student", table_name="assessment_sessions")
+    op.drop_table("assessment_sessions")
+    op.drop_table("assessment_questions")
+    op.drop_index("ix_assessments_ends_at", table_name="assessments")
+    op.drop_table("assessments")
+    op.drop_index("ix_questions_bank_id_id", table_name="questions")
+    op.drop_table("questions")
+    op.drop_index("ix_question_banks_owner_id", table_name="question_banks")
+    op.drop_table("question_banks")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TYPE IF EXISTS assessmenttype")
@@ -0,0 +1,34 @@
+"""Job listing index that also carries the package and CGPA filter columns
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+
+Replaces ix_jobs_active_created_id with the same keyset columns followed by
+package_lpa and min_cgpa, so the min_package and max_cgpa_requirement filters
+of GET /api/jobs/ are checked against index entries while the listing still
+walks (created_at, id) in order.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from migrations.schema_helpers import create_index_if_missing, drop_index_if_exists
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index_if_missing(
+        "ix_jobs_active_created_id_package_cgpa", "jobs", ["is_active", "created_at", "id", "package_lpa", "min_cgpa"]
+    )
+    drop_index_if_exists("ix_jobs_active_created_id", "jobs")
+
+
+def downgrade() -> None:
+    create_index_if_missing("ix_jobs_active_created_id", "jobs", ["is_active", "created_at", "id"])
+    op.drop_index("ix_jobs_active_created_id_package_cgpa", table_name="jobs")
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Enum, ForeignKey, Float
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, Text, Enum, ForeignKey, Float, Index, Table
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -22,9 +22,15 @@ class User(Base):
     google_id = Column(String(100), nullable=True, unique=True)
     company_name = Column(String(200), nullable=True)  # For company users
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, default=0, nullable=False)  # Bump to revoke issued tokens
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # The user listing pages through one role in id order
+    __table_args__ = (
+        Index("ix_users_role_id", "role", "id"),
+    )
+
 class JobCategory(str, enum.Enum):
     TIER1 = "tier1"
     TIER2 = "tier2"
@@ -39,6 +45,40 @@ class ApplicationStatus(str, enum.Enum):
     REJECTED = "rejected"
     WITHDRAWN = "withdrawn"
 
+# Statuses in which an application is still in play
+ACTIVE_APPLICATION_STATUSES = [ApplicationStatus.APPLIED, ApplicationStatus.SHORTLISTED, ApplicationStatus.OFFERED]
+
+# The same set as literal SQL (Enum columns store member names). The partial
+# unique index on applications and INSERT ... ON CONFLICT must spell the
+# predicate identically for the database to match them.
+ACTIVE_APPLICATION_PREDICATE = "status IN ({})".format(
+    ", ".join(f"'{s.name}'" for s in ACTIVE_APPLICATION_STATUSES)
+)
+
+class Skill(Base):
+    __tablename__ = "skills"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, index=True, nullable=False)  # Lower-cased
+
+# Skill associations are indexed both ways: by owner (primary key) for
+# "skills of X" and by skill for "who has skill Y"
+student_skills = Table(
+    "student_skills",
+    Base.metadata,
+    Column("student_profile_id", Integer, ForeignKey("student_profiles.id", ondelete="CASCADE"), primary_key=True),
+    Column("skill_id", Integer, ForeignKey("skills.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_student_skills_skill_student", "skill_id", "student_profile_id"),
+)
+
+job_skills = Table(
+    "job_skills",
+    Base.metadata,
+    Column("job_id", Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True),
+    Column("skill_id", Integer, ForeignKey("skills.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_job_skills_skill_job", "skill_id", "job_id"),
+)
+
 class StudentProfile(Base):
     __tablename__ = "student_profiles"
 
@@ -46,18 +86,21 @@ class StudentProfile(Base):
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
 
     cgpa = Column(Float, default=0.0)
-    skills_json = Column(Text, nullable=True)  # JSON-encoded list of skills
+    skills_json = Column(Text, nullable=True)  # Legacy JSON list; superseded by student_skills (see skills.backfill_skill_tables)
     backlogs = Column(Integer, default=0)
 
     upgrades_used = Column(Integer, default=0)
     highest_accepted_tier = Column(Enum(JobCategory), nullable=True)
     highest_accepted_package_lpa = Column(Float, nullable=True)
     placed_final = Column(Boolean, default=False)
+    # Bumped by every accepted offer; guards apply-time eligibility snapshots
+    placement_version = Column(Integer, default=0, nullable=False)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user = relationship("User")
+    skills = relationship("Skill", secondary=student_skills)
 
 class Job(Base):
     __tablename__ = "jobs"
@@ -71,7 +114,7 @@ class Job(Base):
     category = Column(Enum(JobCategory), nullable=False)
 
     min_cgpa = Column(Float, default=0.0)
-    required_skills_json = Column(Text, nullable=True)  # JSON-encoded list
+    required_skills_json = Column(Text, nullable=True)  # Legacy JSON list; superseded by job_skills (see skills.backfill_skill_tables)
     max_backlogs = Column(Integer, default=999)
 
     is_active = Column(Boolean, default=True)
@@ -79,6 +122,26 @@ class Job(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    skills = relationship("Skill", secondary=job_skills)
+
+    # Keyset pagination walks (created_at, id) newest first, optionally narrowed
+    # by category or company; the package and CGPA filters are checked against
+    # the entries of the unnarrowed walk
+    __table_args__ = (
+        Index("ix_jobs_active_created_id_package_cgpa", "is_active", "created_at", "id", "package_lpa", "min_cgpa"),
+        Index("ix_jobs_active_category_created_id", "is_active", "category", "created_at", "id"),
+        Index("ix_jobs_active_company_created_id", "is_active", "company_name", "created_at", "id"),
+    )
+
+# Materialized output of eligibility_matrix.py (rebuilt wholesale, overnight)
+eligibility_matrix = Table(
+    "eligibility_matrix",
+    Base.metadata,
+    Column("student_profile_id", Integer, ForeignKey("student_profiles.id", ondelete="CASCADE"), primary_key=True),
+    Column("job_id", Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_eligibility_matrix_job_student", "job_id", "student_profile_id"),
+)
+
 class Application(Base):
     __tablename__ = "applications"
 
@@ -96,6 +159,69 @@ class Application(Base):
     student = relationship("User")
     job = relationship("Job")
 
+    # At most one active application per student and job. The other indexes
+    # serve a student's applications newest first, a job's applications by
+    # status, and status-only filters (reports, rollup rebuilds).
+    __table_args__ = (
+        Index(
+            "uq_applications_active_student_job",
+            "student_id",
+            "job_id",
+            unique=True,
+            postgresql_where=text(ACTIVE_APPLICATION_PREDICATE),
+            sqlite_where=text(ACTIVE_APPLICATION_PREDICATE),
+        ),
+        Index("ix_applications_student_created", "student_id", "created_at"),
+        Index("ix_applications_job_status", "job_id", "status"),
+        Index("ix_applications_status", "status"),
+    )
+
+# Responses of completed writes, replayed when a client retries with the same
+# Idempotency-Key (see idempotency.py)
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    endpoint = Column(String(100), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_fingerprint = Column(String(64), nullable=False)
+    response_json = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Placement analytics rollups. Counters are upserted by apply_to_job and
+# accept_offer in the same transaction as the change they count, and can be
+# recomputed from scratch with placement_rollups.py --rebuild. Days are UTC
+# application dates.
+application_rollups = Table(
+    "application_rollups",
+    Base.metadata,
+    Column("day", Date, primary_key=True),
+    Column("company_name", String(200), primary_key=True),
+    Column("category", Enum(JobCategory), primary_key=True),
+    Column("status", Enum(ApplicationStatus), primary_key=True),
+    Column("applications", Integer, nullable=False, default=0),
+)
+
+# Accepted offers with a package, one row per distinct package so medians
+# can be read back without touching applications
+package_rollups = Table(
+    "package_rollups",
+    Base.metadata,
+    Column("day", Date, primary_key=True),
+    Column("company_name", String(200), primary_key=True),
+    Column("category", Enum(JobCategory), primary_key=True),
+    Column("package_lpa", Float, primary_key=True),
+    Column("offers", Integer, nullable=False, default=0),
+)
+
+# Students by highest accepted tier ("unplaced" until a tiered acceptance)
+placement_tier_rollups = Table(
+    "placement_tier_rollups",
+    Base.metadata,
+    Column("tier", String(20), primary_key=True),
+    Column("students", Integer, nullable=False, default=0),
+)
+
 class ChatConversation(Base):
     __tablename__ = "chat_conversations"
     
@@ -103,17 +229,30 @@ class ChatConversation(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String(200), nullable=True)  # Optional conversation title
     is_active = Column(Boolean, default=True)
+    # Rolling summary of the messages up to and including summary_through_message_id (see chat_context.py)
+    summary = Column(Text, nullable=True)
+    summary_through_message_id = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     user = relationship("User")
     messages = relationship("ChatMessage", back_populates="conversation")
 
+    # A user's active conversations, most recently updated first
+    __table_args__ = (
+        Index("ix_chat_conversations_user_active_updated", "user_id", "is_active", "updated_at"),
+    )
+
 class MessageRole(str, enum.Enum):
     USER = "user"
     ASSISTANT = "assistant"
     SYSTEM = "system"
 
+class MessageStatus(str, enum.Enum):
+    PENDING = "pending"  # Assistant reply queued or being generated (see task_queue.py)
+    COMPLETE = "complete"
+    FAILED = "failed"
+
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
     
@@ -121,6 +260,183 @@ class ChatMessage(Base):
     conversation_id = Column(Integer, ForeignKey("chat_conversations.id"), nullable=False)
     role = Column(Enum(MessageRole), nullable=False)
     content = Column(Text, nullable=False)
+    status = Column(Enum(MessageStatus), nullable=False, default=MessageStatus.COMPLETE, server_default="COMPLETE")
+    prompt_tokens = Column(Integer, nullable=True)  # Estimated prompt size behind an assistant reply
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     conversation = relationship("ChatConversation", back_populates="messages")
+
+    # A conversation's history in order
+    __table_args__ = (
+        Index("ix_chat_messages_conversation_created", "conversation_id", "created_at"),
+    )
+
+class TaskStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+# Durable background work: chat replies and other slow side effects, run by
+# the worker pool in task_queue.py. Times are UTC.
+class QueuedTask(Base):
+    __tablename__ = "task_queue"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(Enum(TaskStatus), nullable=False, default=TaskStatus.QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    error = Column(Text, nullable=True)  # From the last failed attempt
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    available_at = Column(DateTime(timezone=True), nullable=False)  # Not claimed before this (retry backoff)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # A running task's lease
+
+    # Workers claim the oldest queued task; maintenance finds expired leases and old finished rows
+    __table_args__ = (
+        Index("ix_task_queue_status_id", "status", "id"),
+    )
+
+class NotificationType(str, enum.Enum):
+    JOB = "job"
+    INTERVIEW = "interview"
+    APPLICATION = "application"
+    SYSTEM = "system"
+    REMINDER = "reminder"
+
+class NotificationPriority(str, enum.Enum):
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+
+# In-app notifications (see notifications.py)
+class Notification(Base):
+    __tablename__ = "notifications"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    type = Column(Enum(NotificationType), nullable=False)
+    priority = Column(Enum(NotificationPriority), nullable=False)
+    title = Column(String(200), nullable=False)
+    message = Column(Text, nullable=False)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=True)
+    application_id = Column(Integer, ForeignKey("applications.id", ondelete="CASCADE"), nullable=True)
+    is_read = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # A user's notifications newest first (keyset on id); a job's fan-out
+    __table_args__ = (
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+        Index("ix_notifications_job_id", "job_id"),
+    )
+
+# Unread notifications per user, kept in step with every insert and read so
+# the nav badge is a primary key lookup (see notifications.py)
+notification_counters = Table(
+    "notification_counters",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("unread", Integer, nullable=False, default=0),
+)
+
+class AssessmentType(str, enum.Enum):
+    APTITUDE = "aptitude"
+    TECHNICAL = "technical"
+    CODING = "coding"
+    INTERVIEW = "interview"
+    GROUP_DISCUSSION = "group-discussion"
+
+# Online assessments (tests): question banks, scheduled tests drawn from a
+# bank, and each student's timed session (see assessments.py)
+class QuestionBank(Base):
+    __tablename__ = "question_banks"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(200), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    company_name = Column(String(200), nullable=True)  # Set for banks of company users
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_question_banks_owner_id", "owner_id"),
+    )
+
+# Multiple choice, so every question can be graded automatically
+class Question(Base):
+    __tablename__ = "questions"
+
+    id = Column(Integer, primary_key=True)
+    bank_id = Column(Integer, ForeignKey("question_banks.id", ondelete="CASCADE"), nullable=False)
+    text = Column(Text, nullable=False)
+    options = Column(Text, nullable=False)  # JSON list of option texts
+    correct_option = Column(Integer, nullable=False)  # Index into options
+    marks = Column(Float, nullable=False, default=1.0)
+    negative_marks = Column(Float, nullable=False, default=0.0)  # Taken off for a wrong answer
+
+    __table_args__ = (
+        Index("ix_questions_bank_id_id", "bank_id", "id"),
+    )
+
+class Assessment(Base):
+    __tablename__ = "assessments"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(200), nullable=False)
+    company_name = Column(String(200), nullable=False)
+    position = Column(String(200), nullable=False)
+    type = Column(Enum(AssessmentType), nullable=False)
+    bank_id = Column(Integer, ForeignKey("question_banks.id"), nullable=False)
+    question_count = Column(Integer, nullable=False)
+    starts_at = Column(DateTime(timezone=True), nullable=False)  # Sessions can start from here...
+    ends_at = Column(DateTime(timezone=True), nullable=False)  # ...until here, when every session ends
+    duration_minutes = Column(Integer, nullable=False)  # Per session
+    location = Column(String(200), nullable=True)
+    instructions = Column(Text, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    graded_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_assessments_ends_at", "ends_at"),
+    )
+
+# The questions of a test, fixed when it is scheduled
+assessment_questions = Table(
+    "assessment_questions",
+    Base.metadata,
+    Column("assessment_id", Integer, ForeignKey("assessments.id", ondelete="CASCADE"), primary_key=True),
+    Column("position", Integer, primary_key=True),
+    Column("question_id", Integer, ForeignKey("questions.id"), nullable=False),
+)
+
+class AssessmentSession(Base):
+    __tablename__ = "assessment_sessions"
+
+    id = Column(Integer, primary_key=True)
+    assessment_id = Column(Integer, ForeignKey("assessments.id", ondelete="CASCADE"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    deadline = Column(DateTime(timezone=True), nullable=False)  # started_at + duration, or the test's end if sooner
+    submitted_at = Column(DateTime(timezone=True), nullable=True)
+    score = Column(Float, nullable=True)  # Set by grading
+    correct_count = Column(Integer, nullable=True)
+    answered_count = Column(Integer, nullable=True)
+
+    # One session per student and test; grading reads a test's sessions
+    __table_args__ = (
+        Index("uq_assessment_sessions_assessment_student", "assessment_id", "student_id", unique=True),
+    )
+
+# Latest saved answer per session and question, written in batches by the
+# autosave buffer (see assessments.py)
+assessment_answers = Table(
+    "assessment_answers",
+    Base.metadata,
+    Column("session_id", Integer, ForeignKey("assessment_sessions.id", ondelete="CASCADE"), primary_key=True),
+    Column("question_id", Integer, ForeignKey("questions.id"), primary_key=True),
+    Column("selected_option", Integer, nullable=False),
+    Column("saved_at", DateTime(timezone=True), nullable=False),  # Newer saves win, whichever worker flushes first
+)
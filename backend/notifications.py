@@ -0,0 +1,263 @@
+"""
+In-app notifications and per-user unread counters.
+
+Notifications are written in the transaction of the change they announce,
+and every insert bumps notification_counters.unread for its recipients in the
+same transaction. Marking notifications read, or deleting unread ones, lowers
+the counter by the number of rows that actually changed. The nav badge is then
+one primary key read (unread_count()) however many notifications a user has.
+
+A new job is announced to every student eligible for it. That fan-out is two
+statements whatever the cohort size: an INSERT ... SELECT over
+eligible_pair_clause() and a counter upsert selected from the rows it wrote.
+It runs from the task queue (see task_queue.py), so creating a job does not
+wait for it.
+
+Every change is also pushed to the recipients' open event streams once its
+transaction commits (see realtime.py), carrying the new unread count, so open
+tabs need not poll.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, insert, literal, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal, dialect_insert
+from eligibility import eligible_students_query
+from realtime import publish_after_commit
+from models import (
+    ApplicationStatus,
+    Job,
+    Notification,
+    NotificationPriority,
+    NotificationType,
+    StudentProfile,
+    User,
+    UserRole,
+    notification_counters,
+)
+from schemas import NotificationResponse
+from task_queue import task_handler
+
+# What a student is told when a company or TPO moves their application on
+STATUS_MESSAGES = {
+    ApplicationStatus.SHORTLISTED: (NotificationPriority.HIGH, "Shortlisted", "You have been shortlisted for {title} at {company}."),
+    ApplicationStatus.OFFERED: (NotificationPriority.HIGH, "Offer received", "{company} has made you an offer for {title}."),
+    ApplicationStatus.REJECTED: (NotificationPriority.MEDIUM, "Application update", "Your application for {title} at {company} was not taken forward."),
+}
+
+
+def _counter_upsert(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"unread": notification_counters.c.unread + stmt.excluded.unread},
+    )
+
+
+async def _add_unread(db: AsyncSession, counts: Dict[int, int]) -> Dict[int, int]:
+    """Raise the users' counters; returns their new unread counts"""
+    # In user order, so concurrent transactions lock counters in the same order
+    rows = [{"user_id": user_id, "unread": count} for user_id, count in sorted(counts.items()) if count]
+    if not rows:
+        return {}
+    result = await db.execute(
+        _counter_upsert(dialect_insert(db.bind, notification_counters).values(rows))
+        .returning(notification_counters.c.user_id, notification_counters.c.unread)
+    )
+    return dict(result.all())
+
+
+async def _take_unread(db: AsyncSession, user_id: int, count: int) -> Optional[int]:
+    """Lower the user's counter; returns the new unread count, or None when count is 0"""
+    if not count:
+        return None
+    result = await db.execute(
+        update(notification_counters)
+        .where(notification_counters.c.user_id == user_id)
+        .values(unread=notification_counters.c.unread - count)
+        .returning(notification_counters.c.unread)
+    )
+    return result.scalar()
+
+
+async def notify(db: AsyncSession, notifications: List[dict]) -> int:
+    """Insert notifications (dicts of Notification columns) and count them as unread; the caller commits.
+
+    Each recipient's open streams get the notification once the caller commits.
+    """
+    if not notifications:
+        return 0
+    result = await db.execute(insert(Notification).returning(Notification, sort_by_parameter_order=True), notifications)
+    rows = result.scalars().all()
+    unread = await _add_unread(db, Counter(n["user_id"] for n in notifications))
+    publish_after_commit(db, "notification", {}, users=[
+        [row.user_id, {**NotificationResponse.model_validate(row).model_dump(mode="json"), "unread_count": unread[row.user_id]}]
+        for row in rows
+    ])
+    return len(notifications)
+
+
+def status_change_notification(
+    user_id: int, application_id: int, job_id: int, job_title: str, company_name: str, new_status: ApplicationStatus
+) -> Optional[dict]:
+    """The student's notification for an application status change, if it calls for one"""
+    if new_status not in STATUS_MESSAGES:
+        return None
+    priority, title, message = STATUS_MESSAGES[new_status]
+    return {
+        "user_id": user_id,
+        "type": NotificationType.APPLICATION,
+        "priority": priority,
+        "title": title,
+        "message": message.format(title=job_title, company=company_name),
+        "job_id": job_id,
+        "application_id": application_id,
+    }
+
+
+async def notify_offer_accepted(db: AsyncSession, student_id: int, application_id: int, job: Job) -> int:
+    """Tell the hiring company's users and the TPOs that a student accepted an offer; the caller commits"""
+    student_name = (await db.execute(select(User.name).where(User.id == student_id))).scalar()
+    # One role per branch, so each is a search of ix_users_role_id rather than a scan of every user
+    recipients = (await db.execute(union_all(
+        select(User.id).where(User.role == UserRole.TPO, User.is_active == True),
+        select(User.id).where(
+            User.role == UserRole.COMPANY, User.company_name == job.company_name, User.is_active == True
+        ),
+    ))).scalars().all()
+    return await notify(db, [
+        {
+            "user_id": user_id,
+            "type": NotificationType.APPLICATION,
+            "priority": NotificationPriority.MEDIUM,
+            "title": "Offer accepted",
+            "message": f"{student_name} accepted the offer for {job.title} at {job.company_name}.",
+            "job_id": job.id,
+            "application_id": application_id,
+        }
+        for user_id in recipients
+    ])
+
+
+async def notify_eligible_students(db: AsyncSession, job_id: int) -> int:
+    """Announce an active job to every student eligible for it; the caller commits.
+
+    Returns the number of students notified. A job already announced is left
+    alone, so a retried task does not notify twice.
+    """
+    announced = await db.execute(
+        select(Notification.id).where(Notification.job_id == job_id, Notification.type == NotificationType.JOB).limit(1)
+    )
+    if announced.first() is not None:
+        return 0
+    job = await db.get(Job, job_id)
+    if job is None or not job.is_active:
+        return 0
+
+    package = f" ({job.package_lpa:g} LPA)" if job.package_lpa else ""
+    announcement = {
+        "type": NotificationType.JOB,
+        "priority": NotificationPriority.HIGH,
+        "title": f"New job: {job.title}",
+        "message": f"{job.company_name} is hiring for {job.title}{package}, and you are eligible to apply.",
+        "job_id": job_id,
+    }
+    recipients = eligible_students_query(job_id).with_only_columns(
+        StudentProfile.user_id,
+        *(literal(value, Notification.__table__.c[column].type) for column, value in announcement.items()),
+    )
+    result = await db.execute(
+        insert(Notification).from_select(["user_id", *announcement], recipients)
+        .returning(Notification.id, Notification.user_id, Notification.created_at)
+    )
+    written = result.all()
+    if not written:
+        return 0
+
+    # Count the rows just written, in user order so concurrent fan-outs lock counters alike
+    announced = (
+        select(Notification.user_id, literal(1))
+        .where(Notification.job_id == job_id, Notification.type == NotificationType.JOB)
+        .order_by(Notification.user_id)
+    )
+    counters = await db.execute(
+        _counter_upsert(dialect_insert(db.bind, notification_counters).from_select(["user_id", "unread"], announced))
+        .returning(notification_counters.c.user_id, notification_counters.c.unread)
+    )
+    unread = dict(counters.all())
+
+    # One event for the whole cohort: the shared announcement, and each student's id and count
+    shared = NotificationResponse.model_validate(
+        {**announcement, "id": 0, "is_read": False, "created_at": written[0].created_at}
+    ).model_dump(mode="json", exclude={"id"})
+    publish_after_commit(db, "notification", shared, users=[
+        [row.user_id, {"id": row.id, "unread_count": unread[row.user_id]}] for row in written
+    ])
+    return len(written)
+
+
+@task_handler("notify_new_job")
+async def announce_job(payload: dict):
+    """Fan-out queued by job creation"""
+    async with AsyncSessionLocal() as db:
+        await notify_eligible_students(db, payload["job_id"])
+        await db.commit()
+
+
+async def unread_count(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(
+        select(notification_counters.c.unread).where(notification_counters.c.user_id == user_id)
+    )
+    return result.scalar() or 0
+
+
+async def mark_read(db: AsyncSession, user_id: int, notification_id: int) -> bool:
+    """Mark one of the user's notifications read; False when it is not theirs. The caller commits."""
+    result = await db.execute(
+        update(Notification)
+        .where(Notification.id == notification_id, Notification.user_id == user_id, Notification.is_read == False)
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
+    unread = await _take_unread(db, user_id, result.rowcount)
+    if unread is not None:
+        publish_after_commit(db, "notifications_read", {}, users=[[user_id, {"id": notification_id, "unread_count": unread}]])
+        return True
+    exists = await db.execute(
+        select(Notification.id).where(Notification.id == notification_id, Notification.user_id == user_id)
+    )
+    return exists.first() is not None
+
+
+async def mark_all_read(db: AsyncSession, user_id: int) -> int:
+    """Mark all of the user's notifications read; the caller commits"""
+    result = await db.execute(
+        update(Notification)
+        .where(Notification.user_id == user_id, Notification.is_read == False)
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
+    unread = await _take_unread(db, user_id, result.rowcount)
+    if unread is not None:
+        publish_after_commit(db, "notifications_read", {}, users=[[user_id, {"id": None, "unread_count": unread}]])
+    return result.rowcount
+
+
+async def delete_notification(db: AsyncSession, user_id: int, notification_id: int) -> bool:
+    """Delete one of the user's notifications; False when it is not theirs. The caller commits."""
+    result = await db.execute(
+        delete(Notification)
+        .where(Notification.id == notification_id, Notification.user_id == user_id)
+        .returning(Notification.is_read)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.first()
+    if row is None:
+        return False
+    unread = await _take_unread(db, user_id, 0 if row.is_read else 1)
+    if unread is None:
+        unread = await unread_count(db, user_id)
+    publish_after_commit(db, "notification_deleted", {}, users=[[user_id, {"id": notification_id, "unread_count": unread}]])
+    return True
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Placement analytics rollups.
+
+application_rollups, package_rollups and placement_tier_rollups hold running
+counters keyed by company, category and day. Write paths collect their
+changes in a RollupDeltas and upsert them before committing, so the counters
+move in the same transaction as the rows they count. The TPO reports read
+only these tables.
+
+Migration 0002 fills the counters when it adds the tables. Rebuild every
+counter from applications and student_profiles whenever they are in doubt:
+    python placement_rollups.py --rebuild
+"""
+
+import argparse
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Date, select, delete, insert, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import engine, Base, dialect_insert
+from models import (
+    Application,
+    ApplicationStatus,
+    Job,
+    JobCategory,
+    StudentProfile,
+    application_rollups,
+    package_rollups,
+    placement_tier_rollups,
+)
+
+UNPLACED = "unplaced"
+TIERS = [UNPLACED, JobCategory.TIER3.value, JobCategory.TIER2.value, JobCategory.TIER1.value]
+
+
+def utc_day(value: Optional[date]) -> date:
+    """UTC calendar day of a timestamp; today for rows not yet flushed"""
+    if value is None:
+        return datetime.now(timezone.utc).date()
+    if not isinstance(value, datetime):
+        return value  # Already a day, e.g. from application_day()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def application_day(bind, column):
+    """SQL expression for the UTC day of a timestamp column, matching utc_day()"""
+    if bind.dialect.name == "postgresql":
+        return func.date(func.timezone("UTC", column), type_=Date)
+    return func.date(column, type_=Date)  # SQLite CURRENT_TIMESTAMP is already UTC
+
+
+def tier_key(tier: Optional[JobCategory]) -> str:
+    return tier.value if tier is not None else UNPLACED
+
+
+class RollupDeltas:
+    """Counter changes made by one transaction, upserted by apply()"""
+
+    def __init__(self):
+        self.applications = Counter()
+        self.packages = Counter()
+        self.tiers = Counter()
+
+    def status_change(
+        self,
+        created_at: Optional[date],
+        company_name: str,
+        category: JobCategory,
+        old: Optional[ApplicationStatus],
+        new: ApplicationStatus,
+        count: int = 1,
+    ):
+        """count applications moved from old to new status (old is None when they are new)"""
+        if old == new:
+            return
+        day = utc_day(created_at)
+        if old is not None:
+            self.applications[(day, company_name, category, old)] -= count
+        self.applications[(day, company_name, category, new)] += count
+
+    def offer_accepted(
+        self,
+        created_at: Optional[datetime],
+        company_name: str,
+        category: JobCategory,
+        package_lpa: Optional[float],
+    ):
+        if package_lpa is not None:
+            self.packages[(utc_day(created_at), company_name, category, package_lpa)] += 1
+
+    def student_added(self):
+        self.tiers[UNPLACED] += 1
+
+    def tier_change(self, old: Optional[JobCategory], new: Optional[JobCategory]):
+        if old != new:
+            self.tiers[tier_key(old)] -= 1
+            self.tiers[tier_key(new)] += 1
+
+    async def apply(self, db: AsyncSession):
+        """Upsert the collected deltas; the caller commits.
+
+        Rows are written in key order so concurrent transactions touching the
+        same counters lock them in the same order.
+        """
+        await _upsert(db, application_rollups, ["day", "company_name", "category", "status"], "applications", self.applications)
+        await _upsert(db, package_rollups, ["day", "company_name", "category", "package_lpa"], "offers", self.packages)
+        await _upsert(db, placement_tier_rollups, ["tier"], "students", {(k,): v for k, v in self.tiers.items()})
+
+
+async def _upsert(db: AsyncSession, table, key_columns, counter_column: str, deltas):
+    rows = [
+        {**dict(zip(key_columns, key)), counter_column: delta}
+        for key, delta in sorted(deltas.items(), key=lambda item: tuple(str(part) for part in item[0]))
+        if delta
+    ]
+    if not rows:
+        return
+    stmt = dialect_insert(db.bind, table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={counter_column: table.c[counter_column] + stmt.excluded[counter_column]},
+    )
+    await db.execute(stmt)
+
+
+def _weighted_median(histogram) -> Optional[float]:
+    """Median of a sorted [(value, count)] histogram"""
+    total = sum(count for _, count in histogram)
+    if total <= 0:
+        return None
+    lower_rank, upper_rank = (total - 1) // 2, total // 2
+    lower = upper = None
+    seen = 0
+    for value, count in histogram:
+        if lower is None and lower_rank < seen + count:
+            lower = value
+        if upper_rank < seen + count:
+            upper = value
+            break
+        seen += count
+    return (lower + upper) / 2
+
+
+def _package_summary(histogram) -> dict:
+    offers = sum(count for _, count in histogram)
+    return {
+        "offers": offers,
+        "averageLpa": round(sum(value * count for value, count in histogram) / offers, 2) if offers else None,
+        "medianLpa": _weighted_median(histogram),
+    }
+
+
+async def compute_placement_report(
+    db: AsyncSession,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> dict:
+    """TPO placement report read from the rollup tables only.
+
+    since/until bound the application day (inclusive). Placement by tier is
+    the current standing of the cohort and ignores the window.
+    """
+    def in_window(table):
+        conditions = []
+        if since is not None:
+            conditions.append(table.c.day >= since)
+        if until is not None:
+            conditions.append(table.c.day <= until)
+        return conditions
+
+    status_rows = await db.execute(
+        select(application_rollups.c.status, func.sum(application_rollups.c.applications))
+        .where(*in_window(application_rollups))
+        .group_by(application_rollups.c.status)
+    )
+    applications_by_status = {s.value: 0 for s in ApplicationStatus}
+    for status, total in status_rows:
+        applications_by_status[status.value] = int(total or 0)
+
+    accepted_rows = await db.execute(
+        select(application_rollups.c.company_name, func.sum(application_rollups.c.applications))
+        .where(application_rollups.c.status == ApplicationStatus.ACCEPTED, *in_window(application_rollups))
+        .group_by(application_rollups.c.company_name)
+    )
+    accepted_by_company = {company: int(total or 0) for company, total in accepted_rows}
+
+    package_rows = (await db.execute(
+        select(
+            package_rollups.c.company_name,
+            package_rollups.c.category,
+            package_rollups.c.package_lpa,
+            func.sum(package_rollups.c.offers),
+        )
+        .where(*in_window(package_rollups))
+        .group_by(package_rollups.c.company_name, package_rollups.c.category, package_rollups.c.package_lpa)
+    )).all()
+
+    by_tier, by_company, overall = {}, {}, Counter()
+    for company, category, package, offers in package_rows:
+        offers = int(offers or 0)
+        if offers <= 0:
+            continue
+        by_tier.setdefault(category.value, Counter())[package] += offers
+        by_company.setdefault(company, Counter())[package] += offers
+        overall[package] += offers
+
+    offers_per_company = []
+    for company in sorted(set(accepted_by_company) | set(by_company)):
+        summary = _package_summary(sorted(by_company.get(company, Counter()).items()))
+        offers_per_company.append({
+            "companyName": company,
+            "acceptedOffers": accepted_by_company.get(company, 0),
+            "averageLpa": summary["averageLpa"],
+            "medianLpa": summary["medianLpa"],
+        })
+    offers_per_company.sort(key=lambda row: (-row["acceptedOffers"], row["companyName"]))
+
+    tier_rows = await db.execute(select(placement_tier_rollups.c.tier, placement_tier_rollups.c.students))
+    students_by_tier = {tier: 0 for tier in TIERS}
+    for tier, students in tier_rows:
+        students_by_tier[tier] = max(int(students or 0), 0)
+    cohort = sum(students_by_tier.values())
+
+    return {
+        "placementByTier": [
+            {
+                "tier": tier,
+                "students": students_by_tier[tier],
+                "rate": round(students_by_tier[tier] / cohort, 4) if cohort else 0.0,
+            }
+            for tier in TIERS
+        ],
+        "totalStudents": cohort,
+        "placementRate": round((cohort - students_by_tier[UNPLACED]) / cohort, 4) if cohort else 0.0,
+        "packages": {
+            "overall": _package_summary(sorted(overall.items())),
+            "byTier": {
+                category.value: _package_summary(sorted(by_tier.get(category.value, Counter()).items()))
+                for category in JobCategory
+            },
+        },
+        "offersPerCompany": offers_per_company,
+        "applicationsByStatus": applications_by_status,
+        "since": since.isoformat() if since else None,
+        "until": until.isoformat() if until else None,
+    }
+
+
+ROLLUP_TABLES = [application_rollups, package_rollups, placement_tier_rollups]
+
+
+def rebuild_rollup_tables(connection) -> dict:
+    """Recompute every rollup counter from the source tables on connection; rows per table"""
+    if connection.dialect.name == "postgresql":
+        # Writers block on their upsert until the rebuild commits, then
+        # add their change on top of the recomputed counters
+        connection.execute(text(
+            "LOCK TABLE application_rollups, package_rollups, placement_tier_rollups IN EXCLUSIVE MODE"
+        ))
+    for table in ROLLUP_TABLES:
+        connection.execute(delete(table))
+
+    day = application_day(connection, Application.created_at).label("day")
+    connection.execute(
+        insert(application_rollups).from_select(
+            ["day", "company_name", "category", "status", "applications"],
+            select(day, Job.company_name, Job.category, Application.status, func.count())
+            .join(Job, Job.id == Application.job_id)
+            .group_by(day, Job.company_name, Job.category, Application.status),
+        )
+    )
+    connection.execute(
+        insert(package_rollups).from_select(
+            ["day", "company_name", "category", "package_lpa", "offers"],
+            select(day, Job.company_name, Job.category, Application.offered_package_lpa, func.count())
+            .join(Job, Job.id == Application.job_id)
+            .where(Application.status == ApplicationStatus.ACCEPTED, Application.offered_package_lpa.isnot(None))
+            .group_by(day, Job.company_name, Job.category, Application.offered_package_lpa),
+        )
+    )
+
+    tier_counts = connection.execute(
+        select(StudentProfile.highest_accepted_tier, func.count()).group_by(StudentProfile.highest_accepted_tier)
+    ).all()
+    if tier_counts:
+        connection.execute(insert(placement_tier_rollups), [
+            {"tier": tier_key(tier), "students": count} for tier, count in tier_counts
+        ])
+
+    return {
+        table.name: connection.execute(select(func.count()).select_from(table)).scalar()
+        for table in ROLLUP_TABLES
+    }
+
+
+def rebuild_rollups():
+    """Recompute every rollup counter from the source tables in one transaction"""
+    Base.metadata.create_all(bind=engine, tables=ROLLUP_TABLES)
+    with engine.begin() as connection:
+        counts = rebuild_rollup_tables(connection)
+    print("Rebuilt rollups: " + ", ".join(f"{name}={rows} rows" for name, rows in counts.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all rollups from source tables")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+        return
+    rebuild_rollups()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Per-student placement state snapshots for the apply path.
+
+A PlacementState holds what eligibility checks need from a student: CGPA,
+backlogs, accepted tier and package floor, upgrades used, the placed flag and
+the student's skills as a bitset of skill ids. Snapshots are cached in-process,
+so a steady-state apply reads nothing but the job.
+
+Each snapshot carries student_profiles.placement_version. accept_offer bumps
+the version whenever it accepts and refreshes the cached snapshot after its
+commit; the apply INSERT only goes through while the version it was checked
+against is still current, so a snapshot that another process made stale is
+caught at write time and reloaded (see routers/applications.py). CGPA,
+backlogs and skills are not changed through the API and follow after the TTL.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import StudentProfile, Job, JobCategory, student_skills, job_skills
+
+
+def skill_mask(skill_ids: Iterable[Optional[int]]) -> int:
+    """Bitset with bit i set for skill id i"""
+    mask = 0
+    for skill_id in skill_ids:
+        if skill_id is not None:
+            mask |= 1 << skill_id
+    return mask
+
+
+def mask_skill_ids(mask: int) -> List[int]:
+    skill_ids = []
+    while mask:
+        low = mask & -mask
+        skill_ids.append(low.bit_length() - 1)
+        mask ^= low
+    return skill_ids
+
+
+@dataclass(frozen=True)
+class PlacementState:
+    user_id: int
+    profile_id: int
+    placement_version: int
+    cgpa: Optional[float]
+    backlogs: Optional[int]
+    highest_accepted_tier: Optional[JobCategory]
+    highest_accepted_package_lpa: Optional[float]
+    upgrades_used: int
+    placed_final: bool
+    skills: int
+
+
+def _placement_fields(profile: StudentProfile) -> dict:
+    return {
+        "placement_version": profile.placement_version or 0,
+        "highest_accepted_tier": profile.highest_accepted_tier,
+        "highest_accepted_package_lpa": profile.highest_accepted_package_lpa,
+        "upgrades_used": profile.upgrades_used or 0,
+        "placed_final": bool(profile.placed_final),
+    }
+
+
+async def load_placement_state(db: AsyncSession, user_id: int) -> Optional[PlacementState]:
+    """The student's profile and skill ids, in one query"""
+    result = await db.execute(
+        select(StudentProfile, student_skills.c.skill_id)
+        .outerjoin(student_skills, student_skills.c.student_profile_id == StudentProfile.id)
+        .where(StudentProfile.user_id == user_id)
+        .execution_options(populate_existing=True)
+    )
+    rows = result.all()
+    if not rows:
+        return None
+    profile = rows[0][0]
+    return PlacementState(
+        user_id=user_id,
+        profile_id=profile.id,
+        cgpa=profile.cgpa,
+        backlogs=profile.backlogs,
+        skills=skill_mask(skill_id for _, skill_id in rows),
+        **_placement_fields(profile),
+    )
+
+
+async def load_active_jobs(db: AsyncSession, job_ids: List[int]) -> Dict[int, Tuple[Job, int]]:
+    """job_id -> (job, required skill bitset) for the active jobs among job_ids, in one query"""
+    result = await db.execute(
+        select(Job, job_skills.c.skill_id)
+        .outerjoin(job_skills, job_skills.c.job_id == Job.id)
+        .where(Job.id.in_(job_ids), Job.is_active == True)
+    )
+    jobs: Dict[int, Tuple[Job, int]] = {}
+    for job, skill_id in result.all():
+        _, mask = jobs.get(job.id, (job, 0))
+        jobs[job.id] = (job, mask | skill_mask([skill_id]))
+    return jobs
+
+
+class PlacementStateCache:
+    """TTL + LRU cache of PlacementState by user id"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[PlacementState]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, state: PlacementState):
+        if self.max_entries <= 0:
+            return
+        current = self._entries.get(state.user_id)
+        if current is not None and current[1].placement_version > state.placement_version:
+            return  # A slower reader must not roll back a newer snapshot
+        self._entries[state.user_id] = (time.monotonic() + self.ttl_seconds, state)
+        self._entries.move_to_end(state.user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def update_placement(self, profile: StudentProfile):
+        """Carry a committed accept into the cached snapshot, keeping its skills"""
+        entry = self._entries.get(profile.user_id)
+        if entry is not None:
+            self.put(replace(entry[1], **_placement_fields(profile)))
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+placement_state_cache = PlacementStateCache(
+    max_entries=settings.placement_state_cache_max_entries,
+    ttl_seconds=settings.placement_state_cache_ttl_seconds,
+)
+
+
+async def get_placement_state(db: AsyncSession, user_id: int, refresh: bool = False) -> Optional[PlacementState]:
+    """Cached snapshot of the student's placement state; refresh=True rereads it"""
+    state = None if refresh else placement_state_cache.get(user_id)
+    if state is None:
+        state = await load_placement_state(db, user_id)
+        if state is None:
+            placement_state_cache.invalidate(user_id)
+        else:
+            placement_state_cache.put(state)
+    return state
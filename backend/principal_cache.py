@@ -0,0 +1,105 @@
+"""
+In-process cache of authenticated principals, keyed by token subject.
+
+get_current_user reads from here before touching the database, so steady-state
+authenticated requests cost no user lookup. Entries expire after a short TTL and
+are evicted least-recently-used; any committed UPDATE of a users row drops the
+cached entry so deactivations and role changes are seen on the next request.
+
+That invalidation is per process. Other workers keep serving their cached
+entry, so a token revoked or a user deactivated elsewhere is still accepted
+there for up to principal_cache_ttl_seconds.
+"""
+
+from collections import OrderedDict
+from typing import Optional
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import User
+
+
+class PrincipalCache:
+    """TTL + LRU cache of detached User rows"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, subject: str) -> Optional[User]:
+        entry = self._entries.get(subject)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[subject]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return user
+
+    def put(self, subject: str, user: User):
+        if self.max_entries <= 0:
+            return
+        self._entries[subject] = (time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, subject: str):
+        if self._entries.pop(subject, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.principal_cache_max_entries,
+    ttl_seconds=settings.principal_cache_ttl_seconds,
+)
+
+
+# Invalidation: remember which users were updated in a session and drop them
+# from the cache only once the transaction commits (or rolls back, to be safe)
+
+@event.listens_for(User, "after_update")
+def _remember_updated_user(mapper, connection, target: User):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    subjects = session.info.setdefault("updated_principals", set())
+    subjects.add(target.email)
+    # A changed email leaves the old subject cached too
+    subjects.update(inspect(target).attrs.email.history.deleted or ())
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_updated_users(session: Session):
+    for subject in session.info.pop("updated_principals", ()):
+        principal_cache.invalidate(subject)
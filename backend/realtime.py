@@ -0,0 +1,230 @@
+"""
+Push delivery of committed changes to open browser tabs.
+
+Each tab holds one Server-Sent Events stream (GET /api/events/, see
+routers/events.py), registered with the process's ConnectionHub under its user
+id and role. Code that changes something a tab shows calls
+publish_after_commit() inside its transaction; the event is held in the
+session and handed to the hub only when the transaction commits, so a rolled
+back change is never announced.
+
+The hub sends every event through a Broker, which brings it back to the hub
+of each API process, and each hub writes it to the streams it holds for the
+event's users or roles. InMemoryBroker loops events straight back, which is
+all a single process needs. Deployments with several API workers install a
+broker on a shared channel (Redis pub/sub, PostgreSQL LISTEN/NOTIFY, ...) with
+event_hub.set_broker() before the hub starts.
+
+An event is one JSON message: {"event": name, "data": {...}} plus "users", a
+list of [user_id, fields] pairs whose fields are merged into data for that
+user's streams, and/or "roles", whose streams all get data as it is. A stream
+that falls queue_size events behind is closed; the browser reconnects and
+reloads.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import settings
+
+
+class Broker:
+    """Carries hub events to the hub of every API process, this one included"""
+
+    async def start(self, deliver: Callable[[str], None]):
+        """Start calling deliver(message) for every message published by any process"""
+        raise NotImplementedError
+
+    def publish(self, message: str):
+        """Send a message without blocking; called from the event loop"""
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class InMemoryBroker(Broker):
+    """Single-process broker: messages go straight back to this process's hub"""
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[str], None]] = None
+
+    async def start(self, deliver: Callable[[str], None]):
+        self._deliver = deliver
+
+    def publish(self, message: str):
+        if self._deliver is not None:
+            # After the publishing code has finished, like a network broker would
+            asyncio.get_running_loop().call_soon(self._deliver, message)
+
+    async def aclose(self):
+        self._deliver = None
+
+
+class Subscription:
+    """One open stream: SSE frames waiting to be written, or None once closed"""
+
+    __slots__ = ("user_id", "role", "queue")
+
+    def __init__(self, user_id: int, role: str, queue_size: int):
+        self.user_id = user_id
+        self.role = role
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+
+
+def sse_frame(event_name: str, data: dict) -> str:
+    return f"event: {event_name}\ndata: {json.dumps(data)}\n\n"
+
+
+class ConnectionHub:
+    """Open streams of this process, by user and by role"""
+
+    def __init__(self, broker: Broker, queue_size: int, keepalive_seconds: float):
+        self.broker = broker
+        self.queue_size = queue_size
+        self.keepalive_seconds = keepalive_seconds
+        self._by_user: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._by_role: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._started = False
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def set_broker(self, broker: Broker):
+        """Use broker from the next start() on"""
+        self.broker = broker
+
+    async def start(self):
+        if not self._started:
+            await self.broker.start(self._deliver)
+            self._started = True
+
+    async def stop(self):
+        """Stop receiving events and end every open stream"""
+        if self._started:
+            await self.broker.aclose()
+            self._started = False
+        for subscriptions in list(self._by_user.values()):
+            for subscription in list(subscriptions):
+                self._close(subscription)
+
+    def subscribe(self, user_id: int, role: str) -> Subscription:
+        subscription = Subscription(user_id, role, self.queue_size)
+        self._by_user[user_id].add(subscription)
+        self._by_role[role].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for index, key in ((self._by_user, subscription.user_id), (self._by_role, subscription.role)):
+            subscriptions = index.get(key)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del index[key]
+
+    def publish(self, messages: Iterable[dict]):
+        """Send events to every process's streams; called once their transaction has committed"""
+        for message in messages:
+            self.broker.publish(json.dumps(message))
+            self.published += 1
+
+    def _close(self, subscription: Subscription):
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def _offer(self, subscription: Subscription, frame: str):
+        try:
+            subscription.queue.put_nowait(frame)
+            self.delivered += 1
+        except asyncio.QueueFull:
+            # Too far behind to catch up event by event; the client reconnects and reloads
+            self.dropped += 1
+            self._close(subscription)
+
+    def _deliver(self, raw: str):
+        message = json.loads(raw)
+        event_name, data = message["event"], message["data"]
+        for user_id, fields in message.get("users", ()):
+            for subscription in list(self._by_user.get(user_id, ())):
+                self._offer(subscription, sse_frame(event_name, {**data, **fields}))
+        roles = [role for role in message.get("roles", ()) if role in self._by_role]
+        if roles:
+            frame = sse_frame(event_name, data)  # Shared by every stream of these roles
+            for role in roles:
+                for subscription in list(self._by_role[role]):
+                    self._offer(subscription, frame)
+
+    async def frames(self, user_id: int, role: str, first: Callable[[], Awaitable[str]]):
+        """SSE text for one stream: await first(), then the stream's events, with keep-alive comments while idle
+
+        The stream is registered before first() runs, so nothing committed
+        meanwhile is missed, and only once the response has started, so a
+        client gone before then leaves nothing behind.
+        """
+        subscription = self.subscribe(user_id, role)
+        try:
+            yield await first()
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscription.queue.get(), self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "connections": sum(len(subscriptions) for subscriptions in self._by_user.values()),
+            "users": len(self._by_user),
+            "by_role": {role: len(subscriptions) for role, subscriptions in self._by_role.items()},
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "broker": type(self.broker).__name__,
+        }
+
+
+event_hub = ConnectionHub(
+    InMemoryBroker(),
+    queue_size=settings.realtime_queue_size,
+    keepalive_seconds=settings.realtime_keepalive_seconds,
+)
+
+
+def publish_after_commit(
+    db,
+    event_name: str,
+    data: dict,
+    users: Optional[List[Tuple[int, dict]]] = None,
+    roles: Optional[List[str]] = None,
+):
+    """Push an event to the given users' and roles' streams once db's transaction commits"""
+    message = {"event": event_name, "data": data}
+    if users:
+        message["users"] = users
+    if roles:
+        message["roles"] = roles
+    db.info.setdefault("realtime_events", []).append(message)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_events(session: Session):
+    messages = session.info.pop("realtime_events", None)
+    if messages:
+        event_hub.publish(messages)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_events(session: Session):
+    session.info.pop("realtime_events", None)
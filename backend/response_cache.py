@@ -0,0 +1,182 @@
+"""
+In-process cache of chatbot answers to stand-alone questions.
+
+Only the first message of a conversation is looked up or stored: its answer
+depends on nothing but the question, while later turns depend on history and
+bypass the cache. Long messages bypass it too, since they tend to carry the
+student's own details. Questions match on normalized text (case, punctuation
+and spacing ignored). With chat_response_cache_min_similarity > 0 a miss also
+searches an in-memory vector index of the cached questions and takes the most
+similar one if its cosine similarity reaches that threshold. The embeddings
+are hashed word and character-trigram counts, so no model or service is needed.
+
+Entries expire after a TTL and the least recently used go first when the
+cache is full. Each entry counts its hits and remembers how long its answer
+took to generate, which stats() sums up as latency saved.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+import re
+import time
+import unicodedata
+import zlib
+
+import numpy as np
+
+from config import settings
+
+EMBEDDING_DIM = 256
+
+
+def normalize_question(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).lower()
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+def embed_question(normalized: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Unit vector of hashed word and character-trigram counts"""
+    vector = np.zeros(dim, dtype=np.float32)
+    padded = f" {normalized} "
+    features = normalized.split() + [padded[i:i + 3] for i in range(len(padded) - 2)]
+    for feature in features:
+        h = zlib.crc32(feature.encode())
+        vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class CachedResponse:
+    content: str
+    generation_ms: float
+    expires_at: float
+    slot: int = -1  # Row in the vector index, if any
+    hits: int = 0
+
+
+class ResponseCache:
+    """TTL + LRU cache of answers by normalized question, with optional similarity lookup"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        min_similarity: float = 0.0,
+        embedder: Callable[[str], np.ndarray] = embed_question,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_similarity = min_similarity
+        self.embedder = embedder
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._slot_keys = []
+        self._free_slots = []
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.saved_ms = 0.0
+
+    def _index_enabled(self) -> bool:
+        return self.min_similarity > 0 and self.max_entries > 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        if entry.slot >= 0:
+            self._vectors[entry.slot] = 0.0
+            self._slot_keys[entry.slot] = None
+            self._free_slots.append(entry.slot)
+
+    def _hit(self, key: str, entry: CachedResponse) -> CachedResponse:
+        self._entries.move_to_end(key)
+        entry.hits += 1
+        self.saved_ms += entry.generation_ms
+        return entry
+
+    def _similar(self, normalized: str) -> Optional[str]:
+        if not self._index_enabled() or self._vectors is None or not self._entries:
+            return None
+        similarities = self._vectors @ self.embedder(normalized)
+        slot = int(np.argmax(similarities))
+        if similarities[slot] < self.min_similarity:
+            return None
+        return self._slot_keys[slot]
+
+    def bypass(self):
+        """Count a message that was not eligible for the cache"""
+        self.bypasses += 1
+
+    def get(self, question: str) -> Optional[CachedResponse]:
+        key = normalize_question(question)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at < now:
+            self._remove(key)
+            entry = None
+        if entry is not None:
+            self.exact_hits += 1
+            return self._hit(key, entry)
+
+        similar = self._similar(key)
+        if similar is not None:
+            entry = self._entries[similar]
+            if entry.expires_at >= now:
+                self.similar_hits += 1
+                return self._hit(similar, entry)
+            self._remove(similar)
+
+        self.misses += 1
+        return None
+
+    def put(self, question: str, content: str, generation_ms: float):
+        if self.max_entries <= 0:
+            return
+        key = normalize_question(question)
+        if key in self._entries:
+            self._remove(key)
+        while len(self._entries) >= self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+        entry = CachedResponse(content=content, generation_ms=generation_ms,
+                               expires_at=time.monotonic() + self.ttl_seconds)
+        if self._index_enabled():
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, EMBEDDING_DIM), dtype=np.float32)
+                self._slot_keys = [None] * self.max_entries
+                self._free_slots = list(range(self.max_entries - 1, -1, -1))
+            entry.slot = self._free_slots.pop()
+            self._vectors[entry.slot] = self.embedder(key)
+            self._slot_keys[entry.slot] = key
+        self._entries[key] = entry
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.similar_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "lookups": lookups,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "bypassed": self.bypasses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "latency_saved_ms": round(self.saved_ms, 1),
+            "top_questions": [
+                {"question": key, "hits": entry.hits}
+                for key, entry in sorted(self._entries.items(), key=lambda item: -item[1].hits)[:10]
+            ],
+        }
+
+    def clear(self):
+        for key in list(self._entries):
+            self._remove(key)
+
+
+response_cache = ResponseCache(
+    max_entries=settings.chat_response_cache_max_entries,
+    ttl_seconds=settings.chat_response_cache_ttl_seconds,
+    min_similarity=settings.chat_response_cache_min_similarity,
+)
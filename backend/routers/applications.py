@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-import json
-
-from database import get_db
-from routers.auth import get_current_user
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy import select, update, and_, func, literal, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, NamedTuple, Optional
+from collections import defaultdict
+
+from database import get_db, dialect_insert
+from routers.auth import get_current_principal, get_current_user
 from models import (
     User,
     UserRole,
@@ -13,17 +14,38 @@ from models import (
     Application,
     JobCategory,
     ApplicationStatus,
+    ACTIVE_APPLICATION_STATUSES,
+    ACTIVE_APPLICATION_PREDICATE,
+)
+from eligibility import ineligibility_reason
+from placement_state import PlacementState, get_placement_state, load_active_jobs, placement_state_cache
+from dashboard_stats import dashboard_stats_cache, publish_dashboard_delta
+from placement_rollups import RollupDeltas, application_day
+from idempotency import request_fingerprint, find_response, store_response
+from notifications import notify, notify_offer_accepted, status_change_notification
+from schemas import (
+    ApplyRequest,
+    ApplicationResponse,
+    AcceptOfferRequest,
+    TokenData,
+    BulkApplyRequest,
+    BulkApplyResult,
+    BulkApplyResponse,
+    BulkStatusRequest,
+    StatusTransitionResult,
+    BulkStatusResponse,
 )
-from schemas import ApplyRequest, ApplicationResponse, AcceptOfferRequest
 
 router = APIRouter()
 
 
-def _skills_set(skills_json: str) -> set:
-    try:
-        return set(s.lower() for s in (json.loads(skills_json or "[]") or []))
-    except Exception:
-        return set()
+# Company / TPO side of the ApplicationStatus state machine. ACCEPTED and
+# WITHDRAWN are only reached through the student's accept_offer.
+STATUS_TRANSITIONS = {
+    ApplicationStatus.APPLIED: {ApplicationStatus.SHORTLISTED, ApplicationStatus.REJECTED},
+    ApplicationStatus.SHORTLISTED: {ApplicationStatus.OFFERED, ApplicationStatus.REJECTED},
+    ApplicationStatus.OFFERED: {ApplicationStatus.REJECTED},
+}
 
 
 def _tier_rank(tier: Optional[JobCategory]) -> int:
@@ -37,20 +59,93 @@ def _tier_rank(tier: Optional[JobCategory]) -> int:
     }[tier]
 
 
+async def _lock_student_profile(db: AsyncSession, user_id: int) -> Optional[StudentProfile]:
+    """Load the student's profile, holding a row lock until the transaction ends.
+
+    PostgreSQL takes FOR UPDATE; applies read the profile FOR SHARE in their
+    INSERT and so wait for it. SQLite has no row locks: a no-op UPDATE first
+    takes the database write lock, which serializes the caller against every
+    other writer.
+    """
+    if db.bind.dialect.name == "sqlite":
+        await db.execute(
+            update(StudentProfile)
+            .where(StudentProfile.user_id == user_id)
+            .values(updated_at=StudentProfile.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+    result = await db.execute(
+        select(StudentProfile)
+        .where(StudentProfile.user_id == user_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+async def _insert_active_applications(db: AsyncSession, state: PlacementState, jobs: List[Job]) -> Dict[int, Application]:
+    """Apply to each job in one INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+
+    Returns job_id -> application for the rows inserted. The SELECT only
+    yields rows while the student's placement_version still matches the
+    snapshot the jobs were checked against (read FOR SHARE, so an accept in
+    flight finishes first) and the job is still active. A job the student
+    already has an active application for hits the partial unique index and is
+    skipped; callers look those up with _active_applications().
+    """
+    rows = (
+        select(
+            StudentProfile.user_id,
+            Job.id,
+            literal(ApplicationStatus.APPLIED, Application.__table__.c.status.type),
+            Job.package_lpa,
+        )
+        .join(Job, Job.id.in_([job.id for job in jobs]))
+        .where(
+            StudentProfile.user_id == state.user_id,
+            StudentProfile.placement_version == state.placement_version,
+            Job.is_active == True,
+        )
+        .with_for_update(read=True, of=StudentProfile)
+    )
+    stmt = (
+        dialect_insert(db.bind, Application)
+        .from_select(["student_id", "job_id", "status", "offered_package_lpa"], rows)
+        .on_conflict_do_nothing(
+            index_elements=["student_id", "job_id"],
+            index_where=text(ACTIVE_APPLICATION_PREDICATE),
+        )
+        .returning(Application)
+    )
+    result = await db.scalars(stmt)
+    return {app.job_id: app for app in result.all()}
+
+
+async def _active_applications(db: AsyncSession, student_id: int, job_ids: List[int]) -> Dict[int, Application]:
+    result = await db.execute(
+        select(Application).where(
+            Application.student_id == student_id,
+            Application.job_id.in_(job_ids),
+            Application.status.in_(ACTIVE_APPLICATION_STATUSES),
+        )
+    )
+    return {app.job_id: app for app in result.scalars()}
+
+
 @router.get("/my", response_model=List[ApplicationResponse])
 async def list_my_applications(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
 ):
-    if current_user.role != UserRole.STUDENT:
+    if principal.role != UserRole.STUDENT:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only students can view their applications")
 
-    apps = (
-        db.query(Application)
-        .filter(Application.student_id == current_user.id)
+    result = await db.execute(
+        select(Application)
+        .where(Application.student_id == principal.user_id)
         .order_by(Application.created_at.desc())
-        .all()
     )
+    apps = result.scalars().all()
 
     return [
         ApplicationResponse.model_validate(a)
@@ -58,106 +153,234 @@ async def list_my_applications(
     ]
 
 
+class _ApplyOutcome(NamedTuple):
+    status_code: int  # 200, or the error status POST /apply answers with
+    detail: Optional[str] = None
+    application: Optional[Application] = None
+    created: bool = False
+
+
+async def _apply_to_jobs(db: AsyncSession, user_id: int, job_ids: List[int]) -> Dict[int, _ApplyOutcome]:
+    """Apply the student to each job, committing if anything was created.
+
+    Eligibility is checked against the cached placement snapshot, so a
+    steady-state call costs one read (the jobs with their required skills)
+    and one guarded INSERT, plus the rollup upsert. When the INSERT skips a
+    job the student holds no active application for, the snapshot was stale:
+    it is reread and those jobs are checked and inserted once more.
+    """
+    state = await get_placement_state(db, user_id)
+    if state is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student profile not found")
+
+    jobs = await load_active_jobs(db, job_ids)
+    outcomes = {
+        job_id: _ApplyOutcome(status.HTTP_404_NOT_FOUND, "Job not found or inactive")
+        for job_id in job_ids if job_id not in jobs
+    }
+    pending = [job_id for job_id in job_ids if job_id in jobs]
+    rollups = RollupDeltas()
+    created_count = 0
+
+    for attempt in range(2):
+        if attempt:
+            state = await get_placement_state(db, user_id, refresh=True)
+            if state is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student profile not found")
+
+        applicable = []
+        for job_id in pending:
+            job, required_skills = jobs[job_id]
+            reason = await ineligibility_reason(db, state, job, required_skills)
+            if reason:
+                outcomes[job_id] = _ApplyOutcome(status.HTTP_403_FORBIDDEN, reason)
+            else:
+                applicable.append(job)
+        if not applicable:
+            pending = []
+            break
+
+        created = await _insert_active_applications(db, state, applicable)
+        skipped = [job.id for job in applicable if job.id not in created]
+        existing = await _active_applications(db, user_id, skipped) if skipped else {}
+        for job in applicable:
+            if job.id in created:
+                rollups.status_change(None, job.company_name, job.category, None, ApplicationStatus.APPLIED)
+                outcomes[job.id] = _ApplyOutcome(status.HTTP_200_OK, application=created[job.id], created=True)
+                created_count += 1
+            elif job.id in existing:
+                outcomes[job.id] = _ApplyOutcome(status.HTTP_200_OK, application=existing[job.id])
+
+        pending = [job_id for job_id in skipped if job_id not in existing]
+        if not pending:
+            break
+
+    for job_id in pending:
+        outcomes[job_id] = _ApplyOutcome(status.HTTP_409_CONFLICT, "Application changed concurrently; retry")
+
+    if created_count:
+        await rollups.apply(db)
+        publish_dashboard_delta(db, totalApplications=created_count)
+        await db.commit()
+        dashboard_stats_cache.invalidate()
+    return outcomes
+
+
 @router.post("/apply", response_model=ApplicationResponse)
 async def apply_to_job(
     body: ApplyRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
 ):
-    if current_user.role != UserRole.STUDENT:
+    if principal.role != UserRole.STUDENT:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only students can apply to jobs")
 
-    job = db.query(Job).filter(Job.id == body.job_id, Job.is_active == True).first()
-    if not job:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or inactive")
+    outcome = (await _apply_to_jobs(db, principal.user_id, [body.job_id]))[body.job_id]
+    if outcome.application is None:
+        raise HTTPException(status_code=outcome.status_code, detail=outcome.detail)
 
-    # Ensure student profile exists
-    profile = db.query(StudentProfile).filter(StudentProfile.user_id == current_user.id).first()
-    if not profile:
-        profile = StudentProfile(user_id=current_user.id)
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
-
-    if profile.placed_final:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are already placed (Tier-1 final)")
+    # A repeat apply returns the active application it ran into
+    return ApplicationResponse.model_validate(outcome.application)
 
-    # Eligibility checks
-    if job.category != JobCategory.INTERNSHIP:
-        if profile.cgpa is not None and job.min_cgpa is not None and profile.cgpa < job.min_cgpa:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="CGPA below required minimum")
-        if profile.backlogs is not None and job.max_backlogs is not None and profile.backlogs > job.max_backlogs:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Backlogs exceed allowed maximum")
-        required_skills = _skills_set(job.required_skills_json)
-        student_skills = _skills_set(profile.skills_json)
-        if required_skills and not required_skills.issubset(student_skills):
-            missing = sorted(required_skills - student_skills)
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Missing required skills: {', '.join(missing)}",
-            )
 
-    # Restriction: once accepted somewhere, no applying to lower package jobs
-    if profile.highest_accepted_package_lpa is not None and job.category != JobCategory.INTERNSHIP and job.package_lpa is not None:
-        if job.package_lpa < profile.highest_accepted_package_lpa:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Cannot apply to a job offering a lower package than your accepted offer",
-            )
+@router.post("/apply/bulk", response_model=BulkApplyResponse)
+async def bulk_apply(
+    body: BulkApplyRequest,
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    """Apply to many jobs in one transaction; one result per distinct job id, in request order"""
+    if principal.role != UserRole.STUDENT:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only students can apply to jobs")
 
-    # Prevent duplicate active applications to same job
-    existing = (
-        db.query(Application)
-        .filter(
-            Application.student_id == current_user.id,
-            Application.job_id == job.id,
-            Application.status.in_([ApplicationStatus.APPLIED, ApplicationStatus.SHORTLISTED, ApplicationStatus.OFFERED]),
+    job_ids = list(dict.fromkeys(body.job_ids))
+    outcomes = await _apply_to_jobs(db, principal.user_id, job_ids)
+
+    results = []
+    for job_id in job_ids:
+        outcome = outcomes[job_id]
+        if outcome.application is None:
+            results.append(BulkApplyResult(job_id=job_id, ok=False, detail=outcome.detail))
+        else:
+            results.append(BulkApplyResult(
+                job_id=job_id,
+                ok=True,
+                created=outcome.created,
+                application=ApplicationResponse.model_validate(outcome.application),
+            ))
+    return BulkApplyResponse(results=results)
+
+
+@router.post("/status/bulk", response_model=BulkStatusResponse)
+async def bulk_update_status(
+    body: BulkStatusRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Move applications through the status state machine in one transaction.
+
+    Each distinct (from, to) pair is one guarded UPDATE; an application whose
+    status changed since it was read is reported rather than overwritten.
+    Companies may only move applications to their own jobs.
+    """
+    if current_user.role not in (UserRole.TPO, UserRole.COMPANY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only TPO or Company can change application status")
+
+    ids = [t.application_id for t in body.transitions]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Each application may appear only once")
+    result = await db.execute(
+        select(
+            Application.id, Application.student_id, Application.status, Application.created_at,
+            Job.id.label("job_id"), Job.title, Job.company_name, Job.category,
         )
-        .first()
-    )
-    if existing:
-        return ApplicationResponse.model_validate(existing)
-
-    app = Application(
-        student_id=current_user.id,
-        job_id=job.id,
-        status=ApplicationStatus.APPLIED,
-        offered_package_lpa=job.package_lpa,
+        .join(Job, Job.id == Application.job_id)
+        .where(Application.id.in_(ids))
     )
-    db.add(app)
-    db.commit()
-    db.refresh(app)
-
-    return ApplicationResponse.model_validate(app)
+    current = {row.id: row for row in result.all()}
+
+    results = {}
+    groups = defaultdict(list)
+    for transition in body.transitions:
+        app_id, target = transition.application_id, transition.status
+        row = current.get(app_id)
+        if row is None or (current_user.role == UserRole.COMPANY and row.company_name != current_user.company_name):
+            results[app_id] = StatusTransitionResult(application_id=app_id, ok=False, detail="Application not found")
+        elif row.status == target:
+            results[app_id] = StatusTransitionResult(application_id=app_id, ok=True, status=target)
+        elif target not in STATUS_TRANSITIONS.get(row.status, set()):
+            results[app_id] = StatusTransitionResult(
+                application_id=app_id, ok=False, status=row.status,
+                detail=f"Cannot move an application from {row.status.value} to {target.value}",
+            )
+        else:
+            groups[(row.status, target)].append(app_id)
+
+    rollups = RollupDeltas()
+    notices = []
+    for (old, new), group_ids in sorted(groups.items(), key=lambda item: (item[0][0].value, item[0][1].value)):
+        result = await db.execute(
+            update(Application)
+            .where(Application.id.in_(group_ids), Application.status == old)
+            .values(status=new)
+            .returning(Application.id)
+            .execution_options(synchronize_session=False)
+        )
+        moved = set(result.scalars())
+        for app_id in group_ids:
+            if app_id in moved:
+                row = current[app_id]
+                rollups.status_change(row.created_at, row.company_name, row.category, old, new)
+                notices.append(status_change_notification(
+                    row.student_id, app_id, row.job_id, row.title, row.company_name, new
+                ))
+                results[app_id] = StatusTransitionResult(application_id=app_id, ok=True, status=new)
+            else:
+                results[app_id] = StatusTransitionResult(
+                    application_id=app_id, ok=False, detail="Application status changed concurrently; retry",
+                )
+
+    if groups:
+        await rollups.apply(db)
+        await notify(db, [notice for notice in notices if notice])
+        await db.commit()
+        dashboard_stats_cache.invalidate()
+
+    return BulkStatusResponse(results=[results[app_id] for app_id in ids])
 
 
 @router.post("/accept", response_model=ApplicationResponse)
 async def accept_offer(
     body: AcceptOfferRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+    idempotency_key: Optional[str] = Header(None, description="Retries with the same key replay the first success"),
 ):
-    if current_user.role != UserRole.STUDENT:
+    if principal.role != UserRole.STUDENT:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only students can accept offers")
 
-    app = (
-        db.query(Application)
-        .filter(Application.id == body.application_id, Application.student_id == current_user.id)
-        .first()
+    # Accepts for one student run one at a time under the profile lock, so the
+    # tier and upgrade checks below always see the previous accept's result
+    profile = await _lock_student_profile(db, principal.user_id)
+    if not profile:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student profile not found")
+
+    fingerprint = request_fingerprint(body)
+    if idempotency_key is not None:
+        replayed = await find_response(db, principal.user_id, "applications.accept", idempotency_key, fingerprint)
+        if replayed is not None:
+            return replayed
+
+    result = await db.execute(
+        select(Application, Job)
+        .join(Job, Job.id == Application.job_id)
+        .where(Application.id == body.application_id, Application.student_id == principal.user_id)
+        .with_for_update(of=Application)  # Company-side status changes wait for this accept
     )
-    if not app:
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Application not found")
-
-    job = db.query(Job).filter(Job.id == app.job_id).first()
-    if not job:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
-
-    profile = db.query(StudentProfile).filter(StudentProfile.user_id == current_user.id).first()
-    if not profile:
-        profile = StudentProfile(user_id=current_user.id)
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
+    app, job = row
 
     if profile.placed_final:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are already placed (Tier-1 final)")
@@ -179,12 +402,20 @@ async def accept_offer(
     if is_upgrade and profile.upgrades_used >= 2:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Maximum of 2 upgrades already used")
 
+    rollups = RollupDeltas()
+    rollups.status_change(app.created_at, job.company_name, job.category, app.status, ApplicationStatus.ACCEPTED)
+    newly_accepted = app.status != ApplicationStatus.ACCEPTED
+    if newly_accepted:
+        rollups.offer_accepted(app.created_at, job.company_name, job.category, job.package_lpa)
+    rollups.tier_change(current_tier, new_tier)
+
     # Accept
     app.status = ApplicationStatus.ACCEPTED
     app.is_final_acceptance = bool(body.final and job.category == JobCategory.TIER1)
     app.offered_package_lpa = job.package_lpa
 
-    # Update profile
+    # Update profile; the new version turns away applies checked against the old state
+    profile.placement_version = (profile.placement_version or 0) + 1
     if job.category != JobCategory.INTERNSHIP:
         if is_upgrade:
             profile.upgrades_used += 1
@@ -193,21 +424,41 @@ async def accept_offer(
 
     if app.is_final_acceptance:
         profile.placed_final = True
-        # Withdraw all other pending applications
-        pending_statuses = [ApplicationStatus.APPLIED, ApplicationStatus.SHORTLISTED, ApplicationStatus.OFFERED]
-        others = (
-            db.query(Application)
-            .filter(
-                Application.student_id == current_user.id,
-                Application.id != app.id,
-                Application.status.in_(pending_statuses),
-            )
-            .all()
+        publish_dashboard_delta(db, placedStudents=1)
+        # Withdraw all other pending applications in one statement; the
+        # grouped count beforehand feeds the rollups without loading rows
+        others = and_(
+            Application.student_id == principal.user_id,
+            Application.id != app.id,
+            Application.status.in_(ACTIVE_APPLICATION_STATUSES),
+        )
+        day = application_day(db.bind, Application.created_at).label("day")
+        result = await db.execute(
+            select(day, Job.company_name, Job.category, Application.status, func.count())
+            .join(Job, Job.id == Application.job_id)
+            .where(others)
+            .group_by(day, Job.company_name, Job.category, Application.status)
+        )
+        for applied_on, company_name, category, old_status, count in result.all():
+            rollups.status_change(applied_on, company_name, category, old_status, ApplicationStatus.WITHDRAWN, count)
+        await db.execute(
+            update(Application)
+            .where(others)
+            .values(status=ApplicationStatus.WITHDRAWN)
+            .execution_options(synchronize_session=False)
         )
-        for other in others:
-            other.status = ApplicationStatus.WITHDRAWN
 
-    db.commit()
-    db.refresh(app)
+    await rollups.apply(db)
+    if newly_accepted:
+        await notify_offer_accepted(db, principal.user_id, app.id, job)
+    await db.flush()
+    response = ApplicationResponse.model_validate(app)
+    if idempotency_key is not None:
+        await store_response(
+            db, principal.user_id, "applications.accept", idempotency_key, fingerprint, response.model_dump(mode="json")
+        )
+    await db.commit()
+    placement_state_cache.update_placement(profile)
+    dashboard_stats_cache.invalidate()
 
-    return ApplicationResponse.model_validate(app)
+    return response
@@ -1,31 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from typing import Optional
+from pydantic import ValidationError
 
 from database import get_db
 from models import User, UserRole, StudentProfile
-from schemas import UserCreate, UserLogin, GoogleLoginRequest, Token, UserResponse
+from schemas import UserCreate, UserLogin, GoogleLoginRequest, Token, TokenData, UserResponse
 from auth_utils import (
-    verify_password, 
-    get_password_hash, 
-    create_access_token, 
+    verify_password_async,
+    get_password_hash_async,
+    create_access_token,
+    build_token_claims,
     verify_token,
     verify_google_token
 )
 from config import settings
+from principal_cache import principal_cache
+from dashboard_stats import dashboard_stats_cache, publish_dashboard_delta
+from placement_rollups import RollupDeltas
 
 router = APIRouter()
 security = HTTPBearer()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
-    token = credentials.credentials
-    payload = verify_token(token)
+def get_token_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> TokenData:
+    """Decode the bearer token into its claims"""
+    payload = verify_token(credentials.credentials)
     
     if payload is None:
         raise HTTPException(
@@ -34,27 +38,92 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    email: str = payload.get("sub")
-    if email is None:
+    try:
+        return TokenData(
+            email=payload["sub"],
+            user_id=payload["uid"],
+            role=payload["role"],
+            token_version=payload["ver"],
+        )
+    except ValidationError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    user = db.query(User).filter(User.email == email).first()
+
+async def _load_principal_user(principal: TokenData, db: AsyncSession) -> User:
+    """Fetch the user behind a token (cached) and reject revoked, stale or deactivated ones"""
+    user = principal_cache.get(principal.email)
     if user is None:
+        result = await db.execute(select(User).where(User.id == principal.user_id))
+        user = result.scalars().first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+        principal_cache.put(principal.email, user)
+    
+    if (
+        user.id != principal.user_id
+        or user.role != principal.role
+        or (user.token_version or 0) != principal.token_version
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user",
+            headers={"WWW-Authenticate": "Bearer"},
         )
     
     return user
 
+async def get_current_principal(
+    principal: TokenData = Depends(get_token_principal),
+    db: AsyncSession = Depends(get_db)
+) -> TokenData:
+    """Get the authenticated principal from token claims.
+
+    Use this when a handler only needs the user's id or role; the token version
+    is checked against the principal cache, so steady-state requests run no SQL.
+    """
+    await _load_principal_user(principal, db)
+    return principal
+
+async def get_current_user(
+    principal: TokenData = Depends(get_token_principal),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get current authenticated user"""
+    return await _load_principal_user(principal, db)
+
+async def _add_student_profile(db: AsyncSession, user: User):
+    """Create a new student's profile in the caller's transaction, counted as unplaced"""
+    db.add(StudentProfile(user=user))
+    rollups = RollupDeltas()
+    rollups.student_added()
+    await rollups.apply(db)
+
+def _publish_new_user(db: AsyncSession, user: User):
+    """Push a new student or company to TPO dashboards once the caller commits"""
+    if user.role == UserRole.STUDENT:
+        publish_dashboard_delta(db, totalStudents=1)
+    elif user.role == UserRole.COMPANY:
+        publish_dashboard_delta(db, activeCompanies=1)
+
 @router.post("/register", response_model=Token)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email.lower()).first()
+    result = await db.execute(select(User).where(User.email == user_data.email.lower()))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -62,7 +131,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         name=user_data.name,
         email=user_data.email.lower(),
@@ -73,22 +142,17 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-
-    # Bootstrap student profile if needed
     if db_user.role == UserRole.STUDENT:
-        profile = db.query(StudentProfile).filter(StudentProfile.user_id == db_user.id).first()
-        if not profile:
-            profile = StudentProfile(user_id=db_user.id)
-            db.add(profile)
-            db.commit()
-            db.refresh(profile)
+        await _add_student_profile(db, db_user)
+    _publish_new_user(db, db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    dashboard_stats_cache.invalidate()
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": db_user.email}, expires_delta=access_token_expires
+        data=build_token_claims(db_user), expires_delta=access_token_expires
     )
     
     return {
@@ -98,14 +162,15 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login user with email and password"""
-    user = db.query(User).filter(
+    result = await db.execute(select(User).where(
         User.email == user_credentials.email.lower(),
         User.role == user_credentials.role
-    ).first()
+    ))
+    user = result.scalars().first()
     
-    if not user or not verify_password(user_credentials.password, user.password_hash):
+    if not user or not await verify_password_async(user_credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -120,7 +185,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     # Create access token
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=build_token_claims(user), expires_delta=access_token_expires
     )
     
     return {
@@ -130,7 +195,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     }
 
 @router.post("/google", response_model=Token)
-async def google_login(google_data: GoogleLoginRequest, db: Session = Depends(get_db)):
+async def google_login(google_data: GoogleLoginRequest, db: AsyncSession = Depends(get_db)):
     """Login/Register user with Google OAuth"""
     # Verify Google token
     idinfo = verify_google_token(google_data.id_token)
@@ -152,7 +217,8 @@ async def google_login(google_data: GoogleLoginRequest, db: Session = Depends(ge
         )
     
     # Check if user exists
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     
     if user:
         # Update existing user with Google info
@@ -170,14 +236,18 @@ async def google_login(google_data: GoogleLoginRequest, db: Session = Depends(ge
             provider="google"
         )
         db.add(user)
+        if user.role == UserRole.STUDENT:
+            await _add_student_profile(db, user)
+        _publish_new_user(db, user)
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    dashboard_stats_cache.invalidate()
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=build_token_claims(user), expires_delta=access_token_expires
     )
     
     return {
@@ -191,6 +261,29 @@ async def get_current_user_profile(current_user: User = Depends(get_current_user
     """Get current user profile"""
     return UserResponse.model_validate(current_user)
 
+@router.get("/principal-cache/stats")
+async def get_principal_cache_stats(principal: TokenData = Depends(get_current_principal)):
+    """Hit/miss counters for the authenticated principal cache (TPO only)"""
+    if principal.role != UserRole.TPO:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only TPO can view cache statistics")
+    return principal_cache.stats()
+
+@router.post("/revoke")
+async def revoke_tokens(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Revoke every token issued to the current user"""
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(token_version=User.token_version + 1)
+    )
+    await db.commit()
+    # Bulk UPDATE skips ORM events, so drop the cached principal explicitly
+    principal_cache.invalidate(current_user.email)
+    return {"message": "All tokens revoked"}
+
 @router.post("/logout")
 async def logout():
     """Logout user (client-side token removal)"""
@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from openai import OpenAI
-import os
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import AsyncIterator, Dict, List, Optional
 from datetime import datetime
+import json
+import time
 
-from database import get_db
-from models import User, ChatConversation, ChatMessage, MessageRole
-from schemas import ChatMessageRequest, ChatMessageResponse, ChatConversationResponse
-from auth_utils import get_current_user
+from config import settings
+from database import get_db, AsyncSessionLocal
+from models import User, ChatConversation, ChatMessage, MessageRole, MessageStatus
+from schemas import ChatMessageRequest, ChatMessageResponse, ChatConversationResponse, TokenData
+from routers.auth import get_current_principal
+from llm_client import LLMError, get_llm_client
+from response_cache import response_cache
+from task_queue import enqueue, task_handler, task_pool, wake_workers
+from chat_context import (
+    estimate_tokens, fit_history, load_recent_history, prompt_tokens, refresh_summary, summary_due, summary_message
+)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 SYSTEM_PROMPT = """You are an AI assistant specialized in helping students with placement and career guidance. You provide helpful, accurate, and encouraging advice on:
 
 - Resume writing and optimization
@@ -34,75 +42,89 @@ Keep your responses:
 
 If asked about topics outside placement/career guidance, politely redirect the conversation back to career-related topics."""
 
-async def generate_ai_response(user_message: str, conversation_history: List[ChatMessage] = None) -> str:
-    """Generate AI response using OpenAI API"""
+FALLBACK_RESPONSE = "I apologize, but I'm experiencing technical difficulties right now. Please try again in a moment. In the meantime, feel free to explore the other features of the placement tracker!"
+
+def build_prompt(
+    user_message: str,
+    conversation_history: List[ChatMessage] = None,
+    summary: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """System prompt, summary, recent history and the new user message in chat completions format"""
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    budget = settings.chat_context_token_budget - estimate_tokens(SYSTEM_PROMPT) - estimate_tokens(user_message)
+    
+    # The rolling summary stands in for the messages before the recent history
+    if summary:
+        messages.append(summary_message(summary))
+        budget -= prompt_tokens(messages[-1:])
+    
+    # Add as much recent conversation history as the prompt's token budget allows
+    if conversation_history:
+        for msg in fit_history(conversation_history, budget):
+            messages.append({
+                "role": msg.role.value,
+                "content": msg.content
+            })
+    
+    # Add current user message
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+async def generate_ai_response(messages: List[Dict[str, str]]) -> str:
+    """Generate AI response to a prompt from build_prompt() using OpenAI API"""
     try:
-        # Prepare conversation history for context
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        # Awaits the API without blocking the event loop (see llm_client.py)
+        response = await get_llm_client().complete(messages, max_tokens=500, temperature=0.7)
         
-        # Add recent conversation history (last 10 messages for context)
-        if conversation_history:
-            recent_messages = conversation_history[-10:]
-            for msg in recent_messages:
-                messages.append({
-                    "role": msg.role.value,
-                    "content": msg.content
-                })
+        return response.strip()
         
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
-        
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            max_tokens=500,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content.strip()
-        
-    except Exception as e:
+    except LLMError as e:
         print(f"OpenAI API error: {e}")
-        return "I apologize, but I'm experiencing technical difficulties right now. Please try again in a moment. In the meantime, feel free to explore the other features of the placement tracker!"
+        return FALLBACK_RESPONSE
 
-@router.post("/send-message", response_model=ChatMessageResponse)
-async def send_message(
-    message_request: ChatMessageRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Send a message and get AI response"""
-    
+def _require_student(principal: TokenData):
     # Only students can use the chatbot for now
-    if current_user.role.value != "student":
+    if principal.role.value != "student":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Chat functionality is currently only available for students"
         )
+
+async def _record_user_message(db: AsyncSession, principal: TokenData, message_request: ChatMessageRequest):
+    """Add the user's message, starting a conversation if needed; the caller commits.
+    
+    Returns the message, its conversation and the unsummarized recent history before it.
+    """
     
     # Get or create conversation
     conversation = None
+    conversation_history = []
     if message_request.conversation_id:
-        conversation = db.query(ChatConversation).filter(
+        result = await db.execute(select(ChatConversation).where(
             ChatConversation.id == message_request.conversation_id,
-            ChatConversation.user_id == current_user.id
-        ).first()
+            ChatConversation.user_id == principal.user_id
+        ))
+        conversation = result.scalars().first()
         
         if not conversation:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Conversation not found"
             )
+        
+        # Recent history for context, read before the new message is added
+        conversation_history = await load_recent_history(
+            db, conversation.id, settings.chat_context_max_messages,
+            after_message_id=conversation.summary_through_message_id
+        )
     else:
         # Create new conversation
         conversation = ChatConversation(
-            user_id=current_user.id,
+            user_id=principal.user_id,
             title=message_request.content[:50] + "..." if len(message_request.content) > 50 else message_request.content
         )
         db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
+        await db.flush()
     
     # Save user message
     user_message = ChatMessage(
@@ -111,70 +133,322 @@ async def send_message(
         content=message_request.content
     )
     db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
-    
-    # Get conversation history for context
-    conversation_history = db.query(ChatMessage).filter(
-        ChatMessage.conversation_id == conversation.id
-    ).order_by(ChatMessage.created_at).all()
-    
-    # Generate AI response
-    ai_response_content = await generate_ai_response(
-        message_request.content, 
-        conversation_history[:-1]  # Exclude the current message
-    )
+    await db.flush()
+    
+    return user_message, conversation, conversation_history
+
+def _cache_question(
+    message_request: ChatMessageRequest,
+    conversation: ChatConversation,
+    conversation_history: List[ChatMessage]
+) -> Optional[str]:
+    """The question to look up in the response cache, or None when the answer depends on more than it"""
+    if conversation_history or conversation.summary or len(message_request.content) > settings.chat_response_cache_max_question_chars:
+        response_cache.bypass()
+        return None
+    return message_request.content
+
+def _summary_due(user_message: str, conversation_history: List[ChatMessage]) -> bool:
+    unsummarized = sum(estimate_tokens(msg.content) for msg in conversation_history)
+    return summary_due(unsummarized + estimate_tokens(user_message))
+
+@router.post("/send-message", response_model=ChatMessageResponse)
+async def send_message(
+    message_request: ChatMessageRequest,
+    background_tasks: BackgroundTasks,
+    principal: TokenData = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Send a message and get AI response"""
+    _require_student(principal)
+    user_message, conversation, conversation_history = await _record_user_message(db, principal, message_request)
+    await db.commit()  # Not held open while the model answers
+    
+    # Answer stand-alone questions from the response cache when we can
+    question = _cache_question(message_request, conversation, conversation_history)
+    cached = response_cache.get(question) if question else None
+    if cached:
+        ai_response_content, used_prompt_tokens = cached.content, 0
+    else:
+        # Generate AI response
+        prompt = build_prompt(message_request.content, conversation_history, conversation.summary)
+        started = time.perf_counter()
+        ai_response_content = await generate_ai_response(prompt)
+        used_prompt_tokens = prompt_tokens(prompt)
+        if question and ai_response_content != FALLBACK_RESPONSE:
+            response_cache.put(question, ai_response_content, (time.perf_counter() - started) * 1000)
     
     # Save AI response
+    ai_message = ChatMessage(
+        conversation_id=user_message.conversation_id,
+        role=MessageRole.ASSISTANT,
+        content=ai_response_content,
+        prompt_tokens=used_prompt_tokens
+    )
+    db.add(ai_message)
+    await db.commit()
+    await db.refresh(ai_message)
+    
+    # Fold older messages into the summary after the response has gone out
+    if _summary_due(message_request.content, conversation_history):
+        background_tasks.add_task(refresh_summary, conversation.id)
+    
+    return ai_message
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _relay_completion(
+    user_message: ChatMessage,
+    prompt: List[Dict[str, str]],
+    question: Optional[str] = None
+) -> AsyncIterator[str]:
+    """SSE events for one streamed completion; saves the assistant message when it ends.
+    
+    A cached answer to `question` is sent as a single token instead.
+    """
+    started = time.perf_counter()
+    yield _sse("start", {"conversation_id": user_message.conversation_id, "user_message_id": user_message.id})
+    
+    parts = []
+    first_token_ms = None
+    cached = response_cache.get(question) if question else None
+    if cached:
+        first_token_ms = (time.perf_counter() - started) * 1000
+        parts.append(cached.content)
+        yield _sse("token", {"content": cached.content})
+    else:
+        try:
+            async for delta in get_llm_client().stream(prompt, max_tokens=500, temperature=0.7):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                parts.append(delta)
+                yield _sse("token", {"content": delta})
+        except LLMError as e:
+            print(f"OpenAI API error: {e}")
+            yield _sse("error", {"detail": FALLBACK_RESPONSE})
+            return
+        if question and parts:
+            response_cache.put(question, "".join(parts).strip(), (time.perf_counter() - started) * 1000)
+    
+    # The request's session is done by now; save on a short-lived one of our own
+    async with AsyncSessionLocal() as db:
+        ai_message = ChatMessage(
+            conversation_id=user_message.conversation_id,
+            role=MessageRole.ASSISTANT,
+            content="".join(parts).strip(),
+            prompt_tokens=0 if cached else prompt_tokens(prompt)
+        )
+        db.add(ai_message)
+        await db.commit()
+        await db.refresh(ai_message)
+    
+    total_ms = (time.perf_counter() - started) * 1000
+    yield _sse("done", {
+        "message": ChatMessageResponse.model_validate(ai_message).model_dump(mode="json"),
+        "timing": {
+            "first_token_ms": round(first_token_ms, 1) if first_token_ms is not None else None,
+            "total_ms": round(total_ms, 1),
+        },
+        "cached": cached is not None,
+    })
+
+@router.post("/stream")
+async def stream_message(
+    message_request: ChatMessageRequest,
+    principal: TokenData = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Send a message and stream the AI response as Server-Sent Events
+    
+    Events: `start` with the conversation and user message ids, a `token` per
+    content delta, then `done` with the saved assistant message and the time to
+    first token and total time in ms and whether the answer came from the
+    response cache - or `error`, in which case nothing is saved.
+    """
+    _require_student(principal)
+    user_message, conversation, conversation_history = await _record_user_message(db, principal, message_request)
+    await db.commit()
+    prompt = build_prompt(message_request.content, conversation_history, conversation.summary)
+    question = _cache_question(message_request, conversation, conversation_history)
+    
+    # Runs once the stream has ended
+    background = BackgroundTask(refresh_summary, conversation.id) if _summary_due(message_request.content, conversation_history) else None
+    
+    return StreamingResponse(
+        _relay_completion(user_message, prompt, question),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background
+    )
+
+@router.post("/messages", response_model=ChatMessageResponse, status_code=status.HTTP_202_ACCEPTED)
+async def queue_message(
+    message_request: ChatMessageRequest,
+    principal: TokenData = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Send a message and have the AI response generated in the background
+    
+    Returns the assistant message at once: `pending` until a worker has
+    generated it (see task_queue.py), or already `complete` when it came from
+    the response cache. Poll GET /chat/messages/{id} until it is `complete`,
+    or `failed` after the task has run out of attempts. The user message, the
+    pending reply and its task are saved in one commit.
+    """
+    _require_student(principal)
+    user_message, conversation, conversation_history = await _record_user_message(db, principal, message_request)
+    
+    question = _cache_question(message_request, conversation, conversation_history)
+    cached = response_cache.get(question) if question else None
     ai_message = ChatMessage(
         conversation_id=conversation.id,
         role=MessageRole.ASSISTANT,
-        content=ai_response_content
+        content=cached.content if cached else "",
+        status=MessageStatus.COMPLETE if cached else MessageStatus.PENDING,
+        prompt_tokens=0 if cached else None
     )
     db.add(ai_message)
-    db.commit()
-    db.refresh(ai_message)
+    await db.flush()
+    if not cached:
+        await enqueue(db, "chat_reply", {
+            "message_id": ai_message.id,
+            "user_message_id": user_message.id,
+            "question": question
+        })
+    await db.commit()
+    await db.refresh(ai_message)
     
+    if not cached:
+        wake_workers()
     return ai_message
 
+async def _fail_reply(payload: dict, error: str):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(ChatMessage)
+            .where(ChatMessage.id == payload["message_id"], ChatMessage.status == MessageStatus.PENDING)
+            .values(status=MessageStatus.FAILED, content=FALLBACK_RESPONSE)
+        )
+        await db.commit()
+
+@task_handler("chat_reply", on_failure=_fail_reply)
+async def generate_queued_reply(payload: dict):
+    """Generate a reply queued by POST /chat/messages; LLM errors are retried by the queue"""
+    async with AsyncSessionLocal() as db:
+        ai_message = await db.get(ChatMessage, payload["message_id"])
+        if ai_message is None or ai_message.status != MessageStatus.PENDING:
+            return  # Finished by an earlier attempt
+        user_message = await db.get(ChatMessage, payload["user_message_id"])
+        conversation = await db.get(ChatConversation, ai_message.conversation_id)
+        
+        # The history as it was when the message was sent
+        conversation_history = await load_recent_history(
+            db, conversation.id, settings.chat_context_max_messages,
+            after_message_id=conversation.summary_through_message_id,
+            before_message_id=user_message.id
+        )
+        prompt = build_prompt(user_message.content, conversation_history, conversation.summary)
+        started = time.perf_counter()
+        content = (await get_llm_client().complete(prompt, max_tokens=500, temperature=0.7)).strip()
+        generation_ms = (time.perf_counter() - started) * 1000
+        
+        await db.execute(
+            update(ChatMessage)
+            .where(ChatMessage.id == ai_message.id, ChatMessage.status == MessageStatus.PENDING)
+            .values(content=content, status=MessageStatus.COMPLETE, prompt_tokens=prompt_tokens(prompt))
+        )
+        await db.commit()
+    
+    if payload.get("question"):
+        response_cache.put(payload["question"], content, generation_ms)
+    if _summary_due(user_message.content, conversation_history):
+        await refresh_summary(conversation.id)
+
+@router.get("/messages/{message_id}", response_model=ChatMessageResponse)
+async def get_message(
+    message_id: int,
+    wait: float = Query(0, ge=0, le=30, description="Seconds to wait for a pending reply to finish"),
+    principal: TokenData = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a message, e.g. to poll a reply queued by POST /chat/messages
+    
+    With `wait`, a pending reply is long-polled: the response comes as soon as
+    it is complete or failed, or after `wait` seconds with it still pending.
+    """
+    _require_student(principal)
+    deadline = time.monotonic() + wait
+    while True:
+        result = await db.execute(
+            select(ChatMessage)
+            .join(ChatConversation, ChatConversation.id == ChatMessage.conversation_id)
+            .where(ChatMessage.id == message_id, ChatConversation.user_id == principal.user_id)
+        )
+        message = result.scalars().first()
+        
+        if not message:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Message not found"
+            )
+        remaining = deadline - time.monotonic()
+        if message.status != MessageStatus.PENDING or remaining <= 0:
+            return message
+        
+        # Hold no connection while waiting; a worker here wakes us, others are polled for
+        await db.close()
+        await task_pool.wait_for_progress(min(remaining, settings.task_poll_interval_seconds))
+
 @router.get("/conversations", response_model=List[ChatConversationResponse])
 async def get_conversations(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    principal: TokenData = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all conversations for the current user"""
     
-    if current_user.role.value != "student":
+    if principal.role.value != "student":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Chat functionality is currently only available for students"
         )
     
-    conversations = db.query(ChatConversation).filter(
-        ChatConversation.user_id == current_user.id,
-        ChatConversation.is_active == True
-    ).order_by(ChatConversation.updated_at.desc()).all()
+    result = await db.execute(
+        select(ChatConversation)
+        .options(selectinload(ChatConversation.messages))
+        .where(
+            ChatConversation.user_id == principal.user_id,
+            ChatConversation.is_active == True
+        )
+        .order_by(ChatConversation.updated_at.desc())
+    )
+    conversations = result.scalars().all()
     
     return conversations
 
 @router.get("/conversations/{conversation_id}", response_model=ChatConversationResponse)
 async def get_conversation(
     conversation_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    principal: TokenData = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific conversation with all messages"""
     
-    if current_user.role.value != "student":
+    if principal.role.value != "student":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Chat functionality is currently only available for students"
         )
     
-    conversation = db.query(ChatConversation).filter(
-        ChatConversation.id == conversation_id,
-        ChatConversation.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(ChatConversation)
+        .options(selectinload(ChatConversation.messages))
+        .where(
+            ChatConversation.id == conversation_id,
+            ChatConversation.user_id == principal.user_id
+        )
+    )
+    conversation = result.scalars().first()
     
     if not conversation:
         raise HTTPException(
@@ -187,21 +461,22 @@ async def get_conversation(
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(
     conversation_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    principal: TokenData = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a conversation"""
     
-    if current_user.role.value != "student":
+    if principal.role.value != "student":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Chat functionality is currently only available for students"
         )
     
-    conversation = db.query(ChatConversation).filter(
+    result = await db.execute(select(ChatConversation).where(
         ChatConversation.id == conversation_id,
-        ChatConversation.user_id == current_user.id
-    ).first()
+        ChatConversation.user_id == principal.user_id
+    ))
+    conversation = result.scalars().first()
     
     if not conversation:
         raise HTTPException(
@@ -211,6 +486,18 @@ async def delete_conversation(
     
     # Soft delete by setting is_active to False
     conversation.is_active = False
-    db.commit()
+    await db.commit()
     
     return {"message": "Conversation deleted successfully"}
+
+@router.get("/cache/stats")
+async def get_response_cache_stats(principal: TokenData = Depends(get_current_principal)):
+    """Hit rate, latency saved and most asked questions of this worker's response cache (TPO only)"""
+    
+    if principal.role.value != "tpo":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only TPOs can view chat cache statistics"
+        )
+    
+    return response_cache.stats()
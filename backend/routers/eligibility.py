@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from database import get_db
+from routers.auth import get_current_principal, get_current_user
+from routers.jobs import job_page
+from models import UserRole, User, Job
+from schemas import EligibleStudent, EligibleStudentPage, JobPage, TokenData
+from eligibility import eligible_students_query, eligible_jobs_query
+from placement_state import get_placement_state
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}/students", response_model=EligibleStudentPage)
+async def list_eligible_students(
+    job_id: int,
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Every student who may apply to a job, evaluated in one query"""
+    if current_user.role not in (UserRole.TPO, UserRole.COMPANY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only TPO or Company can view eligible students")
+
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if current_user.role == UserRole.COMPANY and job.company_name != current_user.company_name:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this job's eligible students")
+
+    eligible = eligible_students_query(job_id).subquery()
+    query = (
+        select(eligible.c.id, User.id, User.name, User.email, eligible.c.cgpa, eligible.c.backlogs)
+        .join(User, User.id == eligible.c.user_id)
+        .order_by(eligible.c.id)
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        query = query.where(eligible.c.id > cursor)
+
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]
+
+    return EligibleStudentPage(
+        items=[
+            EligibleStudent(user_id=user_id, name=name, email=email, cgpa=cgpa, backlogs=backlogs)
+            for _, user_id, name, email, cgpa, backlogs in rows
+        ],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/my-jobs", response_model=JobPage)
+async def list_my_eligible_jobs(
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    """Active jobs the current student may apply to, evaluated in one query"""
+    if principal.role != UserRole.STUDENT:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only students can view their eligible jobs")
+
+    state = await get_placement_state(db, principal.user_id)
+    if state is None:
+        return JobPage(items=[])
+
+    return await job_page(db, eligible_jobs_query(state.profile_id), cursor, limit)
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from typing import Optional
+
+from database import AsyncSessionLocal
+from routers.auth import _load_principal_user, get_current_principal, get_token_principal
+from models import UserRole
+from schemas import TokenData
+from notifications import unread_count
+from realtime import event_hub, sse_frame
+
+router = APIRouter()
+
+# EventSource cannot set headers, so the stream also takes the token as a query parameter
+optional_security = HTTPBearer(auto_error=False)
+
+
+def _stream_principal(
+    access_token: Optional[str] = Query(None, description="Bearer token, for clients that cannot send headers"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+) -> TokenData:
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return get_token_principal(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+
+@router.get("/")
+async def stream_events(principal: TokenData = Depends(_stream_principal)):
+    """Server-Sent Events for the current user, pushed as changes are committed
+
+    Events: `ready` with the unread notification count on connect, then
+    `notification` (a new notification and the unread count),
+    `notifications_read` (`id`, or null for all, and the unread count),
+    `notification_deleted`, and for TPOs `dashboard` with a `delta` to add to
+    the dashboard stats. Idle streams get a keep-alive comment.
+    """
+    # Sessions of our own, closed before streaming, so open streams hold no connections
+    async with AsyncSessionLocal() as db:
+        await _load_principal_user(principal, db)
+
+    async def ready() -> str:
+        async with AsyncSessionLocal() as db:
+            return sse_frame("ready", {"unread_count": await unread_count(db, principal.user_id)})
+
+    return StreamingResponse(
+        event_hub.frames(principal.user_id, principal.role.value, ready),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+async def get_event_stats(principal: TokenData = Depends(get_current_principal)):
+    """Open streams and event counts of this worker's hub (TPO only)"""
+    if principal.role != UserRole.TPO:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only TPO can view event stream stats")
+
+    return event_hub.stats()
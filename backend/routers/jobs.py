@@ -1,16 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-import json
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from typing import List, Optional
 
 from database import get_db
-from routers.auth import get_current_user
-from models import User, UserRole, Job, JobCategory
-from schemas import JobCreate, JobResponse
+from routers.auth import get_current_principal
+from models import UserRole, Job, JobCategory
+from schemas import JobCreate, JobResponse, JobPage, TokenData
+from skills import set_job_skills, job_skill_names
+from dashboard_stats import dashboard_stats_cache, publish_dashboard_delta
+from task_queue import enqueue, wake_workers
 
 router = APIRouter()
 
 
+def job_response(job: Job, required_skills: List[str]) -> JobResponse:
+    # Rows written without the ORM defaults may hold NULL requirements, which
+    # mean "none"; answer them with the schema defaults that say the same
+    return JobResponse(
+        id=job.id,
+        title=job.title,
+        description=job.description,
+        company_name=job.company_name,
+        package_lpa=job.package_lpa,
+        category=job.category,
+        min_cgpa=job.min_cgpa if job.min_cgpa is not None else 0.0,
+        required_skills=required_skills,
+        max_backlogs=job.max_backlogs if job.max_backlogs is not None else 999,
+        is_active=job.is_active,
+        created_at=job.created_at,
+    )
+
+
+async def job_page(db: AsyncSession, query, cursor: Optional[int], limit: int) -> JobPage:
+    """Run a Job SELECT as one newest-first keyset page on (created_at, id)"""
+    if cursor is not None:
+        # Compare against the anchor row in SQL so the timestamp never
+        # round-trips through Python; aliased so it does not correlate with
+        # the outer jobs row
+        anchor = aliased(Job)
+        anchor_created_at = select(anchor.created_at).where(anchor.id == cursor).scalar_subquery()
+        query = query.where(
+            or_(
+                Job.created_at < anchor_created_at,
+                and_(Job.created_at == anchor_created_at, Job.id < cursor),
+            )
+        )
+
+    query = query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1)
+    result = await db.execute(query)
+    jobs = result.scalars().all()
+    # An unknown anchor compares as NULL and matches nothing; only an empty
+    # page needs telling apart from that
+    if not jobs and cursor is not None and await db.scalar(select(Job.id).where(Job.id == cursor)) is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown cursor")
+
+    next_cursor = None
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        next_cursor = jobs[-1].id
+
+    skills_by_job = await job_skill_names(db, [job.id for job in jobs])
+    return JobPage(
+        items=[job_response(job, skills_by_job[job.id]) for job in jobs],
+        next_cursor=next_cursor,
+    )
+
+
 def compute_category_from_package(package_lpa: float) -> JobCategory:
     if package_lpa >= 15.0:
         return JobCategory.TIER1
@@ -46,10 +103,10 @@ def ensure_category_rules(payload: JobCreate) -> JobCategory:
 @router.post("/", response_model=JobResponse)
 async def create_job(
     body: JobCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
 ):
-    if current_user.role not in (UserRole.TPO, UserRole.COMPANY):
+    if principal.role not in (UserRole.TPO, UserRole.COMPANY):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only TPO or Company can create jobs")
 
     category = ensure_category_rules(body)
@@ -61,49 +118,44 @@ async def create_job(
         package_lpa=body.package_lpa,
         category=category,
         min_cgpa=body.min_cgpa,
-        required_skills_json=json.dumps(body.required_skills or []),
         max_backlogs=body.max_backlogs,
         is_active=True,
     )
 
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.flush()
+    required_skills = await set_job_skills(db, job.id, body.required_skills)
+    # Eligible students are notified in the background (notifications.notify_eligible_students)
+    await enqueue(db, "notify_new_job", {"job_id": job.id})
+    publish_dashboard_delta(db, activeJobs=1)
+    await db.commit()
+    await db.refresh(job)
+    dashboard_stats_cache.invalidate()
+    wake_workers()
 
-    return JobResponse(
-        id=job.id,
-        title=job.title,
-        description=job.description,
-        company_name=job.company_name,
-        package_lpa=job.package_lpa,
-        category=job.category,
-        min_cgpa=job.min_cgpa,
-        required_skills=json.loads(job.required_skills_json or "[]"),
-        max_backlogs=job.max_backlogs,
-        is_active=job.is_active,
-        created_at=job.created_at,
-    )
+    return job_response(job, required_skills)
 
 
-@router.get("/", response_model=List[JobResponse])
-async def list_jobs(db: Session = Depends(get_db)):
-    jobs = db.query(Job).filter(Job.is_active == True).order_by(Job.created_at.desc()).all()
-    out: List[JobResponse] = []
-    for job in jobs:
-        out.append(
-            JobResponse(
-                id=job.id,
-                title=job.title,
-                description=job.description,
-                company_name=job.company_name,
-                package_lpa=job.package_lpa,
-                category=job.category,
-                min_cgpa=job.min_cgpa,
-                required_skills=json.loads(job.required_skills_json or "[]"),
-                max_backlogs=job.max_backlogs,
-                is_active=job.is_active,
-                created_at=job.created_at,
-            )
-        )
-    return out
+@router.get("/", response_model=JobPage)
+async def list_jobs(
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    category: Optional[JobCategory] = Query(None),
+    min_package: Optional[float] = Query(None, description="Minimum package in LPA"),
+    company: Optional[str] = Query(None),
+    max_cgpa_requirement: Optional[float] = Query(None, description="Only jobs whose min_cgpa is at most this"),
+    db: AsyncSession = Depends(get_db),
+):
+    query = select(Job).where(Job.is_active == True)
+
+    if category is not None:
+        query = query.where(Job.category == category)
+    if min_package is not None:
+        query = query.where(Job.package_lpa >= min_package)
+    if company:
+        query = query.where(Job.company_name == company)
+    if max_cgpa_requirement is not None:
+        # No minimum (NULL) is no requirement, as in eligibility.py
+        query = query.where(or_(Job.min_cgpa.is_(None), Job.min_cgpa <= max_cgpa_requirement))
 
+    return await job_page(db, query, cursor, limit)
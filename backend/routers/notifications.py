@@ -1,8 +1,84 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from database import get_db
+from routers.auth import get_current_principal
+from models import Notification
+from schemas import NotificationPage, NotificationResponse, TokenData
+from notifications import delete_notification, mark_all_read, mark_read, unread_count
 
 router = APIRouter()
 
-@router.get("/")
-async def get_notifications():
-    """Get user notifications - placeholder"""
-    return {"message": "Notifications endpoint - to be implemented"}
+
+@router.get("/", response_model=NotificationPage)
+async def get_notifications(
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    unread_only: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    """The current user's notifications, newest first, with the unread count"""
+    query = select(Notification).where(Notification.user_id == principal.user_id)
+    if unread_only:
+        query = query.where(Notification.is_read == False)
+    if cursor is not None:
+        query = query.where(Notification.id < cursor)
+
+    result = await db.execute(query.order_by(Notification.id.desc()).limit(limit + 1))
+    notifications = result.scalars().all()
+    next_cursor = None
+    if len(notifications) > limit:
+        notifications = notifications[:limit]
+        next_cursor = notifications[-1].id
+
+    return NotificationPage(
+        items=[NotificationResponse.model_validate(n) for n in notifications],
+        next_cursor=next_cursor,
+        unread_count=await unread_count(db, principal.user_id),
+    )
+
+
+@router.get("/unread-count")
+async def get_unread_count(
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    """Unread notifications for the nav badge, read from the precomputed counter"""
+    return {"unread_count": await unread_count(db, principal.user_id)}
+
+
+@router.post("/read-all")
+async def read_all_notifications(
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    marked = await mark_all_read(db, principal.user_id)
+    await db.commit()
+    return {"marked_read": marked, "unread_count": await unread_count(db, principal.user_id)}
+
+
+@router.post("/{notification_id}/read")
+async def read_notification(
+    notification_id: int,
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    if not await mark_read(db, principal.user_id, notification_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notification not found")
+    await db.commit()
+    return {"unread_count": await unread_count(db, principal.user_id)}
+
+
+@router.delete("/{notification_id}")
+async def remove_notification(
+    notification_id: int,
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    if not await delete_notification(db, principal.user_id, notification_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notification not found")
+    await db.commit()
+    return {"unread_count": await unread_count(db, principal.user_id)}
@@ -0,0 +1,28 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from database import get_db
+from routers.auth import get_current_principal
+from models import UserRole
+from schemas import TokenData
+from placement_rollups import compute_placement_report
+
+router = APIRouter()
+
+
+@router.get("/placements")
+async def get_placement_report(
+    since: Optional[date] = Query(None, description="First application day (UTC), inclusive"),
+    until: Optional[date] = Query(None, description="Last application day (UTC), inclusive"),
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    """Placement rate by tier, packages, offers per company and applications per status (TPO only)"""
+    if principal.role != UserRole.TPO:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only TPO can view placement reports")
+    if since is not None and until is not None and since > until:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="since must not be after until")
+
+    return await compute_placement_report(db, since=since, until=until)
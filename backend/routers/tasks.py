@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db
+from routers.auth import get_current_principal
+from models import UserRole
+from schemas import TokenData
+from task_queue import task_pool
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_task_metrics(
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    """Background task queue depth per kind, with this worker's wait and run times (TPO only)"""
+    if principal.role != UserRole.TPO:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only TPO can view task queue metrics")
+
+    return await task_pool.metrics(db)
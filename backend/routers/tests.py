@@ -1,8 +1,405 @@
-from fastapi import APIRouter
+from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import json
+import random
+
+from database import get_db
+from routers.auth import get_current_principal, get_current_user
+from models import (
+    User, UserRole, QuestionBank, Question, Assessment, AssessmentSession, assessment_questions,
+)
+from schemas import (
+    QuestionBankCreate, QuestionBankResponse, QuestionsAdd, QuestionCreate, AssessmentCreate, AssessmentResponse,
+    AssessmentPage, AssessmentSessionResponse, AutosaveRequest, SessionResult, AssessmentResults, TokenData,
+)
+from config import settings
+from assessments import (
+    OpenSession, Paper, answer_buffer, grade_assessment, invalid_answer, question_order, saved_answers, start_session,
+    _aware,
+)
+from dashboard_stats import dashboard_stats_cache, publish_dashboard_delta
+from task_queue import enqueue, utcnow, wake_workers
 
 router = APIRouter()
 
-@router.get("/")
-async def get_tests():
-    """Get user tests - placeholder"""
-    return {"message": "Tests endpoint - to be implemented"}
+
+def _require_staff(user: User, action: str):
+    if user.role not in (UserRole.TPO, UserRole.COMPANY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Only TPO or Company can {action}")
+
+
+async def _get_bank(db: AsyncSession, user: User, bank_id: int) -> QuestionBank:
+    """A bank the user may use; companies only have their own company's"""
+    bank = await db.get(QuestionBank, bank_id)
+    if bank is None or (user.role == UserRole.COMPANY and bank.company_name != user.company_name):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question bank not found")
+    return bank
+
+
+async def _get_assessment(db: AsyncSession, user: User, assessment_id: int) -> Assessment:
+    assessment = await db.get(Assessment, assessment_id)
+    if assessment is None or (user.role == UserRole.COMPANY and assessment.company_name != user.company_name):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test not found")
+    return assessment
+
+
+async def _add_questions(db: AsyncSession, bank_id: int, questions: List[QuestionCreate]):
+    for index, question in enumerate(questions):
+        if question.correct_option >= len(question.options):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Question {index}: correct_option must index one of its {len(question.options)} options",
+            )
+    db.add_all([
+        Question(
+            bank_id=bank_id,
+            text=question.text,
+            options=json.dumps(question.options),
+            correct_option=question.correct_option,
+            marks=question.marks,
+            negative_marks=question.negative_marks,
+        )
+        for question in questions
+    ])
+    await db.flush()
+
+
+async def _bank_response(db: AsyncSession, bank: QuestionBank) -> QuestionBankResponse:
+    count = await db.scalar(select(func.count()).select_from(Question).where(Question.bank_id == bank.id))
+    return QuestionBankResponse(
+        id=bank.id, name=bank.name, company_name=bank.company_name, question_count=count, created_at=bank.created_at,
+    )
+
+
+async def _owned_session(db: AsyncSession, principal: TokenData, session_id: int) -> OpenSession:
+    session = await answer_buffer.session(db, session_id)
+    if session is None or session.student_id != principal.user_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test session not found")
+    return session
+
+
+async def _session_response(db: AsyncSession, session: OpenSession, paper: Paper) -> AssessmentSessionResponse:
+    answers = await saved_answers(db, session.id)
+    answers.update(answer_buffer.pending_answers(session.id))  # Not flushed yet, and newer
+    return AssessmentSessionResponse(
+        session_id=session.id,
+        assessment_id=session.assessment_id,
+        started_at=session.started_at,
+        deadline=session.deadline,
+        submitted_at=session.submitted_at,
+        questions=[paper.questions[question_id] for question_id in question_order(paper, session.id)],
+        answers=answers,
+    )
+
+
+@router.post("/banks", response_model=QuestionBankResponse)
+async def create_question_bank(
+    body: QuestionBankCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    _require_staff(current_user, "create question banks")
+
+    bank = QuestionBank(
+        name=body.name,
+        owner_id=current_user.id,
+        company_name=current_user.company_name if current_user.role == UserRole.COMPANY else None,
+    )
+    db.add(bank)
+    await db.flush()
+    await _add_questions(db, bank.id, body.questions)
+    response = await _bank_response(db, bank)
+    await db.commit()
+    return response
+
+
+@router.get("/banks", response_model=List[QuestionBankResponse])
+async def list_question_banks(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Question banks with their sizes; companies see their own company's"""
+    _require_staff(current_user, "view question banks")
+
+    counts = (
+        select(Question.bank_id, func.count().label("question_count"))
+        .group_by(Question.bank_id)
+        .subquery()
+    )
+    query = (
+        select(QuestionBank, func.coalesce(counts.c.question_count, 0))
+        .outerjoin(counts, counts.c.bank_id == QuestionBank.id)
+        .order_by(QuestionBank.id)
+    )
+    if current_user.role == UserRole.COMPANY:
+        query = query.where(QuestionBank.company_name == current_user.company_name)
+
+    result = await db.execute(query)
+    return [
+        QuestionBankResponse(
+            id=bank.id, name=bank.name, company_name=bank.company_name, question_count=count, created_at=bank.created_at,
+        )
+        for bank, count in result.all()
+    ]
+
+
+@router.post("/banks/{bank_id}/questions", response_model=QuestionBankResponse)
+async def add_bank_questions(
+    bank_id: int,
+    body: QuestionsAdd,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    _require_staff(current_user, "edit question banks")
+
+    bank = await _get_bank(db, current_user, bank_id)
+    await _add_questions(db, bank.id, body.questions)
+    response = await _bank_response(db, bank)
+    await db.commit()
+    return response
+
+
+@router.get("/autosave/stats")
+async def get_autosave_stats(principal: TokenData = Depends(get_current_principal)):
+    """Answers buffered and flushed by this worker (TPO only)"""
+    if principal.role != UserRole.TPO:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only TPO can view autosave stats")
+
+    return answer_buffer.stats()
+
+
+@router.get("/sessions/{session_id}", response_model=AssessmentSessionResponse)
+async def get_session(
+    session_id: int,
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    """The student's session with its questions and answers so far, for resuming after a reload"""
+    session = await _owned_session(db, principal, session_id)
+    paper = await answer_buffer.paper(db, session.assessment_id)
+    return await _session_response(db, session, paper)
+
+
+@router.put("/sessions/{session_id}/answers")
+async def autosave_answers(
+    session_id: int,
+    body: AutosaveRequest,
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    """Save answers during a test. Buffered and written in batches (see assessments.py).
+
+    Later saves to a question replace earlier ones; the whole sheet or just
+    what changed may be sent.
+    """
+    session = await _owned_session(db, principal, session_id)
+    paper = await answer_buffer.paper(db, session.assessment_id)
+    answers = [(answer.question_id, answer.selected_option) for answer in body.answers]
+    reason = invalid_answer(paper, answers)
+    if reason:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=reason)
+    reason = answer_buffer.save(session, answers)
+    if reason:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=reason)
+
+    return {"saved": len(answers), "deadline": session.deadline}
+
+
+@router.post("/sessions/{session_id}/submit", response_model=AssessmentSessionResponse)
+async def submit_session(
+    session_id: int,
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    """End the session; its buffered answers are written with the submission"""
+    session = await _owned_session(db, principal, session_id)
+    now = utcnow()
+    result = await db.execute(
+        update(AssessmentSession)
+        .where(AssessmentSession.id == session_id, AssessmentSession.submitted_at.is_(None))
+        .values(submitted_at=now)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Test already submitted")
+    await answer_buffer.flush(db, session_id=session_id)  # Commits the submission with the answers
+    session.submitted_at = now
+
+    paper = await answer_buffer.paper(db, session.assessment_id)
+    return await _session_response(db, session, paper)
+
+
+@router.post("/", response_model=AssessmentResponse)
+async def schedule_test(
+    body: AssessmentCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Schedule a test on questions drawn from a bank; it is graded automatically after it ends"""
+    _require_staff(current_user, "schedule tests")
+    if current_user.role == UserRole.COMPANY and body.company_name != current_user.company_name:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Companies can only schedule their own tests")
+    starts_at, ends_at = _aware(body.starts_at), _aware(body.ends_at)
+    if ends_at <= starts_at:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ends_at must be after starts_at")
+
+    bank = await _get_bank(db, current_user, body.bank_id)
+    question_ids = (await db.execute(
+        select(Question.id).where(Question.bank_id == bank.id).order_by(Question.id)
+    )).scalars().all()
+    count = body.question_count or len(question_ids)
+    if not question_ids or count > len(question_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Question bank has {len(question_ids)} questions, {count} requested",
+        )
+
+    assessment = Assessment(
+        title=body.title,
+        company_name=body.company_name,
+        position=body.position,
+        type=body.type,
+        bank_id=bank.id,
+        question_count=count,
+        starts_at=starts_at,
+        ends_at=ends_at,
+        duration_minutes=body.duration_minutes,
+        location=body.location,
+        instructions=body.instructions,
+        created_by=current_user.id,
+    )
+    db.add(assessment)
+    await db.flush()
+    await db.execute(assessment_questions.insert(), [
+        {"assessment_id": assessment.id, "position": position, "question_id": question_id}
+        for position, question_id in enumerate(sorted(random.sample(question_ids, count)))
+    ])
+    # Graded once every worker has flushed the last saves (assessments.grade_closed_assessment)
+    await enqueue(
+        db, "grade_assessment", {"assessment_id": assessment.id},
+        run_at=ends_at + timedelta(seconds=settings.assessment_grading_delay_seconds),
+    )
+    publish_dashboard_delta(db, upcomingTests=1)
+    await db.commit()
+    await db.refresh(assessment)
+    dashboard_stats_cache.invalidate()
+    wake_workers()
+
+    return AssessmentResponse.model_validate(assessment)
+
+
+@router.get("/", response_model=AssessmentPage)
+async def list_tests(
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    upcoming_only: bool = Query(False, description="Only tests that have not ended"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Scheduled tests, newest first; companies see their own"""
+    query = select(Assessment)
+    if current_user.role == UserRole.COMPANY:
+        query = query.where(Assessment.company_name == current_user.company_name)
+    if upcoming_only:
+        query = query.where(Assessment.ends_at > utcnow())
+    if cursor is not None:
+        query = query.where(Assessment.id < cursor)
+
+    result = await db.execute(query.order_by(Assessment.id.desc()).limit(limit + 1))
+    assessments = result.scalars().all()
+    next_cursor = None
+    if len(assessments) > limit:
+        assessments = assessments[:limit]
+        next_cursor = assessments[-1].id
+
+    return AssessmentPage(items=[AssessmentResponse.model_validate(a) for a in assessments], next_cursor=next_cursor)
+
+
+@router.post("/{assessment_id}/start", response_model=AssessmentSessionResponse)
+async def start_test(
+    assessment_id: int,
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal),
+):
+    """Start the test, or resume it: a student has one session per test"""
+    if principal.role != UserRole.STUDENT:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only students can take tests")
+
+    paper = await answer_buffer.paper(db, assessment_id)
+    if paper is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test not found")
+    now = utcnow()
+    if now < paper.starts_at:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Test has not started yet")
+    if now >= paper.ends_at:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Test has ended")
+
+    session = await start_session(db, paper, principal.user_id)
+    await db.commit()
+    answer_buffer.remember(session)
+    return await _session_response(db, session, paper)
+
+
+@router.post("/{assessment_id}/grade")
+async def grade_test(
+    assessment_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Grade the test now rather than waiting for the scheduled grading; can be repeated"""
+    _require_staff(current_user, "grade tests")
+    assessment = await _get_assessment(db, current_user, assessment_id)
+    now, ends_at = utcnow(), _aware(assessment.ends_at)
+    if now < ends_at:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Test has not ended yet")
+    # Saves are taken until the grace period ends, and every worker flushes
+    # the ones it took within a flush interval; grading sooner would miss them
+    settled_at = ends_at + timedelta(
+        seconds=settings.assessment_autosave_grace_seconds + settings.assessment_autosave_flush_seconds
+    )
+    if now < settled_at:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Answers are still being saved; grade after {settled_at.isoformat()}",
+        )
+
+    await answer_buffer.flush(db)
+    summary = await grade_assessment(db, assessment_id)
+    await db.commit()
+    return summary
+
+
+@router.get("/{assessment_id}/results", response_model=AssessmentResults)
+async def get_results(
+    assessment_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Graded sessions, highest score first; students get only their own"""
+    assessment = await _get_assessment(db, current_user, assessment_id)
+    query = select(AssessmentSession).where(AssessmentSession.assessment_id == assessment_id)
+    if current_user.role == UserRole.STUDENT:
+        query = query.where(AssessmentSession.student_id == current_user.id)
+
+    sessions = (await db.execute(
+        query.order_by(AssessmentSession.score.desc().nulls_last(), AssessmentSession.id)
+    )).scalars().all()
+    max_score = await db.scalar(
+        select(func.coalesce(func.sum(Question.marks), 0))
+        .join(assessment_questions, assessment_questions.c.question_id == Question.id)
+        .where(assessment_questions.c.assessment_id == assessment_id)
+    )
+    return AssessmentResults(
+        assessment_id=assessment.id,
+        graded_at=assessment.graded_at,
+        max_score=max_score,
+        results=[
+            SessionResult(
+                session_id=s.id, student_id=s.student_id, started_at=s.started_at, submitted_at=s.submitted_at,
+                score=s.score, correct_count=s.correct_count, answered_count=s.answered_count,
+            )
+            for s in sessions
+        ],
+    )
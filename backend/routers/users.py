@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from database import get_db
-from models import User, StudentProfile, Job, Application, UserRole
-from schemas import UserResponse
-from routers.auth import get_current_user
-from typing import List, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, AsyncSessionLocal
+from models import User, StudentProfile, UserRole
+from schemas import UserResponse, TokenData
+from routers.auth import get_current_user, get_current_principal
+from dashboard_stats import dashboard_stats_cache, compute_dashboard_stats
+from typing import Optional
+import json
 
 router = APIRouter()
 
@@ -14,85 +18,98 @@ async def get_user_profile(current_user: User = Depends(get_current_user)):
     """Get user profile"""
     return UserResponse.model_validate(current_user)
 
+def _user_listing_query(role: Optional[UserRole], cursor: Optional[int], limit: int):
+    """One page of users with their student profile outer-joined in, ordered by id"""
+    query = (
+        select(User, StudentProfile)
+        .outerjoin(StudentProfile, StudentProfile.user_id == User.id)
+        .order_by(User.id)
+        .limit(limit)
+    )
+    if role is not None:
+        query = query.where(User.role == role)
+    if cursor is not None:
+        query = query.where(User.id > cursor)
+    return query
+
+def _user_listing_row(user: User, student_profile: Optional[StudentProfile]) -> dict:
+    user_data = {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "role": user.role,
+        "is_active": user.is_active,
+        "company_name": user.company_name,
+        "created_at": user.created_at
+    }
+    
+    # Add student profile if exists
+    if user.role == UserRole.STUDENT and student_profile:
+        user_data["student_profile"] = {
+            "cgpa": student_profile.cgpa,
+            "placed_final": student_profile.placed_final,
+            "highest_accepted_package_lpa": student_profile.highest_accepted_package_lpa,
+            "course": "Computer Science"  # Add course field to model later
+        }
+    
+    return user_data
+
+async def _stream_users_ndjson(role: Optional[UserRole], cursor: Optional[int], batch_size: int):
+    """Yield every matching user as NDJSON, one keyset batch at a time"""
+    # The request-scoped session may be closed before the body is streamed
+    async with AsyncSessionLocal() as db:
+        while True:
+            rows = (await db.execute(_user_listing_query(role, cursor, batch_size))).all()
+            if not rows:
+                break
+            yield "".join(
+                json.dumps(jsonable_encoder(_user_listing_row(user, profile))) + "\n"
+                for user, profile in rows
+            )
+            cursor = rows[-1][0].id
+            # Rows already sent need not stay in the identity map
+            db.expunge_all()
+
 @router.get("/")
 async def get_users(
     role: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every matching user"),
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal)
 ):
     """Get users by role (for TPO dashboard)"""
-    query = db.query(User)
-    
+    enum_role = None
     if role:
         try:
             enum_role = UserRole(role)
         except ValueError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid role filter")
-        query = query.filter(User.role == enum_role)
     
-    users = query.all()
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_users_ndjson(enum_role, cursor, limit),
+            media_type="application/x-ndjson",
+        )
     
-    # Transform users data with additional info
-    result = []
-    for user in users:
-        user_data = {
-            "id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "role": user.role,
-            "is_active": user.is_active,
-            "company_name": user.company_name,
-            "created_at": user.created_at
-        }
-        
-        # Add student profile if exists
-        if user.role == UserRole.STUDENT:
-            student_profile = db.query(StudentProfile).filter(StudentProfile.user_id == user.id).first()
-            if student_profile:
-                user_data["student_profile"] = {
-                    "cgpa": student_profile.cgpa,
-                    "placed_final": student_profile.placed_final,
-                    "highest_accepted_package_lpa": student_profile.highest_accepted_package_lpa,
-                    "course": "Computer Science"  # Add course field to model later
-                }
-        
-        result.append(user_data)
+    result = await db.execute(_user_listing_query(enum_role, cursor, limit + 1))
+    rows = result.all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0].id
     
-    return result
+    return {
+        "items": [_user_listing_row(user, profile) for user, profile in rows],
+        "next_cursor": next_cursor,
+    }
 
 @router.get("/dashboard/stats")
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    principal: TokenData = Depends(get_current_principal)
 ):
     """Get dashboard statistics for TPO"""
-    
-    # Count total students
-    total_students = db.query(User).filter(User.role == UserRole.STUDENT).count()
-    
-    # Count placed students
-    placed_students = db.query(User).join(StudentProfile).filter(
-        User.role == UserRole.STUDENT,
-        StudentProfile.placed_final == True
-    ).count()
-    
-    # Count active companies
-    active_companies = db.query(User).filter(
-        User.role == UserRole.COMPANY,
-        User.is_active == True
-    ).count()
-    
-    # Count active jobs
-    active_jobs = db.query(Job).filter(Job.is_active == True).count()
-    
-    # Count total applications
-    total_applications = db.query(Application).count()
-    
-    return {
-        "totalStudents": total_students,
-        "placedStudents": placed_students,
-        "activeCompanies": active_companies,
-        "activeJobs": active_jobs,
-        "totalApplications": total_applications,
-        "upcomingTests": 0  # Will implement tests later
-    }
+    return await dashboard_stats_cache.get_or_compute(lambda: compute_dashboard_stats(db))
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
-from models import UserRole, JobCategory, ApplicationStatus, MessageRole
+from typing import Dict, Optional, List
+from models import (
+    UserRole, JobCategory, ApplicationStatus, MessageRole, MessageStatus, NotificationType, NotificationPriority, AssessmentType,
+)
 from datetime import datetime
 
 # User schemas
@@ -38,7 +40,11 @@ class Token(BaseModel):
     user: UserResponse
 
 class TokenData(BaseModel):
-    email: Optional[str] = None
+    """Authenticated principal carried in the JWT claims"""
+    email: str
+    user_id: int
+    role: UserRole
+    token_version: int
 
 # Student Profile
 class StudentProfileBase(BaseModel):
@@ -80,6 +86,22 @@ class JobResponse(JobBase):
     class Config:
         from_attributes = True
 
+class JobPage(BaseModel):
+    items: List[JobResponse]
+    next_cursor: Optional[int] = None  # Pass back as ?cursor= to fetch the next page
+
+# Eligibility schemas
+class EligibleStudent(BaseModel):
+    user_id: int
+    name: str
+    email: EmailStr
+    cgpa: Optional[float] = None
+    backlogs: Optional[int] = None
+
+class EligibleStudentPage(BaseModel):
+    items: List[EligibleStudent]
+    next_cursor: Optional[int] = None  # Pass back as ?cursor= to fetch the next page
+
 # Application schemas
 class ApplyRequest(BaseModel):
     job_id: int
@@ -100,6 +122,38 @@ class ApplicationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Bulk application schemas (one transaction, one result per item)
+BULK_MAX_ITEMS = 500
+
+class BulkApplyRequest(BaseModel):
+    job_ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class BulkApplyResult(BaseModel):
+    job_id: int
+    ok: bool
+    created: bool = False  # False when an active application already existed
+    application: Optional[ApplicationResponse] = None
+    detail: Optional[str] = None
+
+class BulkApplyResponse(BaseModel):
+    results: List[BulkApplyResult]
+
+class StatusTransition(BaseModel):
+    application_id: int
+    status: ApplicationStatus
+
+class BulkStatusRequest(BaseModel):
+    transitions: List[StatusTransition] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class StatusTransitionResult(BaseModel):
+    application_id: int
+    ok: bool
+    status: Optional[ApplicationStatus] = None  # Status after the request
+    detail: Optional[str] = None
+
+class BulkStatusResponse(BaseModel):
+    results: List[StatusTransitionResult]
+
 # Chat schemas
 class ChatMessageRequest(BaseModel):
     content: str
@@ -110,6 +164,8 @@ class ChatMessageResponse(BaseModel):
     conversation_id: int
     role: MessageRole
     content: str
+    status: MessageStatus
+    prompt_tokens: Optional[int] = None
     created_at: datetime
     
     class Config:
@@ -126,3 +182,120 @@ class ChatConversationResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+# Notification schemas
+class NotificationResponse(BaseModel):
+    id: int
+    type: NotificationType
+    priority: NotificationPriority
+    title: str
+    message: str
+    job_id: Optional[int] = None
+    application_id: Optional[int] = None
+    is_read: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class NotificationPage(BaseModel):
+    items: List[NotificationResponse]
+    next_cursor: Optional[int] = None  # Pass back as ?cursor= to fetch the next page
+    unread_count: int
+
+# Assessment (test) schemas
+class QuestionCreate(BaseModel):
+    text: str = Field(..., min_length=1)
+    options: List[str] = Field(..., min_length=2, max_length=6)
+    correct_option: int = Field(..., ge=0)  # Index into options
+    marks: float = Field(1.0, gt=0)
+    negative_marks: float = Field(0.0, ge=0)
+
+class QuestionBankCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=200)
+    questions: List[QuestionCreate] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+
+class QuestionsAdd(BaseModel):
+    questions: List[QuestionCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class QuestionBankResponse(BaseModel):
+    id: int
+    name: str
+    company_name: Optional[str] = None
+    question_count: int
+    created_at: Optional[datetime] = None
+
+class AssessmentCreate(BaseModel):
+    title: str = Field(..., min_length=1, max_length=200)
+    company_name: str
+    position: str
+    type: AssessmentType
+    bank_id: int
+    question_count: Optional[int] = Field(None, ge=1)  # Drawn at random from the bank; all of it when omitted
+    starts_at: datetime
+    ends_at: datetime
+    duration_minutes: int = Field(..., ge=1, le=600)
+    location: Optional[str] = None
+    instructions: Optional[str] = None
+
+class AssessmentResponse(BaseModel):
+    id: int
+    title: str
+    company_name: str
+    position: str
+    type: AssessmentType
+    starts_at: datetime
+    ends_at: datetime
+    duration_minutes: int
+    location: Optional[str] = None
+    instructions: Optional[str] = None
+    question_count: int
+    graded_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class SessionQuestion(BaseModel):
+    id: int
+    text: str
+    options: List[str]
+    marks: float
+    negative_marks: float
+
+class AssessmentSessionResponse(BaseModel):
+    session_id: int
+    assessment_id: int
+    started_at: datetime
+    deadline: datetime
+    submitted_at: Optional[datetime] = None
+    questions: List[SessionQuestion]  # In this student's order
+    answers: Dict[int, int] = Field(default_factory=dict)  # Saved so far: question id -> option, for resuming
+
+class AnswerSave(BaseModel):
+    question_id: int
+    selected_option: int = Field(..., ge=0)
+
+class AutosaveRequest(BaseModel):
+    answers: List[AnswerSave] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class SessionResult(BaseModel):
+    session_id: int
+    student_id: int
+    started_at: datetime
+    submitted_at: Optional[datetime] = None
+    score: Optional[float] = None
+    correct_count: Optional[int] = None
+    answered_count: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class AssessmentResults(BaseModel):
+    assessment_id: int
+    graded_at: Optional[datetime] = None
+    max_score: float
+    results: List[SessionResult]  # Highest score first
+
+class AssessmentPage(BaseModel):
+    items: List[AssessmentResponse]
+    next_cursor: Optional[int] = None  # Pass back as ?cursor= to fetch the next page
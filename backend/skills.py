@@ -0,0 +1,135 @@
+"""
+Skill dictionary helpers.
+
+Skills live in the `skills` table (lower-cased, unique) and are linked to
+student profiles and jobs through `student_skills` / `job_skills`, so skill
+matching happens in SQL instead of re-parsing JSON per request.
+backfill_skill_tables() fills them from the legacy JSON columns; migration
+0002 runs it when it adds the tables.
+"""
+
+from typing import Dict, Iterable, List
+import json
+
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import dialect_insert
+from models import Skill, StudentProfile, Job, student_skills, job_skills
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def normalize_skills(names: Iterable[str]) -> List[str]:
+    """Strip, lower-case and de-duplicate skill names, keeping first-seen order"""
+    seen = {}
+    for name in names or []:
+        if not isinstance(name, str):
+            continue
+        key = name.strip().lower()
+        if key and key not in seen:
+            seen[key] = None
+    return list(seen)
+
+
+async def get_or_create_skill_ids(db: AsyncSession, names: Iterable[str]) -> Dict[str, int]:
+    """Map skill names to ids, inserting any that are new"""
+    names = normalize_skills(names)
+    if not names:
+        return {}
+
+    stmt = dialect_insert(db.bind, Skill.__table__).values([{"name": n} for n in names])
+    await db.execute(stmt.on_conflict_do_nothing(index_elements=["name"]))
+
+    result = await db.execute(select(Skill.name, Skill.id).where(Skill.name.in_(names)))
+    return dict(result.all())
+
+
+async def set_job_skills(db: AsyncSession, job_id: int, names: Iterable[str]) -> List[str]:
+    """Attach required skills to a job; returns the normalized names, sorted as job_skill_names lists them"""
+    skill_ids = await get_or_create_skill_ids(db, names)
+    if skill_ids:
+        stmt = dialect_insert(db.bind, job_skills).values(
+            [{"job_id": job_id, "skill_id": skill_id} for skill_id in skill_ids.values()]
+        )
+        await db.execute(stmt.on_conflict_do_nothing())
+    return sorted(skill_ids)
+
+
+async def job_skill_names(db: AsyncSession, job_ids: List[int]) -> Dict[int, List[str]]:
+    """Required skill names for each job, in one query"""
+    out: Dict[int, List[str]] = {job_id: [] for job_id in job_ids}
+    if not job_ids:
+        return out
+    result = await db.execute(
+        select(job_skills.c.job_id, Skill.name)
+        .join(Skill, Skill.id == job_skills.c.skill_id)
+        .where(job_skills.c.job_id.in_(job_ids))
+        .order_by(job_skills.c.job_id, Skill.name)
+    )
+    for job_id, name in result.all():
+        out[job_id].append(name)
+    return out
+
+
+async def skill_names(db: AsyncSession, skill_ids: List[int]) -> List[str]:
+    """Names of the given skill ids, sorted"""
+    if not skill_ids:
+        return []
+    result = await db.execute(select(Skill.name).where(Skill.id.in_(skill_ids)).order_by(Skill.name))
+    return list(result.scalars().all())
+
+
+
+def _parse_legacy_skills(skills_json) -> List[str]:
+    try:
+        return normalize_skills(json.loads(skills_json or "[]") or [])
+    except (ValueError, TypeError):
+        return []
+
+
+def _insert_batches(connection: Connection, table, rows: List[dict]):
+    for start in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        stmt = dialect_insert(connection, table).values(rows[start:start + BACKFILL_BATCH_SIZE])
+        connection.execute(stmt.on_conflict_do_nothing())
+
+
+def backfill_skill_tables(connection: Connection) -> Dict[str, int]:
+    """Copy the legacy StudentProfile.skills_json / Job.required_skills_json lists
+    into skills, student_skills and job_skills on the caller's connection.
+
+    Safe to re-run: rows are inserted with ON CONFLICT DO NOTHING. Returns how
+    many skills and links the JSON named.
+    """
+    profiles = {
+        profile_id: _parse_legacy_skills(raw)
+        for profile_id, raw in connection.execute(
+            select(StudentProfile.id, StudentProfile.skills_json).where(StudentProfile.skills_json.isnot(None))
+        )
+    }
+    jobs = {
+        job_id: _parse_legacy_skills(raw)
+        for job_id, raw in connection.execute(
+            select(Job.id, Job.required_skills_json).where(Job.required_skills_json.isnot(None))
+        )
+    }
+
+    names = sorted({name for skills in list(profiles.values()) + list(jobs.values()) for name in skills})
+    if names:
+        _insert_batches(connection, Skill.__table__, [{"name": n} for n in names])
+    skill_ids = dict(connection.execute(select(Skill.name, Skill.id)).all())
+
+    student_rows = [
+        {"student_profile_id": profile_id, "skill_id": skill_ids[name]}
+        for profile_id, skills in profiles.items()
+        for name in skills
+    ]
+    job_rows = [
+        {"job_id": job_id, "skill_id": skill_ids[name]}
+        for job_id, skills in jobs.items()
+        for name in skills
+    ]
+    _insert_batches(connection, student_skills, student_rows)
+    _insert_batches(connection, job_skills, job_rows)
+    return {"skills": len(names), "student_links": len(student_rows), "job_links": len(job_rows)}
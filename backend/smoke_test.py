@@ -7,6 +7,7 @@ from init_db import create_tables
 create_tables()
 
 from main import app
+from database import async_engine
 
 async def main():
     transport = httpx.ASGITransport(app=app)
@@ -55,5 +56,7 @@ async def main():
 
         print("SMOKE TEST OK")
 
+    await async_engine.dispose()
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -4,16 +4,15 @@ Server startup script with database initialization
 """
 
 import uvicorn
-from database import engine, Base
-from models import User, StudentProfile, Job, Application
+from init_db import upgrade_database
 from config import settings
 
 def initialize_database():
-    """Initialize database tables"""
+    """Apply pending schema migrations"""
     try:
-        print("Creating database tables...")
-        Base.metadata.create_all(bind=engine)
-        print("✅ Database tables created successfully!")
+        print("Migrating database schema...")
+        upgrade_database()
+        print("✅ Database schema is up to date!")
         return True
     except Exception as e:
         print(f"❌ Database initialization failed: {e}")
@@ -31,7 +30,8 @@ def start_server():
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        timeout_graceful_shutdown=5  # Open event streams would otherwise hold up shutdown
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions API, for tests and benchmarks.
+
+Answers POST /v1/chat/completions with a canned reply that names the last user
+message, one word per token, waiting --token-delay seconds before each token.
+stream=true gets the reply as OpenAI-style SSE chunks; otherwise it returns
+once the whole reply is "generated", like the real API does. Tests can set
+app.state.fail_next to answer that many requests with 503s or change
+app.state.token_delay, and read the request count, peak concurrency and
+client ports (one per connection) back from app.state.
+
+    python stub_llm_server.py --port 8100 --token-delay 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 python main.py
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+REPLY = (
+    "Thanks for asking about {topic}. Start by listing the roles you are aiming for, "
+    "match your resume to their requirements, practise a few mock interviews every week "
+    "and keep track of every application you send."
+)
+
+
+def reply_tokens(messages: list) -> list:
+    """The canned reply to the last user message, split into word tokens"""
+    topic = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "your career")
+    words = REPLY.format(topic=topic.strip()[:60]).split(" ")
+    return [words[0]] + [" " + word for word in words[1:]]
+
+
+def create_app(token_delay: float = 0.05) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+    app.state.token_delay = token_delay
+    app.state.requests = 0
+    app.state.fail_next = 0
+    app.state.in_flight = 0
+    app.state.peak_in_flight = 0
+    app.state.client_ports = set()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        app.state.client_ports.add(request.client.port)
+        if app.state.fail_next > 0:
+            app.state.fail_next -= 1
+            return JSONResponse(
+                status_code=503,
+                content={"error": {"message": "Overloaded", "type": "server_error"}},
+                headers={"Retry-After": "0"},
+            )
+        completion_id = f"chatcmpl-{uuid4().hex[:12]}"
+        created = int(time.time())
+        tokens = reply_tokens(body.get("messages", []))[:body.get("max_tokens") or None]
+
+        if not body.get("stream"):
+            app.state.in_flight += 1
+            app.state.peak_in_flight = max(app.state.peak_in_flight, app.state.in_flight)
+            try:
+                await asyncio.sleep(app.state.token_delay * len(tokens))
+            finally:
+                app.state.in_flight -= 1
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            }
+
+        def chunk(delta: dict, finish_reason=None) -> str:
+            return "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }) + "\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for token in tokens:
+                await asyncio.sleep(app.state.token_delay)
+                yield chunk({"content": token})
+            yield chunk({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """Run an ASGI app under uvicorn in a background thread, for tests"""
+
+    def __init__(self, app, port: int):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--token-delay", type=float, default=0.05, help="Seconds before each token")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.token_delay), host=args.host, port=args.port)
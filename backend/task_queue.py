@@ -0,0 +1,409 @@
+"""
+Durable background task queue with an in-process worker pool.
+
+Slow side effects (chat replies today; notification fan-out and report
+generation are meant to follow) are written to the task_queue table by
+enqueue(), in the same transaction as the change that calls for them, and run
+by TaskWorkerPool on the API process's event loop. The request returns as soon
+as that transaction commits, and queued work survives a restart.
+
+Workers claim the oldest available task with a single UPDATE ... RETURNING.
+On PostgreSQL the candidate row is picked FOR UPDATE SKIP LOCKED, so several
+API processes can share one queue without claiming the same task; SQLite
+serializes writers anyway. A claim holds a lease of task_lease_seconds, and a
+task whose worker died is requeued once its lease runs out. A failed attempt
+is retried with exponential backoff until max_attempts, after which the task
+is FAILED and the on_failure hook of its kind runs. A handler can run again
+after it has committed its own work (the process may stop before the task is
+marked done), so handlers must be idempotent.
+
+Each pool keeps wait-time (available to claimed) and run-time samples per
+kind for the tasks it ran; metrics() adds the queue depth read from the table.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+import asyncio
+import json
+import time
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import QueuedTask, TaskStatus
+
+SAMPLES_PER_KIND = 1000
+MAINTENANCE_INTERVAL_SECONDS = 60
+STOP_GRACE_SECONDS = 10
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value  # SQLite returns naive UTC
+
+
+@dataclass
+class ClaimedTask:
+    id: int
+    kind: str
+    payload: dict
+    attempts: int  # Including the current one
+    max_attempts: int
+    available_at: datetime
+
+
+@dataclass
+class _Registration:
+    handler: Callable[[dict], Awaitable[Any]]
+    on_failure: Optional[Callable[[dict, str], Awaitable[None]]]
+
+
+_handlers: Dict[str, _Registration] = {}
+
+
+def task_handler(kind: str, on_failure: Optional[Callable[[dict, str], Awaitable[None]]] = None):
+    """Register the decorated coroutine function as the handler of `kind` tasks.
+
+    It is called with the task's payload and does its own database work on its
+    own session; raising fails the attempt. on_failure(payload, error) runs once
+    the task has failed for good.
+    """
+    def register(handler):
+        _handlers[kind] = _Registration(handler, on_failure)
+        return handler
+    return register
+
+
+async def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: dict,
+    max_attempts: Optional[int] = None,
+    run_at: Optional[datetime] = None,
+) -> QueuedTask:
+    """Add a task in the caller's transaction; call wake_workers() once it has committed.
+
+    A task given run_at is not claimed before then.
+    """
+    now = utcnow()
+    task = QueuedTask(
+        kind=kind,
+        payload=json.dumps(payload),
+        status=TaskStatus.QUEUED,
+        attempts=0,
+        max_attempts=max_attempts or settings.task_max_attempts,
+        created_at=now,
+        available_at=max(run_at, now) if run_at else now,
+    )
+    db.add(task)
+    await db.flush()
+    return task
+
+
+def _distribution(samples: Iterable[float]) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"samples": 0, "avg_ms": None, "p50_ms": None, "p95_ms": None, "max_ms": None}
+    return {
+        "samples": len(ordered),
+        "avg_ms": round(sum(ordered) / len(ordered), 1),
+        "p50_ms": round(ordered[len(ordered) // 2], 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+        "max_ms": round(ordered[-1], 1),
+    }
+
+
+class _KindStats:
+    def __init__(self):
+        self.wait_ms = deque(maxlen=SAMPLES_PER_KIND)
+        self.run_ms = deque(maxlen=SAMPLES_PER_KIND)
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+
+class TaskWorkerPool:
+    """Workers that claim and run queued tasks, plus a maintenance loop for leases and old rows"""
+
+    def __init__(
+        self,
+        workers: int,
+        poll_interval_seconds: float,
+        lease_seconds: float,
+        retry_backoff_seconds: float,
+        retention_hours: float,
+        maintenance_interval_seconds: float = MAINTENANCE_INTERVAL_SECONDS,
+    ):
+        self.workers = workers
+        self.poll_interval_seconds = poll_interval_seconds
+        self.lease_seconds = lease_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.retention_hours = retention_hours
+        self.maintenance_interval_seconds = maintenance_interval_seconds
+        self.running = 0
+        self._loops: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._progress = asyncio.Event()
+        self._stats: Dict[str, _KindStats] = {}
+
+    def wake(self):
+        """Have idle workers look for new tasks now rather than at their next poll"""
+        self._wake.set()
+
+    async def wait_for_progress(self, timeout: float):
+        """Return when a worker of this pool finishes a task, or after timeout seconds"""
+        try:
+            await asyncio.wait_for(self._progress.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _notify_progress(self):
+        self._progress.set()
+        self._progress = asyncio.Event()
+
+    async def start(self):
+        if self._loops or self.workers <= 0:
+            return
+        self._stopping = asyncio.Event()
+        await self.requeue_expired()
+        self._loops = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._loops.append(asyncio.create_task(self._maintain()))
+
+    async def stop(self, grace_seconds: float = STOP_GRACE_SECONDS):
+        """Let running tasks finish for up to grace_seconds; any still running are picked up after their lease"""
+        if not self._loops:
+            return
+        self._stopping.set()
+        self.wake()
+        _, pending = await asyncio.wait(self._loops, timeout=grace_seconds)
+        for loop in pending:
+            loop.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._loops = []
+
+    async def _work(self):
+        while not self._stopping.is_set():
+            try:
+                task = await self._claim()
+            except SQLAlchemyError as e:
+                print(f"Task queue claim error: {e}")
+                task = None
+            if task is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            await self._run(task)
+
+    async def _maintain(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.maintenance_interval_seconds)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.requeue_expired()
+                await self.purge_finished()
+            except SQLAlchemyError as e:
+                print(f"Task queue maintenance error: {e}")
+
+    async def _claim(self) -> Optional[ClaimedTask]:
+        now = utcnow()
+        candidate = (
+            select(QueuedTask.id)
+            .where(QueuedTask.status == TaskStatus.QUEUED, QueuedTask.available_at <= now)
+            .order_by(QueuedTask.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(QueuedTask)
+                .where(QueuedTask.id == candidate, QueuedTask.status == TaskStatus.QUEUED)
+                .values(
+                    status=TaskStatus.RUNNING,
+                    attempts=QueuedTask.attempts + 1,
+                    started_at=now,
+                    locked_until=now + timedelta(seconds=self.lease_seconds),
+                )
+                .returning(
+                    QueuedTask.id, QueuedTask.kind, QueuedTask.payload, QueuedTask.attempts,
+                    QueuedTask.max_attempts, QueuedTask.available_at,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            row = result.first()
+            await db.commit()
+        if row is None:
+            return None
+        return ClaimedTask(
+            id=row.id, kind=row.kind, payload=json.loads(row.payload), attempts=row.attempts,
+            max_attempts=row.max_attempts, available_at=_aware(row.available_at),
+        )
+
+    async def _run(self, task: ClaimedTask):
+        stats = self._stats.setdefault(task.kind, _KindStats())
+        stats.wait_ms.append(max(0.0, (utcnow() - task.available_at).total_seconds() * 1000))
+        registration = _handlers.get(task.kind)
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            if registration is None:
+                raise LookupError(f"No handler for task kind {task.kind!r}")
+            # A handler must not outlive its lease, or a second worker could run the task too
+            await asyncio.wait_for(registration.handler(task.payload), self.lease_seconds)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"Task {task.id} ({task.kind}) attempt {task.attempts} failed: {error}")
+            await self._record_failure(task, registration, error, stats)
+        else:
+            await self._release(task, status=TaskStatus.DONE, finished_at=utcnow(), error=None)
+            stats.completed += 1
+        finally:
+            self.running -= 1
+            stats.run_ms.append((time.perf_counter() - started) * 1000)
+            self._notify_progress()
+
+    async def _release(self, task: ClaimedTask, **values) -> bool:
+        """Update our claim on the task, unless its lease ran out and it was claimed again"""
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    update(QueuedTask)
+                    .where(
+                        QueuedTask.id == task.id,
+                        QueuedTask.status == TaskStatus.RUNNING,
+                        QueuedTask.attempts == task.attempts,
+                    )
+                    .values(locked_until=None, **values)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                return result.rowcount == 1
+        except SQLAlchemyError as e:
+            print(f"Task {task.id} ({task.kind}) could not be released, it will rerun after its lease: {e}")
+            return False
+
+    async def _record_failure(self, task: ClaimedTask, registration: Optional[_Registration], error: str, stats: _KindStats):
+        if registration is not None and task.attempts < task.max_attempts:
+            delay = self.retry_backoff_seconds * 2 ** (task.attempts - 1)
+            if await self._release(task, status=TaskStatus.QUEUED, available_at=utcnow() + timedelta(seconds=delay), error=error):
+                stats.retried += 1
+            return
+        if await self._release(task, status=TaskStatus.FAILED, finished_at=utcnow(), error=error):
+            stats.failed += 1
+            await self._run_failure_hook(task.kind, task.payload, error)
+
+    async def _run_failure_hook(self, kind: str, payload: dict, error: str):
+        registration = _handlers.get(kind)
+        if registration is None or registration.on_failure is None:
+            return
+        try:
+            await registration.on_failure(payload, error)
+        except Exception as e:
+            print(f"on_failure hook of {kind} task failed: {e}")
+
+    async def requeue_expired(self) -> int:
+        """Requeue running tasks whose lease has run out, or fail them if they are out of attempts"""
+        now = utcnow()
+        expired = (
+            QueuedTask.status == TaskStatus.RUNNING,
+            QueuedTask.locked_until < now,
+        )
+        error = "Lease expired before the task finished"
+        async with AsyncSessionLocal() as db:
+            failed = (await db.execute(
+                update(QueuedTask)
+                .where(*expired, QueuedTask.attempts >= QueuedTask.max_attempts)
+                .values(status=TaskStatus.FAILED, finished_at=now, locked_until=None, error=error)
+                .returning(QueuedTask.kind, QueuedTask.payload)
+                .execution_options(synchronize_session=False)
+            )).all()
+            requeued = await db.execute(
+                update(QueuedTask)
+                .where(*expired)
+                .values(status=TaskStatus.QUEUED, available_at=now, locked_until=None, error=error)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        for row in failed:
+            await self._run_failure_hook(row.kind, json.loads(row.payload), error)
+        return len(failed) + requeued.rowcount
+
+    async def purge_finished(self) -> int:
+        """Delete tasks that finished more than retention_hours ago"""
+        cutoff = utcnow() - timedelta(hours=self.retention_hours)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(QueuedTask)
+                .where(QueuedTask.status.in_([TaskStatus.DONE, TaskStatus.FAILED]), QueuedTask.finished_at < cutoff)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def metrics(self, db: AsyncSession) -> dict:
+        """Queue depth per kind from the table, and this pool's counters and wait/run times"""
+        now = utcnow()
+        rows = (await db.execute(
+            select(QueuedTask.kind, QueuedTask.status, func.count(), func.min(QueuedTask.available_at))
+            .where(QueuedTask.status.in_([TaskStatus.QUEUED, TaskStatus.RUNNING]))
+            .group_by(QueuedTask.kind, QueuedTask.status)
+        )).all()
+
+        kinds: Dict[str, dict] = {}
+
+        def kind_entry(kind: str) -> dict:
+            return kinds.setdefault(kind, {
+                "queued": 0, "running": 0, "oldest_queued_seconds": 0.0,
+                "completed": 0, "retried": 0, "failed": 0,
+                "wait_ms": _distribution([]), "run_ms": _distribution([]),
+            })
+
+        for kind, task_status, count, oldest in rows:
+            entry = kind_entry(kind)
+            if task_status == TaskStatus.QUEUED:
+                entry["queued"] = count
+                entry["oldest_queued_seconds"] = round(max(0.0, (now - _aware(oldest)).total_seconds()), 1)
+            else:
+                entry["running"] = count
+        for kind, stats in self._stats.items():
+            entry = kind_entry(kind)
+            entry.update(
+                completed=stats.completed, retried=stats.retried, failed=stats.failed,
+                wait_ms=_distribution(stats.wait_ms), run_ms=_distribution(stats.run_ms),
+            )
+
+        return {
+            "workers": self.workers if self._loops else 0,
+            "running_here": self.running,
+            "queued": sum(entry["queued"] for entry in kinds.values()),
+            "running": sum(entry["running"] for entry in kinds.values()),
+            "kinds": kinds,
+        }
+
+
+task_pool = TaskWorkerPool(
+    workers=settings.task_workers,
+    poll_interval_seconds=settings.task_poll_interval_seconds,
+    lease_seconds=settings.task_lease_seconds,
+    retry_backoff_seconds=settings.task_retry_backoff_seconds,
+    retention_hours=settings.task_retention_hours,
+)
+
+
+def wake_workers():
+    task_pool.wake()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for POST /api/applications/accept.
+Fires 100 accepts for one student at once, across applications of every tier,
+some retried with a shared Idempotency-Key, and checks that the upgrade and
+tier rules held and that retries replayed the first response.
+
+Runs against a throwaway SQLite database:
+    python test_accept_concurrency.py [--requests 100] [--seed 8]
+"""
+
+import argparse
+import asyncio
+import random
+
+import testkit
+
+testkit.use_throwaway_database("accept")
+
+import httpx
+from sqlalchemy import select
+
+from database import engine, async_engine
+from models import Application, ApplicationStatus, Job, JobCategory, StudentProfile, placement_tier_rollups
+from placement_rollups import rebuild_rollups
+
+JOBS = [
+    ("internship", None), ("tier3", 4.0), ("tier3", 6.0), ("tier2", 9.0),
+    ("tier2", 12.0), ("tier1", 18.0), ("tier1", 30.0),
+]
+TIER_RANK = {JobCategory.TIER3: 1, JobCategory.TIER2: 2, JobCategory.TIER1: 3}
+
+
+async def register(client, name: str, role: str) -> dict:
+    r = await client.post("/api/auth/register", json={
+        "name": name, "email": f"{name.lower()}@example.com", "password": "S3cretp@ss!", "role": role,
+    })
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def tier_rollups() -> dict:
+    with engine.connect() as connection:
+        return {
+            tier: students
+            for tier, students in connection.execute(select(placement_tier_rollups))
+            if students
+        }
+
+
+async def test_parallel_accepts(requests: int, seed: int) -> bool:
+    from main import app
+
+    testkit.create_schema()
+    rng = random.Random(seed)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+        tpo = await register(client, "TPO", "tpo")
+        student = await register(client, "Student", "student")
+
+        application_ids = []
+        for category, package in JOBS:
+            r = await client.post("/api/jobs/", headers=tpo, json={
+                "title": f"{category} {package}", "company_name": "Acme", "category": category, "package_lpa": package,
+            })
+            assert r.status_code == 200, r.text
+            r = await client.post("/api/applications/apply", headers=student, json={"job_id": r.json()["id"]})
+            assert r.status_code == 200, r.text
+            application_ids.append(r.json()["id"])
+
+        # Every fifth request reuses one of a few keys, always with the same body
+        keyed_bodies = {
+            f"retry-{i}": {"application_id": rng.choice(application_ids), "final": rng.random() < 0.2}
+            for i in range(max(1, requests // 20))
+        }
+        calls = []
+        for i in range(requests):
+            if i % 5 == 0:
+                key = rng.choice(list(keyed_bodies))
+                calls.append((key, keyed_bodies[key]))
+            else:
+                calls.append((None, {"application_id": rng.choice(application_ids), "final": rng.random() < 0.1}))
+
+        async def accept(key, body):
+            headers = dict(student, **({"Idempotency-Key": key} if key else {}))
+            return key, await client.post("/api/applications/accept", headers=headers, json=body)
+
+        responses = await asyncio.gather(*(accept(key, body) for key, body in calls))
+
+    statuses = {}
+    for _, r in responses:
+        statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+    no_errors = all(code < 500 for code in statuses)
+    print(f"Responses by status: {dict(sorted(statuses.items()))} - {'✅' if no_errors else '❌'}")
+
+    replays_ok = True
+    for key in keyed_bodies:
+        bodies = {r.text for k, r in responses if k == key and r.status_code == 200}
+        replays_ok = replays_ok and len(bodies) <= 1
+    print(f"Idempotency keys replayed one response each - {'✅' if replays_ok else '❌'}")
+
+    with engine.connect() as connection:
+        profile = connection.execute(select(StudentProfile)).first()
+        accepted = connection.execute(
+            select(Job.category, Application.is_final_acceptance)
+            .join(Job, Job.id == Application.job_id)
+            .where(Application.status == ApplicationStatus.ACCEPTED)
+        ).all()
+        pending = connection.execute(
+            select(Application.id).where(
+                Application.status.in_([ApplicationStatus.APPLIED, ApplicationStatus.SHORTLISTED, ApplicationStatus.OFFERED])
+            )
+        ).all()
+
+    tiers = sorted(TIER_RANK[category] for category, _ in accepted if category in TIER_RANK)
+    rules_ok = (
+        profile.upgrades_used <= 2
+        and len(tiers) == len(set(tiers))  # One acceptance per tier
+        and (not tiers or len(tiers) == profile.upgrades_used + 1)
+        and (not tiers or TIER_RANK[profile.highest_accepted_tier] == tiers[-1])
+    )
+    print(
+        f"Accepted tiers {tiers}, upgrades_used={profile.upgrades_used}, "
+        f"highest={profile.highest_accepted_tier.value if profile.highest_accepted_tier else None} - {'✅' if rules_ok else '❌'}"
+    )
+
+    final = any(is_final for _, is_final in accepted)
+    withdraw_ok = not final or (profile.placed_final and not pending)
+    print(f"Final acceptance={final}, pending left={len(pending)} - {'✅' if withdraw_ok else '❌'}")
+
+    incremental = tier_rollups()
+    rebuild_rollups()
+    rollups_ok = incremental == tier_rollups()
+    print(f"Tier rollups {incremental} match a rebuild - {'✅' if rollups_ok else '❌'}")
+
+    return no_errors and replays_ok and rules_ok and withdraw_ok and rollups_ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=8)  # Reaches a Tier-1 final acceptance
+    args = parser.parse_args()
+
+    ok = await test_parallel_accepts(args.requests, args.seed)
+    await async_engine.dispose()
+
+    print("\n🎉 Concurrent accepts are serialized" if ok else "\n❌ Concurrent accepts raced")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Uniqueness test for active applications.
+Fires parallel single and bulk applies for one student and job and checks that
+the partial unique index leaves exactly one active application, that every
+caller got that application back, and that a student may apply again once the
+earlier application is no longer active.
+
+Runs against a throwaway SQLite database:
+    python test_apply_uniqueness.py [--requests 50]
+"""
+
+import argparse
+import asyncio
+
+import testkit
+
+testkit.use_throwaway_database("apply")
+
+import httpx
+from sqlalchemy import event, select, func
+
+from database import engine, async_engine
+from models import Application, ACTIVE_APPLICATION_STATUSES, application_rollups, ApplicationStatus
+
+
+async def register(client, name: str, role: str) -> dict:
+    r = await client.post("/api/auth/register", json={
+        "name": name, "email": f"{name.lower()}@example.com", "password": "S3cretp@ss!", "role": role,
+    })
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def active_count(job_id: int) -> int:
+    with engine.connect() as connection:
+        return connection.execute(
+            select(func.count()).select_from(Application)
+            .where(Application.job_id == job_id, Application.status.in_(ACTIVE_APPLICATION_STATUSES))
+        ).scalar()
+
+
+def applied_rollup() -> int:
+    with engine.connect() as connection:
+        return connection.execute(
+            select(func.coalesce(func.sum(application_rollups.c.applications), 0))
+            .where(application_rollups.c.status == ApplicationStatus.APPLIED)
+        ).scalar()
+
+
+async def test_one_active_application(requests: int) -> bool:
+    from main import app
+
+    testkit.create_schema()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+        tpo = await register(client, "TPO", "tpo")
+        student = await register(client, "Student", "student")
+        r = await client.post("/api/jobs/", headers=tpo, json={
+            "title": "Engineer", "company_name": "Acme", "category": "tier3", "package_lpa": 5.0,
+        })
+        job_id = r.json()["id"]
+
+        async def apply(i):
+            if i % 3 == 0:
+                r = await client.post("/api/applications/apply/bulk", headers=student, json={"job_ids": [job_id]})
+                result = r.json()["results"][0] if r.status_code == 200 else {}
+                return r.status_code, (result.get("application") or {}).get("id")
+            r = await client.post("/api/applications/apply", headers=student, json={"job_id": job_id})
+            return r.status_code, r.json().get("id")
+
+        responses = await asyncio.gather(*(apply(i) for i in range(requests)))
+        codes = sorted({code for code, _ in responses})
+        ids = {app_id for _, app_id in responses if app_id is not None}
+        parallel_ok = codes == [200] and len(ids) == 1 and active_count(job_id) == 1 and applied_rollup() == 1
+        print(f"{requests} parallel applies: status codes {codes}, application ids {sorted(ids)} - {'✅' if parallel_ok else '❌'}")
+
+        # A repeat apply costs one statement for the insert attempt and one
+        # to read back the existing application
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        await client.get("/api/auth/me", headers=student)  # Warm the principal cache
+        event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+        r = await client.post("/api/applications/apply", headers=student, json={"job_id": job_id})
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+        inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT INTO APPLICATIONS")]
+        repeat_ok = r.status_code == 200 and r.json()["id"] in ids and len(inserts) == 1
+        print(f"Repeat apply returned the existing application with {len(inserts)} insert attempt - {'✅' if repeat_ok else '❌'}")
+
+        (app_id,) = ids
+        r = await client.post("/api/applications/status/bulk", headers=tpo, json={
+            "transitions": [{"application_id": app_id, "status": "rejected"}],
+        })
+        assert r.json()["results"][0]["ok"], r.text
+        r = await client.post("/api/applications/apply", headers=student, json={"job_id": job_id})
+        reapply_ok = r.status_code == 200 and r.json()["id"] != app_id and active_count(job_id) == 1
+        print(f"Re-apply after rejection created application {r.json().get('id')} - {'✅' if reapply_ok else '❌'}")
+
+    return parallel_ok and repeat_ok and reapply_ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    ok = await test_one_active_application(args.requests)
+    await async_engine.dispose()
+
+    print("\n🎉 One active application per student and job" if ok else "\n❌ Duplicate active applications")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Test for online assessments (assessments.py, routers/tests.py).
+
+A company builds a question bank and schedules a test; a few hundred students
+start it and autosave answers through PUT /api/tests/sessions/{id}/answers.
+Checks that a student has one session however often they start, that an
+autosave runs no SQL once its session is cached, that buffered answers reach
+the database as a few multi-row upserts holding only each question's latest
+answer, that the newest save wins whichever worker flushes first and that a
+failed flush or commit is retried, that late saves and saves after submitting
+are refused, that grading by hand waits for every worker's last saves, and
+that the vectorized grading matches a per-answer reference.
+
+Runs against a throwaway SQLite database:
+    python test_assessments.py [--students 300] [--seed 1]
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from datetime import timedelta
+
+import testkit
+
+testkit.use_throwaway_database("assessments")
+
+import httpx
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from database import engine, async_engine, AsyncSessionLocal
+from models import (
+    User, UserRole, Assessment, AssessmentSession, Question, QueuedTask, TaskStatus, assessment_answers, assessment_questions,
+)
+from assessments import AnswerBuffer, answer_buffer
+from config import settings
+from task_queue import task_pool, utcnow
+from testkit import StatementRecorder, token_headers
+
+
+def seed(students: int):
+    testkit.create_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"name": f"Student {i}", "email": f"s{i}@example.com", "role": UserRole.STUDENT, "company_name": None}
+            for i in range(students)
+        ] + [
+            {"name": "TPO", "email": "tpo@example.com", "role": UserRole.TPO, "company_name": None},
+            {"name": "Recruiter", "email": "r@acme.example.com", "role": UserRole.COMPANY, "company_name": "Acme"},
+            {"name": "Other recruiter", "email": "r@globex.example.com", "role": UserRole.COMPANY, "company_name": "Globex"},
+        ])
+
+
+def random_question(rng: random.Random, i: int) -> dict:
+    options = rng.randint(2, 5)
+    return {
+        "text": f"Question {i}",
+        "options": [f"Option {j}" for j in range(options)],
+        "correct_option": rng.randrange(options),
+        "marks": rng.choice([1, 1, 2, 4]),
+        "negative_marks": rng.choice([0, 0, 0.25, 1]),
+    }
+
+
+async def test_setup(client, company, other_company, tpo, rng: random.Random) -> tuple:
+    r = await client.post("/api/tests/banks", headers=company, json={
+        "name": "Aptitude", "questions": [random_question(rng, i) for i in range(30)],
+    })
+    assert r.status_code == 200, r.text
+    bank_id = r.json()["id"]
+    r = await client.post(f"/api/tests/banks/{bank_id}/questions", headers=company, json={
+        "questions": [random_question(rng, i) for i in range(30, 50)],
+    })
+    added = r.json()["question_count"]
+    r = await client.post(f"/api/tests/banks/{bank_id}/questions", headers=company, json={
+        "questions": [{"text": "Bad", "options": ["a", "b"], "correct_option": 2}],
+    })
+    bad_option = r.status_code
+    r = await client.post(f"/api/tests/banks/{bank_id}/questions", headers=other_company, json={
+        "questions": [random_question(rng, 0)],
+    })
+    other_bank = r.status_code
+    r = await client.get("/api/tests/banks", headers=other_company)
+    other_list = r.json()
+    banks_ok = added == 50 and bad_option == 400 and other_bank == 404 and other_list == []
+    print(f"Question bank of {added} questions; bad correct_option -> {bad_option}, "
+          f"another company -> {other_bank} and sees {len(other_list)} banks - {'✅' if banks_ok else '❌'}")
+
+    now = utcnow()
+    r = await client.post("/api/tests/", headers=company, json={
+        "title": "Acme aptitude round", "company_name": "Acme", "position": "Engineer", "type": "aptitude",
+        "bank_id": bank_id, "question_count": 40, "duration_minutes": 30,
+        "starts_at": (now - timedelta(minutes=1)).isoformat(), "ends_at": (now + timedelta(hours=1)).isoformat(),
+    })
+    assert r.status_code == 200, r.text
+    assessment = r.json()
+    r = await client.post("/api/tests/", headers=company, json={
+        "title": "Later round", "company_name": "Acme", "position": "Engineer", "type": "technical",
+        "bank_id": bank_id, "duration_minutes": 30,
+        "starts_at": (now + timedelta(days=1)).isoformat(), "ends_at": (now + timedelta(days=2)).isoformat(),
+    })
+    later = r.json()
+    r = await client.post("/api/tests/", headers=other_company, json={
+        "title": "Not theirs", "company_name": "Acme", "position": "Engineer", "type": "aptitude",
+        "bank_id": bank_id, "duration_minutes": 30,
+        "starts_at": now.isoformat(), "ends_at": (now + timedelta(hours=1)).isoformat(),
+    })
+    foreign = r.status_code
+
+    with engine.connect() as connection:
+        task = connection.execute(
+            select(QueuedTask.status, QueuedTask.payload, QueuedTask.available_at)
+            .where(QueuedTask.kind == "grade_assessment").order_by(QueuedTask.id)
+        ).first()
+    r = await client.get("/api/users/dashboard/stats", headers=tpo)
+    upcoming = r.json().get("upcomingTests") if r.status_code == 200 else None
+    r = await client.get("/api/tests/", headers=company, params={"limit": 1})
+    page = r.json()
+    scheduling_ok = (
+        assessment["question_count"] == 40 and later["question_count"] == 50 and foreign == 403
+        and task is not None and task.status == TaskStatus.QUEUED and task.payload.find(str(assessment["id"])) >= 0
+        and task.available_at.replace(tzinfo=None) >= (now + timedelta(hours=1)).replace(tzinfo=None)
+        and upcoming == 2 and [item["id"] for item in page["items"]] == [later["id"]] and page["next_cursor"] == later["id"]
+    )
+    print(f"Scheduled 2 tests (grading queued for after the end, upcomingTests={upcoming}); "
+          f"another company's schedule -> {foreign} - {'✅' if scheduling_ok else '❌'}")
+    return banks_ok and scheduling_ok, assessment["id"], later["id"]
+
+
+async def test_sessions(client, assessment_id: int, later_id: int, students: list) -> tuple:
+    sessions = []
+    for headers in students:
+        r = await client.post(f"/api/tests/{assessment_id}/start", headers=headers)
+        assert r.status_code == 200, r.text
+        sessions.append(r.json())
+    r = await client.post(f"/api/tests/{assessment_id}/start", headers=students[0])
+    again = r.json()
+    r = await client.post(f"/api/tests/{later_id}/start", headers=students[0])
+    not_started = r.status_code
+
+    question_sets = {frozenset(q["id"] for q in s["questions"]) for s in sessions}
+    orders = {tuple(q["id"] for q in s["questions"]) for s in sessions}
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(func.count()).select_from(AssessmentSession).where(AssessmentSession.assessment_id == assessment_id)
+        ).scalar()
+    sessions_ok = (
+        again["session_id"] == sessions[0]["session_id"] and again["questions"] == sessions[0]["questions"]
+        and rows == len(students) and len(question_sets) == 1 and len(orders) > len(students) // 2
+        and not_started == 403 and "correct_option" not in sessions[0]["questions"][0]
+    )
+    print(f"{rows} sessions for {len(students)} students (starting again resumes), same 40 questions in "
+          f"{len(orders)} orders; a test not yet open -> {not_started} - {'✅' if sessions_ok else '❌'}")
+    return sessions_ok, sessions
+
+
+async def test_autosave(client, sessions: list, students: list, rng: random.Random) -> tuple:
+    latest = {}  # (session, question) -> option, what the database must end up with
+    saves = 0
+    with StatementRecorder() as recorder:
+        for _ in range(4):  # Four autosave rounds, each touching some questions again
+            for session, headers in zip(sessions, students):
+                answers = []
+                for q in rng.sample(session["questions"], rng.randint(1, 15)):
+                    option = rng.randrange(len(q["options"]))
+                    answers.append({"question_id": q["id"], "selected_option": option})
+                    latest[(session["session_id"], q["id"])] = option
+                r = await client.put(f"/api/tests/sessions/{session['session_id']}/answers", headers=headers, json={"answers": answers})
+                assert r.status_code == 200, r.text
+                saves += 1
+    no_sql_ok = not recorder.statements
+    print(f"{saves} autosaves ran {len(recorder.statements)} SQL statements - {'✅' if no_sql_ok else '❌'}")
+
+    pending = answer_buffer.stats()["pending_answers"]
+    with StatementRecorder() as recorder:
+        written = await answer_buffer.flush()
+    upserts = [s for s, _, _ in recorder.statements if s.lstrip().upper().startswith("INSERT INTO ASSESSMENT_ANSWERS")]
+    with engine.connect() as connection:
+        stored = {(s, q): o for s, q, o, _ in connection.execute(select(assessment_answers)).all()}
+    flush_ok = (
+        written == pending == len(latest) and len(upserts) == math.ceil(written / 1000)
+        and "ON CONFLICT" in upserts[0] and stored == latest
+    )
+    print(f"Flush wrote {written} latest answers (of {answer_buffer.answers_saved} saved) in {len(upserts)} "
+          f"upsert statements - {'✅' if flush_ok else '❌'}")
+
+    r = await client.get(f"/api/tests/sessions/{sessions[0]['session_id']}", headers=students[0])
+    resume = {int(q): o for q, o in r.json()["answers"].items()}
+    resume_ok = resume == {q: o for (s, q), o in latest.items() if s == sessions[0]["session_id"]}
+    r = await client.get(f"/api/tests/sessions/{sessions[0]['session_id']}", headers=students[1])
+    print(f"Resuming shows the saved answers; another student's session -> {r.status_code} - "
+          f"{'✅' if resume_ok and r.status_code == 404 else '❌'}")
+    return no_sql_ok and flush_ok and resume_ok and r.status_code == 404, latest
+
+
+async def test_flush_ordering(sessions: list, latest: dict) -> bool:
+    """Two workers buffering saves to the same question; the newer save wins whichever flushes last"""
+    session_id = sessions[2]["session_id"]
+    question = sessions[2]["questions"][0]
+    other_worker = AnswerBuffer(flush_interval_seconds=1, max_pending=1000, grace_seconds=5)
+    async with AsyncSessionLocal() as db:
+        session = await other_worker.session(db, session_id)
+    other_worker.save(session, [(question["id"], 0)])  # Older
+    await asyncio.sleep(0.01)
+    answer_buffer.save(await answer_buffer.session(None, session_id), [(question["id"], 1)])  # Newer
+    await answer_buffer.flush()
+    await other_worker.flush()
+    with engine.connect() as connection:
+        stored = connection.execute(
+            select(assessment_answers.c.selected_option)
+            .where(assessment_answers.c.session_id == session_id, assessment_answers.c.question_id == question["id"])
+        ).scalar()
+    latest[(session_id, question["id"])] = 1
+    ordering_ok = stored == 1
+    print(f"Older save flushed after a newer one leaves option {stored} - {'✅' if ordering_ok else '❌'}")
+
+    write = answer_buffer._write
+
+    async def failing_write(db, rows):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    answer_buffer._write = failing_write
+    answer_buffer.save(await answer_buffer.session(None, session_id), [(question["id"], 0)])
+    try:
+        await answer_buffer.flush()
+        raised = False
+    except OperationalError:
+        raised = True
+    finally:
+        answer_buffer._write = write
+    kept = answer_buffer.pending_answers(session_id)
+    written = await answer_buffer.flush()
+    latest[(session_id, question["id"])] = 0
+    retry_ok = raised and kept == {question["id"]: 0} and written == 1
+    print(f"A failed flush keeps its answers for the next one - {'✅' if retry_ok else '❌'}")
+
+    # Flushed into a request's transaction (submitting, grading), the answers
+    # are only gone from the buffer once that transaction commits
+    question = sessions[2]["questions"][1]
+    answer_buffer.save(await answer_buffer.session(None, session_id), [(question["id"], 0)])
+    async with AsyncSessionLocal() as db:
+        async def failing_commit():
+            raise OperationalError("COMMIT", {}, Exception("database is locked"))
+
+        db.commit = failing_commit
+        try:
+            await answer_buffer.flush(db, session_id=session_id)
+            raised = False
+        except OperationalError:
+            raised = True
+    kept = answer_buffer.pending_answers(session_id)
+    written = await answer_buffer.flush()
+    latest[(session_id, question["id"])] = 0
+    commit_ok = raised and kept == {question["id"]: 0} and written == 1
+    print(f"A flush whose commit fails keeps its answers for the next one - {'✅' if commit_ok else '❌'}")
+    return ordering_ok and retry_ok and commit_ok
+
+
+async def test_deadlines(client, sessions: list, students: list, latest: dict) -> bool:
+    late, late_headers = sessions[3], students[3]
+    cached = await answer_buffer.session(None, late["session_id"])
+    cached.deadline = utcnow() - timedelta(seconds=settings.assessment_autosave_grace_seconds + 1)
+    question = late["questions"][0]
+    r = await client.put(f"/api/tests/sessions/{late['session_id']}/answers", headers=late_headers, json={
+        "answers": [{"question_id": question["id"], "selected_option": 0}],
+    })
+    late_status = r.status_code
+    r = await client.put(f"/api/tests/sessions/{sessions[4]['session_id']}/answers", headers=students[4], json={
+        "answers": [{"question_id": 10 ** 6, "selected_option": 0}],
+    })
+    foreign_question = r.status_code
+
+    submitter, headers = sessions[5], students[5]
+    question = submitter["questions"][-1]
+    r = await client.put(f"/api/tests/sessions/{submitter['session_id']}/answers", headers=headers, json={
+        "answers": [{"question_id": question["id"], "selected_option": 1}],
+    })
+    latest[(submitter["session_id"], question["id"])] = 1
+    r = await client.post(f"/api/tests/sessions/{submitter['session_id']}/submit", headers=headers)
+    submitted = r.json()
+    flushed_with_submit = submitted["answers"].get(str(question["id"])) == 1 and not answer_buffer.pending_answers(submitter["session_id"])
+    r = await client.put(f"/api/tests/sessions/{submitter['session_id']}/answers", headers=headers, json={
+        "answers": [{"question_id": question["id"], "selected_option": 0}],
+    })
+    after_submit = r.status_code
+    r = await client.post(f"/api/tests/sessions/{submitter['session_id']}/submit", headers=headers)
+    resubmit = r.status_code
+
+    deadlines_ok = (
+        late_status == 409 and foreign_question == 400 and flushed_with_submit and submitted["submitted_at"]
+        and after_submit == 409 and resubmit == 409
+    )
+    print(f"Save after the deadline -> {late_status}, to a question not on the paper -> {foreign_question}; "
+          f"submit writes pending answers, then saves -> {after_submit}, submitting again -> {resubmit} - "
+          f"{'✅' if deadlines_ok else '❌'}")
+    return deadlines_ok
+
+
+def reference_scores(assessment_id: int, latest: dict) -> dict:
+    """Score each session answer by answer"""
+    with engine.connect() as connection:
+        key = {row.id: row for row in connection.execute(
+            select(Question.id, Question.correct_option, Question.marks, Question.negative_marks)
+            .join(assessment_questions, assessment_questions.c.question_id == Question.id)
+            .where(assessment_questions.c.assessment_id == assessment_id)
+        )}
+        session_ids = connection.execute(
+            select(AssessmentSession.id).where(AssessmentSession.assessment_id == assessment_id)
+        ).scalars().all()
+    scores = {session_id: (0.0, 0, 0) for session_id in session_ids}
+    for (session_id, question_id), option in latest.items():
+        score, correct, answered = scores[session_id]
+        if option == key[question_id].correct_option:
+            scores[session_id] = (score + key[question_id].marks, correct + 1, answered + 1)
+        else:
+            scores[session_id] = (score - key[question_id].negative_marks, correct, answered + 1)
+    return scores
+
+
+async def test_grading(client, assessment_id: int, company, sessions: list, students: list, latest: dict) -> bool:
+    r = await client.post(f"/api/tests/{assessment_id}/grade", headers=company)
+    too_early = r.status_code
+
+    # Close the test and bring its grading task forward
+    with engine.begin() as connection:
+        connection.execute(update(Assessment).where(Assessment.id == assessment_id).values(ends_at=utcnow() - timedelta(seconds=1)))
+        connection.execute(update(QueuedTask).where(QueuedTask.kind == "grade_assessment").values(available_at=utcnow()))
+    answer_buffer._papers.clear()
+    started = time.perf_counter()
+    with StatementRecorder() as recorder:
+        task_pool.poll_interval_seconds = 0.05
+        await task_pool.start()
+        try:
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline:
+                async with AsyncSessionLocal() as db:
+                    graded = await db.scalar(select(Assessment.graded_at).where(Assessment.id == assessment_id))
+                if graded:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await task_pool.stop()
+    grading_ms = (time.perf_counter() - started) * 1000
+    updates = [(s, many) for s, _, many in recorder.statements if s.lstrip().upper().startswith("UPDATE ASSESSMENT_SESSIONS")]
+
+    expected = reference_scores(assessment_id, latest)
+    with engine.connect() as connection:
+        actual = {row.id: (row.score, row.correct_count, row.answered_count) for row in connection.execute(
+            select(AssessmentSession.id, AssessmentSession.score, AssessmentSession.correct_count, AssessmentSession.answered_count)
+            .where(AssessmentSession.assessment_id == assessment_id)
+        )}
+    matches = all(
+        math.isclose(actual[s][0], expected[s][0], abs_tol=1e-6) and actual[s][1:] == expected[s][1:] for s in expected
+    )
+    grading_ok = too_early == 409 and graded is not None and matches and len(updates) == 1 and updates[0][1]
+    print(f"Scheduled grading scored {len(actual)} sessions in {grading_ms:.0f} ms with {len(updates)} executemany "
+          f"UPDATE, matching the per-answer reference; grading before the end -> {too_early} - "
+          f"{'✅' if grading_ok else '❌'}")
+
+    # Graded by hand once every worker's last saves are in
+    r = await client.post(f"/api/tests/{assessment_id}/grade", headers=company)
+    settling = r.status_code
+    settled = timedelta(seconds=settings.assessment_autosave_grace_seconds + settings.assessment_autosave_flush_seconds + 1)
+    with engine.begin() as connection:
+        connection.execute(update(Assessment).where(Assessment.id == assessment_id).values(ends_at=utcnow() - settled))
+    r = await client.post(f"/api/tests/{assessment_id}/grade", headers=company)
+    regrade_ok = settling == 409 and r.status_code == 200 and r.json()["sessions"] == len(actual)
+    print(f"Grading by hand while late saves may still be flushing -> {settling}, after that -> {r.status_code} - "
+          f"{'✅' if regrade_ok else '❌'}")
+
+    r = await client.get(f"/api/tests/{assessment_id}/results", headers=company)
+    results = r.json()
+    scores = [row["score"] for row in results["results"]]
+    r = await client.get(f"/api/tests/{assessment_id}/results", headers=students[0])
+    own = r.json()["results"]
+    results_ok = (
+        regrade_ok and scores == sorted(scores, reverse=True) and len(scores) == len(actual)
+        and [row["session_id"] for row in own] == [sessions[0]["session_id"]]
+    )
+    print(f"Results: {len(scores)} sessions best first (top {scores[0]} of {results['max_score']}), a student sees "
+          f"{len(own)} - {'✅' if results_ok else '❌'}")
+    return grading_ok and results_ok
+
+
+async def test_assessments(students: int, seed_value: int) -> bool:
+    from main import app
+
+    rng = random.Random(seed_value)
+    seed(students)
+    company, other_company = token_headers(email="r@acme.example.com"), token_headers(email="r@globex.example.com")
+    tpo = token_headers(email="tpo@example.com")
+    student_headers = [token_headers(email=f"s{i}@example.com") for i in range(students)]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+        setup_ok, assessment_id, later_id = await test_setup(client, company, other_company, tpo, rng)
+        sessions_ok, sessions = await test_sessions(client, assessment_id, later_id, student_headers)
+        autosave_ok, latest = await test_autosave(client, sessions, student_headers, rng)
+        ordering_ok = await test_flush_ordering(sessions, latest)
+        deadlines_ok = await test_deadlines(client, sessions, student_headers, latest)
+        grading_ok = await test_grading(client, assessment_id, company, sessions, student_headers, latest)
+    return setup_ok and sessions_ok and autosave_ok and ordering_ok and deadlines_ok and grading_ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        ok = await test_assessments(args.students, args.seed)
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Tests run on timed sessions with batched autosave and vectorized grading" if ok else "\n❌ Assessment problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test for bounded chat history loading (chat_context.py).
+
+Sends messages to a 10-message and a 10,000-message conversation through
+POST /api/chat/send-message, with an in-process LLM backend that records the
+prompt. Checks that the history read is a LIMIT query served in order by
+ix_chat_messages_conversation_created, that the prompt keeps the newest
+messages within the token budget, and that per-message latency does not grow
+with the conversation.
+
+Runs against a throwaway SQLite database:
+    python test_chat_history.py
+"""
+
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import testkit
+
+testkit.use_throwaway_database("chat-history")
+
+import httpx
+from sqlalchemy import event, insert
+
+from chat_context import estimate_tokens, fit_history
+from config import settings
+from database import engine, async_engine
+from llm_client import LLMBackend, set_llm_backend
+from models import ChatConversation, ChatMessage, MessageRole
+
+SENDS = 15
+
+
+class RecordingBackend(LLMBackend):
+    """Answers at once and keeps the last prompt it was sent"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def complete(self, payload: dict, timeout: float) -> str:
+        self.messages = payload["messages"]
+        return "Noted."
+
+
+def seed_conversation(user_id: int, messages: int) -> int:
+    started = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        conversation_id = connection.execute(
+            insert(ChatConversation).values(user_id=user_id, title=f"{messages} messages")
+        ).inserted_primary_key[0]
+        connection.execute(insert(ChatMessage), [
+            {
+                "conversation_id": conversation_id,
+                "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                "content": f"Message {i} " + "about interview preparation " * 14,
+                "created_at": started + timedelta(seconds=i),
+            }
+            for i in range(messages)
+        ])
+    return conversation_id
+
+
+async def send_timed(client, headers, conversation_id: int) -> list:
+    latencies = []
+    for i in range(SENDS):
+        started = time.perf_counter()
+        r = await client.post("/api/chat/send-message", headers=headers, json={
+            "content": f"Follow-up {i}", "conversation_id": conversation_id,
+        })
+        latencies.append(time.perf_counter() - started)
+        assert r.status_code == 200, r.text
+    return latencies
+
+
+async def test_history_window() -> bool:
+    from main import app
+
+    testkit.create_schema()
+    backend = RecordingBackend()
+    set_llm_backend(backend)
+    settings.chat_summary_trigger_tokens = 0  # The plain history window; test_chat_summary.py covers summaries
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        r = await client.post("/api/auth/register", json={
+            "name": "Student", "email": "student@example.com", "password": "S3cretp@ss!", "role": "student",
+        })
+        assert r.status_code == 200, r.text
+        student = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        user_id = r.json()["user"]["id"]
+
+        small = seed_conversation(user_id, 10)
+        large = seed_conversation(user_id, 10_000)
+
+        # The prompt holds the newest messages that fit the budget, in order
+        statements = []
+        listener = lambda conn, cursor, statement, parameters, context, executemany: statements.append((statement, parameters))
+        event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+        r = await client.post("/api/chat/send-message", headers=student, json={
+            "content": "What should I revise first?", "conversation_id": large,
+        })
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+        assert r.status_code == 200, r.text
+
+        history = backend.messages[1:-1]
+        newest = [f"Message {i} " for i in range(10_000 - len(history), 10_000)]
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in backend.messages)
+        window_ok = (
+            0 < len(history) < settings.chat_context_max_messages
+            and all(m["content"].startswith(prefix) for m, prefix in zip(history, newest))
+            and prompt_tokens <= settings.chat_context_token_budget
+            and backend.messages[-1] == {"role": "user", "content": "What should I revise first?"}
+        )
+        print(f"Prompt: {len(history)} newest of 10,000 messages, ~{prompt_tokens} of "
+              f"{settings.chat_context_token_budget} tokens - {'✅' if window_ok else '❌'}")
+
+        # One bounded read of the history, walking the index backwards
+        reads = [(s, p) for s, p in statements if "FROM chat_messages" in s and "ORDER BY" in s]
+        with engine.connect() as connection:
+            plan = " | ".join(
+                row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + reads[0][0], reads[0][1])
+            ) if len(reads) == 1 else ""
+        query_ok = (
+            len(reads) == 1 and "LIMIT" in reads[0][0]
+            and "ix_chat_messages_conversation_created" in plan and "TEMP B-TREE" not in plan
+        )
+        print(f"History reads: {len(reads)}, plan: {plan} - {'✅' if query_ok else '❌'}")
+
+        # Per-message latency is the same for short and very long conversations
+        await send_timed(client, student, small)  # Warm up
+        small_ms = statistics.median(await send_timed(client, student, small)) * 1000
+        large_ms = statistics.median(await send_timed(client, student, large)) * 1000
+        flat_ok = large_ms < small_ms * 1.5 + 5
+        print(f"send-message median: {small_ms:.1f} ms at 10 messages, {large_ms:.1f} ms at 10,000 - "
+              f"{'✅' if flat_ok else '❌'}")
+
+    # The truncator never goes over budget and keeps whole messages, newest first
+    sample = [ChatMessage(id=i, content=content) for i, content in enumerate(["a" * 40, "b" * 400, "c" * 40, "d" * 40])]
+    tail = sum(estimate_tokens(m.content) for m in sample[2:])
+    truncate_ok = (
+        [m.id for m in fit_history(sample, tail)] == [2, 3]
+        and [m.id for m in fit_history(sample, tail - 1)] == [3]
+        and fit_history(sample, 10_000) == sample
+        and fit_history([ChatMessage(content="x" * 4000)], 100) == []
+    )
+    print(f"fit_history keeps the newest messages within the budget - {'✅' if truncate_ok else '❌'}")
+
+    return window_ok and query_ok and flat_ok and truncate_ok
+
+
+async def main():
+    try:
+        ok = await test_history_window()
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Chat history reads stay bounded" if ok else "\n❌ Chat history problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
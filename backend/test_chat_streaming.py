@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test for POST /api/chat/stream against a local stub LLM (stub_llm_server.py).
+
+Serves the stub and the API over real sockets (httpx.ASGITransport would buffer
+the whole response), streams a reply, and reports time to first byte and to
+first token separately from total latency, next to the blocking send-message
+endpoint. Checks that tokens arrive while the completion is still being
+generated and that the assistant message is saved once the stream ends.
+
+Runs against a throwaway SQLite database:
+    python test_chat_streaming.py
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from stub_llm_server import ServerThread, create_app, free_port, reply_tokens
+
+TOKEN_DELAY = 0.02
+LLM_PORT = free_port()
+
+import testkit
+
+testkit.use_throwaway_database("chat-streaming")
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{LLM_PORT}/v1"
+os.environ["OPENAI_API_KEY"] = "stub-key"
+
+import httpx
+from sqlalchemy import select
+
+from database import engine
+from models import ChatMessage, MessageRole
+
+
+async def read_events(response: httpx.Response, started: float):
+    """(event, data, seconds since started) for each SSE event in the response"""
+    event, data = None, []
+    async for line in response.aiter_lines():
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+        elif not line and event:
+            yield event, json.loads("\n".join(data)), time.perf_counter() - started
+            event, data = None, []
+
+
+async def stream_reply(client, headers, content: str, conversation_id=None) -> dict:
+    started = time.perf_counter()
+    timings = {}
+    events = []
+    async with client.stream("POST", "/api/chat/stream", headers=headers, json={
+        "content": content, "conversation_id": conversation_id,
+    }) as response:
+        assert response.status_code == 200, await response.aread()
+        assert response.headers["content-type"].startswith("text/event-stream")
+        async for event, data, at in read_events(response, started):
+            timings.setdefault("first_byte", at)
+            if event == "token":
+                timings.setdefault("first_token", at)
+            events.append((event, data))
+    timings["total"] = time.perf_counter() - started
+    return {"events": events, "timings": timings}
+
+
+async def test_streaming(base_url: str, llm_app) -> bool:
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        r = await client.post("/api/auth/register", json={
+            "name": "Student", "email": "student@example.com", "password": "S3cretp@ss!", "role": "student",
+        })
+        assert r.status_code == 200, r.text
+        student = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        # Blocking endpoint: nothing arrives until the whole completion is done
+        started = time.perf_counter()
+        r = await client.post("/api/chat/send-message", headers=student, json={"content": "Resume tips"})
+        blocking_total = time.perf_counter() - started
+        assert r.status_code == 200, r.text
+        print(f"send-message: first byte {blocking_total * 1000:.0f} ms = total {blocking_total * 1000:.0f} ms")
+
+        question = "How should I prepare for interviews?"
+        expected = reply_tokens([{"role": "user", "content": question}])
+        reply = await stream_reply(client, student, question)
+        events, timings = reply["events"], reply["timings"]
+        names = [event for event, _ in events]
+        print(f"stream: first byte {timings['first_byte'] * 1000:.0f} ms, "
+              f"first token {timings['first_token'] * 1000:.0f} ms, total {timings['total'] * 1000:.0f} ms "
+              f"({names.count('token')} tokens)")
+
+        protocol_ok = (
+            names[0] == "start" and names[-1] == "done"
+            and names[1:-1] == ["token"] * len(expected)
+            and [data["content"] for event, data in events if event == "token"] == expected
+        )
+        print(f"Events: start, {len(expected)} tokens, done - {'✅' if protocol_ok else '❌'}")
+
+        # Generating the reply takes len(expected) * TOKEN_DELAY; the first token must not wait for it
+        generation = len(expected) * TOKEN_DELAY
+        incremental_ok = timings["first_token"] < generation / 2 and timings["total"] >= generation
+        print(f"First token before the completion finished ({generation * 1000:.0f} ms to generate) - "
+              f"{'✅' if incremental_ok else '❌'}")
+
+        done = events[-1][1]
+        server_timing = done["timing"]
+        timing_ok = 0 < server_timing["first_token_ms"] < server_timing["total_ms"]
+        print(f"Server-side timing: first token {server_timing['first_token_ms']} ms, "
+              f"total {server_timing['total_ms']} ms - {'✅' if timing_ok else '❌'}")
+
+        conversation_id = events[0][1]["conversation_id"]
+        with engine.connect() as connection:
+            saved = connection.execute(
+                select(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+                .where(ChatMessage.conversation_id == conversation_id)
+                .order_by(ChatMessage.id)
+            ).all()
+        persisted_ok = (
+            [(role, content) for _, role, content in saved]
+            == [(MessageRole.USER, question), (MessageRole.ASSISTANT, "".join(expected))]
+            and saved[-1][0] == done["message"]["id"]
+        )
+        print(f"Assistant message saved after the stream - {'✅' if persisted_ok else '❌'}")
+
+        # A follow-up in the same conversation carries the history to the model
+        requests_before = llm_app.state.requests
+        reply = await stream_reply(client, student, "And for group discussions?", conversation_id)
+        follow_up_ok = (
+            reply["events"][-1][0] == "done"
+            and reply["events"][0][1]["conversation_id"] == conversation_id
+            and llm_app.state.requests == requests_before + 1
+        )
+        print(f"Follow-up streamed in the same conversation - {'✅' if follow_up_ok else '❌'}")
+
+    return protocol_ok and incremental_ok and timing_ok and persisted_ok and follow_up_ok
+
+
+async def main():
+    from main import app
+
+    testkit.create_schema()
+    llm_app = create_app(token_delay=TOKEN_DELAY)
+    app_port = free_port()
+    with ServerThread(llm_app, LLM_PORT), ServerThread(app, app_port):
+        ok = await test_streaming(f"http://127.0.0.1:{app_port}", llm_app)
+
+    print("\n🎉 Chat replies stream token by token" if ok else "\n❌ Chat streaming problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
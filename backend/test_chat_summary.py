@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test for rolling chat summaries (chat_context.refresh_summary).
+
+Holds two 30-turn conversations through POST /api/chat/send-message with an
+in-process LLM backend, one with summaries and one without, and compares the
+prompt_tokens recorded on the replies. Checks that the prompt becomes system
+prompt + summary + the turns after it, that summaries are refreshed only when
+the unsummarized history goes over the threshold (streamed replies included),
+and that one conversation is never summarized twice at once.
+
+Runs against a throwaway SQLite database:
+    python test_chat_summary.py
+"""
+
+import asyncio
+import statistics
+
+import testkit
+
+testkit.use_throwaway_database("chat-summary")
+
+import httpx
+from sqlalchemy import select
+
+from chat_context import SUMMARY_PROMPT, refresh_summary
+from config import settings
+from database import engine, async_engine
+from llm_client import LLMBackend, set_llm_backend
+from models import ChatConversation, ChatMessage
+
+TURNS = 30
+REPLY = "Focus on data structures, revise your projects and practise explaining trade-offs out loud. " * 4
+
+
+class ScriptedBackend(LLMBackend):
+    """Canned replies and summaries; keeps the last chat prompt"""
+
+    def __init__(self):
+        self.summary_calls = 0
+        self.prompt = []
+
+    async def complete(self, payload: dict, timeout: float) -> str:
+        if payload["messages"][0]["content"] == SUMMARY_PROMPT:
+            self.summary_calls += 1
+            await asyncio.sleep(0.01)
+            return f"Summary {self.summary_calls}: the student is preparing for backend interviews."
+        self.prompt = payload["messages"]
+        return REPLY
+
+    async def stream(self, payload: dict, timeout: float):
+        self.prompt = payload["messages"]
+        for word in REPLY.split(" "):
+            yield word + " "
+
+
+def conversation_row(conversation_id: int):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(ChatConversation.summary, ChatConversation.summary_through_message_id)
+            .where(ChatConversation.id == conversation_id)
+        ).one()
+
+
+async def hold_conversation(client, headers) -> tuple:
+    """(conversation id, prompt_tokens of each reply)"""
+    conversation_id = None
+    tokens = []
+    for turn in range(TURNS):
+        r = await client.post("/api/chat/send-message", headers=headers, json={
+            "content": f"Turn {turn}: what else should I prepare for my interviews next week?",
+            "conversation_id": conversation_id,
+        })
+        assert r.status_code == 200, r.text
+        conversation_id = r.json()["conversation_id"]
+        tokens.append(r.json()["prompt_tokens"])
+    return conversation_id, tokens
+
+
+async def test_summaries() -> bool:
+    from main import app
+
+    testkit.create_schema()
+    backend = ScriptedBackend()
+    set_llm_backend(backend)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        r = await client.post("/api/auth/register", json={
+            "name": "Student", "email": "student@example.com", "password": "S3cretp@ss!", "role": "student",
+        })
+        assert r.status_code == 200, r.text
+        student = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        trigger = settings.chat_summary_trigger_tokens
+        settings.chat_summary_trigger_tokens = 0
+        _, unsummarized = await hold_conversation(client, student)
+        settings.chat_summary_trigger_tokens = trigger
+        summarized_id, summarized = await hold_conversation(client, student)
+
+        # Prompt sizes: the summarized conversation levels off well below the budget-capped one
+        before = statistics.mean(unsummarized[-10:])
+        after = statistics.mean(summarized[-10:])
+        savings_ok = after < 0.6 * before and max(summarized) < settings.chat_context_token_budget
+        print(f"Prompt tokens over the last 10 turns: {before:.0f} without summaries, {after:.0f} with - "
+              f"{'✅' if savings_ok else '❌'}")
+
+        with engine.connect() as connection:
+            recorded = connection.execute(
+                select(ChatMessage.prompt_tokens).where(
+                    ChatMessage.conversation_id == summarized_id, ChatMessage.role == "ASSISTANT"
+                ).order_by(ChatMessage.id)
+            ).scalars().all()
+        recorded_ok = recorded == summarized
+        print(f"prompt_tokens recorded on all {len(recorded)} replies - {'✅' if recorded_ok else '❌'}")
+
+        # The last prompt: system prompt, summary, then only the newest turns
+        with engine.connect() as connection:
+            contents = connection.execute(
+                select(ChatMessage.content).where(ChatMessage.conversation_id == summarized_id).order_by(ChatMessage.id)
+            ).scalars().all()
+        prompt = backend.prompt
+        recent = [m["content"] for m in prompt[2:]]
+        shape_ok = (
+            prompt[1]["role"] == "system" and "Summary of the conversation so far" in prompt[1]["content"]
+            and recent == contents[-len(recent) - 1:-1]  # Up to the reply to this prompt
+            and settings.chat_summary_keep_messages < len(recent) < len(contents) - 1
+        )
+        print(f"Prompt: system + summary + last {len(recent)} of {len(contents) - 1} messages - "
+              f"{'✅' if shape_ok else '❌'}")
+
+        _, through_id = conversation_row(summarized_id)
+        refreshes_ok = 0 < backend.summary_calls <= TURNS // 3
+        print(f"{backend.summary_calls} summary refreshes over {TURNS} turns - {'✅' if refreshes_ok else '❌'}")
+
+        # A streamed reply schedules its refresh for after the stream
+        calls_before = backend.summary_calls
+        for turn in range(8):
+            r = await client.post("/api/chat/stream", headers=student, json={
+                "content": f"Streamed turn {turn}: any tips for group discussions?", "conversation_id": summarized_id,
+            })
+            assert r.status_code == 200 and "event: done" in r.text, r.text
+        stream_ok = backend.summary_calls > calls_before and conversation_row(summarized_id)[1] > through_id
+        print(f"Streamed turns refreshed the summary {backend.summary_calls - calls_before} time(s) - "
+              f"{'✅' if stream_ok else '❌'}")
+
+    # Overlapping refreshes of one conversation make a single summary call
+    calls_before = backend.summary_calls
+    await asyncio.gather(*(refresh_summary(summarized_id) for _ in range(3)))
+    single_ok = backend.summary_calls == calls_before + 1
+    print(f"3 overlapping refreshes -> {backend.summary_calls - calls_before} summary call - "
+          f"{'✅' if single_ok else '❌'}")
+
+    return savings_ok and recorded_ok and shape_ok and refreshes_ok and stream_ok and single_ok
+
+
+async def main():
+    try:
+        ok = await test_summaries()
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Rolling summaries keep prompts small" if ok else "\n❌ Chat summary problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
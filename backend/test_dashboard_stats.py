@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test for the TPO dashboard statistics (dashboard_stats.py, GET /api/users/dashboard/stats).
+
+The figures must come from one aggregate statement that agrees with counting
+each table separately, repeat requests within the TTL must run no SQL, and
+concurrent misses must share one computation. Registering, posting a job and
+applying must invalidate the cache so the next request recomputes, and a
+result that an invalidation overtook mid-query must not be cached.
+
+Runs against a throwaway SQLite database:
+    python test_dashboard_stats.py [--students 500]
+"""
+
+import argparse
+import asyncio
+
+import testkit
+
+testkit.use_throwaway_database("dashboard-stats")
+
+import httpx
+from sqlalchemy import func, insert, select
+
+from database import engine, async_engine
+from dashboard_stats import DashboardStatsCache, dashboard_stats_cache
+from models import User, UserRole, StudentProfile, Job, JobCategory, Application
+from testkit import StatementRecorder, token_headers
+
+URL = "/api/users/dashboard/stats"
+
+
+def seed(students: int):
+    testkit.create_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"name": f"Student {i}", "email": f"s{i}@example.com", "role": UserRole.STUDENT, "company_name": None,
+             "is_active": True}
+            for i in range(students)
+        ] + [
+            {"name": "TPO", "email": "tpo@example.com", "role": UserRole.TPO, "company_name": None, "is_active": True},
+            {"name": "Acme", "email": "r@acme.example.com", "role": UserRole.COMPANY, "company_name": "Acme",
+             "is_active": True},
+            {"name": "Gone", "email": "r@gone.example.com", "role": UserRole.COMPANY, "company_name": "Gone",
+             "is_active": False},
+        ])
+        student_ids = connection.execute(select(User.id).where(User.role == UserRole.STUDENT)).scalars().all()
+        connection.execute(insert(StudentProfile), [
+            {"user_id": user_id, "cgpa": 8.0, "backlogs": 0, "placed_final": i % 10 == 0}
+            for i, user_id in enumerate(student_ids)
+        ])
+        connection.execute(insert(Job), [
+            {"title": f"Role {i}", "company_name": "Acme", "package_lpa": 10.0, "category": JobCategory.TIER2,
+             "min_cgpa": 0.0, "max_backlogs": 999, "is_active": i % 4 != 0}
+            for i in range(20)
+        ])
+
+
+def counted_separately() -> dict:
+    with engine.connect() as connection:
+        def count(query):
+            return connection.execute(query).scalar()
+
+        return {
+            "totalStudents": count(select(func.count()).where(User.role == UserRole.STUDENT)),
+            "placedStudents": count(select(func.count()).where(StudentProfile.placed_final == True)),
+            "activeCompanies": count(select(func.count()).where(User.role == UserRole.COMPANY, User.is_active == True)),
+            "activeJobs": count(select(func.count()).where(Job.is_active == True)),
+            "totalApplications": count(select(func.count()).select_from(Application)),
+            "upcomingTests": 0,
+        }
+
+
+async def stats(client, tpo) -> tuple:
+    """(figures without computedAt, computedAt, statements run) for one request"""
+    with StatementRecorder() as recorder:
+        r = await client.get(URL, headers=tpo)
+    assert r.status_code == 200, r.text
+    figures = r.json()
+    return figures, figures.pop("computedAt"), len(recorder.statements)
+
+
+async def test_cached(client, tpo) -> bool:
+    dashboard_stats_cache.invalidate()
+    cold, computed_at, statements = await stats(client, tpo)
+    cold_ok = cold == counted_separately() and statements == 1
+    print(f"Cold: {cold} in {statements} statement, matching separate counts - {'✅' if cold_ok else '❌'}")
+
+    warm = [await stats(client, tpo) for _ in range(20)]
+    warm_ok = all(figures == cold and at == computed_at and count == 0 for figures, at, count in warm)
+    print(f"20 requests within the TTL: {sum(count for _, _, count in warm)} statements - {'✅' if warm_ok else '❌'}")
+
+    dashboard_stats_cache.invalidate()
+    with StatementRecorder() as recorder:
+        responses = await asyncio.gather(*(client.get(URL, headers=tpo) for _ in range(20)))
+    shared_ok = len(recorder.statements) == 1 and len({r.json()["computedAt"] for r in responses}) == 1
+    print(f"20 concurrent misses: {len(recorder.statements)} statement - {'✅' if shared_ok else '❌'}")
+    return cold_ok and warm_ok and shared_ok
+
+
+async def test_invalidation(client, tpo) -> bool:
+    before, _, _ = await stats(client, tpo)
+
+    r = await client.post("/api/auth/register", json={
+        "name": "New student", "email": "new@example.com", "password": "S3cretp@ss!", "role": "student",
+    })
+    student = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    registered, _, registered_statements = await stats(client, tpo)
+
+    r = await client.post("/api/jobs/", headers=token_headers(email="r@acme.example.com"), json={
+        "title": "Fresh role", "company_name": "Acme", "package_lpa": 10.0, "category": "tier2",
+    })
+    job_id = r.json()["id"]
+    posted, _, posted_statements = await stats(client, tpo)
+
+    r = await client.post("/api/applications/apply", headers=student, json={"job_id": job_id})
+    assert r.status_code == 200, r.text
+    applied, _, applied_statements = await stats(client, tpo)
+
+    ok = (
+        registered["totalStudents"] == before["totalStudents"] + 1
+        and posted["activeJobs"] == before["activeJobs"] + 1
+        and applied["totalApplications"] == before["totalApplications"] + 1
+        and registered_statements == posted_statements == applied_statements == 1
+        and applied == counted_separately()
+    )
+    print(f"Recomputed after register (students {before['totalStudents']} -> {registered['totalStudents']}), "
+          f"a new job (active jobs {before['activeJobs']} -> {posted['activeJobs']}) and an apply "
+          f"(applications {before['totalApplications']} -> {applied['totalApplications']}) - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_overtaken() -> bool:
+    cache = DashboardStatsCache(ttl_seconds=60)
+    computations = []
+
+    async def compute():
+        computations.append(None)
+        if len(computations) == 1:
+            cache.invalidate()  # Something committed while the first query ran
+        return {"n": len(computations)}
+
+    first = await cache.get_or_compute(compute)
+    second = await cache.get_or_compute(compute)
+    third = await cache.get_or_compute(compute)
+    ok = (first, second, third) == ({"n": 1}, {"n": 2}, {"n": 2})
+    print(f"A result overtaken by an invalidation is returned but not cached ({len(computations)} computations "
+          f"for 3 reads) - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_dashboard_stats(students: int) -> bool:
+    from main import app
+
+    seed(students)
+    tpo = token_headers(email="tpo@example.com")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        await client.get("/api/auth/me", headers=tpo)  # Warm the principal cache so authentication adds no SQL
+        cached_ok = await test_cached(client, tpo)
+        invalidation_ok = await test_invalidation(client, tpo)
+    overtaken_ok = await test_overtaken()
+    return cached_ok and invalidation_ok and overtaken_ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500)
+    args = parser.parse_args()
+
+    try:
+        ok = await test_dashboard_stats(args.students)
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Dashboard stats are one statement, cached and invalidated on change" if ok
+          else "\n❌ Dashboard stats problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
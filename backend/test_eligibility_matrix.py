@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Randomized equivalence test for the eligibility engines.
+Checks that the NumPy matrix and the SQL eligibility clause give exactly the
+same answer as the per-request apply checks for every student x job pair.
+
+Runs against a throwaway SQLite database:
+    python test_eligibility_matrix.py [--rounds 5] [--seed 1]
+"""
+
+import argparse
+import asyncio
+import random
+
+import testkit
+
+testkit.use_throwaway_database("eligibility")
+
+from sqlalchemy import select, insert
+
+from database import engine, AsyncSessionLocal, async_engine
+from models import User, UserRole, StudentProfile, Job, JobCategory, Skill, student_skills, job_skills
+from eligibility import ineligibility_reason, eligible_pair_clause
+from eligibility_matrix import load_columns, compute_matrix
+from placement_state import load_placement_state, skill_mask
+
+
+def seed_cohort(rng: random.Random, students: int, jobs: int):
+    """Random cohort that deliberately covers NULLs, internships and floors"""
+    testkit.create_schema(fresh=True)
+
+    with engine.begin() as connection:
+        vocabulary = rng.randint(1, 130)  # Crosses the 64-bit word boundary
+        connection.execute(insert(Skill), [{"name": f"skill-{i}"} for i in range(vocabulary)])
+        skill_ids = [row[0] for row in connection.execute(select(Skill.id))]
+
+        connection.execute(insert(User), [
+            {"name": f"S{i}", "email": f"s{i}@example.com", "role": UserRole.STUDENT}
+            for i in range(students)
+        ])
+        user_ids = [row[0] for row in connection.execute(select(User.id))]
+        connection.execute(insert(StudentProfile), [
+            {
+                "user_id": user_id,
+                "cgpa": rng.choice([None, 0.0, 6.5, 7.0, 7.5, 8.0, 9.9, round(rng.uniform(4, 10), 2)]),
+                "backlogs": rng.choice([None, 0, 1, 2, 5]),
+                "placed_final": rng.choice([None, False, False, False, True]),
+                "highest_accepted_package_lpa": rng.choice([None, None, 3.0, 8.0, 12.5, 15.0, 20.0]),
+                "upgrades_used": 0,
+            }
+            for user_id in user_ids
+        ])
+        profile_ids = [row[0] for row in connection.execute(select(StudentProfile.id))]
+        links = [
+            {"student_profile_id": p, "skill_id": s}
+            for p in profile_ids
+            for s in rng.sample(skill_ids, rng.randint(0, min(len(skill_ids), 12)))
+        ]
+        if links:
+            connection.execute(insert(student_skills), links)
+
+        connection.execute(insert(Job), [
+            {
+                "title": f"J{i}",
+                "company_name": "Acme",
+                "category": rng.choice(list(JobCategory)),
+                "package_lpa": rng.choice([None, 3.0, 8.0, 12.5, 15.0, 20.0, round(rng.uniform(3, 30), 1)]),
+                "min_cgpa": rng.choice([None, 0.0, 6.5, 7.0, 7.5, 8.0]),
+                "max_backlogs": rng.choice([None, 0, 1, 2, 999]),
+                "is_active": rng.random() < 0.85,
+            }
+            for i in range(jobs)
+        ])
+        job_ids = [row[0] for row in connection.execute(select(Job.id))]
+        links = [
+            {"job_id": j, "skill_id": s}
+            for j in job_ids
+            for s in rng.sample(skill_ids, rng.randint(0, min(len(skill_ids), 3)))
+        ]
+        if links:
+            connection.execute(insert(job_skills), links)
+
+
+async def per_request_answers() -> dict:
+    """(profile_id, job_id) -> eligible, using the apply endpoint's checks"""
+    answers = {}
+    async with AsyncSessionLocal() as db:
+        user_ids = (await db.execute(select(StudentProfile.user_id))).scalars().all()
+        jobs = (await db.execute(select(Job))).scalars().all()
+        required = {job.id: 0 for job in jobs}
+        for job_id, skill_id in (await db.execute(select(job_skills))).all():
+            required[job_id] |= skill_mask([skill_id])
+        for user_id in user_ids:
+            state = await load_placement_state(db, user_id)
+            for job in jobs:
+                eligible = bool(job.is_active) and await ineligibility_reason(db, state, job, required[job.id]) is None
+                answers[(state.profile_id, job.id)] = eligible
+    return answers
+
+
+async def sql_answers() -> set:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(StudentProfile.id, Job.id).select_from(StudentProfile).join(Job, eligible_pair_clause())
+        )
+        return set(result.all())
+
+
+def matrix_answers() -> set:
+    with engine.connect() as connection:
+        students, jobs = load_columns(connection)
+    matrix = compute_matrix(students, jobs, chunk=17)  # Small chunk exercises the chunk edges
+    return {
+        (int(students.profile_ids[i]), int(jobs.job_ids[j]))
+        for i, j in zip(*matrix.nonzero())
+    }
+
+
+async def test_equivalence(rounds: int, seed: int) -> bool:
+    rng = random.Random(seed)
+    ok = True
+    for round_no in range(rounds):
+        seed_cohort(rng, students=rng.randint(20, 80), jobs=rng.randint(5, 40))
+        expected = await per_request_answers()
+        expected_pairs = {pair for pair, eligible in expected.items() if eligible}
+
+        from_sql = await sql_answers()
+        from_matrix = matrix_answers()
+
+        sql_ok = from_sql == expected_pairs
+        matrix_ok = from_matrix == expected_pairs
+        print(
+            f"Round {round_no + 1}: {len(expected)} pairs, {len(expected_pairs)} eligible "
+            f"- SQL {'✅' if sql_ok else '❌'}  matrix {'✅' if matrix_ok else '❌'}"
+        )
+        if not sql_ok:
+            print(f"   SQL mismatches: {sorted(from_sql ^ expected_pairs)[:10]}")
+        if not matrix_ok:
+            print(f"   Matrix mismatches: {sorted(from_matrix ^ expected_pairs)[:10]}")
+        ok = ok and sql_ok and matrix_ok
+    return ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    ok = await test_equivalence(args.rounds, args.seed)
+    await async_engine.dispose()
+
+    print("\n🎉 Eligibility engines agree" if ok else "\n❌ Eligibility engines disagree")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
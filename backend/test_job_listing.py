@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test for the job listing (GET /api/jobs/, routers/jobs.py).
+
+Seeds jobs posted in bursts, so many share a created_at, and pages through
+them a few at a time: every active job must come back exactly once, newest
+first with ties broken by id, with and without the min_package and
+max_cgpa_requirement filters (a job with no minimum CGPA passes the latter,
+as it does eligibility). The filtered listing must walk the
+(is_active, created_at, id, package_lpa, min_cgpa) index without sorting,
+and a cursor naming no job is a 400 rather than an empty last page.
+
+Runs against a throwaway SQLite database:
+    python test_job_listing.py [--jobs 3000] [--page 37] [--seed 1]
+"""
+
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import testkit
+
+testkit.use_throwaway_database("job-listing")
+
+import httpx
+from sqlalchemy import func, insert, or_, select
+
+from database import engine, async_engine
+from models import Job, JobCategory
+from testkit import StatementRecorder
+
+FILTERS = [
+    {},
+    {"min_package": 12.0},
+    {"max_cgpa_requirement": 6.0},
+    {"min_package": 8.0, "max_cgpa_requirement": 7.0},
+    {"category": "tier1", "min_package": 20.0},
+]
+
+
+def seed(jobs: int, rng: random.Random):
+    testkit.create_schema()
+    started = datetime(2026, 9, 1, 9, 0, 0)
+    with engine.begin() as connection:
+        connection.execute(insert(Job), [
+            {
+                "title": f"Role {i}", "company_name": f"Company {i % 25}",
+                "package_lpa": package, "category": category_for(package),
+                "min_cgpa": rng.choice([None, 0.0, 6.0, 6.5, 7.0, 8.0]), "max_backlogs": 999,
+                "is_active": rng.random() < 0.9,
+                # About 20 jobs a second, in no particular id order
+                "created_at": started + timedelta(seconds=rng.randrange(max(1, jobs // 20))),
+            }
+            for i, package in enumerate(round(rng.uniform(3.0, 30.0), 1) for _ in range(jobs))
+        ])
+
+
+def category_for(package: float) -> JobCategory:
+    if package >= 15.0:
+        return JobCategory.TIER1
+    return JobCategory.TIER2 if package >= 8.0 else JobCategory.TIER3
+
+
+def expected_ids(filters: dict) -> list:
+    query = select(Job.id).where(Job.is_active == True).order_by(Job.created_at.desc(), Job.id.desc())
+    if "min_package" in filters:
+        query = query.where(Job.package_lpa >= filters["min_package"])
+    if "max_cgpa_requirement" in filters:
+        query = query.where(or_(Job.min_cgpa.is_(None), Job.min_cgpa <= filters["max_cgpa_requirement"]))
+    if "category" in filters:
+        query = query.where(Job.category == JobCategory(filters["category"]))
+    with engine.connect() as connection:
+        return connection.execute(query).scalars().all()
+
+
+async def walk(client, filters: dict, page: int) -> list:
+    seen, cursor = [], None
+    while True:
+        r = await client.get("/api/jobs/", params={**filters, "limit": page, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200, r.text
+        body = r.json()
+        seen.extend(item["id"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+async def test_paging(client, page: int) -> bool:
+    with engine.connect() as connection:
+        burst_sizes = connection.execute(
+            select(func.count()).where(Job.is_active == True).group_by(Job.created_at)
+        ).scalars().all()
+    print(f"{sum(burst_sizes)} active jobs share {len(burst_sizes)} created_at values, up to {max(burst_sizes)} each")
+    ok = True
+    for filters in FILTERS:
+        seen, expected = await walk(client, filters, page), expected_ids(filters)
+        filter_ok = seen == expected and len(expected) > page
+        ok = ok and filter_ok
+        print(f"{filters or 'No filters'}: {len(seen)} jobs in pages of {page}, each once, newest first - "
+              f"{'✅' if filter_ok else '❌'}")
+    return ok
+
+
+async def test_filter_plans(client) -> bool:
+    with StatementRecorder() as recorder:
+        r = await client.get("/api/jobs/", params={"min_package": 12.0, "max_cgpa_requirement": 6.0, "limit": 20})
+        cursor = r.json()["next_cursor"]
+        await client.get("/api/jobs/", params={"min_package": 12.0, "max_cgpa_requirement": 6.0, "limit": 20, "cursor": cursor})
+    listings = [(s, p) for s, p, _ in recorder.statements if "FROM jobs" in s and "ORDER BY" in s]
+    ok = len(listings) == 2
+    with engine.connect() as connection:
+        for label, (statement, parameters) in zip(("First filtered page", "Next filtered page"), listings):
+            plan = " | ".join(row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+            plan_ok = "ix_jobs_active_created_id_package_cgpa" in plan and "TEMP B-TREE" not in plan
+            ok = ok and plan_ok
+            print(f"{label}: {plan} - {'✅' if plan_ok else '❌'}")
+    return ok
+
+
+async def test_cursors(client) -> bool:
+    with engine.connect() as connection:
+        oldest = connection.execute(
+            select(Job.id).where(Job.is_active == True).order_by(Job.created_at, Job.id).limit(1)
+        ).scalar()
+        missing = connection.execute(select(Job.id).order_by(Job.id.desc()).limit(1)).scalar() + 1000
+    r = await client.get("/api/jobs/", params={"cursor": missing})
+    unknown = r.status_code
+    r = await client.get("/api/jobs/", params={"cursor": oldest})
+    last = r.status_code, r.json()
+    ok = unknown == 400 and last == (200, {"items": [], "next_cursor": None})
+    print(f"Unknown cursor -> {unknown}; the oldest job as cursor -> {last[0]} with an empty last page - "
+          f"{'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_job_listing(jobs: int, page: int, seed_value: int) -> bool:
+    from main import app
+
+    seed(jobs, random.Random(seed_value))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        paging_ok = await test_paging(client, page)
+        plans_ok = await test_filter_plans(client)
+        cursors_ok = await test_cursors(client)
+    return paging_ok and plans_ok and cursors_ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=3000)
+    parser.add_argument("--page", type=int, default=37)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        ok = await test_job_listing(args.jobs, args.page, args.seed)
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Job listing pages exactly, filters are index-backed" if ok else "\n❌ Job listing problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test for the async LLM client (llm_client.py) against a local stub LLM server.
+
+Checks that chat completions no longer stall the event loop - /health stays
+fast and concurrent send-message calls overlap - and that the client reuses
+pooled connections, caps completions in flight, bounds each attempt with a
+timeout and retries 503s with backoff, but never retries a stream that has
+already produced tokens.
+
+Runs against a throwaway SQLite database:
+    python test_llm_client.py
+"""
+
+import asyncio
+import os
+import time
+
+from stub_llm_server import ServerThread, create_app, free_port, reply_tokens
+
+TOKEN_DELAY = 0.02
+LLM_PORT = free_port()
+
+import testkit
+
+testkit.use_throwaway_database("llm-client")
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{LLM_PORT}/v1"
+os.environ["OPENAI_API_KEY"] = "stub-key"
+
+import httpx
+
+from llm_client import LLMBackend, LLMClient, LLMError, OpenAIBackend
+
+PROMPT = [{"role": "user", "content": "Resume tips"}]
+
+
+class BrokenStreamBackend(LLMBackend):
+    """Streams one token, then drops the connection"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def stream(self, payload: dict, timeout: float):
+        self.calls += 1
+        yield "Hello"
+        raise httpx.RemoteProtocolError("peer closed connection")
+
+
+async def test_event_loop(base_url: str, llm_app) -> bool:
+    """Concurrent chats overlap and other requests are served meanwhile"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        r = await client.post("/api/auth/register", json={
+            "name": "Student", "email": "student@example.com", "password": "S3cretp@ss!", "role": "student",
+        })
+        assert r.status_code == 200, r.text
+        student = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        generation = len(reply_tokens(PROMPT)) * TOKEN_DELAY
+        health_latencies = []
+        done = asyncio.Event()
+
+        async def poll_health():
+            while not done.is_set():
+                started = time.perf_counter()
+                r = await client.get("/health")
+                assert r.status_code == 200
+                health_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.02)
+
+        async def chat(i: int):
+            r = await client.post("/api/chat/send-message", headers=student, json={"content": f"Question {i}"})
+            assert r.status_code == 200, r.text
+            return r.json()["content"]
+
+        poller = asyncio.create_task(poll_health())
+        started = time.perf_counter()
+        replies = await asyncio.gather(*(chat(i) for i in range(8)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await poller
+
+        replies_ok = all(reply.startswith("Thanks for asking about Question") for reply in replies)
+        overlap_ok = elapsed < 2 * generation + 0.5
+        health_ok = max(health_latencies) < 0.25
+        print(f"8 concurrent send-message: {elapsed * 1000:.0f} ms for {generation * 1000:.0f} ms completions - "
+              f"{'✅' if replies_ok and overlap_ok else '❌'}")
+        print(f"/health during chats: max {max(health_latencies) * 1000:.0f} ms over {len(health_latencies)} "
+              f"requests - {'✅' if health_ok else '❌'}")
+
+        # The stub sheds the next two requests; send-message still gets the real reply
+        from llm_client import get_llm_client
+        retries_before = get_llm_client().retries
+        llm_app.state.fail_next = 2
+        reply = await chat(99)
+        retry_ok = reply.startswith("Thanks for asking") and get_llm_client().retries == retries_before + 2
+        print(f"Two 503s retried with backoff: {get_llm_client().retries - retries_before} retries - "
+              f"{'✅' if retry_ok else '❌'}")
+
+    return replies_ok and overlap_ok and health_ok and retry_ok
+
+
+async def test_client(llm_app) -> bool:
+    """Pooling, concurrency cap, timeouts and stream retries on LLMClient itself"""
+    base_url = f"http://127.0.0.1:{LLM_PORT}/v1"
+
+    client = LLMClient(OpenAIBackend(base_url, max_connections=4), model="stub", max_concurrency=4)
+    try:
+        ports_before = set(llm_app.state.client_ports)
+        for _ in range(10):
+            await client.complete(PROMPT, max_tokens=2)
+        new_ports = llm_app.state.client_ports - ports_before
+        pooled_ok = len(new_ports) == 1
+        print(f"10 sequential completions over {len(new_ports)} connection(s) - {'✅' if pooled_ok else '❌'}")
+
+        llm_app.state.peak_in_flight = 0
+        await asyncio.gather(*(client.complete(PROMPT, max_tokens=5) for _ in range(12)))
+        capped_ok = llm_app.state.peak_in_flight == 4 and client.in_flight == 0
+        print(f"12 concurrent completions, limit 4: peak {llm_app.state.peak_in_flight} in flight - "
+              f"{'✅' if capped_ok else '❌'}")
+    finally:
+        await client.aclose()
+
+    # Each attempt is cut off at its timeout, and a timed-out attempt is retried once
+    client = LLMClient(
+        OpenAIBackend(base_url), model="stub", timeout_seconds=0.2, max_retries=1, backoff_seconds=0.05,
+    )
+    started = time.perf_counter()
+    try:
+        await client.complete(PROMPT)
+        timed_out = False
+    except LLMError:
+        timed_out = True
+    finally:
+        await client.aclose()
+    elapsed = time.perf_counter() - started
+    generation = len(reply_tokens(PROMPT)) * TOKEN_DELAY
+    timeout_ok = timed_out and client.retries == 1 and elapsed < generation
+    print(f"Timed out after {elapsed * 1000:.0f} ms and {client.retries} retry "
+          f"(completion takes {generation * 1000:.0f} ms) - {'✅' if timeout_ok else '❌'}")
+
+    # Tokens already relayed cannot be taken back, so a broken stream is not retried
+    backend = BrokenStreamBackend()
+    client = LLMClient(backend, model="stub", backoff_seconds=0)
+    received = []
+    try:
+        async for delta in client.stream(PROMPT):
+            received.append(delta)
+        stream_failed = False
+    except LLMError:
+        stream_failed = True
+    stream_ok = stream_failed and received == ["Hello"] and backend.calls == 1 and client.in_flight == 0
+    print(f"Stream broken after its first token fails without a retry - {'✅' if stream_ok else '❌'}")
+
+    return pooled_ok and capped_ok and timeout_ok and stream_ok
+
+
+async def main():
+    from main import app
+
+    testkit.create_schema()
+    llm_app = create_app(token_delay=TOKEN_DELAY)
+    app_port = free_port()
+    with ServerThread(llm_app, LLM_PORT), ServerThread(app, app_port):
+        loop_ok = await test_event_loop(f"http://127.0.0.1:{app_port}", llm_app)
+        client_ok = await test_client(llm_app)
+
+    ok = loop_ok and client_ok
+    print("\n🎉 LLM calls are async, pooled, bounded and retried" if ok else "\n❌ LLM client problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Test for notifications (notifications.py, routers/notifications.py).
+
+Seeds 20,000 students, posts a job through POST /api/jobs/ and lets the task
+queue announce it. Checks that the fan-out is one INSERT ... SELECT however
+many students are eligible, that exactly the eligible students are notified
+once each (a retried task adds nothing) and that only the posting company
+may list them, that the unread count is a read of the counter alone, that
+keyset pages walk a long list without gaps or repeats, and that status
+changes and offer acceptance notify the right users.
+Counters are compared with the notifications themselves at the end.
+
+Runs against a throwaway SQLite database:
+    python test_notifications.py [--students 20000] [--seed 1]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import testkit
+
+testkit.use_throwaway_database("notifications")
+
+import httpx
+from sqlalchemy import func, insert, select
+
+from database import engine, async_engine, AsyncSessionLocal
+from eligibility import eligible_students_query
+from models import (
+    User, UserRole, StudentProfile, Notification, NotificationType, NotificationPriority,
+    notification_counters,
+)
+from notifications import notify, notify_eligible_students
+from task_queue import task_pool
+from testkit import StatementRecorder, token_headers, user_id, wait_for_tasks
+
+
+def seed(students: int, rng: random.Random):
+    testkit.create_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"name": f"Student {i}", "email": f"s{i}@example.com", "role": UserRole.STUDENT, "company_name": None}
+            for i in range(students)
+        ] + [
+            {"name": "TPO", "email": "tpo@example.com", "role": UserRole.TPO, "company_name": None},
+            {"name": "Recruiter A", "email": "a@acme.example.com", "role": UserRole.COMPANY, "company_name": "Acme"},
+            {"name": "Recruiter B", "email": "b@acme.example.com", "role": UserRole.COMPANY, "company_name": "Acme"},
+            {"name": "Other recruiter", "email": "r@globex.example.com", "role": UserRole.COMPANY, "company_name": "Globex"},
+        ])
+        student_ids = connection.execute(select(User.id).where(User.role == UserRole.STUDENT)).scalars().all()
+        connection.execute(insert(StudentProfile), [
+            {
+                "user_id": user_id,
+                "cgpa": round(rng.uniform(5, 10), 2),
+                "backlogs": rng.choice([0, 0, 0, 1, 3]),
+                "placed_final": rng.random() < 0.05,
+                "upgrades_used": 0,
+            }
+            for user_id in student_ids
+        ])
+
+
+async def post_job(client, headers, title: str, min_cgpa: float) -> int:
+    r = await client.post("/api/jobs/", headers=headers, json={
+        "title": title, "company_name": "Acme", "package_lpa": 10.0, "category": "tier2", "min_cgpa": min_cgpa,
+        "max_backlogs": 1,
+    })
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def counters_match() -> bool:
+    with engine.connect() as connection:
+        actual = dict(connection.execute(
+            select(Notification.user_id, func.count()).where(Notification.is_read == False).group_by(Notification.user_id)
+        ).all())
+        counted = {user: unread for user, unread in connection.execute(select(notification_counters)).all() if unread}
+    return actual == counted
+
+
+async def test_fan_out(client, company, other_company, students: int) -> tuple:
+    started = time.perf_counter()
+    with StatementRecorder() as recorder:
+        job_id = await post_job(client, company, "Backend Engineer", 7.0)
+        post_ms = (time.perf_counter() - started) * 1000
+        await wait_for_tasks("notify_new_job")
+    total_ms = (time.perf_counter() - started) * 1000
+
+    inserts = [(s, many) for s, _, many in recorder.statements if s.lstrip().upper().startswith("INSERT INTO NOTIFICATIONS")]
+    async with AsyncSessionLocal() as db:
+        eligible = set((await db.execute(
+            eligible_students_query(job_id).with_only_columns(StudentProfile.user_id)
+        )).scalars().all())
+    with engine.connect() as connection:
+        notified = connection.execute(
+            select(Notification.user_id, func.count()).where(Notification.job_id == job_id).group_by(Notification.user_id)
+        ).all()
+    set_based_ok = len(inserts) == 1 and "SELECT" in inserts[0][0] and not inserts[0][1]
+    print(f"POST /api/jobs/ returned in {post_ms:.0f} ms; announced to {len(notified)} of {students} students "
+          f"{total_ms:.0f} ms after the post, with {len(inserts)} INSERT ... SELECT - {'✅' if set_based_ok else '❌'}")
+
+    exact_ok = {user for user, _ in notified} == eligible and all(count == 1 for _, count in notified) and len(eligible) > 0
+    print(f"Exactly the {len(eligible)} eligible students notified, once each - {'✅' if exact_ok else '❌'}")
+
+    r = await client.get(f"/api/eligibility/jobs/{job_id}/students", headers=company, params={"limit": 1000})
+    own_listing = r.status_code
+    listed = {item["user_id"] for item in r.json()["items"]}
+    r = await client.get(f"/api/eligibility/jobs/{job_id}/students", headers=other_company)
+    listing_ok = own_listing == 200 and listed <= eligible and len(listed) == min(1000, len(eligible)) and r.status_code == 403
+    print(f"Acme lists the job's eligible students ({own_listing}), Globex may not ({r.status_code}) - "
+          f"{'✅' if listing_ok else '❌'}")
+
+    async with AsyncSessionLocal() as db:
+        again = await notify_eligible_students(db, job_id)
+        await db.commit()
+    retry_ok = again == 0 and counters_match()
+    print(f"A retried fan-out adds nothing, counters match - {'✅' if retry_ok else '❌'}")
+    return set_based_ok and exact_ok and listing_ok and retry_ok, sorted(eligible)
+
+
+async def test_listing(client, student_id: int, headers) -> bool:
+    # A long list: three more jobs, plus older notifications written directly
+    async with AsyncSessionLocal() as db:
+        await notify(db, [
+            {"user_id": student_id, "type": NotificationType.SYSTEM, "priority": NotificationPriority.LOW,
+             "title": f"Reminder {i}", "message": "Complete your profile"}
+            for i in range(120)
+        ])
+        await db.commit()
+
+    with StatementRecorder() as recorder:
+        r = await client.get("/api/notifications/unread-count", headers=headers)
+    unread = r.json()["unread_count"]
+    reads = [s for s, _, _ in recorder.statements if "notification" in s]
+    badge_ok = r.status_code == 200 and unread == 121 and len(reads) == 1 and "FROM notification_counters" in reads[0]
+    print(f"Unread badge: {unread}, read with {len(reads)} statement on notification_counters - "
+          f"{'✅' if badge_ok else '❌'}")
+
+    seen, cursor, pages = [], None, 0
+    with StatementRecorder() as recorder:
+        while True:
+            r = await client.get("/api/notifications/", headers=headers, params={"limit": 50, **({"cursor": cursor} if cursor else {})})
+            assert r.status_code == 200, r.text
+            page = r.json()
+            pages += 1
+            seen.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    listing = next(s for s, _, _ in recorder.statements if "FROM notifications" in s and "ORDER BY" in s)
+    with engine.connect() as connection:
+        plan = " | ".join(row[-1] for row in connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + listing, next(p for s, p, _ in recorder.statements if s == listing)
+        ))
+    pages_ok = (
+        len(seen) == 121 and seen == sorted(set(seen), reverse=True) and pages == 3
+        and "ix_notifications_user_id_id" in plan and "TEMP B-TREE" not in plan
+    )
+    print(f"Keyset listing: {len(seen)} notifications in {pages} pages, newest first, plan: {plan} - "
+          f"{'✅' if pages_ok else '❌'}")
+
+    r = await client.get("/api/notifications/", headers=headers, params={"unread_only": True, "limit": 200})
+    unread_only_ok = len(r.json()["items"]) == 121 and r.json()["unread_count"] == 121
+    return badge_ok and pages_ok and unread_only_ok
+
+
+async def test_reading(client, headers, other) -> bool:
+    r = await client.get("/api/notifications/", headers=headers, params={"limit": 3})
+    first, second, third = (item["id"] for item in r.json()["items"])
+
+    r = await client.post(f"/api/notifications/{first}/read", headers=headers)
+    once = r.json()["unread_count"]
+    r = await client.post(f"/api/notifications/{first}/read", headers=headers)
+    twice = r.json()["unread_count"]
+    r = await client.post(f"/api/notifications/{second}/read", headers=other)
+    not_theirs = r.status_code
+    r = await client.delete(f"/api/notifications/{third}", headers=headers)
+    deleted = r.json()["unread_count"]
+    read_ok = once == 120 and twice == 120 and not_theirs == 404 and deleted == 119
+    print(f"Read: 121 -> {once}, read again -> {twice}, delete unread -> {deleted}, "
+          f"other user gets {not_theirs} - {'✅' if read_ok else '❌'}")
+
+    r = await client.post("/api/notifications/read-all", headers=headers)
+    all_ok = r.json() == {"marked_read": 119, "unread_count": 0} and counters_match()
+    print(f"Read all: {r.json()} - {'✅' if all_ok else '❌'}")
+    return read_ok and all_ok
+
+
+async def test_application_events(client, student_id: int, student, company, tpo) -> bool:
+    job_id = await post_job(client, company, "Data Engineer", 0.0)
+    await wait_for_tasks("notify_new_job")
+    r = await client.post("/api/applications/apply", headers=student, json={"job_id": job_id})
+    assert r.status_code == 200, r.text
+    application_id = r.json()["id"]
+
+    for target in ("shortlisted", "offered"):
+        r = await client.post("/api/applications/status/bulk", headers=company, json={
+            "transitions": [{"application_id": application_id, "status": target}],
+        })
+        assert r.status_code == 200 and r.json()["results"][0]["ok"], r.text
+    r = await client.get("/api/notifications/", headers=student, params={"limit": 2})
+    titles = [item["title"] for item in r.json()["items"]]
+    status_ok = titles == ["Offer received", "Shortlisted"] and r.json()["unread_count"] == 3
+    print(f"Status changes notify the student: {titles} - {'✅' if status_ok else '❌'}")
+
+    r = await client.post("/api/applications/accept", headers=student, json={"application_id": application_id})
+    assert r.status_code == 200, r.text
+    with engine.connect() as connection:
+        recipients = set(connection.execute(
+            select(Notification.user_id).where(Notification.application_id == application_id, Notification.title == "Offer accepted")
+        ).scalars())
+    expected = {user_id("tpo@example.com"), user_id("a@acme.example.com"), user_id("b@acme.example.com")}
+    r = await client.get("/api/notifications/unread-count", headers=tpo)
+    accept_ok = recipients == expected and r.json()["unread_count"] == 1
+    print(f"Offer acceptance notifies the TPO and Acme's recruiters ({len(recipients)} users) - "
+          f"{'✅' if accept_ok else '❌'}")
+    return status_ok and accept_ok
+
+
+async def test_notifications(students: int, seed_value: int) -> bool:
+    from main import app
+
+    seed(students, random.Random(seed_value))
+    task_pool.poll_interval_seconds = 0.05
+    await task_pool.start()
+    company, tpo = token_headers(email="a@acme.example.com"), token_headers(email="tpo@example.com")
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+            fan_out_ok, eligible = await test_fan_out(client, company, token_headers(email="r@globex.example.com"), students)
+            student_id = eligible[0]
+            with engine.connect() as connection:
+                student_email, other_email = connection.execute(
+                    select(User.email).where(User.id.in_([eligible[0], eligible[1]])).order_by(User.id)
+                ).scalars().all()
+            student, other = token_headers(email=student_email), token_headers(email=other_email)
+
+            listing_ok = await test_listing(client, student_id, student)
+            reading_ok = await test_reading(client, student, other)
+            events_ok = await test_application_events(client, student_id, student, company, tpo)
+    finally:
+        await task_pool.stop()
+
+    final_ok = counters_match()
+    print(f"Unread counters match the notifications for every user - {'✅' if final_ok else '❌'}")
+    return fan_out_ok and listing_ok and reading_ok and events_ok and final_ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        ok = await test_notifications(args.students, args.seed)
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Notifications fan out set-based with O(1) unread counts" if ok else "\n❌ Notification problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
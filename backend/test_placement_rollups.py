@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Consistency test for the placement rollups.
+Drives random apply, bulk apply, bulk status and accept traffic through the
+API, then checks that the incrementally maintained counters match a
+from-scratch rebuild and that the reports endpoint reads them back correctly.
+
+Runs against a throwaway SQLite database:
+    python test_placement_rollups.py [--students 12] [--seed 3]
+"""
+
+import argparse
+import asyncio
+import random
+
+import testkit
+
+testkit.use_throwaway_database("rollup")
+
+import httpx
+from sqlalchemy import select
+
+from database import engine, async_engine
+from models import application_rollups, package_rollups, placement_tier_rollups
+from placement_rollups import rebuild_rollups
+
+COMPANIES = ["Acme", "Globex", "Initech"]
+PACKAGES = {"tier3": [4.0, 6.5], "tier2": [9.0, 12.0], "tier1": [18.0, 24.0], "internship": [None]}
+
+
+def snapshot() -> dict:
+    """Non-zero counters per rollup table"""
+    tables = {
+        application_rollups: "applications",
+        package_rollups: "offers",
+        placement_tier_rollups: "students",
+    }
+    with engine.connect() as connection:
+        result = {}
+        for table, counter in tables.items():
+            keys = [c for c in table.c if c.name != counter]
+            result[table.name] = {
+                tuple(row[:-1]): row[-1]
+                for row in connection.execute(select(*keys, table.c[counter]))
+                if row[-1]
+            }
+        return result
+
+
+async def register(client, name: str, role: str, **extra) -> dict:
+    r = await client.post("/api/auth/register", json={
+        "name": name, "email": f"{name.lower()}@example.com", "password": "S3cretp@ss!", "role": role, **extra,
+    })
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def drive_traffic(client, rng: random.Random, students: int) -> dict:
+    tpo = await register(client, "TPO", "tpo")
+
+    job_ids = []
+    for company in COMPANIES:
+        for category, packages in PACKAGES.items():
+            for package in packages:
+                r = await client.post("/api/jobs/", headers=tpo, json={
+                    "title": f"{company} {category} {package}",
+                    "company_name": company,
+                    "category": category,
+                    "package_lpa": package,
+                })
+                assert r.status_code == 200, r.text
+                job_ids.append(r.json()["id"])
+
+    outcomes = {"applied": 0, "accepted": 0, "rejected": 0, "moved": 0}
+    for i in range(students):
+        headers = await register(client, f"Student{i}", "student")
+        application_ids = []
+        chosen = rng.sample(job_ids, rng.randint(1, len(job_ids) // 2))
+        if i % 2:
+            r = await client.post("/api/applications/apply/bulk", headers=headers, json={"job_ids": chosen})
+            assert r.status_code == 200, r.text
+            for result in r.json()["results"]:
+                if result["ok"]:
+                    application_ids.append(result["application"]["id"])
+                    outcomes["applied"] += 1
+        else:
+            for job_id in chosen:
+                r = await client.post("/api/applications/apply", headers=headers, json={"job_id": job_id})
+                if r.status_code == 200:
+                    application_ids.append(r.json()["id"])
+                    outcomes["applied"] += 1
+
+        # Company-side moves, including some the state machine refuses
+        targets = ["shortlisted", "offered", "rejected", "applied", "accepted"]
+        r = await client.post("/api/applications/status/bulk", headers=tpo, json={"transitions": [
+            {"application_id": a, "status": rng.choice(targets)}
+            for a in rng.sample(application_ids, len(application_ids) // 2)
+        ]}) if len(application_ids) > 1 else None
+        if r is not None:
+            assert r.status_code == 200, r.text
+            outcomes["moved"] += sum(result["ok"] for result in r.json()["results"])
+
+        # Accept a few in random order: downgrades, repeats and post-final
+        # acceptances are refused and must leave the counters alone
+        for application_id in rng.choices(application_ids, k=min(len(application_ids), 4)):
+            r = await client.post("/api/applications/accept", headers=headers, json={
+                "application_id": application_id, "final": rng.random() < 0.3,
+            })
+            outcomes["accepted" if r.status_code == 200 else "rejected"] += 1
+
+    return tpo, outcomes
+
+
+async def test_rollups_match_rebuild(students: int, seed: int) -> bool:
+    from main import app
+
+    testkit.create_schema()
+    rng = random.Random(seed)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        tpo, outcomes = await drive_traffic(client, rng, students)
+
+        incremental = snapshot()
+        report = (await client.get("/api/reports/placements", headers=tpo)).json()
+        rebuild_rollups()
+        rebuilt = snapshot()
+        rebuilt_report = (await client.get("/api/reports/placements", headers=tpo)).json()
+
+    print(
+        f"Traffic: {outcomes['applied']} applications, {outcomes['accepted']} acceptances, "
+        f"{outcomes['rejected']} refused acceptances, {outcomes['moved']} bulk status moves"
+    )
+    ok = True
+    for name in incremental:
+        same = incremental[name] == rebuilt[name]
+        print(f"{name}: {len(incremental[name])} rows - {'✅' if same else '❌'}")
+        if not same:
+            diff = set(incremental[name].items()) ^ set(rebuilt[name].items())
+            print(f"   differences: {sorted(diff, key=str)[:10]}")
+        ok = ok and same
+
+    applications = sum(report["applicationsByStatus"].values())
+    counts_ok = applications == outcomes["applied"] and report["totalStudents"] == students
+    print(f"Report counts {applications} applications, {report['totalStudents']} students - {'✅' if counts_ok else '❌'}")
+
+    same_report = report == rebuilt_report
+    print(f"Report unchanged by rebuild - {'✅' if same_report else '❌'}")
+    return ok and counts_ok and same_report
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    ok = await test_rollups_match_rebuild(args.students, args.seed)
+    await async_engine.dispose()
+
+    print("\n🎉 Placement rollups are consistent" if ok else "\n❌ Placement rollups drifted")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test for the cached student placement snapshot behind POST /api/applications/apply.
+Checks that a steady-state apply reads only the job and writes one INSERT, that
+accepting an offer keeps the cached snapshot coherent, and that a snapshot made
+stale behind the cache's back (as by another worker) is caught by the INSERT's
+version guard instead of letting a placed student apply.
+
+Runs against a throwaway SQLite database:
+    python test_placement_state.py
+"""
+
+import asyncio
+
+import testkit
+
+testkit.use_throwaway_database("placement-state")
+
+import httpx
+from sqlalchemy import event, select, update
+
+from database import engine, async_engine
+from models import Application, StudentProfile, User, UserRole
+from placement_state import placement_state_cache
+
+
+class StatementLog:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(" ".join(statement.split()).upper())
+
+    def count(self, prefix: str) -> int:
+        return sum(1 for s in self.statements if s.startswith(prefix))
+
+
+async def register(client, name: str, role: str) -> tuple:
+    r = await client.post("/api/auth/register", json={
+        "name": name, "email": f"{name.lower()}@example.com", "password": "S3cretp@ss!", "role": role,
+    })
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}, r.json()["user"]["id"]
+
+
+async def create_job(client, headers, category: str, package) -> int:
+    r = await client.post("/api/jobs/", headers=headers, json={
+        "title": f"{category} {package}", "company_name": "Acme", "category": category, "package_lpa": package,
+    })
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+async def test_placement_snapshot() -> bool:
+    from main import app
+
+    testkit.create_schema()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        tpo, _ = await register(client, "TPO", "tpo")
+        student, student_id = await register(client, "Student", "student")
+        jobs = [await create_job(client, tpo, category, package) for category, package in [
+            ("tier3", 5.0), ("tier3", 6.0), ("tier1", 30.0), ("tier2", 12.0), ("internship", None),
+        ]]
+
+        # Warm the principal and placement caches
+        r = await client.post("/api/applications/apply", headers=student, json={"job_id": jobs[0]})
+        assert r.status_code == 200, r.text
+
+        log = StatementLog()
+        event.listen(async_engine.sync_engine, "before_cursor_execute", log)
+        r = await client.post("/api/applications/apply", headers=student, json={"job_id": jobs[1]})
+        event.remove(async_engine.sync_engine, "before_cursor_execute", log)
+        reads = [s for s in log.statements if s.startswith("SELECT")]
+        inserts = log.count("INSERT INTO APPLICATIONS ")
+        single_read_ok = (
+            r.status_code == 200 and len(reads) == 1 and "FROM JOBS" in reads[0]
+            and inserts == 1
+        )
+        print(f"Warm apply: {len(reads)} read, {inserts} application insert, {len(log.statements)} statements - "
+              f"{'✅' if single_read_ok else '❌'}")
+
+        # Accept a Tier-1 offer as final; the cached snapshot must follow
+        r = await client.post("/api/applications/apply", headers=student, json={"job_id": jobs[2]})
+        offer_id = r.json()["id"]
+        for target in ("shortlisted", "offered"):
+            r = await client.post("/api/applications/status/bulk", headers=tpo, json={
+                "transitions": [{"application_id": offer_id, "status": target}],
+            })
+            assert r.json()["results"][0]["ok"], r.text
+        r = await client.post("/api/applications/accept", headers=student, json={"application_id": offer_id, "final": True})
+        assert r.status_code == 200, r.text
+        cached = placement_state_cache.get(student_id)
+        r = await client.post("/api/applications/apply", headers=student, json={"job_id": jobs[4]})
+        accept_ok = (
+            cached is not None and cached.placed_final and cached.placement_version == 1
+            and r.status_code == 403 and "already placed" in r.json()["detail"]
+        )
+        print(f"Cached snapshot after final accept: placed={cached and cached.placed_final}, "
+              f"apply -> {r.status_code} - {'✅' if accept_ok else '❌'}")
+
+        # Another worker places a second student; this process still caches the old state
+        other, other_id = await register(client, "Other", "student")
+        r = await client.post("/api/applications/apply", headers=other, json={"job_id": jobs[0]})
+        assert r.status_code == 200, r.text
+        with engine.begin() as connection:
+            connection.execute(
+                update(StudentProfile)
+                .where(StudentProfile.user_id == other_id)
+                .values(placed_final=True, placement_version=StudentProfile.placement_version + 1)
+            )
+        stale = placement_state_cache.get(other_id)
+        r = await client.post("/api/applications/apply/bulk", headers=other, json={"job_ids": [jobs[3], jobs[4]]})
+        results = r.json()["results"]
+        with engine.connect() as connection:
+            applications = connection.execute(
+                select(Application.job_id).where(Application.student_id == other_id)
+            ).scalars().all()
+        guard_ok = (
+            stale is not None and not stale.placed_final
+            and all(not result["ok"] and "already placed" in result["detail"] for result in results)
+            and applications == [jobs[0]]
+            and placement_state_cache.get(other_id).placed_final
+        )
+        print(f"Stale snapshot caught by the insert guard: {[result['detail'] for result in results]} - "
+              f"{'✅' if guard_ok else '❌'}")
+
+        # Every registered student has a profile from the start
+        with engine.connect() as connection:
+            missing = connection.execute(
+                select(User.id)
+                .outerjoin(StudentProfile, StudentProfile.user_id == User.id)
+                .where(User.role == UserRole.STUDENT, StudentProfile.id.is_(None))
+            ).all()
+        profiles_ok = not missing
+        print(f"Students without a profile: {len(missing)} - {'✅' if profiles_ok else '❌'}")
+
+    return single_read_ok and accept_ok and guard_ok and profiles_ok
+
+
+async def main():
+    try:
+        ok = await test_placement_snapshot()
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Placement snapshots stay coherent" if ok else "\n❌ Placement snapshot problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
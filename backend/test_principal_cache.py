@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test for the authenticated principal cache (principal_cache.py, routers/auth.py).
+
+Warm GET /api/auth/me calls must run no SQL at all. Deactivating a user or
+changing their role through the ORM must drop their cached entry at commit,
+after which their token is refused with 401 - whether the user comes fresh
+from the database or from the cache.
+
+Runs against a throwaway SQLite database:
+    python test_principal_cache.py [--warm-calls 50]
+"""
+
+import argparse
+import asyncio
+
+import testkit
+
+testkit.use_throwaway_database("principal-cache")
+
+import httpx
+from sqlalchemy import insert, select
+
+from database import engine, async_engine, AsyncSessionLocal
+from models import User, UserRole
+from principal_cache import principal_cache
+from testkit import StatementRecorder, token_headers
+
+
+def seed():
+    testkit.create_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"name": "Student", "email": "student@example.com", "role": UserRole.STUDENT},
+            {"name": "Leaver", "email": "leaver@example.com", "role": UserRole.STUDENT},
+            {"name": "Mover", "email": "mover@example.com", "role": UserRole.STUDENT},
+        ])
+
+
+async def update_user(email: str, **values):
+    """Change a user the way an admin screen would: through the ORM, then commit"""
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(select(User).where(User.email == email))).scalars().one()
+        for name, value in values.items():
+            setattr(user, name, value)
+        await db.commit()
+
+
+async def me(client, headers) -> tuple:
+    """(status, detail or email, statements run) for one GET /api/auth/me"""
+    with StatementRecorder() as recorder:
+        r = await client.get("/api/auth/me", headers=headers)
+    body = r.json()
+    return r.status_code, body.get("email", body.get("detail")), len(recorder.statements)
+
+
+async def test_warm_calls(client, warm_calls: int) -> bool:
+    headers = token_headers(email="student@example.com")
+    principal_cache.clear()
+    cold = await me(client, headers)
+    warm = [await me(client, headers) for _ in range(warm_calls)]
+    statements = sum(count for _, _, count in warm)
+    ok = cold[:2] == (200, "student@example.com") and cold[2] == 1 and statements == 0 and all(
+        status == 200 for status, _, _ in warm
+    )
+    print(f"Cold /me: {cold[2]} statement; {warm_calls} warm calls: {statements} statements - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_deactivation(client) -> bool:
+    headers = token_headers(email="leaver@example.com")
+    before = await me(client, headers)
+    invalidations = principal_cache.stats()["invalidations"]
+    await update_user("leaver@example.com", is_active=False)
+    dropped = principal_cache.stats()["invalidations"] == invalidations + 1
+    fresh = await me(client, headers)
+    cached = await me(client, headers)
+    ok = (
+        before[0] == 200 and dropped
+        and fresh == (401, "Inactive user", 1)
+        and cached == (401, "Inactive user", 0)
+    )
+    print(f"Deactivated: cache entry dropped at commit: {dropped}; /me then {fresh[0]} from the database, "
+          f"{cached[0]} from the cache - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_role_change(client) -> bool:
+    headers = token_headers(email="mover@example.com")
+    before = await me(client, headers)
+    invalidations = principal_cache.stats()["invalidations"]
+    await update_user("mover@example.com", role=UserRole.COMPANY, company_name="Acme")
+    dropped = principal_cache.stats()["invalidations"] == invalidations + 1
+    old_token = await me(client, headers)
+    new_token = await me(client, token_headers(email="mover@example.com"))
+    ok = (
+        before[0] == 200 and dropped
+        and old_token == (401, "Token has been revoked", 1)
+        and new_token[:2] == (200, "mover@example.com")
+    )
+    print(f"Role changed: cache entry dropped at commit: {dropped}; token with the old role gets {old_token[0]}, "
+          f"a new token {new_token[0]} - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_principal_cache(warm_calls: int) -> bool:
+    from main import app
+
+    seed()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        warm_ok = await test_warm_calls(client, warm_calls)
+        deactivation_ok = await test_deactivation(client)
+        role_ok = await test_role_change(client)
+    return warm_ok and deactivation_ok and role_ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--warm-calls", type=int, default=50)
+    args = parser.parse_args()
+
+    try:
+        ok = await test_principal_cache(args.warm_calls)
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Warm requests run no SQL and user changes reach the cache" if ok else "\n❌ Principal cache problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Test for pushed events (realtime.py, routers/events.py).
+
+Serves the API from a uvicorn subprocess, so its memory can be read apart from
+the test's, and holds 5,000 idle GET /api/events/ streams open over raw
+sockets. Reports the server's resident memory per open stream, then checks
+that a job post reaches exactly the connected eligible students and the TPO's
+dashboard, that a read reaches every tab of its user, and that closed
+connections leave no subscriptions behind.
+
+In-process checks cover the rest: events go out on commit and never on
+rollback, a broker carries events between two hubs as it would between API
+processes, and a stream that stops reading is dropped.
+
+Runs against a throwaway SQLite database:
+    python test_realtime.py [--connections 5000] [--seed 1]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import testkit
+
+testkit.use_throwaway_database("realtime")
+
+import httpx
+from sqlalchemy import insert, select
+
+from auth_utils import create_access_token, build_token_claims
+from database import engine, async_engine, AsyncSessionLocal
+from eligibility import eligible_students_query
+from models import User, UserRole, StudentProfile, NotificationType, NotificationPriority
+from notifications import notify
+from realtime import Broker, ConnectionHub, InMemoryBroker, event_hub
+from stub_llm_server import free_port
+
+MAX_KB_PER_CONNECTION = 64
+
+
+def seed(students: int, rng: random.Random):
+    testkit.create_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"name": f"Student {i}", "email": f"s{i}@example.com", "role": UserRole.STUDENT, "company_name": None}
+            for i in range(students)
+        ] + [
+            {"name": "TPO", "email": "tpo@example.com", "role": UserRole.TPO, "company_name": None},
+            {"name": "Recruiter", "email": "r@acme.example.com", "role": UserRole.COMPANY, "company_name": "Acme"},
+        ])
+        student_ids = connection.execute(select(User.id).where(User.role == UserRole.STUDENT)).scalars().all()
+        connection.execute(insert(StudentProfile), [
+            {
+                "user_id": user_id,
+                "cgpa": round(rng.uniform(5, 10), 2) if i else 9.5,  # The first student, with two tabs, is eligible
+                "backlogs": rng.choice([0, 0, 0, 1, 3]) if i else 0,
+                "placed_final": False,
+                "upgrades_used": 0,
+            }
+            for i, user_id in enumerate(student_ids)
+        ])
+
+
+def users() -> list:
+    with engine.connect() as connection:
+        return connection.execute(select(User.id, User.email, User.role, User.token_version).order_by(User.id)).all()
+
+
+def token(user) -> str:
+    return create_access_token(data=build_token_claims(SimpleNamespace(**user._mapping)))
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    raise RuntimeError("no VmRSS")
+
+
+class Stream:
+    """One GET /api/events/ over a raw socket, collecting (event, data) as they arrive"""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.events = []
+        self.arrived = asyncio.Event()
+        self.closed = False
+
+    async def open(self, port: int, access_token: str):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(
+            f"GET /api/events/?access_token={access_token} HTTP/1.1\r\nHost: testserver\r\n"
+            f"Accept: text/event-stream\r\n\r\n".encode()
+        )
+        status = await self.reader.readline()
+        assert b" 200 " in status, status
+        while (await self.reader.readline()).strip():
+            pass  # Headers
+        self.task = asyncio.create_task(self._read())
+        await self.wait_for("ready")
+
+    async def _read(self):
+        # Chunk-size lines of the chunked body are neither fields nor blank, so they are skipped
+        event, data = None, []
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                line = line.decode().rstrip("\r\n")
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data.append(line[len("data:"):].strip())
+                elif not line and event:
+                    self.events.append((event, json.loads("\n".join(data))))
+                    self.arrived.set()
+                    event, data = None, []
+        finally:
+            self.closed = True
+            self.arrived.set()
+
+    def of(self, name: str) -> list:
+        return [data for event, data in self.events if event == name]
+
+    async def wait_for(self, name: str, count: int = 1, timeout: float = 30) -> list:
+        deadline = time.monotonic() + timeout
+        while len(self.of(name)) < count and not self.closed:
+            self.arrived.clear()
+            await asyncio.wait_for(self.arrived.wait(), max(deadline - time.monotonic(), 0.001))
+        return self.of(name)
+
+    def close(self):
+        self.task.cancel()
+        self.writer.close()
+
+
+async def open_streams(port: int, targets: list, batch: int = 250) -> list:
+    streams = []
+    for start in range(0, len(targets), batch):
+        opened = [Stream(user.id) for user in targets[start:start + batch]]
+        await asyncio.gather(*(stream.open(port, token(user)) for stream, user in zip(opened, targets[start:start + batch])))
+        streams.extend(opened)
+    return streams
+
+
+async def wait_until(predicate, timeout: float = 30) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if await predicate():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def test_commit_only(student_id: int) -> bool:
+    await event_hub.start()
+    subscription = event_hub.subscribe(student_id, "student")
+    notice = {"user_id": student_id, "type": NotificationType.SYSTEM, "priority": NotificationPriority.LOW,
+              "title": "Welcome", "message": "Complete your profile"}
+
+    async with AsyncSessionLocal() as db:
+        await notify(db, [notice])
+        await db.rollback()
+    await asyncio.sleep(0.05)
+    rolled_back = subscription.queue.qsize()
+
+    async with AsyncSessionLocal() as db:
+        await notify(db, [notice])
+        queued = subscription.queue.qsize()
+        await db.commit()
+    await asyncio.sleep(0.05)
+    frame = subscription.queue.get_nowait() if subscription.queue.qsize() == 1 else ""
+    event_hub.unsubscribe(subscription)
+
+    ok = rolled_back == 0 and queued == 0 and frame.startswith("event: notification\n") and '"unread_count": 1' in frame
+    print(f"Rolled back notification pushed {rolled_back} events, committed one pushed "
+          f"{1 if frame else 0} after the commit - {'✅' if ok else '❌'}")
+    return ok
+
+
+class ChannelBroker(Broker):
+    """Stands in for a shared pub/sub channel: every broker on the channel receives every message"""
+
+    def __init__(self, channel: list):
+        self.channel = channel
+        self.deliver = None
+
+    async def start(self, deliver):
+        self.deliver = deliver
+        self.channel.append(self)
+
+    def publish(self, message: str):
+        for broker in self.channel:
+            asyncio.get_running_loop().call_soon(broker.deliver, message)
+
+    async def aclose(self):
+        self.channel.remove(self)
+
+
+async def test_pluggable_broker(student_id: int) -> bool:
+    # Two hubs, as in two API processes; the stream is held by the other one
+    channel = []
+    await event_hub.stop()
+    event_hub.set_broker(ChannelBroker(channel))
+    await event_hub.start()
+    other = ConnectionHub(ChannelBroker(channel), queue_size=10, keepalive_seconds=15)
+    await other.start()
+    subscription = other.subscribe(student_id, "student")
+
+    async with AsyncSessionLocal() as db:
+        await notify(db, [{"user_id": student_id, "type": NotificationType.SYSTEM, "priority": NotificationPriority.LOW,
+                           "title": "From another process", "message": "Hello"}])
+        await db.commit()
+    await asyncio.sleep(0.05)
+    frame = subscription.queue.get_nowait() if subscription.queue.qsize() == 1 else ""
+    await other.stop()
+    await event_hub.stop()
+
+    ok = "From another process" in frame and event_hub.stats()["broker"] == "ChannelBroker"
+    print(f"Event committed on one hub reached a stream on another through the broker - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_slow_stream(student_id: int) -> bool:
+    hub = ConnectionHub(InMemoryBroker(), queue_size=5, keepalive_seconds=15)
+    subscription = hub.subscribe(student_id, "student")
+    message = json.dumps({"event": "notification", "data": {"title": "x"}, "users": [[student_id, {}]]})
+    for _ in range(8):
+        hub._deliver(message)
+    frames = []
+    while not subscription.queue.empty():
+        frames.append(subscription.queue.get_nowait())
+    stats = hub.stats()
+    ok = frames == [None] and stats["dropped"] == 1 and stats["connections"] == 0 and stats["delivered"] == 5
+    print(f"A stream 5 events behind was closed and dropped - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_idle_connections(port: int, pid: int, accounts: list, connections: int) -> tuple:
+    students = [user for user in accounts if user.role == UserRole.STUDENT]
+    tpo = next(user for user in accounts if user.role == UserRole.TPO)
+
+    # Warm up the server's code paths and caches, so the baseline holds them
+    warm = await open_streams(port, students[:50])
+    for stream in warm:
+        stream.close()
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        assert await wait_until(lambda: stats(client, tpo, 0)), "warm-up streams not released"
+    await asyncio.sleep(0.5)
+
+    before = rss_kb(pid)
+    started = time.perf_counter()
+    # Every student, a second tab for the first one, and the TPO
+    streams = await open_streams(port, students + [students[0], tpo])
+    opened_s = time.perf_counter() - started
+    await asyncio.sleep(1)
+    after = rss_kb(pid)
+    per_connection = (after - before) / len(streams)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        held_ok = await stats(client, tpo, len(streams))
+    ok = held_ok and len(streams) == connections and per_connection < MAX_KB_PER_CONNECTION
+    print(f"{len(streams)} idle streams opened in {opened_s:.1f} s; server RSS {before / 1024:.0f} -> "
+          f"{after / 1024:.0f} MB, {per_connection:.1f} KB per connection - {'✅' if ok else '❌'}")
+    return ok, streams
+
+
+async def stats(client, tpo, connections: int) -> bool:
+    r = await client.get("/api/events/stats", headers={"Authorization": f"Bearer {token(tpo)}"})
+    return r.status_code == 200 and r.json()["connections"] == connections
+
+
+async def test_push(port: int, streams: list, accounts: list) -> bool:
+    company = next(user for user in accounts if user.role == UserRole.COMPANY)
+    tpo = next(user for user in accounts if user.role == UserRole.TPO)
+    by_user = {}
+    for stream in streams:
+        by_user.setdefault(stream.user_id, []).append(stream)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+        started = time.perf_counter()
+        r = await client.post("/api/jobs/", headers={"Authorization": f"Bearer {token(company)}"}, json={
+            "title": "Platform Engineer", "company_name": "Acme", "package_lpa": 12.0, "category": "tier2",
+            "min_cgpa": 7.0, "max_backlogs": 1,
+        })
+        assert r.status_code == 200, r.text
+        job_id = r.json()["id"]
+
+        async with AsyncSessionLocal() as db:
+            eligible = set((await db.execute(
+                eligible_students_query(job_id).with_only_columns(StudentProfile.user_id)
+            )).scalars().all())
+        expected = [stream for user_id in eligible for stream in by_user[user_id]]
+        await asyncio.gather(*(stream.wait_for("notification") for stream in expected))
+        delivered_ms = (time.perf_counter() - started) * 1000
+        await asyncio.sleep(0.5)
+
+        notified = {stream.user_id for stream in streams if stream.of("notification")}
+        sample = expected[0].of("notification")[0]
+        fan_out_ok = (
+            notified == eligible and all(len(stream.of("notification")) == 1 for stream in expected)
+            and sample["title"] == "New job: Platform Engineer" and sample["job_id"] == job_id
+            and sample["unread_count"] == 1 and isinstance(sample["id"], int)
+        )
+        print(f"Job post reached all {len(expected)} streams of the {len(eligible)} eligible students, and no "
+              f"other, {delivered_ms:.0f} ms after the request - {'✅' if fan_out_ok else '❌'}")
+
+        tpo_stream = by_user[tpo.id][0]
+        dashboard = await tpo_stream.wait_for("dashboard")
+        students_dashboard = sum(len(stream.of("dashboard")) for stream in streams if stream.user_id != tpo.id)
+        dashboard_ok = dashboard == [{"delta": {"activeJobs": 1}}] and students_dashboard == 0
+        print(f"TPO dashboard got {dashboard[0] if dashboard else None}, students got {students_dashboard} - "
+              f"{'✅' if dashboard_ok else '❌'}")
+
+        # Read in one tab: both tabs of that student hear about it
+        student = accounts[0]
+        tabs = by_user[student.id]
+        notification_id = tabs[0].of("notification")[0]["id"]
+        r = await client.post(f"/api/notifications/{notification_id}/read",
+                              headers={"Authorization": f"Bearer {token(student)}"})
+        assert r.status_code == 200, r.text
+        reads = await asyncio.gather(*(tab.wait_for("notifications_read") for tab in tabs))
+        tabs_ok = len(tabs) == 2 and all(read == [{"id": notification_id, "unread_count": 0}] for read in reads)
+        print(f"Read in one tab reached all {len(tabs)} tabs - {'✅' if tabs_ok else '❌'}")
+    return fan_out_ok and dashboard_ok and tabs_ok
+
+
+async def test_disconnects(port: int, streams: list, accounts: list) -> bool:
+    tpo = next(user for user in accounts if user.role == UserRole.TPO)
+    for stream in streams:
+        stream.close()
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        ok = await wait_until(lambda: stats(client, tpo, 0))
+    print(f"Closing {len(streams)} connections released every subscription - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_realtime(connections: int, seed_value: int) -> bool:
+    seed(connections - 2, random.Random(seed_value))
+    accounts = users()
+    # Not the first student, whose streams expect a single notification later
+    student_id = accounts[1].id
+
+    results = [
+        await test_commit_only(student_id),
+        await test_pluggable_broker(student_id),
+        await test_slow_stream(student_id),
+    ]
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--timeout-graceful-shutdown", "5"],
+        env={**os.environ, "TASK_POLL_INTERVAL_SECONDS": "0.1"},
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            for _ in range(300):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+        ok, streams = await test_idle_connections(port, server.pid, accounts, connections)
+        results.append(ok)
+        results.append(await test_push(port, streams, accounts))
+        results.append(await test_disconnects(port, streams, accounts))
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.wait(timeout=30)
+    return all(results)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        ok = await test_realtime(args.connections, args.seed)
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Committed changes are pushed to open streams" if ok else "\n❌ Event stream problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test for the chatbot response cache (response_cache.py).
+
+Unit checks of normalization, TTL, LRU eviction, hit counts and similarity
+lookup, then a simulated season of students opening conversations with the
+same few questions through POST /api/chat/send-message and /api/chat/stream,
+with an in-process LLM backend that takes 50 ms per answer. Reports the hit
+rate and latency saved, and checks that follow-up turns bypass the cache.
+
+Runs against a throwaway SQLite database:
+    python test_response_cache.py
+"""
+
+import asyncio
+import random
+import statistics
+import time
+
+import testkit
+
+testkit.use_throwaway_database("response-cache")
+
+import httpx
+
+from database import async_engine
+from llm_client import LLMBackend, set_llm_backend
+from response_cache import ResponseCache, response_cache
+
+GENERATION_SECONDS = 0.05
+FAQ = [
+    "How do I prepare for HR round?",
+    "Resume tips for freshers",
+    "What should I say in tell me about yourself?",
+    "How to negotiate salary for first job",
+    "Which projects should I put on my resume?",
+]
+
+
+class SlowBackend(LLMBackend):
+    """Answers after GENERATION_SECONDS and counts the calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, payload: dict, timeout: float) -> str:
+        self.calls += 1
+        await asyncio.sleep(GENERATION_SECONDS)
+        return f"Answer to: {payload['messages'][-1]['content']}"
+
+    async def stream(self, payload: dict, timeout: float):
+        self.calls += 1
+        for word in f"Answer to: {payload['messages'][-1]['content']}".split(" "):
+            await asyncio.sleep(GENERATION_SECONDS / 5)
+            yield word + " "
+
+
+def variant(question: str, rng: random.Random) -> str:
+    """The same question as another student might type it"""
+    text = rng.choice([question, question.lower(), question.upper(), question.rstrip("?!.")])
+    return text + rng.choice(["", "?", "  ", "!!"])
+
+
+def test_cache_unit() -> bool:
+    cache = ResponseCache(max_entries=3, ttl_seconds=60)
+    cache.put("How do I prepare for HR round?", "A", 100)
+    normalized_ok = (
+        cache.get("how do i prepare for hr round") is not None
+        and cache.get("  HOW do I prepare, for HR round!! ") is not None
+        and cache.get("How do I prepare for the HR round?") is None
+    )
+    print(f"Exact lookup ignores case, punctuation and spacing - {'✅' if normalized_ok else '❌'}")
+
+    cache.put("b", "B", 100)
+    cache.put("c", "C", 100)
+    cache.get("How do I prepare for HR round?")  # Most recently used now
+    cache.put("d", "D", 100)
+    lru_ok = cache.get("b") is None and cache.get("How do I prepare for HR round?") is not None
+    hits_ok = cache.get("c").hits == 1 and cache.stats()["top_questions"][0] == {
+        "question": "how do i prepare for hr round", "hits": 4,
+    }
+    print(f"LRU evicts the least recently used, entries count hits - {'✅' if lru_ok and hits_ok else '❌'}")
+
+    cache = ResponseCache(max_entries=10, ttl_seconds=0.05)
+    cache.put("q", "A", 100)
+    fresh = cache.get("q") is not None
+    time.sleep(0.06)
+    ttl_ok = fresh and cache.get("q") is None and cache.stats()["entries"] == 0
+    print(f"Entries expire after the TTL - {'✅' if ttl_ok else '❌'}")
+
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, min_similarity=0.8)
+    cache.put("Resume tips for freshers", "resume answer", 100)
+    cache.put("How do I prepare for HR round?", "hr answer", 100)
+    similar = cache.get("resume tips for a fresher")
+    similar_ok = (
+        similar is not None and similar.content == "resume answer"
+        and cache.get("Resume tips for experienced candidates") is None
+        and cache.get("How do I negotiate my salary?") is None
+        and cache.stats()["similar_hits"] == 1
+    )
+    cache.clear()
+    cleared_ok = cache.get("resume tips for a fresher") is None
+    print(f"Similarity lookup serves near-duplicates only - {'✅' if similar_ok and cleared_ok else '❌'}")
+
+    return normalized_ok and lru_ok and hits_ok and ttl_ok and similar_ok and cleared_ok
+
+
+async def test_cache_in_chat() -> bool:
+    from main import app
+
+    testkit.create_schema()
+    backend = SlowBackend()
+    set_llm_backend(backend)
+    rng = random.Random(7)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        tokens = {}
+        for role in ("student", "tpo"):
+            r = await client.post("/api/auth/register", json={
+                "name": role, "email": f"{role}@example.com", "password": "S3cretp@ss!", "role": role,
+            })
+            assert r.status_code == 200, r.text
+            tokens[role] = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        # 200 conversations opened with a FAQ or, now and then, a question of their own
+        hit_latencies, miss_latencies = [], []
+        unique_questions = set()
+        for i in range(200):
+            question = variant(rng.choice(FAQ), rng) if rng.random() < 0.9 else f"Unique question {i}"
+            unique_questions.add(" ".join(question.lower().replace("?", " ").replace("!", " ").split()))
+            calls_before = backend.calls
+            started = time.perf_counter()
+            r = await client.post("/api/chat/send-message", headers=tokens["student"], json={"content": question})
+            elapsed = time.perf_counter() - started
+            assert r.status_code == 200, r.text
+            generated = backend.calls > calls_before
+            (miss_latencies if generated else hit_latencies).append(elapsed)
+            assert (r.json()["prompt_tokens"] > 0) == generated, r.json()  # A cached answer spends no prompt
+
+        calls_ok = backend.calls == len(unique_questions)
+        print(f"200 opening questions, {len(unique_questions)} distinct: {backend.calls} LLM calls - "
+              f"{'✅' if calls_ok else '❌'}")
+        print(f"Median latency: {statistics.median(hit_latencies) * 1000:.1f} ms cached, "
+              f"{statistics.median(miss_latencies) * 1000:.1f} ms generated")
+
+        # Follow-ups depend on history and always reach the model
+        conversation_id = r.json()["conversation_id"]
+        calls_before = backend.calls
+        for question in FAQ[:3]:
+            r = await client.post("/api/chat/send-message", headers=tokens["student"], json={
+                "content": question, "conversation_id": conversation_id,
+            })
+            assert r.status_code == 200, r.text
+        bypass_ok = backend.calls == calls_before + 3
+        print(f"Follow-up turns bypass the cache - {'✅' if bypass_ok else '❌'}")
+
+        # A streamed opening question is served from the same cache
+        calls_before = backend.calls
+        r = await client.post("/api/chat/stream", headers=tokens["student"], json={"content": FAQ[0].lower()})
+        stream_ok = r.status_code == 200 and '"cached": true' in r.text and backend.calls == calls_before
+        print(f"Streamed FAQ answered from the cache - {'✅' if stream_ok else '❌'}")
+
+        r = await client.get("/api/chat/cache/stats", headers=tokens["student"])
+        forbidden_ok = r.status_code == 403
+        r = await client.get("/api/chat/cache/stats", headers=tokens["tpo"])
+        stats = r.json()
+        stats_ok = (
+            forbidden_ok and r.status_code == 200
+            and stats["bypassed"] == 3 and stats["hit_rate"] > 0.8
+            and stats["latency_saved_ms"] >= (stats["exact_hits"] * GENERATION_SECONDS * 1000)
+        )
+        print(f"Stats: hit rate {stats['hit_rate']:.1%}, {stats['latency_saved_ms'] / 1000:.1f} s of generation saved, "
+              f"{stats['bypassed']} bypassed, top question {stats['top_questions'][0]} - {'✅' if stats_ok else '❌'}")
+
+    response_cache.clear()
+    return calls_ok and bypass_ok and stream_ok and stats_ok
+
+
+async def main():
+    unit_ok = test_cache_unit()
+    try:
+        chat_ok = await test_cache_in_chat()
+    finally:
+        await async_engine.dispose()
+
+    ok = unit_ok and chat_ok
+    print("\n🎉 Repeated questions are answered from the cache" if ok else "\n❌ Response cache problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test for the rollup backfill in migration 0002 (placement_rollups.rebuild_rollup_tables).
+
+Builds a database at revision 0001 with applications spread over a few days
+and some accepted offers, as the app left it before the rollup tables
+existed, and upgrades it to head: GET /api/reports/placements, which reads
+only the rollups, must then count that history, by status, day, tier and
+company, with no manual rebuild.
+
+Runs against a throwaway SQLite database:
+    python test_rollup_backfill.py
+"""
+
+import asyncio
+
+import testkit
+
+testkit.use_throwaway_database("rollup-backfill")
+
+import httpx
+from sqlalchemy import text
+
+from database import engine, async_engine
+from testkit import token_headers
+
+STUDENTS = {
+    # email: (highest_accepted_tier, highest_accepted_package_lpa)
+    "placed-tier1@example.com": ("TIER1", 20.0),
+    "placed-tier2@example.com": ("TIER2", 10.0),
+    "applied@example.com": (None, None),
+    "shortlisted@example.com": (None, None),
+}
+JOBS = {"Acme": ("TIER1", 20.0), "Globex": ("TIER2", 10.0)}
+APPLICATIONS = [
+    # (student, company, status, offered_package_lpa, created_at)
+    ("placed-tier1@example.com", "Acme", "ACCEPTED", 20.0, "2026-09-01 10:00:00"),
+    ("placed-tier1@example.com", "Globex", "REJECTED", None, "2026-09-01 11:00:00"),
+    ("placed-tier2@example.com", "Globex", "ACCEPTED", 10.0, "2026-09-02 09:00:00"),
+    ("placed-tier2@example.com", "Acme", "APPLIED", None, "2026-09-02 09:30:00"),
+    ("applied@example.com", "Acme", "APPLIED", None, "2026-09-02 14:00:00"),
+    ("shortlisted@example.com", "Globex", "SHORTLISTED", None, "2026-09-03 16:00:00"),
+]
+
+
+def seed_legacy():
+    """A database as the app left it before migrations: the 0001 schema, no rollup tables"""
+    testkit.migrate_to("0001")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (name, email, role, provider, is_active) VALUES (:name, :email, :role, 'local', TRUE)"
+        ), [
+            {"name": email.split("@")[0], "email": email, "role": "STUDENT"} for email in STUDENTS
+        ] + [
+            {"name": "TPO", "email": "tpo@example.com", "role": "TPO"},
+        ])
+        connection.execute(text(
+            "INSERT INTO student_profiles (user_id, cgpa, backlogs, upgrades_used, placed_final, "
+            "highest_accepted_tier, highest_accepted_package_lpa) "
+            "SELECT id, 8.0, 0, 0, FALSE, :tier, :package FROM users WHERE email = :email"
+        ), [{"email": email, "tier": tier, "package": package} for email, (tier, package) in STUDENTS.items()])
+        connection.execute(text(
+            "INSERT INTO jobs (title, company_name, package_lpa, category, min_cgpa, max_backlogs, is_active) "
+            "VALUES (:company, :company, :package, :category, 0.0, 999, TRUE)"
+        ), [{"company": company, "category": category, "package": package} for company, (category, package) in JOBS.items()])
+        connection.execute(text(
+            "INSERT INTO applications (student_id, job_id, status, is_final_acceptance, offered_package_lpa, created_at) "
+            "SELECT student_profiles.id, jobs.id, :status, FALSE, :package, :created_at "
+            "FROM student_profiles JOIN users ON users.id = student_profiles.user_id, jobs "
+            "WHERE users.email = :email AND jobs.company_name = :company"
+        ), [
+            {"email": email, "company": company, "status": status, "package": package, "created_at": created_at}
+            for email, company, status, package, created_at in APPLICATIONS
+        ])
+
+
+async def test_report(client, tpo) -> bool:
+    r = await client.get("/api/reports/placements", headers=tpo)
+    report = r.json()
+    by_status = {status: n for status, n in report["applicationsByStatus"].items() if n}
+    by_tier = {row["tier"]: row["students"] for row in report["placementByTier"]}
+    companies = [(row["companyName"], row["acceptedOffers"], row["averageLpa"]) for row in report["offersPerCompany"]]
+    ok = (
+        by_status == {"applied": 2, "shortlisted": 1, "accepted": 2, "rejected": 1}
+        and by_tier == {"unplaced": 2, "tier3": 0, "tier2": 1, "tier1": 1}
+        and report["packages"]["overall"]["offers"] == 2
+        and companies == [("Acme", 1, 20.0), ("Globex", 1, 10.0)]
+    )
+    print(f"Report after upgrade: {by_status}, tiers {by_tier}, offers {companies} - {'✅' if ok else '❌'}")
+
+    r = await client.get("/api/reports/placements", headers=tpo, params={"since": "2026-09-02"})
+    windowed = {status: n for status, n in r.json()["applicationsByStatus"].items() if n}
+    window_ok = windowed == {"applied": 2, "shortlisted": 1, "accepted": 1}
+    print(f"Since 2026-09-02: {windowed}, counted on the days applied - {'✅' if window_ok else '❌'}")
+    return ok and window_ok
+
+
+async def main():
+    from main import app
+
+    seed_legacy()
+    try:
+        testkit.migrate_to("head")
+        tpo = token_headers(email="tpo@example.com")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            ok = await test_report(client, tpo)
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Upgrading counts existing applications into the rollups" if ok else "\n❌ Rollup backfill problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test for the skills backfill (migration 0002, skills.backfill_skill_tables)
+and the job skills it feeds.
+
+Builds a database at revision 0001 whose profiles and jobs hold the legacy
+JSON skill lists, in mixed case, with duplicates, stray values and a broken
+document, and upgrades it to head: the skills, student_skills and job_skills
+tables must hold each normalized name once, and running migrate_skills.py
+afterwards must add nothing. JobResponse.required_skills must then come from
+job_skills (sorted, whatever the legacy column says), for jobs listed by
+GET /api/jobs/ and created by POST /api/jobs/ alike, and eligibility must
+follow the backfilled skills.
+
+Runs against a throwaway SQLite database:
+    python test_skills_backfill.py
+"""
+
+import asyncio
+import json
+
+import testkit
+
+testkit.use_throwaway_database("skills-backfill")
+
+import httpx
+from sqlalchemy import func, select, text, update
+
+from database import engine, async_engine
+from migrate_skills import backfill_skills
+from models import User, StudentProfile, Job, Skill, student_skills, job_skills
+from testkit import StatementRecorder, token_headers
+
+STUDENT_SKILLS = {
+    "full@example.com": json.dumps(["Python", " python ", "SQL", 3, "", None]),
+    "partial@example.com": json.dumps(["PYTHON"]),
+    "broken@example.com": "not json",
+    "none@example.com": None,
+}
+JOB_SKILLS = {
+    "Data Engineer": json.dumps(["sql", "Python", "sql"]),
+    "Any Graduate": json.dumps([]),
+    "Legacy Null": None,
+}
+
+
+def seed_legacy():
+    """A database as the app left it before migrations: the 0001 schema, skills only as JSON"""
+    testkit.migrate_to("0001")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (name, email, role, provider, is_active) VALUES (:name, :email, :role, 'local', TRUE)"
+        ), [
+            {"name": email.split("@")[0], "email": email, "role": "STUDENT"} for email in STUDENT_SKILLS
+        ] + [
+            {"name": "TPO", "email": "tpo@example.com", "role": "TPO"},
+        ])
+        connection.execute(text(
+            "INSERT INTO student_profiles (user_id, cgpa, backlogs, upgrades_used, placed_final, skills_json) "
+            "SELECT id, 8.0, 0, 0, FALSE, :skills_json FROM users WHERE email = :email"
+        ), [{"email": email, "skills_json": raw} for email, raw in STUDENT_SKILLS.items()])
+        connection.execute(text(
+            "INSERT INTO jobs (title, company_name, package_lpa, category, min_cgpa, max_backlogs, is_active, "
+            "required_skills_json) VALUES (:title, 'Acme', 10.0, 'TIER2', 0.0, 999, TRUE, :skills_json)"
+        ), [{"title": title, "skills_json": raw} for title, raw in JOB_SKILLS.items()])
+
+
+def skill_tables() -> tuple:
+    with engine.connect() as connection:
+        names = connection.execute(select(Skill.name).order_by(Skill.name)).scalars().all()
+        students = connection.execute(
+            select(User.email, Skill.name)
+            .join(StudentProfile, StudentProfile.user_id == User.id)
+            .join(student_skills, student_skills.c.student_profile_id == StudentProfile.id)
+            .join(Skill, Skill.id == student_skills.c.skill_id)
+            .order_by(User.email, Skill.name)
+        ).all()
+        jobs = connection.execute(select(func.count()).select_from(job_skills)).scalar()
+    return names, students, jobs
+
+
+def test_backfill() -> bool:
+    testkit.migrate_to("head")
+    names, students, jobs = skill_tables()
+    expected_students = [
+        ("full@example.com", "python"), ("full@example.com", "sql"), ("partial@example.com", "python"),
+    ]
+    first_ok = names == ["python", "sql"] and students == expected_students and jobs == 2
+    print(f"alembic upgrade head filled skills {names}, {len(students)} student links, {jobs} job links - "
+          f"{'✅' if first_ok else '❌'}")
+
+    backfill_skills()
+    rerun_ok = skill_tables() == (names, students, jobs)
+    print(f"Running migrate_skills.py afterwards adds nothing - {'✅' if rerun_ok else '❌'}")
+    return first_ok and rerun_ok
+
+
+async def test_job_responses(client, tpo) -> bool:
+    # The legacy column no longer matters once the tables are filled
+    with engine.begin() as connection:
+        connection.execute(update(Job).where(Job.title == "Data Engineer").values(required_skills_json='["cobol"]'))
+
+    with StatementRecorder() as recorder:
+        r = await client.get("/api/jobs/")
+    listed = {job["title"]: job["required_skills"] for job in r.json()["items"]}
+    skill_reads = [s for s, _, _ in recorder.statements if "job_skills" in s]
+    listing_ok = listed == {"Data Engineer": ["python", "sql"], "Any Graduate": [], "Legacy Null": []} and len(skill_reads) == 1
+    print(f"GET /api/jobs/ required_skills {listed}, read in {len(skill_reads)} statement - "
+          f"{'✅' if listing_ok else '❌'}")
+
+    r = await client.post("/api/jobs/", headers=tpo, json={
+        "title": "Platform Engineer", "company_name": "Acme", "package_lpa": 10.0, "category": "tier2",
+        "required_skills": ["SQL", "Rust", " sql", "Go"],
+    })
+    created = r.json()["required_skills"]
+    r = await client.get("/api/jobs/", params={"limit": 1})
+    relisted = r.json()["items"][0]["required_skills"]
+    created_ok = created == ["go", "rust", "sql"] and relisted == created
+    print(f"POST /api/jobs/ answers {created}, listed again as {relisted} - {'✅' if created_ok else '❌'}")
+    return listing_ok and created_ok
+
+
+async def test_eligibility(client, tpo) -> bool:
+    with engine.connect() as connection:
+        job_id = connection.execute(select(Job.id).where(Job.title == "Data Engineer")).scalar()
+    r = await client.get(f"/api/eligibility/jobs/{job_id}/students", headers=tpo)
+    eligible = [student["email"] for student in r.json()["items"]]
+    ok = eligible == ["full@example.com"]
+    print(f"Eligible for Data Engineer (python, sql): {eligible} - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def main():
+    from main import app
+
+    seed_legacy()
+    try:
+        backfill_ok = test_backfill()
+        tpo = token_headers(email="tpo@example.com")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            responses_ok = await test_job_responses(client, tpo)
+            eligibility_ok = await test_eligibility(client, tpo)
+    finally:
+        await async_engine.dispose()
+
+    ok = backfill_ok and responses_ok and eligibility_ok
+    print("\n🎉 Skills are backfilled once and served from the skill tables" if ok else "\n❌ Skills backfill problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Test for the background task queue (task_queue.py) and queued chat replies.
+
+Sends messages through POST /api/chat/messages with an in-process LLM backend
+that takes 300 ms per answer, and checks that the request returns 202 with a
+pending reply well before the answer exists, in a single commit, and that
+GET /api/chat/messages/{id}?wait= returns the reply once a worker has
+generated it. Then checks that queued and abandoned tasks survive a restart,
+that failed attempts are retried and finally marked failed, that two pools
+working one queue never run a task twice, and the metrics endpoint.
+
+The API's startup event is not run by httpx's ASGI transport, so the test
+starts and stops the worker pool itself. Runs against a throwaway SQLite
+database:
+    python test_task_queue.py
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+
+import testkit
+
+testkit.use_throwaway_database("task-queue")
+
+import httpx
+from sqlalchemy import event, func, select
+
+from config import settings
+from database import engine, async_engine, AsyncSessionLocal
+from llm_client import LLMBackend, set_llm_backend
+from models import QueuedTask, TaskStatus
+from task_queue import TaskWorkerPool, enqueue, task_handler, task_pool, utcnow
+
+GENERATION_SECONDS = 0.3
+
+# Runs of the "count" test task: task number -> times run
+runs = {}
+running_now = 0
+peak_running = 0
+
+
+@task_handler("count")
+async def count_run(payload: dict):
+    global running_now, peak_running
+    running_now += 1
+    peak_running = max(peak_running, running_now)
+    await asyncio.sleep(0.02)
+    runs[payload["n"]] = runs.get(payload["n"], 0) + 1
+    running_now -= 1
+
+
+class SlowBackend(LLMBackend):
+    """Answers after GENERATION_SECONDS, failing the next `fail_next` calls; keeps the last prompt"""
+
+    def __init__(self):
+        self.fail_next = 0
+        self.calls = 0
+        self.prompt = []
+
+    async def complete(self, payload: dict, timeout: float) -> str:
+        self.calls += 1
+        if self.fail_next:
+            self.fail_next -= 1
+            raise RuntimeError("model unavailable")
+        self.prompt = payload["messages"]
+        await asyncio.sleep(GENERATION_SECONDS)
+        return f"Answer to: {payload['messages'][-1]['content']}"
+
+
+def task_rows(kind: str) -> list:
+    with engine.connect() as connection:
+        return connection.execute(
+            select(QueuedTask.status, QueuedTask.attempts, QueuedTask.error).where(QueuedTask.kind == kind)
+            .order_by(QueuedTask.id)
+        ).all()
+
+
+async def send(client, headers, content: str, conversation_id=None) -> dict:
+    r = await client.post("/api/chat/messages", headers=headers, json={
+        "content": content, "conversation_id": conversation_id,
+    })
+    assert r.status_code == 202, r.text
+    return r.json()
+
+
+async def poll(client, headers, message_id: int, wait: float = 5) -> dict:
+    r = await client.get(f"/api/chat/messages/{message_id}?wait={wait}", headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+async def test_queued_replies(client, student, other, backend) -> bool:
+    # Idle workers commit their empty claims, so count the request's commits with the pool stopped
+    await task_pool.stop()
+    commits = []
+    listener = lambda conn: commits.append(conn)
+    event.listen(async_engine.sync_engine, "commit", listener)
+    started = time.perf_counter()
+    pending = await send(client, student, "How do I prepare for HR round?")
+    accepted_ms = (time.perf_counter() - started) * 1000
+    event.remove(async_engine.sync_engine, "commit", listener)
+    await task_pool.start()
+
+    accepted_ok = (
+        pending["status"] == "pending" and pending["content"] == ""
+        and accepted_ms < GENERATION_SECONDS * 1000 / 2 and len(commits) == 1
+    )
+    print(f"202 with a pending reply in {accepted_ms:.1f} ms and {len(commits)} commit - "
+          f"{'✅' if accepted_ok else '❌'}")
+
+    started = time.perf_counter()
+    reply = await poll(client, student, pending["id"])
+    waited_ms = (time.perf_counter() - started) * 1000
+    reply_ok = (
+        reply["status"] == "complete" and reply["content"] == "Answer to: How do I prepare for HR round?"
+        and reply["prompt_tokens"] > 0 and waited_ms < GENERATION_SECONDS * 1000 + 200
+    )
+    print(f"Long poll returned the reply after {waited_ms:.0f} ms - {'✅' if reply_ok else '❌'}")
+
+    # A follow-up sees the finished reply as history; a reply still pending is left out
+    conversation_id = pending["conversation_id"]
+    first = await send(client, student, "And the technical round?", conversation_id)
+    second = await send(client, student, "What about group discussions?", conversation_id)
+    replies = [await poll(client, student, message["id"]) for message in (first, second)]
+    history = [m["content"] for m in backend.prompt[1:-1]]
+    history_ok = (
+        all(r["status"] == "complete" for r in replies)
+        and history == [
+            "How do I prepare for HR round?", "Answer to: How do I prepare for HR round?",
+            "And the technical round?",
+        ]
+    )
+    print(f"Queued follow-up prompt holds {len(history)} finished messages - {'✅' if history_ok else '❌'}")
+
+    r = await client.get(f"/api/chat/messages/{first['id']}", headers=other)
+    other_ok = r.status_code == 404
+    print(f"Another student cannot read the reply - {'✅' if other_ok else '❌'}")
+    return accepted_ok and reply_ok and history_ok and other_ok
+
+
+async def test_durability(client, student) -> bool:
+    # Sent while no worker runs: the reply waits in the table until workers start
+    await task_pool.stop()
+    pending = await send(client, student, "Resume tips for freshers")
+    await asyncio.sleep(GENERATION_SECONDS * 2)
+    still_pending = (await poll(client, student, pending["id"], wait=0))["status"] == "pending"
+
+    # A task whose worker died mid-run is handed out again once its lease is over
+    async with AsyncSessionLocal() as db:
+        abandoned = await enqueue(db, "count", {"n": -1})
+        abandoned.status = TaskStatus.RUNNING
+        abandoned.attempts = 1
+        abandoned.locked_until = utcnow() - timedelta(seconds=1)
+        await db.commit()
+
+    await task_pool.start()
+    reply = await poll(client, student, pending["id"])
+    for _ in range(50):
+        if runs.get(-1):
+            break
+        await asyncio.sleep(0.02)
+    ok = still_pending and reply["status"] == "complete" and runs.get(-1) == 1
+    print(f"Reply queued while workers were down and an expired lease both ran after a restart - "
+          f"{'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_retries(client, student, backend) -> bool:
+    backoff = task_pool.retry_backoff_seconds
+    task_pool.retry_backoff_seconds = 0.05
+
+    # Two failed attempts, then the third succeeds
+    backend.fail_next = 2
+    message = await send(client, student, "Unique question about retries")
+    reply = await poll(client, student, message["id"])
+    task = task_rows("chat_reply")[-1]
+    retried_ok = reply["status"] == "complete" and task.status == TaskStatus.DONE and task.attempts == 3
+    print(f"Reply generated on attempt {task.attempts} after two model errors - {'✅' if retried_ok else '❌'}")
+
+    # Out of attempts: the reply fails with the fallback text and the task keeps the error
+    backend.fail_next = settings.task_max_attempts
+    message = await send(client, student, "Unique question that always fails")
+    reply = await poll(client, student, message["id"])
+    for _ in range(50):
+        task = task_rows("chat_reply")[-1]
+        if task.status == TaskStatus.FAILED:
+            break
+        await asyncio.sleep(0.02)
+    failed_ok = (
+        reply["status"] == "failed" and "technical difficulties" in reply["content"]
+        and task.status == TaskStatus.FAILED and "model unavailable" in task.error
+    )
+    print(f"After {task.attempts} failed attempts the reply is marked failed - {'✅' if failed_ok else '❌'}")
+
+    task_pool.retry_backoff_seconds = backoff
+    return retried_ok and failed_ok
+
+
+async def test_no_double_runs() -> bool:
+    # A second pool stands in for another API process working the same queue
+    other = TaskWorkerPool(workers=4, poll_interval_seconds=0.05, lease_seconds=60,
+                           retry_backoff_seconds=1, retention_hours=24)
+    async with AsyncSessionLocal() as db:
+        for n in range(40):
+            await enqueue(db, "count", {"n": n})
+        await db.commit()
+    started = time.perf_counter()
+    task_pool.wake()
+    await other.start()
+    while len(runs) < 41 and time.perf_counter() - started < 20:
+        await asyncio.sleep(0.02)
+    await other.stop()
+
+    counts = [runs.get(n) for n in range(40)]
+    ok = counts == [1] * 40 and peak_running > 1
+    print(f"40 tasks on 8 workers in two pools: each ran once, up to {peak_running} at a time - "
+          f"{'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_metrics(client, student, tpo) -> bool:
+    r = await client.get("/api/tasks/metrics", headers=student)
+    forbidden_ok = r.status_code == 403
+
+    await task_pool.stop()
+    async with AsyncSessionLocal() as db:
+        for n in range(100, 105):
+            await enqueue(db, "count", {"n": n})
+        await db.commit()
+    r = await client.get("/api/tasks/metrics", headers=tpo)
+    metrics = r.json()
+    chat = metrics["kinds"]["chat_reply"]
+    metrics_ok = (
+        forbidden_ok and r.status_code == 200
+        and metrics["queued"] == 5 and metrics["kinds"]["count"]["queued"] == 5
+        and chat["completed"] == 5 and chat["retried"] == 4 and chat["failed"] == 1
+        and chat["run_ms"]["max_ms"] >= GENERATION_SECONDS * 1000 and chat["wait_ms"]["samples"] == 10
+    )
+    print(f"Metrics: {metrics['queued']} queued; chat_reply {chat['completed']} completed, wait p50 "
+          f"{chat['wait_ms']['p50_ms']} ms, run p50 {chat['run_ms']['p50_ms']} ms - {'✅' if metrics_ok else '❌'}")
+    await task_pool.start()
+
+    # Finished tasks are deleted after the retention period
+    while any(row.status in (TaskStatus.QUEUED, TaskStatus.RUNNING) for row in task_rows("count")):
+        await asyncio.sleep(0.02)
+    retention = task_pool.retention_hours
+    task_pool.retention_hours = 0
+    purged = await task_pool.purge_finished()
+    task_pool.retention_hours = retention
+    with engine.connect() as connection:
+        left = connection.execute(select(func.count()).select_from(QueuedTask)).scalar()
+    purge_ok = purged > 0 and left == 0
+    print(f"Purged {purged} finished tasks - {'✅' if purge_ok else '❌'}")
+    return metrics_ok and purge_ok
+
+
+async def test_task_queue() -> bool:
+    from main import app
+
+    testkit.create_schema()
+    backend = SlowBackend()
+    set_llm_backend(backend)
+    task_pool.poll_interval_seconds = 0.05
+    await task_pool.start()
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            tokens = {}
+            for name, role in (("student", "student"), ("other", "student"), ("tpo", "tpo")):
+                r = await client.post("/api/auth/register", json={
+                    "name": name, "email": f"{name}@example.com", "password": "S3cretp@ss!", "role": role,
+                })
+                assert r.status_code == 200, r.text
+                tokens[name] = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+            results = [
+                await test_queued_replies(client, tokens["student"], tokens["other"], backend),
+                await test_durability(client, tokens["student"]),
+                await test_retries(client, tokens["student"], backend),
+                await test_no_double_runs(),
+                await test_metrics(client, tokens["student"], tokens["tpo"]),
+            ]
+    finally:
+        await task_pool.stop()
+    return all(results)
+
+
+async def main():
+    try:
+        ok = await test_task_queue()
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Slow work runs on the background task queue" if ok else "\n❌ Task queue problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test for token claims and revocation (routers/auth.py, principal_cache.py).
+
+Tokens issued before the uid/ver claims existed, tokens whose role claim
+does not match the user, and tokens revoked through POST /api/auth/revoke
+are all refused with 401, while a token from a fresh login still works.
+A revocation committed by another worker (which this worker's cache does
+not hear about) is honoured once the cached entry expires.
+
+Runs against a throwaway SQLite database:
+    python test_token_revocation.py [--ttl 0.5]
+"""
+
+import argparse
+import asyncio
+
+import testkit
+
+testkit.use_throwaway_database("token-revocation")
+
+import httpx
+from sqlalchemy import update
+
+from auth_utils import create_access_token
+from database import engine, async_engine
+from models import User
+from principal_cache import principal_cache
+from testkit import token_headers
+
+PASSWORD = "S3cretp@ss!"
+
+
+def bearer(claims: dict) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(data=claims)}"}
+
+
+async def me(client, headers) -> tuple:
+    r = await client.get("/api/auth/me", headers=headers)
+    return r.status_code, r.json().get("detail")
+
+
+async def register(client, email: str) -> dict:
+    r = await client.post("/api/auth/register", json={
+        "name": email.split("@")[0], "email": email, "password": PASSWORD, "role": "student",
+    })
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def test_claims(client) -> bool:
+    headers = await register(client, "claims@example.com")
+    user = (await client.get("/api/auth/me", headers=headers)).json()
+
+    legacy = await me(client, bearer({"sub": user["email"], "role": "student"}))
+    no_version = await me(client, bearer({"sub": user["email"], "uid": user["id"], "role": "student"}))
+    wrong_role = await me(client, bearer({"sub": user["email"], "uid": user["id"], "role": "tpo", "ver": 0}))
+    wrong_id = await me(client, bearer({"sub": user["email"], "uid": user["id"] + 1000, "role": "student", "ver": 0}))
+    ok = (
+        legacy == (401, "Could not validate credentials") and no_version == (401, "Could not validate credentials")
+        and wrong_role == (401, "Token has been revoked") and wrong_id == (401, "Token has been revoked")
+    )
+    print(f"Legacy token without uid/ver -> {legacy[0]}, without ver -> {no_version[0]}, "
+          f"role claim tpo for a student -> {wrong_role[0]}, someone else's id -> {wrong_id[0]} - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_revoke(client) -> bool:
+    first = await register(client, "revoker@example.com")
+    r = await client.post("/api/auth/login", json={"email": "revoker@example.com", "password": PASSWORD, "role": "student"})
+    second = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    before = await me(client, first)
+
+    r = await client.post("/api/auth/revoke", headers=first)
+    revoked = r.status_code
+    old_tokens = [await me(client, headers) for headers in (first, second)]
+    r = await client.post("/api/auth/login", json={"email": "revoker@example.com", "password": PASSWORD, "role": "student"})
+    fresh = await me(client, {"Authorization": f"Bearer {r.json()['access_token']}"})
+    ok = (
+        before[0] == 200 and revoked == 200
+        and old_tokens == [(401, "Token has been revoked")] * 2 and fresh[0] == 200
+    )
+    print(f"Revoke -> {revoked}; both earlier tokens then -> {[status for status, _ in old_tokens]}, "
+          f"a new login's token -> {fresh[0]} - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_other_worker(client, ttl: float) -> bool:
+    await register(client, "elsewhere@example.com")
+    headers = token_headers(email="elsewhere@example.com")
+    principal_cache.ttl_seconds = ttl
+    principal_cache.clear()
+    await me(client, headers)
+
+    # Another worker revokes: the row changes, but this process's cache is not told
+    with engine.begin() as connection:
+        connection.execute(
+            update(User).where(User.email == "elsewhere@example.com").values(token_version=User.token_version + 1)
+        )
+    cached = await me(client, headers)
+    await asyncio.sleep(ttl + 0.1)
+    expired = await me(client, headers)
+    ok = cached[0] == 200 and expired == (401, "Token has been revoked")
+    print(f"Revoked by another worker: still accepted from the cache ({cached[0]}), refused once the "
+          f"{ttl} s TTL has passed ({expired[0]}) - {'✅' if ok else '❌'}")
+    return ok
+
+
+async def test_token_revocation(ttl: float) -> bool:
+    from main import app
+
+    testkit.create_schema()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        claims_ok = await test_claims(client)
+        revoke_ok = await test_revoke(client)
+        other_worker_ok = await test_other_worker(client, ttl)
+    return claims_ok and revoke_ok and other_worker_ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ttl", type=float, default=0.5, help="Principal cache TTL for the other-worker check")
+    args = parser.parse_args()
+
+    try:
+        ok = await test_token_revocation(args.ttl)
+    finally:
+        await async_engine.dispose()
+
+    print("\n🎉 Stale, mismatched and revoked tokens are refused" if ok else "\n❌ Token revocation problems")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
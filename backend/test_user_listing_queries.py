@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Query-count test for GET /api/users/.
+A page of users must cost the same number of SQL statements whatever its size,
+and the NDJSON export must cost one statement per batch.
+
+Runs against a throwaway SQLite database:
+    python test_user_listing_queries.py
+"""
+
+import asyncio
+import json
+
+import testkit
+
+testkit.use_throwaway_database("user-listing")
+
+import httpx
+from sqlalchemy import event, insert, select
+
+from database import engine, async_engine
+from models import User, UserRole, StudentProfile
+
+STUDENTS = 300
+COMPANIES = 40
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def seed():
+    testkit.create_schema()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"name": f"Student {i}", "email": f"student{i}@example.com", "role": UserRole.STUDENT}
+            for i in range(STUDENTS)
+        ] + [
+            {"name": f"Company {i}", "email": f"company{i}@example.com", "role": UserRole.COMPANY, "company_name": f"Co {i}"}
+            for i in range(COMPANIES)
+        ])
+        student_ids = [
+            row[0] for row in connection.execute(select(User.id).where(User.role == UserRole.STUDENT))
+        ]
+        connection.execute(insert(StudentProfile), [
+            {"user_id": user_id, "cgpa": 7.5, "placed_final": False} for user_id in student_ids
+        ])
+
+
+async def statements_for(client, counter, url, headers) -> tuple:
+    counter.count = 0
+    r = await client.get(url, headers=headers)
+    assert r.status_code == 200, (url, r.status_code, r.text)
+    return counter.count, r
+
+
+async def test_constant_queries_per_page() -> bool:
+    from main import app
+
+    counter = StatementCounter()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        r = await client.post("/api/auth/register", json={
+            "name": "TPO", "email": "tpo@example.com", "password": "S3cretp@ss!", "role": "tpo",
+        })
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        # Warm the principal cache so authentication adds no statements
+        await client.get("/api/auth/me", headers=headers)
+
+        counts = {}
+        for limit in (1, 10, 100, 1000):
+            counts[limit], r = await statements_for(client, counter, f"/api/users/?limit={limit}", headers)
+            body = r.json()
+            assert len(body["items"]) == min(limit, STUDENTS + COMPANIES + 1)
+            students = [u for u in body["items"] if u["role"] == "student"]
+            assert all("student_profile" in u for u in students)
+
+        student_pages, cursor, seen = 0, None, 0
+        while True:
+            url = "/api/users/?role=student&limit=64" + (f"&cursor={cursor}" if cursor else "")
+            count, r = await statements_for(client, counter, url, headers)
+            assert count == counts[1], (url, count)
+            page = r.json()
+            seen += len(page["items"])
+            student_pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        ndjson_count, r = await statements_for(client, counter, "/api/users/?format=ndjson&limit=100", headers)
+        lines = [json.loads(line) for line in r.text.splitlines()]
+
+    event.remove(async_engine.sync_engine, "before_cursor_execute", counter)
+
+    constant = len(set(counts.values())) == 1
+    paged = seen == STUDENTS
+    total = STUDENTS + COMPANIES + 1
+    batches = -(-total // 100) + 1  # Full batches plus the final empty read
+    streamed = len(lines) == total and ndjson_count == batches
+
+    print(f"Statements per page by limit: {counts} - {'✅' if constant else '❌'}")
+    print(f"Paged {seen} students in {student_pages} pages - {'✅' if paged else '❌'}")
+    print(f"NDJSON streamed {len(lines)} users in {ndjson_count} statements - {'✅' if streamed else '❌'}")
+    return constant and paged and streamed
+
+
+async def main():
+    seed()
+    ok = await test_constant_queries_per_page()
+    await async_engine.dispose()
+
+    print("\n🎉 User listing query count is constant" if ok else "\n❌ User listing query count check failed")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""
+Shared scaffolding for the script tests (test_*.py).
+
+Each test runs against its own throwaway database, so it must point
+DATABASE_URL there before config.py and database.py are imported:
+
+    import testkit
+    testkit.use_throwaway_database("notifications")
+
+    from database import engine, ...
+
+The other helpers import the app's modules lazily for the same reason.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+
+def use_throwaway_database(name: str, url: Optional[str] = None) -> str:
+    """Point DATABASE_URL at url, or at a fresh SQLite file named after the test"""
+    if "database" in sys.modules or "config" in sys.modules:
+        raise RuntimeError("use_throwaway_database() must run before config.py or database.py is imported")
+    if url is None:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix=f'{name}-test-'), f'{name}.db')}"
+    os.environ["DATABASE_URL"] = url
+    return url
+
+
+def create_schema(fresh: bool = False):
+    """Create every table from the models; fresh drops them first"""
+    from database import Base, engine
+
+    if fresh:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def migrate_to(revision: str = "head"):
+    """Run the Alembic migrations up to revision, as init_db.upgrade_database() does for head"""
+    from alembic import command
+
+    from database import engine
+    from init_db import alembic_config
+
+    config = alembic_config()
+    config.attributes["configure_logger"] = False
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+def token_headers(user_id: Optional[int] = None, email: Optional[str] = None) -> dict:
+    """Bearer headers for an existing user, by id or email, without logging in"""
+    from sqlalchemy import select
+
+    from auth_utils import build_token_claims, create_access_token
+    from database import engine
+    from models import User
+
+    query = select(User.id, User.email, User.role, User.token_version)
+    query = query.where(User.id == user_id) if user_id is not None else query.where(User.email == email)
+    with engine.connect() as connection:
+        row = connection.execute(query).one()
+    return {"Authorization": f"Bearer {create_access_token(data=build_token_claims(SimpleNamespace(**row._mapping)))}"}
+
+
+def user_id(email: str) -> int:
+    from sqlalchemy import select
+
+    from database import engine
+    from models import User
+
+    with engine.connect() as connection:
+        return connection.execute(select(User.id).where(User.email == email)).scalar()
+
+
+class StatementRecorder:
+    """Collects (statement, parameters, executemany) for every statement the async engine runs while entered"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters, executemany))
+
+    def __enter__(self):
+        from sqlalchemy import event
+
+        from database import async_engine
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+
+        from database import async_engine
+
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self)
+
+
+async def wait_for_tasks(kind: str, timeout: float = 60):
+    """Wait until no task of this kind is queued or running"""
+    from sqlalchemy import func, select
+
+    from database import AsyncSessionLocal
+    from models import QueuedTask, TaskStatus
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        # Through the async engine: a blocking read here would hold up the workers
+        async with AsyncSessionLocal() as db:
+            open_tasks = (await db.execute(
+                select(func.count()).select_from(QueuedTask)
+                .where(QueuedTask.kind == kind, QueuedTask.status.in_([TaskStatus.QUEUED, TaskStatus.RUNNING]))
+            )).scalar()
+        if not open_tasks:
+            return
+        await asyncio.sleep(0.02)
+    raise TimeoutError(f"{kind} tasks did not finish")
@@ -21,6 +21,36 @@ interface NotificationContextType {
   updateNotifications: (notifications: Notification[]) => void;
 }
 
+interface ApiNotification {
+  id: number;
+  type: Notification['type'];
+  priority: Notification['priority'];
+  title: string;
+  message: string;
+  is_read: boolean;
+  created_at: string;
+}
+
+const fromApi = (n: ApiNotification): Notification => ({
+  id: String(n.id),
+  type: n.type,
+  title: n.title,
+  message: n.message,
+  timestamp: new Date(n.created_at).toLocaleString(),
+  read: n.is_read,
+  priority: n.priority,
+});
+
+// Persist a change made in the UI; local-only notifications (no token) are left alone
+const sendNotificationUpdate = (path: string, method: 'POST' | 'DELETE') => {
+  const token = localStorage.getItem('access_token');
+  if (!token) return;
+  fetch(`${API_BASE_URL}/notifications${path}`, {
+    method,
+    headers: { 'Authorization': `Bearer ${token}` },
+  }).catch(error => console.error('Error updating notifications:', error));
+};
+
 const NotificationContext = createContext<NotificationContextType | undefined>(undefined);
 
 export const useNotifications = () => {
@@ -78,7 +108,7 @@ export const NotificationProvider: React.FC<NotificationProviderProps> = ({ chil
           return;
         }
 
-        const response = await fetch(`${API_BASE_URL}/notifications`, {
+        const response = await fetch(`${API_BASE_URL}/notifications/`, {
           headers: {
             'Authorization': `Bearer ${token}`,
             'Content-Type': 'application/json'
@@ -87,7 +117,7 @@ export const NotificationProvider: React.FC<NotificationProviderProps> = ({ chil
 
         if (response.ok) {
           const data = await response.json();
-          setNotifications(Array.isArray(data) ? data : []);
+          setNotifications(Array.isArray(data.items) ? data.items.map(fromApi) : []);
         } else {
           // Use fallback data on API error
           setNotifications([
@@ -123,6 +153,34 @@ export const NotificationProvider: React.FC<NotificationProviderProps> = ({ chil
     loadNotifications();
   }, []);
 
+  // Changes pushed by the server as they are committed, instead of polling
+  useEffect(() => {
+    const token = localStorage.getItem('access_token');
+    if (!token) return;
+    const source = new EventSource(`${API_BASE_URL}/events/?access_token=${encodeURIComponent(token)}`);
+
+    source.addEventListener('notification', (event) => {
+      const notification = fromApi(JSON.parse((event as MessageEvent).data));
+      setNotifications(prev => [notification, ...prev.filter(n => n.id !== notification.id)]);
+    });
+    source.addEventListener('notifications_read', (event) => {
+      const { id } = JSON.parse((event as MessageEvent).data);
+      setNotifications(prev =>
+        prev.map(n => (id === null || n.id === String(id) ? { ...n, read: true } : n))
+      );
+    });
+    source.addEventListener('notification_deleted', (event) => {
+      const { id } = JSON.parse((event as MessageEvent).data);
+      setNotifications(prev => prev.filter(n => n.id !== String(id)));
+    });
+    source.addEventListener('dashboard', (event) => {
+      const { delta } = JSON.parse((event as MessageEvent).data);
+      window.dispatchEvent(new CustomEvent('dashboard-delta', { detail: delta }));
+    });
+
+    return () => source.close();
+  }, []);
+
   const unreadCount = notifications.filter(n => !n.read).length;
 
   const addNotification = (notification: Omit<Notification, 'id'>) => {
@@ -134,6 +192,7 @@ export const NotificationProvider: React.FC<NotificationProviderProps> = ({ chil
   };
 
   const markAsRead = (id: string) => {
+    sendNotificationUpdate(`/${id}/read`, 'POST');
     setNotifications(prev => 
       prev.map(notif => 
         notif.id === id ? { ...notif, read: true } : notif
@@ -142,12 +201,14 @@ export const NotificationProvider: React.FC<NotificationProviderProps> = ({ chil
   };
 
   const markAllAsRead = () => {
+    sendNotificationUpdate('/read-all', 'POST');
     setNotifications(prev => 
       prev.map(notif => ({ ...notif, read: true }))
     );
   };
 
   const deleteNotification = (id: string) => {
+    sendNotificationUpdate(`/${id}`, 'DELETE');
     setNotifications(prev => prev.filter(notif => notif.id !== id));
   };
 
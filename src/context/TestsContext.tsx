@@ -39,6 +39,38 @@ interface TestsContextType {
   markTestCompleted: (id: string) => void;
 }
 
+interface ApiTest {
+  id: number;
+  title: string;
+  company_name: string;
+  position: string;
+  type: Test['type'];
+  starts_at: string;
+  ends_at: string;
+  duration_minutes: number;
+  location: string | null;
+  instructions: string | null;
+}
+
+const pad = (n: number) => String(n).padStart(2, '0');
+
+const fromApi = (t: ApiTest): Test => {
+  const startsAt = new Date(t.starts_at);
+  return {
+    id: String(t.id),
+    company: t.company_name,
+    position: t.position,
+    type: t.type,
+    date: `${startsAt.getFullYear()}-${pad(startsAt.getMonth() + 1)}-${pad(startsAt.getDate())}`,
+    time: `${pad(startsAt.getHours())}:${pad(startsAt.getMinutes())}`,
+    duration: t.duration_minutes,
+    location: t.location ?? 'Online',
+    status: new Date(t.ends_at) > new Date() ? 'scheduled' : 'completed',
+    instructions: t.instructions ?? undefined,
+    reminderSet: false,
+  };
+};
+
 const TestsContext = createContext<TestsContextType | undefined>(undefined);
 
 export const useTests = () => {
@@ -93,7 +125,7 @@ export const TestsProvider: React.FC<TestsProviderProps> = ({ children }) => {
           return;
         }
 
-        const response = await fetch(`${API_BASE_URL}/tests`, {
+        const response = await fetch(`${API_BASE_URL}/tests/`, {
           headers: {
             'Authorization': `Bearer ${token}`,
             'Content-Type': 'application/json'
@@ -102,7 +134,7 @@ export const TestsProvider: React.FC<TestsProviderProps> = ({ children }) => {
 
         if (response.ok) {
           const data = await response.json();
-          setTests(Array.isArray(data) ? data : []);
+          setTests(Array.isArray(data.items) ? data.items.map(fromApi) : []);
         } else {
           // Use fallback data on API error
           setTests([
@@ -37,7 +37,7 @@ interface AuthResponse {
   user: User;
 }
 
-import { API_ORIGIN } from '@/lib/config';
+import { API_BASE_URL, API_ORIGIN } from '@/lib/config';
 
 class ApiClient {
   private baseUrl: string;
@@ -142,14 +142,39 @@ class ApiClient {
   }
 
   // Test endpoints
-  async getTests(): Promise<any[]> {
-    return this.request('/api/tests');
+  async getTests(): Promise<{ items: any[]; next_cursor: number | null }> {
+    return this.request('/api/tests/');
   }
 
   // Notification endpoints
-  async getNotifications(): Promise<any[]> {
-    return this.request('/api/notifications');
+  async getNotifications(): Promise<{ items: any[]; next_cursor: number | null; unread_count: number }> {
+    return this.request('/api/notifications/');
+  }
+
+  async getUnreadNotificationCount(): Promise<{ unread_count: number }> {
+    return this.request('/api/notifications/unread-count');
   }
 }
 
 export const apiClient = new ApiClient(API_ORIGIN);
+
+// GET /api/users/ returns { items, next_cursor } pages; follow next_cursor
+// until the last page to get every user with this role
+export async function fetchAllUsers(role: 'student' | 'company' | 'tpo', headers: HeadersInit): Promise<any[]> {
+  const users: any[] = [];
+  let cursor: number | null = null;
+  do {
+    const params = new URLSearchParams({ role, limit: '1000' });
+    if (cursor !== null) {
+      params.set('cursor', String(cursor));
+    }
+    const response = await fetch(`${API_BASE_URL}/users/?${params}`, { headers });
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+    const page: { items: any[]; next_cursor: number | null } = await response.json();
+    users.push(...page.items);
+    cursor = page.next_cursor;
+  } while (cursor !== null);
+  return users;
+}
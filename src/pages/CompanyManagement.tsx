@@ -22,6 +22,7 @@ import {
 import { GraduationHat } from "@/components/ui/graduation-hat";
 import { useToast } from "@/hooks/use-toast";
 import { API_BASE_URL } from "@/lib/config";
+import { fetchAllUsers } from "@/lib/api";
 
 interface Company {
   id: string;
@@ -67,27 +68,10 @@ const CompanyManagement = () => {
       setIsLoading(true);
       try {
         const token = localStorage.getItem('access_token');
-        const response = await fetch(`${API_BASE_URL}/users?role=company`, {
-          headers: {
-            'Content-Type': 'application/json',
-            ...(token ? { Authorization: `Bearer ${token}` } : {})
-          }
+        const companiesData = await fetchAllUsers('company', {
+          'Content-Type': 'application/json',
+          ...(token ? { Authorization: `Bearer ${token}` } : {})
         });
-        
-        if (!response.ok) {
-          throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-        }
-        
-        const companiesData = await response.json();
-        
-        // Handle empty response
-        if (!Array.isArray(companiesData)) {
-          console.warn('Companies data is not an array:', companiesData);
-          setCompanies([]);
-          setFilteredCompanies([]);
-          setIsLoading(false);
-          return;
-        }
 
         const formattedCompanies: Company[] = companiesData.map((company: any) => ({
           id: company.id.toString(),
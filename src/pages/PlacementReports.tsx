@@ -19,7 +19,7 @@ import {
   Loader2
 } from "lucide-react";
 import { useToast } from "@/hooks/use-toast";
-import { API_BASE_URL } from "@/lib/config";
+import { fetchAllUsers } from "@/lib/api";
 
 interface PlacementStats {
   totalStudents: number;
@@ -92,18 +92,11 @@ const PlacementReports = () => {
         }
 
         // Fetch real data from API
-        const [usersResponse, companiesResponse] = await Promise.all([
-          fetch(`${API_BASE_URL}/users?role=student`, { headers }),
-          fetch(`${API_BASE_URL}/users?role=company`, { headers })
+        const [studentsData, companiesData] = await Promise.all([
+          fetchAllUsers('student', headers),
+          fetchAllUsers('company', headers)
         ]);
 
-        if (!usersResponse.ok || !companiesResponse.ok) {
-          throw new Error('API requests failed');
-        }
-
-        const studentsData = await usersResponse.json();
-        const companiesData = await companiesResponse.json();
-
         // Calculate real statistics
         const placedStudents = studentsData.filter((student: any) => 
           student.student_profile?.placed_final === true
@@ -26,6 +26,7 @@ import {
 } from "lucide-react";
 import { SearchFilterBar } from "@/components/ui/search-filter-bar";
 import { API_BASE_URL } from "@/lib/config";
+import { fetchAllUsers } from "@/lib/api";
 
 interface Student {
   id: string;
@@ -66,13 +67,10 @@ const StudentManagement = () => {
       setIsLoading(true);
       try {
         const token = localStorage.getItem('access_token');
-        const response = await fetch(`${API_BASE_URL}/users?role=student`, {
-          headers: {
-            'Content-Type': 'application/json',
-            ...(token ? { Authorization: `Bearer ${token}` } : {})
-          }
+        const studentsData = await fetchAllUsers('student', {
+          'Content-Type': 'application/json',
+          ...(token ? { Authorization: `Bearer ${token}` } : {})
         });
-        const studentsData = await response.json();
         
         const formattedStudents: Student[] = studentsData.map((student: any) => ({
           id: student.id.toString(),
@@ -14,6 +14,7 @@ import {
   AlertTriangle
 } from "lucide-react";
 import { API_BASE_URL } from "@/lib/config";
+import { fetchAllUsers } from "@/lib/api";
 
 interface Student {
   id: string;
@@ -60,13 +61,7 @@ const TPODashboard = () => {
       }
 
       // Fetch students data
-      const studentsResponse = await fetch(`${API_BASE_URL}/users?role=student`, { headers });
-      
-      if (!studentsResponse.ok) {
-        throw new Error(`Students API failed: ${studentsResponse.status}`);
-      }
-      
-      const studentsData = await studentsResponse.json();
+      const studentsData = await fetchAllUsers('student', headers);
       
       // Transform students data
       const transformedStudents = studentsData.map((user: any) => ({
@@ -80,13 +75,7 @@ const TPODashboard = () => {
       }));
 
       // Fetch companies data
-      const companiesResponse = await fetch(`${API_BASE_URL}/users?role=company`, { headers });
-      
-      if (!companiesResponse.ok) {
-        throw new Error(`Companies API failed: ${companiesResponse.status}`);
-      }
-      
-      const companiesData = await companiesResponse.json();
+      const companiesData = await fetchAllUsers('company', headers);
       
       // Transform companies data
       const transformedCompanies = companiesData.map((user: any) => ({
@@ -146,6 +135,22 @@ const TPODashboard = () => {
     fetchDashboardData();
   }, []);
 
+  // Counts pushed over the notification event stream (see NotificationContext)
+  useEffect(() => {
+    const applyDelta = (event: Event) => {
+      const delta = (event as CustomEvent<Record<string, number>>).detail;
+      setStats(prev => {
+        const next: Record<string, number> = { ...prev };
+        Object.entries(delta).forEach(([key, change]) => {
+          next[key] = (next[key] ?? 0) + change;
+        });
+        return next as typeof prev;
+      });
+    };
+    window.addEventListener('dashboard-delta', applyDelta);
+    return () => window.removeEventListener('dashboard-delta', applyDelta);
+  }, []);
+
   const getStatusColor = (status: string) => {
     switch (status) {
       case 'active': return 'bg-blue-500';